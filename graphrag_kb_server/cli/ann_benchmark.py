@@ -0,0 +1,111 @@
+import time
+from pathlib import Path
+
+import click
+import numpy as np
+import nano_vectordb.dbs as nano_dbs
+
+from graphrag_kb_server.service.lightrag.lightrag_ann_index import IVFIndex
+
+
+def _clustered_matrix(rows: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    """Random embeddings grouped around topics, like the embeddings of a document collection."""
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((clusters, dim)).astype(np.float32)
+    matrix = topics[rng.integers(0, clusters, rows)]
+    matrix += 0.6 * rng.standard_normal((rows, dim)).astype(np.float32)
+    return nano_dbs.normalize(matrix).astype(np.float32)
+
+
+def _load_matrix(vdb_file: Path) -> np.ndarray:
+    storage = nano_dbs.load_storage(str(vdb_file))
+    assert storage is not None, f"Cannot load {vdb_file}"
+    return nano_dbs.normalize(storage["matrix"]).astype(np.float32)
+
+
+def _exact_search(matrix: np.ndarray, query: np.ndarray, top_k: int) -> np.ndarray:
+    """The scan done by nano-vectordb: scores of all rows and a full sort."""
+    scores = np.dot(matrix, query)
+    return np.argsort(scores)[-top_k:][::-1]
+
+
+def _percentile_ms(timings: list[float], p: float) -> float:
+    return float(np.percentile(timings, p) * 1000)
+
+
+@click.command()
+@click.option(
+    "--vdb-file",
+    type=click.Path(exists=True, path_type=Path),
+    default=None,
+    help="A vdb_*.json storage. Synthetic embeddings are used if missing.",
+)
+@click.option(
+    "--rows", type=int, default=200_000, help="Number of synthetic embeddings"
+)
+@click.option(
+    "--dim", type=int, default=1536, help="Dimension of the synthetic embeddings"
+)
+@click.option("--queries", type=int, default=200, help="Number of queries")
+@click.option("--top-k", type=int, default=40, help="Number of results per query")
+@click.option(
+    "--nprobe",
+    type=int,
+    multiple=True,
+    default=[4, 8, 16, 32, 64],
+    help="Number of lists scored per query",
+)
+def benchmark(
+    vdb_file: Path | None,
+    rows: int,
+    dim: int,
+    queries: int,
+    top_k: int,
+    nprobe: tuple[int, ...],
+):
+    """Compares the recall@k and the latency of the IVF index with the exact scan."""
+    if vdb_file is not None:
+        matrix = _load_matrix(vdb_file)
+    else:
+        matrix = _clustered_matrix(rows, dim, max(1, rows // 500), seed=42)
+    rng = np.random.default_rng(7)
+    # Queries close to stored rows, as questions are close to the chunks which answer them
+    query_rows = matrix[rng.integers(0, len(matrix), queries)]
+    query_matrix = nano_dbs.normalize(
+        query_rows + 0.3 * rng.standard_normal(query_rows.shape).astype(np.float32)
+    ).astype(np.float32)
+    click.echo(
+        f"{matrix.shape[0]} rows of dimension {matrix.shape[1]}, {queries} queries, k={top_k}"
+    )
+
+    timings = []
+    expected = []
+    for query in query_matrix:
+        start = time.perf_counter()
+        expected.append(set(_exact_search(matrix, query, top_k).tolist()))
+        timings.append(time.perf_counter() - start)
+    click.echo(
+        f"exact scan: p50 {_percentile_ms(timings, 50):.2f} ms, p95 {_percentile_ms(timings, 95):.2f} ms"
+    )
+
+    start = time.perf_counter()
+    index = IVFIndex.train(matrix)
+    click.echo(
+        f"IVF index: {len(index.centroids)} lists built in {time.perf_counter() - start:.1f} s"
+    )
+    for probes in nprobe:
+        timings = []
+        recalls = []
+        for query, exact in zip(query_matrix, expected):
+            start = time.perf_counter()
+            found, _ = index.search(matrix, query, top_k, probes)
+            timings.append(time.perf_counter() - start)
+            recalls.append(len(exact.intersection(found.tolist())) / len(exact))
+        click.echo(
+            f"nprobe {probes:>4}: recall@{top_k} {np.mean(recalls):.3f}, "
+            f"p50 {_percentile_ms(timings, 50):.2f} ms, p95 {_percentile_ms(timings, 95):.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -96,6 +96,14 @@ class Config:
         "OPENROUTER_PROVIDER"
     )  # Optional: specify provider (e.g., "openai", "anthropic", "mistral")
     extract_links_on_start = os.getenv("EXTRACT_LINKS_ON_START", "false") == "true"
+    # "eager" loads all projects before the server starts, "background" loads them after
+    startup_mode = os.getenv("STARTUP_MODE", "eager")
+    assert startup_mode in ["eager", "background"], "Invalid startup mode"
+    startup_warmup_concurrency = int(os.getenv("STARTUP_WARMUP_CONCURRENCY", "4"))
+    # How often the resource usage per project is stored in the database. Disabled if 0.
+    resource_snapshot_interval_minutes = int(
+        os.getenv("RESOURCE_SNAPSHOT_INTERVAL_MINUTES", "60")
+    )
     apify_token = os.getenv("APIFY_TOKEN")
     assert apify_token is not None, "Please specify the Apify token"
 
@@ -160,6 +168,102 @@ class LightRAGConfig:
     assert lightrag_model_type in [
         m.value for m in LightRAGModelType
     ], "Invalid LightRAG model type"
+    lightrag_coalesce_queries = os.getenv("LIGHTRAG_COALESCE_QUERIES", "true") == "true"
+    lightrag_pipelined_retrieval = (
+        os.getenv("LIGHTRAG_PIPELINED_RETRIEVAL", "true") == "true"
+    )
+    lightrag_batch_max_concurrency = int(
+        os.getenv("LIGHTRAG_BATCH_MAX_CONCURRENCY", "4")
+    )
+    # Approximate memory for the loaded LightRAG projects in MB. No limit if 0.
+    lightrag_memory_budget_mb = int(os.getenv("LIGHTRAG_MEMORY_BUDGET_MB", "0"))
+    # Whether the vector storages are loaded from memory-mapped .npy sidecar files
+    lightrag_vector_sidecar = os.getenv("LIGHTRAG_VECTOR_SIDECAR", "true") == "true"
+    # Whether the vector storages with at least LIGHTRAG_ANN_MIN_ROWS rows are searched with an IVF index
+    lightrag_ann_index = os.getenv("LIGHTRAG_ANN_INDEX", "true") == "true"
+    lightrag_ann_min_rows = int(os.getenv("LIGHTRAG_ANN_MIN_ROWS", "20000"))
+    # Number of index lists scored per query. Higher values have a better recall and a higher latency.
+    lightrag_ann_nprobe = int(os.getenv("LIGHTRAG_ANN_NPROBE", "16"))
+    # Quantization of the stored embeddings (none, int8 or float16). The rows are ranked with the
+    # quantized matrix and the best ones are rescored with the memory-mapped float32 matrix.
+    lightrag_quantization = os.getenv("LIGHTRAG_QUANTIZATION", "none")
+    assert lightrag_quantization in ["none", "int8", "float16"], "Invalid quantization"
+    # Projects (tennant/project) which use the quantization. All projects if empty.
+    lightrag_quantization_projects = [
+        p.strip()
+        for p in os.getenv("LIGHTRAG_QUANTIZATION_PROJECTS", "").split(",")
+        if p.strip()
+    ]
+    # Whether the graph is loaded from a binary snapshot instead of parsing the GraphML file
+    lightrag_graph_snapshot = os.getenv("LIGHTRAG_GRAPH_SNAPSHOT", "true") == "true"
+    # Maximum number of graphs kept in memory for the analytics only, besides those of the loaded LightRAG instances
+    lightrag_analytics_graphs = int(os.getenv("LIGHTRAG_ANALYTICS_GRAPHS", "4"))
+    # Whether text chunks and full documents are read on demand from a data file with an offset index
+    lightrag_chunk_store = os.getenv("LIGHTRAG_CHUNK_STORE", "true") == "true"
+    # Number of recently read chunks kept in memory per storage
+    lightrag_chunk_store_cache_size = int(
+        os.getenv("LIGHTRAG_CHUNK_STORE_CACHE_SIZE", "1000")
+    )
+    # Whether indexing writes a new version of the project which replaces the served one when complete
+    lightrag_hot_swap = os.getenv("LIGHTRAG_HOT_SWAP", "true") == "true"
+    lightrag_semantic_cache = os.getenv("LIGHTRAG_SEMANTIC_CACHE", "false") == "true"
+    # Projects (tennant/project) which use the semantic cache. All projects if empty.
+    lightrag_semantic_cache_projects = [
+        p.strip()
+        for p in os.getenv("LIGHTRAG_SEMANTIC_CACHE_PROJECTS", "").split(",")
+        if p.strip()
+    ]
+    lightrag_semantic_cache_size = int(
+        os.getenv("LIGHTRAG_SEMANTIC_CACHE_SIZE", "1000")
+    )
+    lightrag_semantic_cache_threshold = float(
+        os.getenv("LIGHTRAG_SEMANTIC_CACHE_THRESHOLD", "0.95")
+    )
+    # Minimum share of the query words matched by entity names for the fast keyword mode
+    lightrag_fast_keywords_min_coverage = float(
+        os.getenv("LIGHTRAG_FAST_KEYWORDS_MIN_COVERAGE", "0.5")
+    )
+    lightrag_keyword_cache_size = int(os.getenv("LIGHTRAG_KEYWORD_CACHE_SIZE", "5000"))
+    lightrag_keyword_cache_timeout = int(
+        os.getenv("LIGHTRAG_KEYWORD_CACHE_TIMEOUT", str(3600 * 24 * 30))
+    )
+    # Seconds after a change of a project's cache before it is written to disk
+    lightrag_cache_write_delay = float(os.getenv("LIGHTRAG_CACHE_WRITE_DELAY", "30"))
+    # Whether the embedding requests are combined into batches and their vectors cached on disk
+    lightrag_embedding_batcher = (
+        os.getenv("LIGHTRAG_EMBEDDING_BATCHER", "true") == "true"
+    )
+    # Maximum number of texts per embedding request
+    lightrag_embedding_batch_size = int(
+        os.getenv("LIGHTRAG_EMBEDDING_BATCH_SIZE", "128")
+    )
+    # Time in milliseconds during which concurrent texts are collected into a batch
+    lightrag_embedding_batch_wait_ms = float(
+        os.getenv("LIGHTRAG_EMBEDDING_BATCH_WAIT_MS", "5")
+    )
+    # Maximum number of concurrent embedding requests of the server
+    lightrag_embedding_max_concurrency = int(
+        os.getenv("LIGHTRAG_EMBEDDING_MAX_CONCURRENCY", "8")
+    )
+    # Whether the embeddings are cached by content hash in the root directory
+    lightrag_embedding_cache = os.getenv("LIGHTRAG_EMBEDDING_CACHE", "true") == "true"
+    # Betweenness centrality of the topics: exact, or approximate from sampled pivot nodes for large projects
+    lightrag_betweenness_mode = os.getenv("LIGHTRAG_BETWEENNESS_MODE", "exact")
+    assert lightrag_betweenness_mode in [
+        "exact",
+        "approximate",
+    ], "Invalid betweenness mode"
+    # The approximate scores are within epsilon of the exact normalized scores with probability 1 - delta
+    lightrag_betweenness_epsilon = float(
+        os.getenv("LIGHTRAG_BETWEENNESS_EPSILON", "0.05")
+    )
+    lightrag_betweenness_delta = float(os.getenv("LIGHTRAG_BETWEENNESS_DELTA", "0.1"))
+    # Pivots per connected component of the approximation. Derived from the error bound if 0.
+    lightrag_betweenness_samples = int(os.getenv("LIGHTRAG_BETWEENNESS_SAMPLES", "0"))
+    # Whether the betweenness is computed in a worker process instead of a thread of the server
+    lightrag_betweenness_worker = (
+        os.getenv("LIGHTRAG_BETWEENNESS_WORKER", "true") == "true"
+    )
 
 
 class CAGConfig:
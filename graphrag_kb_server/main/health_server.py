@@ -0,0 +1,61 @@
+from aiohttp import web
+
+from graphrag_kb_server.config import cfg
+from graphrag_kb_server.main.cors import CORS_HEADERS
+from graphrag_kb_server.main.error_handler import handle_error
+from graphrag_kb_server.service.project_warmup import project_warmup
+
+SERVICE_UNAVAILABLE = 503
+
+routes = web.RouteTableDef()
+
+
+@routes.get("/health/ready")
+async def health_ready(request: web.Request) -> web.Response:
+    """
+    Optional route description
+    ---
+    summary: Returns whether the server has finished loading the projects.
+    tags:
+      - health
+    responses:
+      '200':
+        description: The server is ready.
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                status:
+                  type: string
+      '503':
+        description: The projects are still being loaded in the background. Queries are served, but cold projects are loaded on demand.
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                status:
+                  type: string
+                total:
+                  type: integer
+                counts:
+                  type: object
+                  description: Number of projects per state (cold, warming, warm, failed).
+    """
+
+    async def handle_request(_: web.Request) -> web.Response:
+        if cfg.startup_mode == "eager" or project_warmup.is_ready():
+            return web.json_response({"status": "ready"}, headers=CORS_HEADERS)
+        snapshot = project_warmup.snapshot()
+        return web.json_response(
+            {
+                "status": "warming",
+                "total": snapshot["total"],
+                "counts": snapshot["counts"],
+            },
+            status=SERVICE_UNAVAILABLE,
+            headers=CORS_HEADERS,
+        )
+
+    return await handle_error(handle_request, request=request)
@@ -148,6 +148,7 @@ async def get_context(
     context_size: int | None = None,
     format: str = "json_string",
     keywords: bool = False,
+    keyword_mode: str = "fast",
 ) -> str:
     """
     Retrieve the RAG knowledge-base context for a project and question.
@@ -162,6 +163,8 @@ async def get_context(
                       json_string_with_json. Default: json_string.
         keywords:     If True, append high/low-level keywords to the context
                       (LightRAG only). Default: False.
+        keyword_mode: fast (match the entity names, LLM only as fallback) or
+                      llm. Default: fast.
     """
     token = _resolve_token(ctx)
     params: dict[str, Any] = {
@@ -171,6 +174,7 @@ async def get_context(
         "search": search,
         "format": format,
         "keywords": str(keywords).lower(),
+        "keyword_mode": keyword_mode,
     }
     if context_size is not None:
         params["context_size"] = context_size
@@ -28,6 +28,19 @@ from graphrag_kb_server.logger import logger
 from graphrag_kb_server.config import admin_cfg, jwt_cfg, cfg
 from graphrag_kb_server.main.cors import CORS_HEADERS
 from graphrag_kb_server.service.generate_url_service import generate_direct_url
+from graphrag_kb_server.service.lightrag.lightrag_centrality import centrality_stats
+from graphrag_kb_server.service.lightrag.lightrag_coalescing import query_coalescer
+from graphrag_kb_server.service.lightrag.lightrag_embedding_batcher import (
+    embedding_batcher,
+)
+from graphrag_kb_server.service.lightrag.lightrag_keyword_cache import keyword_cache
+from graphrag_kb_server.service.lightrag.lightrag_semantic_cache import (
+    semantic_answer_cache,
+)
+from graphrag_kb_server.service.lightrag.lightrag_init import lightrag_cache
+from graphrag_kb_server.service.query_metrics import query_metrics
+from graphrag_kb_server.service.project_warmup import project_warmup
+from graphrag_kb_server.service.resource_accounting import resource_accounting
 
 
 UNAUTHORIZED = 401
@@ -641,6 +654,204 @@ async def list_tennants(request: web.Request) -> web.Response:
     return await handle_error(handle_request, request=request)
 
 
+@routes.options("/protected/tennant/query_metrics")
+async def query_metrics_options(request: web.Request) -> web.Response:
+    return web.json_response({"message": "Accept all hosts"}, headers=CORS_HEADERS)
+
+
+@routes.get("/protected/tennant/query_metrics")
+async def get_query_metrics(request: web.Request) -> web.Response:
+    """
+    Optional route description
+    ---
+    summary: Returns the latency histograms of the query pipeline stages per project and search mode.
+    tags:
+      - admin
+    security:
+      - bearerAuth: []
+    parameters:
+      - name: project
+        in: query
+        required: false
+        description: Restricts the metrics to a project, in the format tennant/project.
+        schema:
+          type: string
+    responses:
+      '200':
+        description: The latency histograms and the query cache statistics.
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                spans:
+                  type: array
+                  items:
+                    type: object
+                    properties:
+                      project:
+                        type: string
+                      mode:
+                        type: string
+                      span:
+                        type: string
+                        description: The pipeline stage, e.g. keywords, kg_search, llm_first_token or total.
+                      count:
+                        type: integer
+                      mean_ms:
+                        type: number
+                      max_ms:
+                        type: number
+                      p50_ms:
+                        type: number
+                      p95_ms:
+                        type: number
+                      p99_ms:
+                        type: number
+                      buckets:
+                        type: object
+                        description: Number of observations per upper bucket bound in milliseconds.
+                keyword_cache:
+                  type: object
+                  description: Hits, misses and hit rate of the keyword extraction cache.
+                semantic_cache:
+                  type: object
+                  description: Hits, misses and hit rate of the semantic answer cache.
+                residency:
+                  type: object
+                  description: Memory, hits, misses, evictions and load times of the loaded LightRAG projects.
+                coalescing:
+                  type: object
+                  description: Number of coalesced (follower) and executed (leader) queries.
+                embeddings:
+                  type: object
+                  description: Requested, cached and embedded texts and the number of embedding requests.
+                centrality:
+                  type: object
+                  description: Milliseconds taken by each centrality measure in the last computation, per project.
+      '401':
+        description: Unauthorized. The client must provide a valid Bearer token.
+      '500':
+        description: Internal server error.
+    """
+
+    async def handle_request(request: web.Request) -> web.Response:
+        project = request.rel_url.query.get("project", None)
+        return web.json_response(
+            {
+                "spans": query_metrics.snapshot(project),
+                "keyword_cache": keyword_cache.stats(),
+                "semantic_cache": semantic_answer_cache.stats(),
+                "residency": lightrag_cache.stats(),
+                "coalescing": {
+                    "leaders": query_coalescer.leaders,
+                    "followers": query_coalescer.followers,
+                    "in_flight": query_coalescer.in_flight(),
+                },
+                "embeddings": embedding_batcher.stats(),
+                "centrality": centrality_stats(project),
+            },
+            headers=CORS_HEADERS,
+        )
+
+    return await handle_error(handle_request, request=request)
+
+
+@routes.options("/protected/tennant/resource_usage")
+async def resource_usage_options(request: web.Request) -> web.Response:
+    return web.json_response({"message": "Accept all hosts"}, headers=CORS_HEADERS)
+
+
+@routes.get("/protected/tennant/resource_usage")
+async def get_resource_usage(request: web.Request) -> web.Response:
+    """
+    Optional route description
+    ---
+    summary: Returns the resource usage per tennant and project since the server started.
+    tags:
+      - admin
+    security:
+      - bearerAuth: []
+    parameters:
+      - name: tennant
+        in: query
+        required: false
+        description: Restricts the usage to a tennant folder.
+        schema:
+          type: string
+    responses:
+      '200':
+        description: The resource usage per tennant, with its totals and its projects.
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                started_at:
+                  type: string
+                  description: When the usage counters were started.
+                tennants:
+                  type: array
+                  items:
+                    type: object
+                    properties:
+                      tennant:
+                        type: string
+                      totals:
+                        type: object
+                        description: The sums of the project values, except the latency percentiles.
+                      projects:
+                        type: array
+                        items:
+                          type: object
+                          properties:
+                            tennant:
+                              type: string
+                            engine:
+                              type: string
+                            project:
+                              type: string
+                            resident_memory_bytes:
+                              type: integer
+                              description: Approximate memory of the loaded storages.
+                            disk_bytes:
+                              type: integer
+                            query_count:
+                              type: integer
+                            query_p50_ms:
+                              type: number
+                            query_p95_ms:
+                              type: number
+                            query_p99_ms:
+                              type: number
+                            llm_calls:
+                              type: integer
+                            prompt_tokens:
+                              type: integer
+                            completion_tokens:
+                              type: integer
+                            indexing_runs:
+                              type: integer
+                            indexing_seconds:
+                              type: number
+                unattributed:
+                  type: object
+                  description: LLM usage which is not related to a project.
+      '401':
+        description: Unauthorized. The client must provide a valid Bearer token.
+      '500':
+        description: Internal server error.
+    """
+
+    async def handle_request(request: web.Request) -> web.Response:
+        tennant = request.rel_url.query.get("tennant", None)
+        return web.json_response(
+            await resource_accounting.snapshot(tennant), headers=CORS_HEADERS
+        )
+
+    return await handle_error(handle_request, request=request)
+
+
 @routes.post("/protected/token/create_read_only_token")
 async def create_read_only_token(request: web.Request) -> web.Response:
     """
@@ -1101,3 +1312,58 @@ async def validate_token(request: web.Request) -> web.Response:
             )
 
     return await handle_error(handle_request, request=request)
+
+
+@routes.options("/protected/tennant/project_warm_state")
+async def project_warm_state_options(request: web.Request) -> web.Response:
+    return web.json_response({"message": "Accept all hosts"}, headers=CORS_HEADERS)
+
+
+@routes.get("/protected/tennant/project_warm_state")
+async def get_project_warm_state(request: web.Request) -> web.Response:
+    """
+    Optional route description
+    ---
+    summary: Returns the warm-up state of the projects loaded in the background after startup.
+    tags:
+      - admin
+    security:
+      - bearerAuth: []
+    responses:
+      '200':
+        description: The warm-up state of each project.
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                ready:
+                  type: boolean
+                  description: Whether the background warm-up has finished.
+                total:
+                  type: integer
+                counts:
+                  type: object
+                  description: Number of projects per state.
+                projects:
+                  type: array
+                  description: The projects in warm-up order, i.e. the most recently searched first.
+                  items:
+                    type: object
+                    properties:
+                      project:
+                        type: string
+                        description: The project in the format tennant/project.
+                      state:
+                        type: string
+                        enum: [cold, warming, warm, failed]
+      '401':
+        description: Unauthorized. The client must provide a valid Bearer token.
+      '500':
+        description: Internal server error.
+    """
+
+    async def handle_request(_: web.Request) -> web.Response:
+        return web.json_response(project_warmup.snapshot(), headers=CORS_HEADERS)
+
+    return await handle_error(handle_request, request=request)
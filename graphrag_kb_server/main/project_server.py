@@ -17,6 +17,7 @@ from graphrag_kb_server.model.rag_parameters import (
     ContextParameters,
     QueryParameters,
     ContextFormat,
+    KeywordMode,
 )
 from graphrag_kb_server.model.context import Search
 from graphrag_kb_server.model.project import IndexingStatus
@@ -25,7 +26,7 @@ from graphrag_kb_server.model.topics import (
     SimilarityTopicsRequest,
     SimilarityTopicsMethod,
 )
-from graphrag_kb_server.config import cfg
+from graphrag_kb_server.config import cfg, lightrag_cfg
 from graphrag_kb_server.main.cors import CORS_HEADERS
 
 from graphrag_kb_server.service.zip_service import zip_input
@@ -41,9 +42,13 @@ from graphrag_kb_server.main.project_request_functions import (
 from graphrag_kb_server.service.index_support import save_webpage_to_text, unzip_file
 from graphrag_kb_server.utils.file_support import write_uploaded_file
 from graphrag_kb_server.model.engines import find_engine_from_query, find_engine, Engine
+from graphrag_kb_server.model.node_centrality import CentralityMeasure
 from graphrag_kb_server.service.tennant import find_project_folder
 from graphrag_kb_server.service.lightrag.lightrag_index_support import acreate_lightrag
 from graphrag_kb_server.service.lightrag.lightrag_search import lightrag_search
+from graphrag_kb_server.service.lightrag.lightrag_batch_search import (
+    lightrag_batch_search,
+)
 from graphrag_kb_server.service.lightrag.lightrag_constants import INPUT_FOLDER
 from graphrag_kb_server.service.lightrag.lightrag_visualization import (
     generate_lightrag_graph_visualization,
@@ -62,7 +67,11 @@ from graphrag_kb_server.service.lightrag.lightrag_clustering import (
     generate_communities_json,
 )
 from graphrag_kb_server.main.simple_template import HTML_CONTENT
-from graphrag_kb_server.main.query_support import enrich_text_units_context, execute_query
+from graphrag_kb_server.main.query_support import (
+    add_links_to_response,
+    enrich_text_units_context,
+    execute_query,
+)
 from graphrag_kb_server.service.lightrag.lightrag_summary import get_summary
 from graphrag_kb_server.service.lightrag.lightrag_graph_support import (
     create_communities_gexf_for_project,
@@ -321,7 +330,7 @@ async def upload_index(request: web.Request) -> web.Response:
             return
 
     async def handle_request(request: web.Request) -> web.Response:
-        from graphrag_kb_server.service.project import clear_rag
+        from graphrag_kb_server.service.project import clear_project_input, clear_rag
 
         saved_files = []
         body = request["data"]["body"]
@@ -350,8 +359,14 @@ async def upload_index(request: web.Request) -> web.Response:
                 project_folder: Path = find_project_folder(
                     tennant_folder, engine, sanitized_project_name
                 )
-                if engine == Engine.CAG or not incremental:
+                if engine == Engine.CAG:
                     await clear_rag(project_folder)
+                elif not incremental:
+                    if lightrag_cfg.lightrag_hot_swap:
+                        # The served version is replaced when the new one is indexed
+                        clear_project_input(project_folder)
+                    else:
+                        await clear_rag(project_folder)
 
                 if asynchronous:
                     asyncio.create_task(
@@ -785,6 +800,179 @@ async def chat(request: web.Request) -> web.Response:
     return await handle_error(handle_request, request=request)
 
 
+BATCH_SEARCH_MODES = [Search.LOCAL, Search.GLOBAL, Search.ALL, Search.NAIVE]
+
+
+@routes.options("/protected/project/batch_query")
+async def batch_query_options(_: web.Request) -> web.Response:
+    return web.json_response({"message": "Accept all hosts"}, headers=CORS_HEADERS)
+
+
+@routes.post("/protected/project/batch_query")
+async def batch_query(request: web.Request) -> web.Response:
+    """
+    Answers multiple questions about the same project in one request
+    ---
+    summary: returns the responses to a list of questions using the LightRAG index. The questions share the embedding call, the vector search and the chunk reads.
+    tags:
+      - project
+    security:
+      - bearerAuth: []
+    parameters:
+      - name: project
+        in: query
+        required: true
+        description: The project name
+        schema:
+          type: string
+      - name: engine
+        in: query
+        required: true
+        description: The type of engine used to run the RAG system
+        schema:
+          type: string
+          enum: [lightrag]
+      - name: keyword_mode
+        in: query
+        required: false
+        description: How the keywords are extracted. "fast" matches the question against the entity names and only calls the LLM if too few words match.
+        schema:
+          type: string
+          enum: [llm, fast]
+          default: llm
+    requestBody:
+      required: true
+      content:
+        application/json:
+          schema:
+            type: object
+            properties:
+              questions:
+                type: array
+                items:
+                  type: string
+                description: The questions to answer.
+                default: ["What are the main topics?", "Who are the main actors?"]
+              search:
+                type: string
+                description: The type of the search (local, global).
+                enum: [local, global, all, naive]
+              context_size:
+                type: integer
+                description: The size of the context, like eg 14000
+                format: int32
+                default: 14000
+              system_prompt_additional:
+                type: string
+                description: Additional instructions to the LLM. This will not override the original system prompt.
+                default: ""
+              include_context:
+                type: boolean
+                description: Whether to include the context in the responses.
+                default: false
+              structured_output:
+                type: boolean
+                description: Whether to use structured output.
+                default: false
+              max_concurrency:
+                type: integer
+                description: The maximum number of questions answered concurrently.
+                format: int32
+                default: 4
+    responses:
+      '200':
+        description: The responses to the questions in the order of the questions
+        content:
+          application/json:
+            schema:
+              type: array
+              items:
+                type: object
+      '400':
+        description: Bad Request - No project found.
+        content:
+          application/json:
+            example:
+              status: "error"
+              message: "No project found"
+
+    """
+
+    async def handle_request(request: web.Request) -> web.Response:
+        match extract_tennant_folder(request):
+            case Response() as error_response:
+                return error_response
+            case Path() as tennant_folder:
+                match handle_project_folder(request, tennant_folder):
+                    case Response() as error_response:
+                        return error_response
+                    case Path() as project_dir:
+                        body = request["data"]["body"]
+                        questions = body.get("questions", [])
+                        if not isinstance(questions, list) or not all(
+                            isinstance(q, str) for q in questions
+                        ):
+                            return invalid_response(
+                                "Invalid questions",
+                                "Please specify the questions as a list of strings",
+                            )
+                        if find_engine_from_query(request) != Engine.LIGHTRAG:
+                            return invalid_response(
+                                "Unsupported engine",
+                                "Batch queries are only supported by LightRAG",
+                            )
+                        search = body.get("search", Search.ALL.value)
+                        if search not in BATCH_SEARCH_MODES:
+                            return invalid_response(
+                                "Invalid search",
+                                f"Please specify one of these searches: {', '.join(BATCH_SEARCH_MODES)}",
+                            )
+                        if search == Search.ALL:
+                            search = "hybrid"
+                        keyword_mode = request.rel_url.query.get(
+                            "keyword_mode", KeywordMode.LLM.value
+                        )
+                        if keyword_mode not in KeywordMode:
+                            return invalid_response(
+                                "Invalid keyword mode",
+                                f"Please specify one of these keyword modes: {', '.join(KeywordMode)}",
+                            )
+                        query_params = QueryParameters(
+                            format=Format.JSON.value,
+                            search=search,
+                            engine=Engine.LIGHTRAG,
+                            context_params=ContextParameters(
+                                query="",
+                                project_dir=project_dir,
+                                context_size=body.get("context_size", 14000),
+                            ),
+                            system_prompt_additional=body.get(
+                                "system_prompt_additional", ""
+                            ),
+                            include_context=body.get("include_context", False),
+                            structured_output=body.get("structured_output", False),
+                            keyword_mode=keyword_mode,
+                        )
+                        chat_responses = await lightrag_batch_search(
+                            query_params, questions, body.get("max_concurrency")
+                        )
+                        chat_responses = await asyncio.gather(
+                            *[
+                                add_links_to_response(chat_response, project_dir)
+                                for chat_response in chat_responses
+                            ]
+                        )
+                        return web.json_response(
+                            [
+                                chat_response.model_dump()
+                                for chat_response in chat_responses
+                            ],
+                            headers=CORS_HEADERS,
+                        )
+
+    return await handle_error(handle_request, request=request)
+
+
 @routes.options("/protected/project/topics")
 async def project_topics_options(_: web.Request) -> web.Response:
     return web.json_response({"message": "Accept all hosts"}, headers=CORS_HEADERS)
@@ -851,6 +1039,14 @@ async def project_topics(request: web.Request) -> web.Response:
         schema:
           type: boolean
           default: false
+      - name: centrality_measure
+        in: query
+        required: false
+        description: The precomputed centrality measure which ranks the topics. Only used for LightRAG
+        schema:
+          type: string
+          enum: [betweenness, pagerank, degree, eigenvector, community]
+          default: betweenness
     responses:
       '200':
         description: Expected response to a valid request
@@ -876,6 +1072,14 @@ async def project_topics(request: web.Request) -> web.Response:
                 deduplicate_topics_param = (
                     request.rel_url.query.get("deduplicate_topics", "false") == "true"
                 )
+                centrality_measure = request.rel_url.query.get(
+                    "centrality_measure", CentralityMeasure.BETWEENNESS
+                )
+                if centrality_measure not in CentralityMeasure:
+                    return invalid_response(
+                        "Invalid centrality measure",
+                        f"Invalid centrality measure: {centrality_measure}",
+                    )
                 topics = await generate_topics(
                     TopicsRequest(
                         project_dir=project_dir,
@@ -884,6 +1088,7 @@ async def project_topics(request: web.Request) -> web.Response:
                         add_questions=add_questions,
                         entity_type_filter=entity_type_filter,
                         deduplicate_topics=deduplicate_topics_param,
+                        centrality_measure=centrality_measure,
                     )
                 )
                 format = request.rel_url.query.get("format", Format.JSON.value)
@@ -1072,6 +1277,11 @@ async def project_related_topics(request: web.Request) -> web.Response:
               text:
                 type: string
                 description: The text to find related entities for
+              sources:
+                type: array
+                items:
+                  type: string
+                description: The source entities of the personalized_pagerank method. Only the source if empty.
               limit:
                 type: integer
                 format: int32
@@ -1108,10 +1318,13 @@ async def project_related_topics(request: web.Request) -> web.Response:
                     format: int32
                     description: The number of independent runs to average results
                     default: 10
+                  seed:
+                    type: integer
+                    description: The seed of the random walks, for reproducible results. Random if missing
               similarity_topics_method:
                 type: string
                 description: The method to use for similarity topics.
-                enum: [random_walk, nearest_neighbors]
+                enum: [random_walk, nearest_neighbors, personalized_pagerank]
                 default: random_walk
     responses:
       '200':
@@ -1157,11 +1370,13 @@ async def project_related_topics(request: web.Request) -> web.Response:
                     body = await request.json()
                     source = body.get("source", "AI")
                     text = body.get("text", "")
+                    sources = body.get("sources", [])
                     random_walk_parameters = body.get("random_walk_parameters", {})
                     samples = random_walk_parameters.get("samples", 50000)
                     path_length = random_walk_parameters.get("path_length", 5)
                     restart_prob = random_walk_parameters.get("restart_prob", 0.15)
                     runs = random_walk_parameters.get("runs", 10)
+                    seed = random_walk_parameters.get("seed")
                     limit = body.get("limit", 8)
                     topics_prompt = body.get("topics_prompt", "")
                     deduplicate_topics = body.get("deduplicate_topics", False)
@@ -1175,12 +1390,14 @@ async def project_related_topics(request: web.Request) -> web.Response:
                         project_dir=project_dir,
                         source=source,
                         text=text,
+                        sources=sources,
                         samples=samples,
                         engine=engine,
                         path_length=path_length,
                         restart_prob=restart_prob,
                         k=limit,
                         runs=runs,
+                        seed=seed,
                         topics_prompt=topics_prompt,
                         deduplicate_topics=deduplicate_topics,
                         method=SimilarityTopicsMethod.from_string(
@@ -1269,6 +1486,14 @@ async def context(request: web.Request) -> web.Response:
           type: string
           enum: [json_string, json, json_string_with_json]
           default: json_string
+      - name: keyword_mode
+        in: query
+        required: false
+        description: How the keywords are extracted. "fast" matches the question against the entity names and only calls the LLM if too few words match.
+        schema:
+          type: string
+          enum: [llm, fast]
+          default: llm
     responses:
       '200':
         description: Expected response to a valid request
@@ -1302,6 +1527,14 @@ async def context(request: web.Request) -> web.Response:
                                     request.rel_url.query.get("keywords", "false")
                                     == "true"
                                 )
+                                keyword_mode = request.rel_url.query.get(
+                                    "keyword_mode", KeywordMode.LLM.value
+                                )
+                                if keyword_mode not in KeywordMode:
+                                    return invalid_response(
+                                        "Invalid keyword mode",
+                                        f"Please specify one of these keyword modes: {', '.join(KeywordMode)}",
+                                    )
                                 actual_search = (
                                     search if search != Search.ALL else "hybrid"
                                 )
@@ -1310,9 +1543,11 @@ async def context(request: web.Request) -> web.Response:
                                     search=actual_search,
                                     engine=Engine.LIGHTRAG.value,
                                     context_params=context_params,
-                                    include_context=context_params.context_format == ContextFormat.JSON,
+                                    include_context=context_params.context_format
+                                    == ContextFormat.JSON,
                                     keywords=keywords,
                                     context_format=context_params.context_format,
+                                    keyword_mode=keyword_mode,
                                 )
                                 context_builder_result = await lightrag_search(
                                     query_params,
@@ -2158,6 +2393,14 @@ async def lightrag_centrality(request: web.Request) -> web.Response:
         schema:
           type: string
           default: category
+      - name: centrality_measure
+        in: query
+        required: false
+        description: The precomputed centrality measure which sorts the nodes. Community is the degree of the node within its community.
+        schema:
+          type: string
+          enum: [betweenness, pagerank, degree, eigenvector, community]
+          default: betweenness
     security:
       - bearerAuth: []
     responses:
@@ -2180,9 +2423,20 @@ async def lightrag_centrality(request: web.Request) -> web.Response:
             case Path() as project_dir:
                 format = request.rel_url.query.get("format", "json")
                 limit = int(request.rel_url.query.get("limit", 20))
+                centrality_measure = request.rel_url.query.get(
+                    "centrality_measure", CentralityMeasure.BETWEENNESS
+                )
+                if centrality_measure not in CentralityMeasure:
+                    return invalid_response(
+                        "Invalid centrality measure",
+                        f"Invalid centrality measure: {centrality_measure}",
+                    )
+                centrality_measure = CentralityMeasure(centrality_measure)
                 match format:
                     case "json":
-                        df = await get_sorted_centrality_scores_as_pd(project_dir)
+                        df = await get_sorted_centrality_scores_as_pd(
+                            project_dir, centrality_measure
+                        )
                         category = request.rel_url.query.get("category", None)
                         categories = request.rel_url.query.get("categories", None)
                         if categories:
@@ -2197,7 +2451,7 @@ async def lightrag_centrality(request: web.Request) -> web.Response:
                         )
                     case "xls":
                         excel_bytes = await get_sorted_centrality_scores_as_xls(
-                            project_dir, limit
+                            project_dir, limit, centrality_measure
                         )
                         return web.Response(
                             body=excel_bytes,
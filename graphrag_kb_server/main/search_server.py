@@ -123,6 +123,11 @@ async def match_entities(request: web.Request) -> web.Response:
                 type: boolean
                 description: Whether to bypass the cache and force a new search
                 default: false
+              centrality_measure:
+                type: string
+                description: The precomputed centrality measure which selects the candidate entities
+                enum: [betweenness, pagerank, degree, eigenvector, community]
+                default: betweenness
     responses:
       '200':
         description: The response to the query in either json, html or markdown format
@@ -344,4 +349,4 @@ async def search_history(request: web.Request) -> web.Response:
 
     return await handle_error(
         await _handle_request(request, handle_search_history), request=request
-    )
\ No newline at end of file
+    )
@@ -13,7 +13,19 @@ from graphrag_kb_server.main import all_routes, sio
 
 from graphrag_kb_server.main.multi_tennant_server import auth_middleware
 from graphrag_kb_server.logger import logger, init_logger
+from graphrag_kb_server.service.lightrag.lightrag_centrality import (
+    shutdown_betweenness_worker,
+)
+from graphrag_kb_server.service.lightrag.lightrag_embedding_batcher import (
+    embedding_batcher,
+)
+from graphrag_kb_server.service.lightrag.lightrag_keyword_cache import keyword_cache
+from graphrag_kb_server.service.lightrag.lightrag_semantic_cache import (
+    semantic_answer_cache,
+)
 from graphrag_kb_server.service.project import initialize_projects
+from graphrag_kb_server.service.project_warmup import project_warmup
+from graphrag_kb_server.service.resource_accounting import resource_accounting
 from graphrag_kb_server.service.snippet_generation_service import find_chat_assets
 from graphrag_kb_server.main.cors import CORS_HEADERS
 from graphrag_kb_server.main.websocket_api import *
@@ -59,6 +71,7 @@ async def static_routing_middleware(request: web.Request, handler):
         if (
             path.startswith("/protected/")
             or path.startswith("/tennant/")
+            or path.startswith("/health/")
             or path in GRAPHRAG_LINKS
             or path in CHAT_LINKS
         ):
@@ -114,10 +127,21 @@ async def multipart_form(request: web.Request) -> Tuple[Dict, bool]:
 
 async def on_startup(app: web.Application):
     await bootstrap_database()
-    await initialize_projects()
+    if cfg.startup_mode == "background":
+        # The server binds immediately, cold projects are loaded on their first query
+        project_warmup.start()
+    else:
+        await initialize_projects()
+    resource_accounting.start()
 
 
 async def on_cleanup(app: web.Application):
+    project_warmup.stop()
+    resource_accounting.stop()
+    await embedding_batcher.close()
+    await keyword_cache.flush()
+    await semantic_answer_cache.flush()
+    shutdown_betweenness_worker()
     await close_connection_pool()
 
 
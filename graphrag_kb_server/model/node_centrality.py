@@ -1,2 +1,16 @@
+from enum import StrEnum
+
+
+class CentralityMeasure(StrEnum):
+    BETWEENNESS = "betweenness"
+    PAGERANK = "pagerank"
+    DEGREE = "degree"
+    EIGENVECTOR = "eigenvector"
+    # Degree within the community of the node, relative to the size of the community
+    COMMUNITY = "community"
+
+
 # entity_id, entity_type, description, file_path, centrality_score
 NodeCentrality = tuple[str, str, str, str, float]
+# entity_id, entity_type, description, file_path, community, then the score of each CentralityMeasure in its order
+NodeCentralities = tuple[str, str, str, str, int, float, float, float, float, float]
@@ -21,6 +21,11 @@ class ContextFormat(StrEnum):
     JSON_STRING_WITH_JSON = "json_string_with_json"
 
 
+class KeywordMode(StrEnum):
+    LLM = "llm"
+    FAST = "fast"
+
+
 class ContextParameters(BaseModel):
     query: str = Field(description="The query fpr which the context is retrieved.")
     project_dir: Path = Field(description="The path of the project.")
@@ -107,6 +112,10 @@ class QueryParameters(BaseModel):
     context_format: ContextFormat = Field(
         default=ContextFormat.JSON_STRING, description="The format of the response."
     )
+    keyword_mode: KeywordMode = Field(
+        default=KeywordMode.LLM,
+        description="How the query keywords are extracted. 'fast' matches the query against the entity names and only uses the LLM if too few words match.",
+    )
 
 
 def convert_to_lightrag_query_params(
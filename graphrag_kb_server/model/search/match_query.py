@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field, ConfigDict
 
+from graphrag_kb_server.model.node_centrality import CentralityMeasure
 from graphrag_kb_server.model.search.entity import Entity, EntityList
 
 
@@ -28,6 +29,10 @@ class MatchQuery(BaseModel):
     no_cache: bool = Field(
         default=False, description="Whether to bypass the cache and force a new search"
     )
+    centrality_measure: CentralityMeasure = Field(
+        default=CentralityMeasure.BETWEENNESS,
+        description="The centrality measure which selects the candidate entities",
+    )
 
 
 class MatchOutput(BaseModel):
@@ -4,6 +4,7 @@ from pydantic import BaseModel, Field
 from enum import Enum
 
 from graphrag_kb_server.model.engines import Engine
+from graphrag_kb_server.model.node_centrality import CentralityMeasure
 
 
 DEFAULT_TOPIC_LIMIT: Final[int] = 20
@@ -84,6 +85,10 @@ class TopicsRequest(BaseModel):
     deduplicate_topics: bool = Field(
         default=False, description="Whether to deduplicate the topics"
     )
+    centrality_measure: CentralityMeasure = Field(
+        default=CentralityMeasure.BETWEENNESS,
+        description="The centrality measure which ranks the topics. Only used for LightRAG",
+    )
 
     def __hash__(self) -> int:
         """Make TopicsRequest hashable by converting all fields to hashable types."""
@@ -102,6 +107,7 @@ class TopicsRequest(BaseModel):
             self.entity_type_filter,
             topics_tuple,
             self.deduplicate_topics,
+            self.centrality_measure,
         )
 
         return hash(hashable_fields)
@@ -110,6 +116,7 @@ class TopicsRequest(BaseModel):
 class SimilarityTopicsMethod(Enum):
     RANDOM_WALK = "random_walk"
     NEAREST_NEIGHBORS = "nearest_neighbors"
+    PERSONALIZED_PAGERANK = "personalized_pagerank"
 
     @classmethod
     def from_string(cls, value: str) -> "SimilarityTopicsMethod":
@@ -126,6 +133,10 @@ class SimilarityTopicsRequest(BaseModel):
         ..., description="The source entity to find related entities for"
     )
     text: str = Field(..., description="The text to find related entities for")
+    sources: list[str] = Field(
+        default=[],
+        description="The source entities of the personalized PageRank, e.g. the entities matched in the text. Only the source if empty",
+    )
     samples: int = Field(
         default=50000, description="Number of random walk samples to perform"
     )
@@ -137,6 +148,9 @@ class SimilarityTopicsRequest(BaseModel):
     runs: int = Field(
         default=10, description="Number of independent runs to average results"
     )
+    seed: int | None = Field(
+        default=None, description="Seed of the random walks. Random if missing"
+    )
     engine: Engine = Field(default=Engine.LIGHTRAG, description="The engine to use")
     topics_prompt: str = Field(
         default="", description="The prompt to post process the generated topics"
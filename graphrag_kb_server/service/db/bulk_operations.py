@@ -0,0 +1,64 @@
+from typing import Any, Sequence
+
+from graphrag_kb_server.service.db.connection_pool import init_pool
+
+
+async def bulk_insert(
+    schema_name: str,
+    table_name: str,
+    columns: Sequence[str],
+    records: Sequence[tuple],
+    conflict_columns: Sequence[str],
+    update_columns: Sequence[str] = (),
+    preceding_statements: Sequence[tuple[str, Sequence[Any]]] = (),
+) -> int:
+    """
+    Inserts the records with a single COPY into a temporary table followed by one
+    INSERT ... SELECT, instead of a statement per record. Conflicting rows are updated
+    with the columns in `update_columns` (the last record wins) or left unchanged if
+    there are none (the first record wins). The new rows are numbered in the order of
+    the records. `preceding_statements`, e.g. a DELETE, run in the same transaction.
+    Returns the number of inserted or updated rows.
+    """
+    pool = await init_pool()
+    column_list = ", ".join(columns)
+    conflict_list = ", ".join(conflict_columns)
+    staging_table = f"BULK_{table_name}"
+    if update_columns:
+        position_order = "BULK_POSITION DESC"
+        updates = ", ".join(
+            f"{column} = EXCLUDED.{column}" for column in update_columns
+        )
+        conflict_action = f"DO UPDATE SET {updates}"
+    else:
+        position_order = "BULK_POSITION ASC"
+        conflict_action = "DO NOTHING"
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            for sql, args in preceding_statements:
+                await conn.execute(sql, *args)
+            if not records:
+                return 0
+            await conn.execute(
+                f"""
+CREATE TEMPORARY TABLE {staging_table} ON COMMIT DROP AS
+SELECT 0 AS BULK_POSITION, {column_list} FROM {schema_name}.{table_name} WITH NO DATA;
+"""
+            )
+            # Unquoted identifiers are folded to lower case by PostgreSQL, COPY quotes them
+            await conn.copy_records_to_table(
+                staging_table.lower(),
+                records=[(i, *record) for i, record in enumerate(records)],
+                columns=["bulk_position", *(column.lower() for column in columns)],
+            )
+            status = await conn.execute(
+                f"""
+INSERT INTO {schema_name}.{table_name} ({column_list})
+SELECT {column_list} FROM (
+    SELECT DISTINCT ON ({conflict_list}) * FROM {staging_table}
+    ORDER BY {conflict_list}, {position_order}
+) AS DEDUPLICATED ORDER BY BULK_POSITION
+ON CONFLICT ({conflict_list}) {conflict_action};
+"""
+            )
+    return int(status.split()[-1])
@@ -11,6 +11,7 @@ from graphrag_kb_server.service.db.common_operations import (
     DB_CACHE_EXPIRATION_TIME,
 )
 from graphrag_kb_server.model.digest_functions import content_sha256_combined
+from graphrag_kb_server.model.node_centrality import CentralityMeasure
 from graphrag_kb_server.model.search.match_query import MatchQuery, MatchOutput
 
 
@@ -52,6 +53,14 @@ DROP TABLE IF EXISTS {schema_name}.{TB_EXPANDED_ENTITIES};
     )
 
 
+def _query_digest(match_query: MatchQuery, project_dir: Path) -> tuple[str, bytes]:
+    search_key = match_query.user_profile
+    if match_query.centrality_measure != CentralityMeasure.BETWEENNESS:
+        # The candidate entities depend on the measure. Betweenness keeps the previous digest
+        search_key = f"{search_key}\n{match_query.centrality_measure}"
+    return content_sha256_combined(search_key, project_dir)
+
+
 async def insert_expanded_entities(
     project_dir: Path, match_query: MatchQuery, match_output: MatchOutput
 ) -> str:
@@ -60,7 +69,7 @@ async def insert_expanded_entities(
     project_id = await get_project_id_from_path(project_dir)
     profile_dict = jiter.from_json(match_query.user_profile.encode(encoding="utf-8"))
     linkedin_profile_url = profile_dict.get("linkedin_profile_url")
-    digest_sha256, query_digest_sha256 = content_sha256_combined(match_query.user_profile, project_dir)
+    digest_sha256, query_digest_sha256 = _query_digest(match_query, project_dir)
     sql = f"""
 MERGE INTO {schema_name}.{TB_EXPANDED_ENTITIES} AS t
 USING (
@@ -116,7 +125,7 @@ async def get_expanded_entities(
     simple_project = extract_elements_from_path(project_dir)
     schema_name = simple_project.schema_name
     project_id = await get_project_id_from_path(project_dir)
-    _, query_digest_sha256 = content_sha256_combined(match_query.user_profile, project_dir)
+    _, query_digest_sha256 = _query_digest(match_query, project_dir)
     result = await fetch_one(
         f"""
 SELECT ID, MATCH_OUTPUT FROM {schema_name}.{TB_EXPANDED_ENTITIES} 
@@ -144,3 +153,15 @@ DELETE FROM {schema_name}.{TB_EXPANDED_ENTITIES} WHERE PROJECT_ID = $1 AND ID =
         project_id,
         id,
     )
+
+
+async def delete_project_expanded_entities(project_dir: Path) -> str:
+    simple_project = extract_elements_from_path(project_dir)
+    schema_name = simple_project.schema_name
+    project_id = await get_project_id_from_path(project_dir)
+    return await execute_query(
+        f"""
+DELETE FROM {schema_name}.{TB_EXPANDED_ENTITIES} WHERE PROJECT_ID = $1;
+""",
+        project_id,
+    )
@@ -1,4 +1,5 @@
 from graphrag_kb_server.model.search.keywords import Keywords
+from graphrag_kb_server.service.db.bulk_operations import bulk_insert
 from graphrag_kb_server.service.db.connection_pool import execute_query, fetch_all
 from graphrag_kb_server.service.db.db_persistence_search import TB_SEARCH_HISTORY
 
@@ -35,16 +36,16 @@ DROP TABLE IF EXISTS {schema_name}.{TB_KEYWORDS};
 
 
 async def save_keywords(schema_name: str, keywords: Keywords):
-    for keyword in keywords.keywords:
-        await execute_query(
-            f"""
-INSERT INTO {schema_name}.{TB_KEYWORDS} (KEYWORD, KEYWORD_TYPE, SEARCH_ID) VALUES ($1, $2, $3)
-ON CONFLICT (KEYWORD, SEARCH_ID) DO NOTHING;
-    """,
-            keyword,
-            keywords.keyword_type,
-            keywords.search_id,
-        )
+    await bulk_insert(
+        schema_name,
+        TB_KEYWORDS,
+        ["KEYWORD", "KEYWORD_TYPE", "SEARCH_ID"],
+        [
+            (keyword, keywords.keyword_type, keywords.search_id)
+            for keyword in keywords.keywords
+        ],
+        ["KEYWORD", "SEARCH_ID"],
+    )
 
 
 async def find_keywords(
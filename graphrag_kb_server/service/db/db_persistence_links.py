@@ -1,5 +1,6 @@
 import logging
 from graphrag_kb_server.model.path_link import PathLink
+from graphrag_kb_server.service.db.bulk_operations import bulk_insert
 from graphrag_kb_server.service.db.connection_pool import (
     execute_query,
     execute_query_with_return,
@@ -41,10 +42,24 @@ DROP TABLE IF EXISTS {schema_name}.{TB_PATH_LINKS};
 
 
 async def save_path_links(
-    schema_name: str, path_links: list[PathLink], insert_if_not_exists: bool = False
+    schema_name: str,
+    path_links: list[PathLink],
+    insert_if_not_exists: bool = False,
+    replace_project_id: int | None = None,
 ):
-    pool = await init_pool()
-    if insert_if_not_exists and len(path_links) > 0:
+    """
+    Saves the links. With `replace_project_id`, the previous links of that project are
+    deleted in the same transaction.
+    """
+    preceding_statements = []
+    if replace_project_id is not None:
+        preceding_statements.append(
+            (
+                f"DELETE FROM {schema_name}.{TB_PATH_LINKS} WHERE PROJECT_ID = $1;",
+                [replace_project_id],
+            )
+        )
+    elif insert_if_not_exists and len(path_links) > 0:
         # check first path link
         first_path_link = path_links[0]
         count = await execute_query_with_return(
@@ -56,17 +71,14 @@ async def save_path_links(
         if count > 0:
             return
 
-    async with pool.acquire() as conn:
-        for link in path_links:
-            await conn.execute(
-                f"""
-        INSERT INTO {schema_name}.{TB_PATH_LINKS} (PATH, LINK, PROJECT_ID) VALUES ($1, $2, $3)
-        ON CONFLICT (PATH, LINK, PROJECT_ID) DO NOTHING;
-        """,
-                link.path,
-                link.link,
-                link.project_id,
-            )
+    await bulk_insert(
+        schema_name,
+        TB_PATH_LINKS,
+        ["PATH", "LINK", "PROJECT_ID"],
+        [(link.path, link.link, link.project_id) for link in path_links],
+        ["PATH", "LINK", "PROJECT_ID"],
+        preceding_statements=preceding_statements,
+    )
 
 
 async def find_path_links(schema_name: str, project_id: int) -> list[PathLink]:
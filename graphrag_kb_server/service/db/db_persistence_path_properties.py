@@ -3,12 +3,13 @@ from datetime import timezone
 import datetime
 
 from graphrag_kb_server.model.path_properties import PathProperties
+from graphrag_kb_server.service.db.bulk_operations import bulk_insert
+from graphrag_kb_server.service.db.db_persistence_links import TB_PATH_LINKS
 from graphrag_kb_server.service.db.connection_pool import (
     execute_query,
     execute_query_with_return,
     fetch_all,
     fetch_one,
-    init_pool,
 )
 
 
@@ -46,16 +47,30 @@ DROP TABLE IF EXISTS {schema_name}.{TB_PATH_PROPERTIES};
     )
 
 
-async def upsert_path_properties(schema_name: str, path_properties: list[PathProperties], insert_if_not_exists: bool = False):
+async def upsert_path_properties(
+    schema_name: str,
+    path_properties: list[PathProperties],
+    insert_if_not_exists: bool = False,
+    replace_project_id: int | None = None,
+):
     """Insert or update a list of PathProperties records.
 
     On conflict (PATH, PROJECT_ID) the LAST_MODIFIED and UPDATED_AT columns
-    are refreshed so callers can safely call this repeatedly.
+    are refreshed so callers can safely call this repeatedly. With
+    `replace_project_id`, the previous records of that project are deleted
+    in the same transaction.
     """
-    if not path_properties:
+    preceding_statements = []
+    if replace_project_id is not None:
+        preceding_statements.append(
+            (
+                f"DELETE FROM {schema_name}.{TB_PATH_PROPERTIES} WHERE PROJECT_ID = $1;",
+                [replace_project_id],
+            )
+        )
+    elif not path_properties:
         return
-    pool = await init_pool()
-    if insert_if_not_exists and len(path_properties) > 0:
+    elif insert_if_not_exists and len(path_properties) > 0:
         # check first path property
         first_path_property = path_properties[0]
         count = await execute_query_with_return(
@@ -66,27 +81,25 @@ async def upsert_path_properties(schema_name: str, path_properties: list[PathPro
         )
         if count > 0:
             return
-    async with pool.acquire() as conn:
-        for props in path_properties:
-            # Strip timezone info before storing: PostgreSQL TIMESTAMP (without
-            # time zone) rejects aware datetimes from asyncpg.
-            last_modified = props.last_modified
-            if last_modified is not None and last_modified.tzinfo is not None:
-                last_modified = last_modified.astimezone(timezone.utc).replace(tzinfo=None)
-            await conn.execute(
-                f"""
-INSERT INTO {schema_name}.{TB_PATH_PROPERTIES} (PATH, ORIGINAL_PATH, LAST_MODIFIED, PROJECT_ID)
-VALUES ($1, $2, $3, $4)
-ON CONFLICT (PATH, PROJECT_ID) DO UPDATE
-    SET ORIGINAL_PATH = EXCLUDED.ORIGINAL_PATH,
-        LAST_MODIFIED = EXCLUDED.LAST_MODIFIED,
-        UPDATED_AT    = now();
-""",
-                props.path,
-                props.original_path,
-                last_modified,
-                props.project_id,
-            )
+    records = []
+    for props in path_properties:
+        # Strip timezone info before storing: PostgreSQL TIMESTAMP (without
+        # time zone) rejects aware datetimes from asyncpg.
+        last_modified = props.last_modified
+        if last_modified is not None and last_modified.tzinfo is not None:
+            last_modified = last_modified.astimezone(timezone.utc).replace(tzinfo=None)
+        records.append(
+            (props.path, props.original_path, last_modified, props.project_id)
+        )
+    await bulk_insert(
+        schema_name,
+        TB_PATH_PROPERTIES,
+        ["PATH", "ORIGINAL_PATH", "LAST_MODIFIED", "PROJECT_ID"],
+        records,
+        ["PATH", "PROJECT_ID"],
+        ["ORIGINAL_PATH", "LAST_MODIFIED", "UPDATED_AT"],
+        preceding_statements,
+    )
 
 
 async def find_path_properties(
@@ -147,3 +160,34 @@ WHERE PROJECT_ID = $1;
             )
         )
     return result
+
+
+async def find_reference_metadata(
+    schema_name: str, project_id: int
+) -> dict[str, tuple[list[str], datetime.datetime | None]]:
+    """Return the links and last modified date of every path of a project in a single query."""
+    rows = await fetch_all(
+        f"""
+WITH PATHS AS (
+    SELECT PATH FROM {schema_name}.{TB_PATH_PROPERTIES} WHERE PROJECT_ID = $1
+    UNION
+    SELECT PATH FROM {schema_name}.{TB_PATH_LINKS} WHERE PROJECT_ID = $1
+)
+SELECT PATHS.PATH, P.LAST_MODIFIED,
+    COALESCE(
+        (SELECT ARRAY_AGG(L.LINK ORDER BY L.ID) FROM {schema_name}.{TB_PATH_LINKS} L
+         WHERE L.PROJECT_ID = $1 AND L.PATH = PATHS.PATH),
+        '{{}}'
+    ) AS LINKS
+FROM PATHS
+LEFT JOIN {schema_name}.{TB_PATH_PROPERTIES} P ON P.PATH = PATHS.PATH AND P.PROJECT_ID = $1;
+""",
+        project_id,
+    )
+    result = {}
+    for row in rows:
+        last_modified = row["last_modified"]
+        if last_modified is not None and last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        result[row["path"]] = (list(row["links"]), last_modified)
+    return result
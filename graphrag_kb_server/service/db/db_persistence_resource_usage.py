@@ -0,0 +1,74 @@
+from datetime import datetime
+from typing import Any
+
+from graphrag_kb_server.service.db.connection_pool import execute_query
+
+TB_RESOURCE_USAGE = "TB_RESOURCE_USAGE"
+
+RESOURCE_USAGE_COLUMNS = [
+    "tennant",
+    "engine",
+    "project",
+    "resident_memory_bytes",
+    "disk_bytes",
+    "query_count",
+    "query_p50_ms",
+    "query_p95_ms",
+    "query_p99_ms",
+    "llm_calls",
+    "prompt_tokens",
+    "completion_tokens",
+    "indexing_runs",
+    "indexing_seconds",
+]
+
+
+async def create_resource_usage_table():
+    await execute_query(
+        f"""
+CREATE TABLE IF NOT EXISTS public.{TB_RESOURCE_USAGE} (
+    ID SERIAL NOT NULL,
+    SNAPSHOT_AT TIMESTAMP NOT NULL,
+    INTERVAL_START TIMESTAMP NOT NULL,
+    TENNANT CHARACTER VARYING(128) NOT NULL,
+    ENGINE CHARACTER VARYING(32) NOT NULL,
+    PROJECT CHARACTER VARYING(256) NOT NULL,
+    RESIDENT_MEMORY_BYTES BIGINT NOT NULL,
+    DISK_BYTES BIGINT NOT NULL,
+    QUERY_COUNT INTEGER NOT NULL,
+    QUERY_P50_MS DOUBLE PRECISION NOT NULL,
+    QUERY_P95_MS DOUBLE PRECISION NOT NULL,
+    QUERY_P99_MS DOUBLE PRECISION NOT NULL,
+    LLM_CALLS INTEGER NOT NULL,
+    PROMPT_TOKENS BIGINT NOT NULL,
+    COMPLETION_TOKENS BIGINT NOT NULL,
+    INDEXING_RUNS INTEGER NOT NULL,
+    INDEXING_SECONDS DOUBLE PRECISION NOT NULL,
+    PRIMARY KEY (ID)
+);
+"""
+    )
+    await execute_query(
+        f"""
+CREATE INDEX IF NOT EXISTS IDX_RESOURCE_USAGE_TENNANT_SNAPSHOT
+    ON public.{TB_RESOURCE_USAGE} (TENNANT, SNAPSHOT_AT);
+"""
+    )
+
+
+async def insert_resource_usage(
+    snapshot_at: datetime, interval_start: datetime, rows: list[dict[str, Any]]
+):
+    """Stores the usage of each project during the interval ending at snapshot_at."""
+    columns = ", ".join(c.upper() for c in RESOURCE_USAGE_COLUMNS)
+    placeholders = ", ".join(f"${i + 3}" for i in range(len(RESOURCE_USAGE_COLUMNS)))
+    for row in rows:
+        await execute_query(
+            f"""
+INSERT INTO public.{TB_RESOURCE_USAGE} (SNAPSHOT_AT, INTERVAL_START, {columns})
+VALUES ($1, $2, {placeholders});
+""",
+            snapshot_at,
+            interval_start,
+            *[row[c] for c in RESOURCE_USAGE_COLUMNS],
+        )
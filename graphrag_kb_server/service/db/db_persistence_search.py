@@ -1,4 +1,5 @@
 from pathlib import Path
+from datetime import datetime
 import json
 from graphrag_kb_server.model.search.keywords import KeywordType
 from graphrag_kb_server.model.search.relationships import RelationshipsJSON
@@ -396,6 +397,20 @@ select
                 created_at=row["created_at"],
             )
         )
-    return SearchHistory(
-        results=results
-    )
\ No newline at end of file
+    return SearchHistory(results=results)
+
+
+async def find_last_search_by_project(
+    schema_name: str, engine: str
+) -> dict[str, datetime]:
+    rows = await fetch_all(
+        f"""
+SELECT P.NAME, MAX(H.CREATED_AT) LAST_SEARCH
+FROM {schema_name}.{TB_PROJECTS} P
+INNER JOIN {schema_name}.{TB_SEARCH_HISTORY} H ON H.PROJECT_ID = P.ID
+WHERE P.ENGINE = $1
+GROUP BY P.NAME;
+""",
+        engine,
+    )
+    return {row["name"]: row["last_search"] for row in rows}
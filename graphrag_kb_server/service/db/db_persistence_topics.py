@@ -4,6 +4,7 @@ from graphrag_kb_server.model.topics import (
     TopicQuestion,
     TopicQuestions,
 )
+from graphrag_kb_server.service.db.bulk_operations import bulk_insert
 from graphrag_kb_server.service.db.connection_pool import (
     execute_query,
     execute_query_with_return,
@@ -13,6 +14,7 @@ from graphrag_kb_server.service.db.connection_pool import (
 from graphrag_kb_server.service.db.db_persistence_project import TB_PROJECTS
 from graphrag_kb_server.model.topics import TopicsRequest, Topics
 from graphrag_kb_server.model.engines import Engine
+from graphrag_kb_server.model.node_centrality import CentralityMeasure
 from graphrag_kb_server.service.db.common_operations import clear_table, get_project_id
 
 TB_TOPICS = "TB_TOPICS"
@@ -28,15 +30,33 @@ CREATE TABLE IF NOT EXISTS {schema_name}.{TB_TOPICS} (
     TYPE TEXT NOT NULL,
     QUESTIONS TEXT[] DEFAULT '{{}}',
     PROJECT_ID INTEGER NOT NULL,
+    CENTRALITY_MEASURE TEXT NOT NULL DEFAULT 'betweenness',
     ACTIVE BOOLEAN NOT NULL DEFAULT TRUE,
     CREATED_AT TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     UPDATED_AT TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
 	PRIMARY KEY (ID),
-	UNIQUE (NAME, PROJECT_ID),
     CONSTRAINT PROJECT_ID
 		FOREIGN KEY (PROJECT_ID) REFERENCES {schema_name}.TB_PROJECTS (ID) 
 		MATCH SIMPLE ON UPDATE NO ACTION ON DELETE CASCADE
 );
+"""
+    )
+    # The topics are stored per centrality measure which ranks them
+    await execute_query(
+        f"""
+ALTER TABLE {schema_name}.{TB_TOPICS}
+ADD COLUMN IF NOT EXISTS CENTRALITY_MEASURE TEXT NOT NULL DEFAULT 'betweenness';
+"""
+    )
+    await execute_query(
+        f"""
+ALTER TABLE {schema_name}.{TB_TOPICS} DROP CONSTRAINT IF EXISTS TB_TOPICS_NAME_PROJECT_ID_KEY;
+"""
+    )
+    await execute_query(
+        f"""
+CREATE UNIQUE INDEX IF NOT EXISTS TB_TOPICS_NAME_PROJECT_ID_MEASURE_KEY
+ON {schema_name}.{TB_TOPICS} (NAME, PROJECT_ID, CENTRALITY_MEASURE);
 """
     )
 
@@ -52,10 +72,12 @@ DROP TABLE IF EXISTS {schema_name}.{TB_TOPICS};
 async def insert_topic(schema_name: str, topic: Topic) -> int:
     existing_topic = await fetch_one(
         f"""
-SELECT ID FROM {schema_name}.{TB_TOPICS} WHERE NAME = $1 AND PROJECT_ID = $2;
+SELECT ID FROM {schema_name}.{TB_TOPICS} WHERE NAME = $1 AND PROJECT_ID = $2
+AND CENTRALITY_MEASURE = $3;
 """,
         topic.name,
         topic.project_id,
+        CentralityMeasure.BETWEENNESS.value,
     )
     if existing_topic is not None:
         return existing_topic["id"]
@@ -79,6 +101,13 @@ async def delete_topics_by_project_name(
     await clear_table(schema_name, project_name, engine, TB_TOPICS)
 
 
+def _centrality_measure(topics_request: TopicsRequest) -> CentralityMeasure:
+    # Only the LightRAG topics are ranked by a centrality measure
+    if topics_request.engine == Engine.LIGHTRAG:
+        return topics_request.centrality_measure
+    return CentralityMeasure.BETWEENNESS
+
+
 async def find_topics_by_project_name(topics_request: TopicsRequest) -> Topics:
     schema_name = topics_request.project_dir.parent.parent.name
     project_name = topics_request.project_dir.name
@@ -88,10 +117,11 @@ async def find_topics_by_project_name(topics_request: TopicsRequest) -> Topics:
         f"""
 SELECT * FROM {schema_name}.{TB_TOPICS} WHERE PROJECT_ID = 
 (SELECT ID FROM {schema_name}.{TB_PROJECTS} WHERE NAME = $1 AND ENGINE = $2) 
-AND ACTIVE = TRUE ORDER BY ID ASC LIMIT $3;
+AND CENTRALITY_MEASURE = $3 AND ACTIVE = TRUE ORDER BY ID ASC LIMIT $4;
 """,
         project_name,
         engine.value,
+        _centrality_measure(topics_request).value,
         limit,
     )
     topics = [
@@ -114,9 +144,32 @@ async def save_topics_request(topics_request: TopicsRequest, topics: Topics) ->
     project_name = project_dir.name
     schema_name = project_dir.parent.parent.name
     project_id = await get_project_id(schema_name, project_name, engine)
-    for topic in topics.topics:
-        topic_with_id = topic.model_copy(update={"id": None, "project_id": project_id})
-        await insert_topic(schema_name, topic_with_id)
+    centrality_measure = _centrality_measure(topics_request).value
+    # Topics which already exist are kept. The new ones are numbered in their order.
+    await bulk_insert(
+        schema_name,
+        TB_TOPICS,
+        [
+            "NAME",
+            "DESCRIPTION",
+            "TYPE",
+            "QUESTIONS",
+            "PROJECT_ID",
+            "CENTRALITY_MEASURE",
+        ],
+        [
+            (
+                topic.name,
+                topic.description,
+                topic.type,
+                topic.questions,
+                project_id,
+                centrality_measure,
+            )
+            for topic in topics.topics
+        ],
+        ["NAME", "PROJECT_ID", "CENTRALITY_MEASURE"],
+    )
 
 
 async def find_questions(questions_query: QuestionsQuery) -> TopicQuestions:
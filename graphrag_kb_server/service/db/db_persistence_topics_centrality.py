@@ -1,11 +1,15 @@
 from pathlib import Path
 
+from graphrag_kb_server.service.db.bulk_operations import bulk_insert
 from graphrag_kb_server.service.db.connection_pool import (
     execute_query,
-    execute_query_with_return,
     fetch_all,
 )
-from graphrag_kb_server.model.node_centrality import NodeCentrality
+from graphrag_kb_server.model.node_centrality import (
+    CentralityMeasure,
+    NodeCentralities,
+    NodeCentrality,
+)
 from graphrag_kb_server.model.engines import Engine
 from graphrag_kb_server.service.db.db_persistence_project import TB_PROJECTS
 from graphrag_kb_server.service.db.common_operations import (
@@ -16,6 +20,24 @@ from graphrag_kb_server.service.db.common_operations import (
 
 
 TB_TOPICS_WITH_CENTRALITY = "TB_TOPICS_WITH_CENTRALITY"
+# The column of each measure. The columns added after the betweenness are empty in older rows.
+CENTRALITY_COLUMNS: dict[CentralityMeasure, str] = {
+    CentralityMeasure.BETWEENNESS: "CENTRALITY",
+    CentralityMeasure.PAGERANK: "PAGERANK",
+    CentralityMeasure.DEGREE: "DEGREE",
+    CentralityMeasure.EIGENVECTOR: "EIGENVECTOR",
+    CentralityMeasure.COMMUNITY: "COMMUNITY_CENTRALITY",
+}
+# The columns of NodeCentralities, followed by the project
+CENTRALITIES_INSERT_COLUMNS = [
+    "ENTITY_ID",
+    "ENTITY_TYPE",
+    "DESCRIPTION",
+    "FILE_PATH",
+    "COMMUNITY",
+    *CENTRALITY_COLUMNS.values(),
+    "PROJECT_ID",
+]
 
 
 async def create_topics_with_centrality_table(schema_name: str):
@@ -28,6 +50,11 @@ CREATE TABLE IF NOT EXISTS {schema_name}.{TB_TOPICS_WITH_CENTRALITY} (
     DESCRIPTION TEXT NOT NULL,
     FILE_PATH TEXT NOT NULL,
     CENTRALITY FLOAT NOT NULL,
+    PAGERANK FLOAT,
+    DEGREE FLOAT,
+    EIGENVECTOR FLOAT,
+    COMMUNITY INTEGER,
+    COMMUNITY_CENTRALITY FLOAT,
     PROJECT_ID INTEGER NOT NULL,
     ACTIVE BOOLEAN NOT NULL DEFAULT TRUE,
     CREATED_AT TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
@@ -38,6 +65,16 @@ CREATE TABLE IF NOT EXISTS {schema_name}.{TB_TOPICS_WITH_CENTRALITY} (
 		FOREIGN KEY (PROJECT_ID) REFERENCES {schema_name}.TB_PROJECTS (ID) 
 		MATCH SIMPLE ON UPDATE NO ACTION ON DELETE CASCADE
 );
+"""
+    )
+    await execute_query(
+        f"""
+ALTER TABLE {schema_name}.{TB_TOPICS_WITH_CENTRALITY}
+ADD COLUMN IF NOT EXISTS PAGERANK FLOAT,
+ADD COLUMN IF NOT EXISTS DEGREE FLOAT,
+ADD COLUMN IF NOT EXISTS EIGENVECTOR FLOAT,
+ADD COLUMN IF NOT EXISTS COMMUNITY INTEGER,
+ADD COLUMN IF NOT EXISTS COMMUNITY_CENTRALITY FLOAT;
 """
     )
 
@@ -51,39 +88,39 @@ DROP TABLE IF EXISTS {schema_name}.{TB_TOPICS_WITH_CENTRALITY};
 
 
 async def insert_topics_with_centrality(
-    project_dir: Path, node_centralities: list[NodeCentrality]
+    project_dir: Path, node_centralities: list[NodeCentralities], replace: bool = False
 ) -> int:
+    """
+    Inserts the scores of the nodes of a project in one transaction. With `replace`,
+    the previous scores of the project are deleted in the same transaction, so that
+    readers see either the old or the new scores.
+    """
     simple_project = extract_elements_from_path(project_dir)
+    schema_name = simple_project.schema_name
     project_id = await get_project_id(
-        simple_project.schema_name,
+        schema_name,
         simple_project.project_name,
         simple_project.engine.value,
         create_if_not_exists=True,
     )
-    for node_centrality in node_centralities:
-        await insert_topic_with_centrality(
-            simple_project.schema_name, project_id, node_centrality
+    preceding_statements = []
+    if replace:
+        preceding_statements.append(
+            (
+                f"DELETE FROM {schema_name}.{TB_TOPICS_WITH_CENTRALITY} WHERE PROJECT_ID = $1;",
+                [project_id],
+            )
         )
-    return len(node_centralities)
-
-
-async def insert_topic_with_centrality(
-    schema_name: str, project_id: int, node_centrality: NodeCentrality
-) -> int:
-    res = await execute_query_with_return(
-        f"""
-INSERT INTO {schema_name}.{TB_TOPICS_WITH_CENTRALITY} 
-(ENTITY_ID, ENTITY_TYPE, DESCRIPTION, FILE_PATH, CENTRALITY, PROJECT_ID) VALUES ($1, $2, $3, $4, $5, $6)
-RETURNING ID;
-""",
-        node_centrality[0],
-        node_centrality[1],
-        node_centrality[2],
-        node_centrality[3],
-        node_centrality[4],
-        project_id,
+    await bulk_insert(
+        schema_name,
+        TB_TOPICS_WITH_CENTRALITY,
+        CENTRALITIES_INSERT_COLUMNS,
+        [(*node_centrality, project_id) for node_centrality in node_centralities],
+        ["ENTITY_ID", "PROJECT_ID"],
+        [*CENTRALITIES_INSERT_COLUMNS[1:-1], "UPDATED_AT"],
+        preceding_statements,
     )
-    return res
+    return len(node_centralities)
 
 
 async def delete_topics_with_centrality_by_project_name(
@@ -93,21 +130,24 @@ async def delete_topics_with_centrality_by_project_name(
 
 
 async def find_topics_with_centrality_by_project_name(
-    project_dir: Path, limit: int = -1
+    project_dir: Path,
+    limit: int = -1,
+    measure: CentralityMeasure = CentralityMeasure.BETWEENNESS,
 ) -> list[NodeCentrality]:
     simple_project = extract_elements_from_path(project_dir)
     schema_name = simple_project.schema_name
     project_name = simple_project.project_name
     engine = simple_project.engine.value
     limit_clause = 1000000
+    column = CENTRALITY_COLUMNS[measure]
     if limit > 0:
         limit_clause = limit
     result = await fetch_all(
         f"""
-SELECT ENTITY_ID, ENTITY_TYPE, DESCRIPTION, FILE_PATH, CENTRALITY
+SELECT ENTITY_ID, ENTITY_TYPE, DESCRIPTION, FILE_PATH, {column} AS CENTRALITY
 FROM {schema_name}.{TB_TOPICS_WITH_CENTRALITY} WHERE PROJECT_ID = 
 (SELECT ID FROM {schema_name}.{TB_PROJECTS} WHERE NAME = $1 AND ENGINE = $2)
-AND ACTIVE = TRUE ORDER BY CENTRALITY DESC LIMIT $3;
+AND ACTIVE = TRUE AND {column} IS NOT NULL ORDER BY {column} DESC, ID ASC LIMIT $3;
 """,
         project_name,
         engine,
@@ -0,0 +1,114 @@
+import numpy as np
+from numba import njit
+
+from graphrag_kb_server.service.random_walk import GraphCSR
+
+
+def degree_centrality(csr: GraphCSR) -> np.ndarray:
+    """The number of neighbours of each node relative to the number of other nodes."""
+    n = len(csr.node_ids)
+    degrees = np.diff(csr.indptr).astype(np.float64)
+    return degrees / (n - 1) if n > 1 else degrees
+
+
+@njit(cache=True)
+def _eigenvector_centrality(
+    indptr: np.ndarray, indices: np.ndarray, tolerance: float, max_iterations: int
+) -> np.ndarray:
+    n = len(indptr) - 1
+    scores = np.full(n, 1.0 / n)
+    next_scores = np.empty(n)
+    for _ in range(max_iterations):
+        # Power iteration on A + I, which converges on bipartite graphs as well
+        for i in range(n):
+            score = scores[i]
+            for j in range(indptr[i], indptr[i + 1]):
+                score += scores[indices[j]]
+            next_scores[i] = score
+        norm = np.sqrt(np.sum(next_scores**2))
+        if norm == 0.0:
+            return np.zeros(n)
+        next_scores /= norm
+        change = np.sum(np.abs(next_scores - scores))
+        scores, next_scores = next_scores, scores
+        if change < n * tolerance:
+            break
+    return scores
+
+
+def eigenvector_centrality(
+    csr: GraphCSR, tolerance: float = 1e-6, max_iterations: int = 100
+) -> np.ndarray:
+    """
+    The principal eigenvector of the adjacency, scaled to unit length: nodes are central
+    when their neighbours are central. Stops after `max_iterations` without convergence.
+    """
+    if len(csr.node_ids) == 0:
+        return np.zeros(0)
+    return _eigenvector_centrality(csr.indptr, csr.indices, tolerance, max_iterations)
+
+
+@njit(cache=True)
+def _label_propagation(
+    indptr: np.ndarray, indices: np.ndarray, max_iterations: int, seed: int
+) -> np.ndarray:
+    np.random.seed(seed)
+    n = len(indptr) - 1
+    labels = np.arange(n)
+    counts = np.zeros(n, dtype=np.int64)
+    for _ in range(max_iterations):
+        changed = False
+        for v in np.random.permutation(n):
+            best_count = 0
+            for j in range(indptr[v], indptr[v + 1]):
+                w = indices[j]
+                if w != v:
+                    counts[labels[w]] += 1
+                    best_count = max(best_count, counts[labels[w]])
+            # A node keeps its label while it is one of the most frequent ones
+            if best_count > 0 and counts[labels[v]] < best_count:
+                best = labels[v]
+                ties = 0
+                for j in range(indptr[v], indptr[v + 1]):
+                    label = labels[indices[j]]
+                    if counts[label] == best_count:
+                        # Each tied label once, picked with equal probability
+                        counts[label] = -1
+                        ties += 1
+                        if np.random.random() * ties < 1.0:
+                            best = label
+                labels[v] = best
+                changed = True
+            for j in range(indptr[v], indptr[v + 1]):
+                counts[labels[indices[j]]] = 0
+            counts[labels[v]] = 0
+        if not changed:
+            break
+    return labels
+
+
+def label_propagation(
+    csr: GraphCSR, max_iterations: int = 100, seed: int = 0
+) -> np.ndarray:
+    """
+    Communities found by asynchronous label propagation: each node, in a random order,
+    takes the most frequent label of its neighbours, until every node has one of them.
+    Ties are broken at random. The communities are numbered from 0 in the order of their
+    first node.
+    """
+    labels = _label_propagation(csr.indptr, csr.indices, max_iterations, seed)
+    _, first_nodes, communities = np.unique(
+        labels, return_index=True, return_inverse=True
+    )
+    return np.argsort(np.argsort(first_nodes))[communities]
+
+
+def community_centrality(csr: GraphCSR, communities: np.ndarray) -> np.ndarray:
+    """The neighbours of each node in its community relative to the other nodes of the community."""
+    n = len(csr.node_ids)
+    sources = np.repeat(np.arange(n), np.diff(csr.indptr))
+    internal = communities[sources] == communities[csr.indices]
+    internal &= sources != csr.indices
+    degrees = np.bincount(sources[internal], minlength=n).astype(np.float64)
+    others = np.bincount(communities, minlength=n)[communities] - 1
+    return np.divide(degrees, others, out=np.zeros(n), where=others > 0)
@@ -94,7 +94,7 @@ async def extract_last_modified_only(project_dir: Path, file_path: Path) -> date
     if original_file_path is None:
         return None
     return get_last_updated(original_file_path)
-    
+
 
 async def _extract_path_properties(project_dir: Path, project_id: int) -> list[PathProperties]:
     original_file_path = project_dir / INPUT_FOLDER
@@ -168,7 +168,10 @@ def get_last_updated(path: Path) -> datetime | None:
     return _last_updated_filesystem(path)
 
 
-async def save_path_properties(project_dir: Path, insert_if_not_exists: bool = False):
+async def save_path_properties(
+    project_dir: Path, insert_if_not_exists: bool = False, replace: bool = False
+):
+    """Saves the properties of the input files. With `replace`, they replace the saved ones."""
     simple_project = extract_elements_from_path(project_dir)
     project_id = await get_project_id(
         simple_project.schema_name,
@@ -177,7 +180,12 @@ async def save_path_properties(project_dir: Path, insert_if_not_exists: bool = F
         create_if_not_exists=True,
     )
     path_properties = await _extract_path_properties(project_dir, project_id)
-    await upsert_path_properties(simple_project.schema_name, path_properties, insert_if_not_exists)
+    await upsert_path_properties(
+        simple_project.schema_name,
+        path_properties,
+        insert_if_not_exists,
+        project_id if replace else None,
+    )
 
 
 if __name__ == "__main__":
@@ -188,4 +196,4 @@ if __name__ == "__main__":
     last_modified = _last_updated_docx(Path("C:/Users/gilfe/Downloads/January 2018 CIC - Apps v Bots - Executive Summary.docx"))
     print(last_modified)
     last_modified = _last_updated_docx(Path("C:/var/graphrag/tennants/gil_fernandes/lightrag/clustre_full/original_input/clustre/Articles and PoVs/AS - Sustainability.docx"))
-    print(last_modified)
\ No newline at end of file
+    print(last_modified)
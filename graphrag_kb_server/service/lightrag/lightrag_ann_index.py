@@ -0,0 +1,314 @@
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import nano_vectordb.dbs as nano_dbs
+from nano_vectordb import NanoVectorDB
+
+from graphrag_kb_server.config import lightrag_cfg
+from graphrag_kb_server.logger import logger
+
+ANN_SUFFIX = ".ivf.npz"
+# Rows which are assigned to the lists in one matrix product, to bound the memory
+ASSIGN_BATCH_SIZE = 8192
+# Training rows sampled per list
+TRAINING_ROWS_PER_LIST = 32
+TRAINING_ITERATIONS = 8
+# The lists are retrained when the storage has grown by this factor since the training
+RETRAIN_GROWTH = 2
+
+_nano_query = NanoVectorDB.query
+_nano_upsert = NanoVectorDB.upsert
+_nano_delete = NanoVectorDB.delete
+
+
+def _storage(db: NanoVectorDB) -> dict:
+    return getattr(db, "_NanoVectorDB__storage")
+
+
+@dataclass
+class IVFIndex:
+    """
+    Inverted file index over a normalized embedding matrix. The rows are clustered around
+    centroids (spherical k-means) and a query only scores the rows of the `nprobe` lists
+    whose centroids are the most similar to it. The scores of these candidates are exact.
+    The index stores the list of each row, so it follows the row positions of the matrix.
+    """
+
+    centroids: np.ndarray
+    assignments: np.ndarray
+    trained_rows: int
+    # Row numbers sorted by list and the start of each list, rebuilt after changes
+    _order: np.ndarray | None = field(default=None, repr=False)
+    _offsets: np.ndarray | None = field(default=None, repr=False)
+
+    @staticmethod
+    def train(
+        matrix: np.ndarray, n_lists: int | None = None, seed: int = 0
+    ) -> "IVFIndex":
+        rows = matrix.shape[0]
+        n_lists = min(n_lists or max(1, int(np.sqrt(rows))), rows)
+        rng = np.random.default_rng(seed)
+        sample_size = min(rows, n_lists * TRAINING_ROWS_PER_LIST)
+        sample = np.asarray(
+            matrix[np.sort(rng.choice(rows, sample_size, replace=False))],
+            dtype=np.float32,
+        )
+        centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+        for _ in range(TRAINING_ITERATIONS):
+            labels = _nearest(sample, centroids)
+            order = np.argsort(labels, kind="stable")
+            lists, starts = np.unique(labels[order], return_index=True)
+            sums = np.add.reduceat(sample[order], starts, axis=0)
+            centroids[lists] = nano_dbs.normalize(sums)
+            # Empty lists restart from random rows
+            empty = np.setdiff1d(np.arange(n_lists), lists)
+            if len(empty):
+                centroids[empty] = sample[rng.choice(sample_size, len(empty))]
+        index = IVFIndex(
+            centroids=centroids,
+            assignments=np.empty(0, dtype=np.int32),
+            trained_rows=rows,
+        )
+        index.assignments = index.assign(matrix)
+        return index
+
+    def assign(self, vectors: np.ndarray) -> np.ndarray:
+        return _nearest(vectors, self.centroids)
+
+    def append(self, vectors: np.ndarray):
+        self.assignments = np.concatenate([self.assignments, self.assign(vectors)])
+        self._order = None
+
+    def update(self, rows: np.ndarray, vectors: np.ndarray):
+        self.assignments[rows] = self.assign(vectors)
+        self._order = None
+
+    def delete(self, rows: list[int]):
+        self.assignments = np.delete(self.assignments, rows)
+        self._order = None
+
+    def _lists(self) -> tuple[np.ndarray, np.ndarray]:
+        if self._order is None:
+            self._order = np.argsort(self.assignments, kind="stable").astype(np.int32)
+            self._offsets = np.zeros(len(self.centroids) + 1, dtype=np.int64)
+            np.cumsum(
+                np.bincount(self.assignments, minlength=len(self.centroids)),
+                out=self._offsets[1:],
+            )
+        return self._order, self._offsets
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        """The rows of the lists closest to the normalized query, in row order."""
+        order, offsets = self._lists()
+        centroid_scores = self.centroids @ query
+        if nprobe < len(self.centroids):
+            probed = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        else:
+            probed = np.arange(len(self.centroids))
+        rows = np.concatenate([order[offsets[i] : offsets[i + 1]] for i in probed])
+        # Ascending rows read the matrix sequentially
+        rows.sort()
+        return rows
+
+    def search(
+        self, matrix: np.ndarray, query: np.ndarray, top_k: int, nprobe: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """The rows and exact scores of the best candidates, the best first."""
+        rows = self.candidates(query, nprobe)
+        scores = matrix[rows] @ query
+        if len(rows) > top_k:
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+            rows, scores = rows[best], scores[best]
+        ranking = np.argsort(-scores, kind="stable")
+        return rows[ranking], scores[ranking]
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), ASSIGN_BATCH_SIZE):
+        batch = np.asarray(vectors[start : start + ASSIGN_BATCH_SIZE], dtype=np.float32)
+        labels[start : start + len(batch)] = np.argmax(batch @ centroids.T, axis=1)
+    return labels
+
+
+def index_file(storage_file: str | Path) -> Path:
+    return Path(storage_file).with_suffix(ANN_SUFFIX)
+
+
+def _signature(storage_file: Path) -> np.ndarray:
+    stat = storage_file.stat()
+    return np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+
+def write_index(storage_file: str | Path, index: IVFIndex):
+    """Writes the index, tagged with the size and modification time of the JSON storage."""
+    storage_file = Path(storage_file)
+    target = index_file(storage_file)
+    tmp_file = target.with_suffix(".tmp")
+    with open(tmp_file, "wb") as f:
+        np.savez(
+            f,
+            signature=_signature(storage_file),
+            centroids=index.centroids,
+            assignments=index.assignments,
+            trained_rows=np.array(index.trained_rows),
+        )
+    tmp_file.replace(target)
+
+
+def read_index(storage_file: str | Path, rows: int) -> IVFIndex | None:
+    """Returns the index, or None if it is missing or does not match the storage."""
+    storage_file = Path(storage_file)
+    target = index_file(storage_file)
+    if not target.exists() or not storage_file.exists():
+        return None
+    try:
+        with np.load(target) as stored:
+            if not np.array_equal(stored["signature"], _signature(storage_file)):
+                return None
+            if len(stored["assignments"]) != rows:
+                return None
+            return IVFIndex(
+                centroids=stored["centroids"],
+                assignments=stored["assignments"],
+                trained_rows=int(stored["trained_rows"]),
+            )
+    except Exception as e:
+        logger.warning(f"Ignoring invalid ANN index {target}: {e}")
+        return None
+
+
+def _build_index(db: NanoVectorDB) -> IVFIndex:
+    matrix = _storage(db)["matrix"]
+    start = time.perf_counter()
+    index = IVFIndex.train(matrix)
+    logger.info(
+        f"Built the ANN index of {db.storage_file} with {len(index.centroids)} lists "
+        f"for {matrix.shape[0]} rows in {time.perf_counter() - start:.1f} s"
+    )
+    return index
+
+
+def attach_index(db: NanoVectorDB):
+    """Loads the index of a storage, or builds it if the storage is large enough."""
+    rows = len(db)
+    index = None
+    if rows >= lightrag_cfg.lightrag_ann_min_rows:
+        index = read_index(db.storage_file, rows)
+        if index is None:
+            index = _build_index(db)
+            if Path(db.storage_file).exists():
+                write_index(db.storage_file, index)
+    db._ann_index = index
+
+
+def _query(
+    self: NanoVectorDB,
+    query: np.ndarray,
+    top_k: int = 10,
+    better_than_threshold: float = None,
+    filter_lambda: nano_dbs.ConditionLambda = None,
+) -> list[dict]:
+    if not hasattr(self, "_ann_index"):
+        attach_index(self)
+    index: IVFIndex | None = self._ann_index
+    if index is None or filter_lambda is not None or self.metric != "cosine":
+        return _nano_query(self, query, top_k, better_than_threshold, filter_lambda)
+    storage = _storage(self)
+    rows, scores = index.search(
+        storage["matrix"],
+        nano_dbs.normalize(query).astype(nano_dbs.Float),
+        top_k,
+        lightrag_cfg.lightrag_ann_nprobe,
+    )
+    results = []
+    for row, score in zip(rows, scores):
+        if better_than_threshold is not None and score < better_than_threshold:
+            break
+        results.append({**storage["data"][row], nano_dbs.f_METRICS: score})
+    return results
+
+
+def _upsert(self: NanoVectorDB, datas: list[nano_dbs.Data]):
+    if not hasattr(self, "_ann_index"):
+        attach_index(self)
+    report = _nano_upsert(self, datas)
+    index: IVFIndex | None = getattr(self, "_ann_index", None)
+    if index is None:
+        return report
+    storage = _storage(self)
+    if report["update"]:
+        updated = set(report["update"])
+        rows = np.array(
+            [i for i, d in enumerate(storage["data"]) if d[nano_dbs.f_ID] in updated]
+        )
+        index.update(rows, storage["matrix"][rows])
+    added = len(storage["data"]) - len(index.assignments)
+    if added > 0:
+        index.append(storage["matrix"][-added:])
+    return report
+
+
+def _delete(self: NanoVectorDB, ids: list[str]):
+    if not hasattr(self, "_ann_index"):
+        attach_index(self)
+    index: IVFIndex | None = getattr(self, "_ann_index", None)
+    if index is not None:
+        deleted = set(ids)
+        index.delete(
+            [
+                i
+                for i, d in enumerate(_storage(self)["data"])
+                if d[nano_dbs.f_ID] in deleted
+            ]
+        )
+    _nano_delete(self, ids)
+
+
+def _save_with_index(save):
+    def _save(self: NanoVectorDB):
+        save(self)
+        rows = len(self)
+        index: IVFIndex | None = getattr(self, "_ann_index", None)
+        if rows < lightrag_cfg.lightrag_ann_min_rows:
+            self._ann_index = None
+            index_file(self.storage_file).unlink(missing_ok=True)
+            return
+        try:
+            if index is None or rows > index.trained_rows * RETRAIN_GROWTH:
+                # Built at index time, so that queries do not wait for the training
+                index = _build_index(self)
+                self._ann_index = index
+            write_index(self.storage_file, index)
+        except Exception as e:
+            logger.warning(f"Could not write the ANN index of {self.storage_file}: {e}")
+
+    _save.with_ann_index = True
+    return _save
+
+
+def _pre_process_with_index(pre_process):
+    def _pre_process(self: NanoVectorDB):
+        pre_process(self)
+        # Loaded with the storage, so that the first query does not wait for it
+        attach_index(self)
+
+    _pre_process.with_ann_index = True
+    return _pre_process
+
+
+def install_ann_index():
+    """
+    Makes the nano-vectordb storages search an IVF index when they have at least
+    LIGHTRAG_ANN_MIN_ROWS rows. Wraps the current save and load functions, so it must be
+    installed after the vector sidecar.
+    """
+    NanoVectorDB.query = _query
+    NanoVectorDB.upsert = _upsert
+    NanoVectorDB.delete = _delete
+    if not getattr(NanoVectorDB.save, "with_ann_index", False):
+        NanoVectorDB.save = _save_with_index(NanoVectorDB.save)
+    if not getattr(NanoVectorDB.pre_process, "with_ann_index", False):
+        NanoVectorDB.pre_process = _pre_process_with_index(NanoVectorDB.pre_process)
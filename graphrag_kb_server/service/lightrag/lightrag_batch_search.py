@@ -0,0 +1,204 @@
+import asyncio
+from typing import Any
+
+import numpy as np
+from lightrag.base import BaseKVStorage, BaseVectorStorage
+
+from graphrag_kb_server.config import lightrag_cfg
+from graphrag_kb_server.logger import logger
+from graphrag_kb_server.model.chat_response import ChatResponse
+from graphrag_kb_server.model.rag_parameters import (
+    QueryParameters,
+    convert_to_lightrag_query_params,
+)
+from graphrag_kb_server.service.lightrag.lightrag_init import initialize_rag
+from graphrag_kb_server.service.lightrag.lightrag_search import (
+    QueryStages,
+    _uses_vector_chunks,
+    lightrag_search,
+)
+
+
+class SharedChunkReader:
+    """
+    Wraps the text chunk storage of a project for the questions of a batch.
+    Each question registers the chunks it can select before its chunk merge. When all the
+    questions have registered theirs or finished, the union of the chunk ids is read with one
+    get_by_ids call and the chunks are kept for the whole batch.
+    """
+
+    def __init__(self, storage: BaseKVStorage, questions: int):
+        self.storage = storage
+        self.chunks: dict[str, dict | None] = {}
+        self.pending: set[str] = set()
+        # The questions which have neither registered their chunks nor finished
+        self.waiting = set(range(questions))
+        self.ready = asyncio.Event()
+        self.reads = 0
+
+    def __getattr__(self, name: str) -> Any:
+        # global_config, embedding_func, etc. come from the wrapped storage
+        return getattr(self.storage, name)
+
+    async def get_by_ids(self, ids: list[str]) -> list[dict | None]:
+        missing = [i for i in ids if i not in self.chunks]
+        if missing:
+            # Chunks which were not registered, e.g. on a retry after the batch read
+            await self._read(missing)
+        return [self.chunks.get(i) for i in ids]
+
+    async def _read(self, ids: list[str]):
+        self.reads += 1
+        for chunk_id, chunk in zip(ids, await self.storage.get_by_ids(ids)):
+            self.chunks[chunk_id] = chunk
+
+    async def wait_for_batch(self, question: int, ids: list[str]):
+        """Registers the chunks of a question and waits for the read of the batch."""
+        if question in self.waiting:
+            self.pending.update(i for i in ids if i not in self.chunks)
+            await self.leave(question)
+        await self.ready.wait()
+
+    async def leave(self, question: int):
+        """Called when a question finishes, which may be without reaching the chunk merge."""
+        self.waiting.discard(question)
+        if self.waiting or self.ready.is_set():
+            return
+        ids, self.pending = list(self.pending), set()
+        try:
+            if ids:
+                await self._read(ids)
+        except Exception as e:
+            # Each question then reads its own chunks
+            logger.warning(f"Batched chunk read failed: {e}")
+        finally:
+            self.ready.set()
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def batch_vector_scan(
+    storage: dict[str, Any],
+    query_embeddings: np.ndarray,
+    top_k: int,
+    cosine_threshold: float,
+) -> list[list[dict]]:
+    """
+    Scores the questions against all chunk vectors with a single matrix multiply and
+    returns the chunks of each question in the format of lightrag's _get_vector_context.
+    """
+    data = storage["data"]
+    if len(data) == 0:
+        return [[] for _ in range(len(query_embeddings))]
+    scores = storage["matrix"] @ _normalize(query_embeddings).T
+    top_k = min(top_k, len(data))
+    results = []
+    for column in scores.T:
+        candidates = np.argpartition(-column, top_k - 1)[:top_k]
+        chunks = []
+        for i in candidates[np.argsort(-column[candidates])]:
+            if column[i] < cosine_threshold:
+                break
+            dp = data[i]
+            if "content" not in dp:
+                continue
+            chunks.append(
+                {
+                    "content": dp["content"],
+                    "created_at": dp.get("__created_at__"),
+                    "file_path": dp.get("file_path", "unknown_source"),
+                    "source_type": "vector",
+                    "chunk_id": dp["__id__"],
+                }
+            )
+        results.append(chunks)
+    return results
+
+
+async def _batch_vector_chunks(
+    chunks_vdb: BaseVectorStorage, query_embeddings: np.ndarray, top_k: int
+) -> list[list[dict]] | None:
+    try:
+        storage = await chunks_vdb.client_storage
+        return batch_vector_scan(
+            storage, query_embeddings, top_k, chunks_vdb.cosine_better_than_threshold
+        )
+    except Exception as e:
+        # Storages other than nano-vectordb: each question runs its own vector search
+        logger.warning(f"Batched vector scan not available: {e}")
+        return None
+
+
+async def lightrag_batch_search(
+    query_params: QueryParameters,
+    questions: list[str],
+    max_concurrency: int | None = None,
+) -> list[ChatResponse]:
+    """
+    Answers several questions about the same project. The query embeddings are computed
+    with one call, the chunk vector search is one matrix multiply for the whole batch and
+    the chunks of all the questions are read with one call. The searches then run with bounded concurrency.
+    The responses are in the same order as the questions.
+    """
+    if not questions:
+        return []
+    project_dir = query_params.context_params.project_dir
+    rag = await initialize_rag(project_dir)
+    param = convert_to_lightrag_query_params(query_params, False)
+    chunk_reader = SharedChunkReader(rag.text_chunks, len(questions))
+    semaphore = asyncio.Semaphore(
+        max_concurrency or lightrag_cfg.lightrag_batch_max_concurrency
+    )
+
+    def wait_for_chunks(question: int):
+        async def wait(chunk_ids: list[str]):
+            # The waiting questions give up their slot, so that the others reach the read
+            semaphore.release()
+            try:
+                await chunk_reader.wait_for_batch(question, chunk_ids)
+            finally:
+                await semaphore.acquire()
+
+        return wait
+
+    stages = [
+        QueryStages(text_chunks_db=chunk_reader, before_chunk_merge=wait_for_chunks(i))
+        for i in range(len(questions))
+    ]
+
+    embedding_func = rag.text_chunks.embedding_func
+    if embedding_func and embedding_func.func:
+        query_embeddings = np.asarray(await embedding_func.func(questions))
+        for stage, query_embedding in zip(stages, query_embeddings):
+            stage.query_embedding = query_embedding
+        if _uses_vector_chunks(param, rag.chunks_vdb):
+            vector_chunks = await _batch_vector_chunks(
+                rag.chunks_vdb, query_embeddings, param.chunk_top_k or param.top_k
+            )
+            if vector_chunks is not None:
+                for stage, chunks in zip(stages, vector_chunks):
+                    stage.vector_chunks = chunks
+
+    async def search(i: int, question: str) -> ChatResponse:
+        context_params = query_params.context_params.model_copy(
+            update={"query": question}
+        )
+        try:
+            async with semaphore:
+                return await lightrag_search(
+                    query_params.model_copy(update={"context_params": context_params}),
+                    stages=stages[i],
+                )
+        finally:
+            await chunk_reader.leave(i)
+
+    responses = await asyncio.gather(
+        *[search(i, question) for i, question in enumerate(questions)]
+    )
+    logger.info(
+        f"Batch of {len(questions)} questions for {project_dir} read the chunks in {chunk_reader.reads} calls"
+    )
+    return responses
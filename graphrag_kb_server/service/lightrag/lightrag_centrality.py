@@ -1,59 +1,354 @@
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
 from pathlib import Path
 import asyncio
+import hashlib
+import multiprocessing
+import os
+import time
 
+import networkx as nx
+import numpy as np
 import pandas as pd
-import rustworkx as rx
-
 
+from graphrag_kb_server.config import lightrag_cfg
 from graphrag_kb_server.service.lightrag.lightrag_graph_support import (
-    create_network_from_project_dir,
-    networkx_to_rustworkx,
+    create_network_from_working_dir,
+)
+from graphrag_kb_server.service.lightrag.lightrag_versions import get_working_dir
+from graphrag_kb_server.service.graph_centrality import (
+    community_centrality,
+    degree_centrality,
+    eigenvector_centrality,
+    label_propagation,
+)
+from graphrag_kb_server.service.query_metrics import project_label
+from graphrag_kb_server.service.random_walk import (
+    GraphCSR,
+    get_graph_csr,
+    personalized_pagerank,
+)
+from graphrag_kb_server.model.node_centrality import (
+    CentralityMeasure,
+    NodeCentralities,
+    NodeCentrality,
 )
-from graphrag_kb_server.model.node_centrality import NodeCentrality
 from graphrag_kb_server.service.db.db_persistence_topics_centrality import (
     find_topics_with_centrality_by_project_name,
     insert_topics_with_centrality,
 )
+from graphrag_kb_server.utils.betweenness import (
+    connected_components,
+    neighbourhood_fingerprints,
+    normalize_betweenness,
+    pivot_count,
+    sample_betweenness,
+)
 from graphrag_kb_server.logger import logger
 
+# Unnormalized betweenness of the last computation, which an incremental index updates
+BETWEENNESS_FILE = "betweenness.npz"
+# The pivots are drawn with a fixed seed, so that the approximate ranking is stable
+BETWEENNESS_SEED = 0
 
-async def get_sorted_centrality_scores(
+_betweenness_executor: ProcessPoolExecutor | None = None
+
+
+def _get_betweenness_executor() -> ProcessPoolExecutor:
+    global _betweenness_executor
+    if _betweenness_executor is None:
+        # Spawned, as forking a server with running threads is unsafe
+        _betweenness_executor = ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _betweenness_executor
+
+
+def shutdown_betweenness_worker():
+    global _betweenness_executor
+    if _betweenness_executor is not None:
+        _betweenness_executor.shutdown(wait=False, cancel_futures=True)
+        _betweenness_executor = None
+
+
+async def _sample_betweenness(*args) -> np.ndarray:
+    if lightrag_cfg.lightrag_betweenness_worker:
+        # The worker process has its own cores to use, the server threads search sequentially
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _get_betweenness_executor(), sample_betweenness, *args, os.cpu_count() or 1
+        )
+    return await asyncio.to_thread(sample_betweenness, *args)
+
+
+def _betweenness_settings() -> np.ndarray:
+    """The settings of the computation. Stored scores with other settings are not reused."""
+    return np.array(
+        [
+            lightrag_cfg.lightrag_betweenness_mode == "exact",
+            lightrag_cfg.lightrag_betweenness_epsilon,
+            lightrag_cfg.lightrag_betweenness_delta,
+            lightrag_cfg.lightrag_betweenness_samples,
+        ],
+        dtype=np.float64,
+    )
+
+
+def _betweenness_samples(number_of_nodes: int) -> int | None:
+    """The pivots per connected component, None for the exact scores."""
+    if lightrag_cfg.lightrag_betweenness_mode == "exact":
+        return None
+    if lightrag_cfg.lightrag_betweenness_samples > 0:
+        return lightrag_cfg.lightrag_betweenness_samples
+    return pivot_count(
+        number_of_nodes,
+        lightrag_cfg.lightrag_betweenness_epsilon,
+        lightrag_cfg.lightrag_betweenness_delta,
+    )
+
+
+def _node_hashes(node_ids: list[str]) -> np.ndarray:
+    digests = b"".join(
+        hashlib.blake2b(node_id.encode("utf-8"), digest_size=8).digest()
+        for node_id in node_ids
+    )
+    return np.frombuffer(digests, dtype=np.uint64)
+
+
+def _read_betweenness(betweenness_file: Path) -> dict[str, np.ndarray] | None:
+    if not betweenness_file.exists():
+        return None
+    try:
+        with np.load(betweenness_file) as data:
+            return {key: data[key] for key in data.files}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Invalid betweenness file {betweenness_file}: {e}")
+        return None
+
+
+def _write_betweenness(betweenness_file: Path, **arrays: np.ndarray):
+    tmp_file = betweenness_file.with_suffix(".tmp")
+    with open(tmp_file, "wb") as f:
+        np.savez(f, **arrays)
+    tmp_file.replace(betweenness_file)
+
+
+async def compute_betweenness(
     project_dir: Path,
-) -> list[NodeCentrality]:
-    logger.info(f"Getting sorted centrality scores for project: {project_dir}")
-    G = await asyncio.to_thread(create_network_from_project_dir, project_dir)
-    logger.info(f"Created network from project directory: {project_dir}")
-    rw_graph = await asyncio.to_thread(networkx_to_rustworkx, G)
-    logger.info(f"Converted network to rustworkx graph: {project_dir}")
-    centrality = await asyncio.to_thread(rx.betweenness_centrality, rw_graph)
-    logger.info(f"Calculated betweenness centrality for project: {project_dir}")
-
-    def process_centrality_data():
-        node_centrality = {
-            node: (centrality[node], rw_graph[node]) for node in rw_graph.node_indices()
+    G: nx.Graph,
+    incremental: bool = False,
+    working_dir: Path | None = None,
+) -> tuple[GraphCSR, np.ndarray]:
+    """
+    Normalized betweenness centrality of the nodes of the project graph, exact or estimated
+    from sampled pivots. An incremental update only searches the connected components with
+    added or rewired nodes and keeps the stored scores of the other components.
+    The scores are stored in the working directory, by default the one of the served version.
+    """
+    csr = get_graph_csr(G)
+    node_ids = [str(node_id) for node_id in csr.node_ids]
+
+    def analyse_graph() -> tuple[np.ndarray, np.ndarray]:
+        labels = connected_components(csr.indptr, csr.indices)
+        fingerprints = neighbourhood_fingerprints(
+            csr.indptr, csr.indices, _node_hashes(node_ids)
+        )
+        return labels, fingerprints
+
+    labels, fingerprints = await asyncio.to_thread(analyse_graph)
+    betweenness = np.zeros(len(node_ids))
+    components = np.unique(labels)
+    settings = _betweenness_settings()
+    betweenness_file = (working_dir or get_working_dir(project_dir)) / BETWEENNESS_FILE
+    previous = (
+        await asyncio.to_thread(_read_betweenness, betweenness_file)
+        if incremental
+        else None
+    )
+    if previous is not None and np.array_equal(previous["settings"], settings):
+        previous_positions = {
+            node_id: i for i, node_id in enumerate(previous["node_ids"].tolist())
         }
-        sorted_centrality = []
-        for _, centrality_info in sorted(
-            node_centrality.items(), key=lambda item: item[1][0], reverse=True
-        ):
-            data = centrality_info[1]
-            sorted_centrality.append(
+        previous_index = np.array(
+            [previous_positions.get(node_id, -1) for node_id in node_ids],
+            dtype=np.int64,
+        )
+        unchanged = previous_index >= 0
+        unchanged[unchanged] = (
+            previous["fingerprints"][previous_index[unchanged]]
+            == fingerprints[unchanged]
+        )
+        # Components whose nodes all have the same neighbours as before are unchanged
+        total_components = len(components)
+        components = np.unique(labels[~unchanged])
+        kept = ~np.isin(labels, components)
+        betweenness[kept] = previous["betweenness"][previous_index[kept]]
+        logger.info(
+            f"Updating the betweenness of {len(components)} of {total_components} components of {project_dir}"
+        )
+    if len(components) > 0:
+        betweenness += await _sample_betweenness(
+            csr.indptr,
+            csr.indices,
+            labels,
+            components,
+            _betweenness_samples(len(node_ids)),
+            BETWEENNESS_SEED,
+        )
+    await asyncio.to_thread(
+        _write_betweenness,
+        betweenness_file,
+        node_ids=np.array(node_ids, dtype=str),
+        fingerprints=fingerprints,
+        betweenness=betweenness,
+        settings=settings,
+    )
+    return csr, normalize_betweenness(betweenness)
+
+
+# PageRank with the damping factor 0.85 of networkx
+PAGERANK_RESTART_PROB = 0.15
+
+# Milliseconds taken by each measure in the last computation, per project
+centrality_timings: dict[str, dict[str, float]] = {}
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 3)
+
+
+async def compute_centrality_measures(
+    project_dir: Path, incremental: bool = False, working_dir: Path | None = None
+) -> list[NodeCentralities]:
+    """
+    All centrality measures of the nodes of the project graph, computed over its cached
+    adjacency and sorted by betweenness. The graph is the one of the working directory,
+    by default the one of the served version.
+    """
+    logger.info(f"Computing centrality measures for project: {project_dir}")
+    working_dir = working_dir or get_working_dir(project_dir)
+    G = await asyncio.to_thread(create_network_from_working_dir, working_dir)
+    timings = {}
+    start = time.perf_counter()
+    csr, betweenness = await compute_betweenness(
+        project_dir, G, incremental, working_dir
+    )
+    timings[CentralityMeasure.BETWEENNESS] = _elapsed_ms(start)
+
+    def compute_other_measures() -> (
+        tuple[dict[CentralityMeasure, np.ndarray], np.ndarray]
+    ):
+        scores = {CentralityMeasure.BETWEENNESS: betweenness}
+        start = time.perf_counter()
+        _, scores[CentralityMeasure.PAGERANK] = personalized_pagerank(
+            G, csr.node_ids, PAGERANK_RESTART_PROB
+        )
+        timings[CentralityMeasure.PAGERANK] = _elapsed_ms(start)
+        start = time.perf_counter()
+        scores[CentralityMeasure.DEGREE] = degree_centrality(csr)
+        timings[CentralityMeasure.DEGREE] = _elapsed_ms(start)
+        start = time.perf_counter()
+        scores[CentralityMeasure.EIGENVECTOR] = eigenvector_centrality(csr)
+        timings[CentralityMeasure.EIGENVECTOR] = _elapsed_ms(start)
+        start = time.perf_counter()
+        communities = label_propagation(csr)
+        scores[CentralityMeasure.COMMUNITY] = community_centrality(csr, communities)
+        timings[CentralityMeasure.COMMUNITY] = _elapsed_ms(start)
+        return scores, communities
+
+    scores, communities = await asyncio.to_thread(compute_other_measures)
+    project_timings = {f"{measure}_ms": ms for measure, ms in timings.items()}
+    centrality_timings[project_label(project_dir)] = project_timings
+    logger.info(f"Centrality timings of {project_dir}: {project_timings}")
+
+    def sort_nodes() -> list[NodeCentralities]:
+        node_centralities = []
+        for position in np.argsort(-betweenness, kind="stable"):
+            data = G.nodes[csr.node_ids[position]]
+            node_centralities.append(
                 (
                     data["entity_id"],
                     data["entity_type"],
                     data["description"],
                     data["file_path"],
-                    centrality_info[0],
+                    int(communities[position]),
+                    *(
+                        scores[measure][position].item()
+                        for measure in CentralityMeasure
+                    ),
                 )
             )
-        return sorted_centrality
+        return node_centralities
+
+    return await asyncio.to_thread(sort_nodes)
+
+
+def centrality_stats(project: str | None = None) -> dict[str, dict[str, float]]:
+    """The timings of the last centrality computation of each project (tennant/project)."""
+    return {
+        label: timings
+        for label, timings in centrality_timings.items()
+        if project is None or label == project
+    }
+
+
+def sort_by_measure(
+    node_centralities: list[NodeCentralities], measure: CentralityMeasure
+) -> list[NodeCentrality]:
+    """The scores of one measure, the highest first. Ties keep the order of the input."""
+    column = 5 + list(CentralityMeasure).index(measure)
+    return sorted(
+        (
+            node_centrality[:4] + (node_centrality[column],)
+            for node_centrality in node_centralities
+        ),
+        key=lambda node_centrality: node_centrality[4],
+        reverse=True,
+    )
+
 
-    sorted_centrality = await asyncio.to_thread(process_centrality_data)
+async def get_sorted_centrality_scores(
+    project_dir: Path, measure: CentralityMeasure = CentralityMeasure.BETWEENNESS
+) -> list[NodeCentrality]:
+    node_centralities = await compute_centrality_measures(project_dir)
+    sorted_centrality = sort_by_measure(node_centralities, measure)
     logger.info(f"Sorted centrality scores for project: {project_dir}")
     return sorted_centrality
 
 
+_centrality_locks: dict[str, asyncio.Lock] = {}
+
+
+def _centrality_lock(project_dir: Path) -> asyncio.Lock:
+    """The scores of a project are computed once, even by concurrent first requests."""
+    return _centrality_locks.setdefault(project_dir.as_posix(), asyncio.Lock())
+
+
+async def _store_centrality_measures(
+    project_dir: Path, node_centralities: list[NodeCentralities]
+):
+    await insert_topics_with_centrality(project_dir, node_centralities, replace=True)
+    logger.info(f"Inserted centrality scores for project: {project_dir}")
+
+
+async def refresh_centrality_scores(
+    project_dir: Path, incremental: bool, working_dir: Path | None = None
+):
+    """
+    Replaces the stored centrality scores of a project after it is indexed, so that the
+    topics follow the new graph and requests do not compute them. A hot swapped version
+    passes its working directory, as its scores are stored before it is served.
+    """
+    try:
+        node_centralities = await compute_centrality_measures(
+            project_dir, incremental, working_dir
+        )
+        async with _centrality_lock(project_dir):
+            await _store_centrality_measures(project_dir, node_centralities)
+    except Exception as e:
+        logger.error(f"Could not refresh the centrality scores of {project_dir}: {e}")
+
+
 async def convert_to_pd(sorted_centrality: list[NodeCentrality]) -> pd.DataFrame:
     return await asyncio.to_thread(
         lambda: pd.DataFrame(
@@ -69,26 +364,31 @@ async def convert_to_pd(sorted_centrality: list[NodeCentrality]) -> pd.DataFrame
     )
 
 
-async def get_sorted_centrality_scores_as_pd(project_dir: Path) -> pd.DataFrame:
+async def get_sorted_centrality_scores_as_pd(
+    project_dir: Path, measure: CentralityMeasure = CentralityMeasure.BETWEENNESS
+) -> pd.DataFrame:
     logger.info(
-        f"Getting sorted centrality scores as pandas dataframe for project: {project_dir}"
+        f"Getting sorted {measure} scores as pandas dataframe for project: {project_dir}"
     )
-    cached_data = await find_topics_with_centrality_by_project_name(project_dir, -1)
-    if cached_data is not None and len(cached_data) > 0:
-        logger.info(f"Found cached centrality scores for project: {project_dir}")
-        return await convert_to_pd(cached_data)
-    sorted_centrality = await get_sorted_centrality_scores(project_dir)
-    logger.info(f"Sorted centrality scores for project: {project_dir}")
-    data = await convert_to_pd(sorted_centrality)
-    await insert_topics_with_centrality(project_dir, sorted_centrality)
-    logger.info(f"Inserted centrality scores for project: {project_dir}")
-    return data
+    async with _centrality_lock(project_dir):
+        cached_data = await find_topics_with_centrality_by_project_name(
+            project_dir, -1, measure
+        )
+        if cached_data is not None and len(cached_data) > 0:
+            logger.info(f"Found cached centrality scores for project: {project_dir}")
+            return await convert_to_pd(cached_data)
+        # Not computed yet, or stored before the measure was added
+        node_centralities = await compute_centrality_measures(project_dir)
+        await _store_centrality_measures(project_dir, node_centralities)
+        return await convert_to_pd(sort_by_measure(node_centralities, measure))
 
 
 async def get_sorted_centrality_scores_as_xls(
-    project_dir: Path, limit: int = -1
+    project_dir: Path,
+    limit: int = -1,
+    measure: CentralityMeasure = CentralityMeasure.BETWEENNESS,
 ) -> bytes:
-    data = await get_sorted_centrality_scores_as_pd(project_dir)
+    data = await get_sorted_centrality_scores_as_pd(project_dir, measure)
     if limit > 0:
         data = data.head(limit)
     # Create BytesIO buffer
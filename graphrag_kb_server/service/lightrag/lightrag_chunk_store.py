@@ -0,0 +1,371 @@
+import asyncio
+import json
+import mmap
+import os
+import pickle
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator, final
+
+import jiter
+from lightrag import LightRAG
+from lightrag.base import BaseKVStorage
+from lightrag.namespace import NameSpace
+
+from graphrag_kb_server.logger import logger
+
+DATA_SUFFIX = ".dat"
+INDEX_SUFFIX = ".idx"
+MIGRATED_SUFFIX = ".migrated"
+# The data file is rewritten when more than half of it and at least this many bytes are dead records
+COMPACTION_MIN_DEAD_BYTES = 16 * 2**20
+# Approximate in-memory size of an index entry (key, tuple and dict slot)
+INDEX_ENTRY_SIZE = 200
+CHUNK_STORE_NAMESPACES = {
+    "text_chunks": NameSpace.KV_STORE_TEXT_CHUNKS,
+    "full_docs": NameSpace.KV_STORE_FULL_DOCS,
+}
+
+
+def store_files(working_dir: str | Path, namespace: str) -> tuple[Path, Path]:
+    """The offset index and the JSON file which is migrated."""
+    working_dir = Path(working_dir)
+    return (
+        working_dir / f"chunk_store_{namespace}{INDEX_SUFFIX}",
+        working_dir / f"kv_store_{namespace}.json",
+    )
+
+
+def data_file_name(index_file: Path, generation: int) -> Path:
+    """Each migration or compaction writes a new generation of the data file."""
+    return index_file.with_name(f"{index_file.stem}.{generation}{DATA_SUFFIX}")
+
+
+def _encode(value: dict[str, Any]) -> bytes:
+    return json.dumps(value).encode("utf-8")
+
+
+def read_index(index_file: Path) -> dict[str, Any]:
+    if not index_file.exists():
+        return {"index": {}, "generation": 0, "dead_bytes": 0}
+    with open(index_file, "rb") as f:
+        return pickle.load(f)
+
+
+def write_index(
+    index_file: Path,
+    index: dict[str, tuple[int, int]],
+    generation: int,
+    dead_bytes: int,
+):
+    tmp_index_file = index_file.with_suffix(".tmp")
+    with open(tmp_index_file, "wb") as f:
+        pickle.dump(
+            {"index": index, "generation": generation, "dead_bytes": dead_bytes},
+            f,
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+    tmp_index_file.replace(index_file)
+
+
+def write_data_file(
+    data_file: Path, records: Iterator[tuple[str, bytes]]
+) -> dict[str, tuple[int, int]]:
+    """Writes the encoded records one after the other and returns their offsets and lengths."""
+    index = {}
+    offset = 0
+    tmp_data_file = data_file.with_suffix(".tmp")
+    with open(tmp_data_file, "wb") as f:
+        for id, encoded in records:
+            f.write(encoded)
+            index[id] = (offset, len(encoded))
+            offset += len(encoded)
+        f.flush()
+        os.fsync(f.fileno())
+    tmp_data_file.replace(data_file)
+    return index
+
+
+def migrate_json_store(json_file: Path, index_file: Path) -> int:
+    """
+    Converts a JSON KV store into a new generation of the data file and its offset index.
+    The JSON file is renamed afterwards, so that it is not migrated again.
+    Returns the number of records.
+    """
+    previous_generation = read_index(index_file)["generation"]
+    generation = previous_generation + 1
+    with open(json_file, "rb") as f:
+        records: dict[str, dict[str, Any]] = jiter.from_json(f.read())
+    index = write_data_file(
+        data_file_name(index_file, generation),
+        ((id, _encode(value)) for id, value in records.items()),
+    )
+    # The index is switched after the data is written, so that it never points to missing records
+    write_index(index_file, index, generation, 0)
+    json_file.replace(json_file.with_name(json_file.name + MIGRATED_SUFFIX))
+    data_file_name(index_file, previous_generation).unlink(missing_ok=True)
+    return len(index)
+
+
+def _iter_snapshot(
+    index: dict[str, tuple[int, int]], data: mmap.mmap
+) -> Iterator[tuple[str, dict[str, Any]]]:
+    try:
+        for id, (offset, length) in index.items():
+            yield id, json.loads(data[offset : offset + length])
+    finally:
+        data.close()
+
+
+@final
+@dataclass
+class ChunkFileKVStorage(BaseKVStorage):
+    """
+    KV storage for large records (text chunks, full documents) which are read a few at a time.
+    The records are appended to a data file and only their offsets are kept in memory.
+    Reads go through a memory map and an LRU of recently read records.
+    """
+
+    cache_size: int = 1000
+
+    def __post_init__(self):
+        working_dir = self.global_config["working_dir"]
+        workspace_dir = (
+            os.path.join(working_dir, self.workspace) if self.workspace else working_dir
+        )
+        os.makedirs(workspace_dir, exist_ok=True)
+        self._index_file, self._json_file = store_files(workspace_dir, self.namespace)
+        self._index: dict[str, tuple[int, int]] | None = None
+        self._generation = 0
+        self._dead_bytes = 0
+        self._cache: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._mmap: mmap.mmap | None = None
+        self._writer = None
+        self._dirty = False
+        self._storage_lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def _data_file(self) -> Path:
+        return data_file_name(self._index_file, self._generation)
+
+    async def initialize(self):
+        async with self._storage_lock:
+            if self._index is None:
+                await asyncio.to_thread(self._load_index)
+
+    def _load_index(self):
+        if self._json_file.exists():
+            # Written by the JSON storage, i.e. before the chunk store was enabled
+            start = time.perf_counter()
+            count = migrate_json_store(self._json_file, self._index_file)
+            logger.info(
+                f"Migrated {count} records of {self._json_file} in {time.perf_counter() - start:.1f} s"
+            )
+        stored = read_index(self._index_file)
+        self._index = stored["index"]
+        self._generation = stored["generation"]
+        self._dead_bytes = stored["dead_bytes"]
+
+    def _read(self, offset: int, length: int) -> bytes:
+        if self._mmap is None or offset + length > len(self._mmap):
+            # The file grew since it was mapped
+            if self._writer is not None:
+                self._writer.flush()
+            if self._mmap is not None:
+                self._mmap.close()
+            with open(self._data_file, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap[offset : offset + length]
+
+    def _get(self, id: str) -> dict[str, Any] | None:
+        value = self._cache.get(id)
+        if value is not None:
+            self._cache.move_to_end(id)
+            self.hits += 1
+            return value
+        location = self._index.get(id)
+        if location is None:
+            return None
+        self.misses += 1
+        value = json.loads(self._read(*location))
+        self._cache[id] = value
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return value
+
+    def _with_defaults(self, id: str, value: dict[str, Any]) -> dict[str, Any]:
+        # A copy, so that callers cannot modify the cached record
+        result = dict(value)
+        result.setdefault("create_time", 0)
+        result.setdefault("update_time", 0)
+        result["_id"] = id
+        return result
+
+    async def get_by_id(self, id: str) -> dict[str, Any] | None:
+        async with self._storage_lock:
+            value = self._get(id)
+            return self._with_defaults(id, value) if value else None
+
+    async def get_by_ids(self, ids: list[str]) -> list[dict[str, Any]]:
+        async with self._storage_lock:
+            results = []
+            for id in ids:
+                value = self._get(id)
+                results.append(self._with_defaults(id, value) if value else None)
+            return results
+
+    async def iter_records(self) -> Iterator[tuple[str, dict[str, Any]]]:
+        """
+        Iterates over all records without adding them to the LRU. The iterator reads a snapshot
+        of the index through its own memory map, so that it can be consumed in a thread while
+        records are written or the data file is compacted.
+        """
+        async with self._storage_lock:
+            index = dict(self._index)
+            if not index:
+                return iter(())
+            if self._writer is not None:
+                self._writer.flush()
+            with open(self._data_file, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return _iter_snapshot(index, data)
+
+    async def filter_keys(self, keys: set[str]) -> set[str]:
+        async with self._storage_lock:
+            return set(keys) - set(self._index.keys())
+
+    async def upsert(self, data: dict[str, dict[str, Any]]) -> None:
+        if not data:
+            return
+        current_time = int(time.time())
+        async with self._storage_lock:
+            if self._writer is None:
+                self._writer = open(self._data_file, "ab")
+            offset = self._writer.seek(0, os.SEEK_END)
+            for k, v in data.items():
+                if self.namespace.endswith("text_chunks") and "llm_cache_list" not in v:
+                    v["llm_cache_list"] = []
+                if k in self._index:
+                    v["update_time"] = current_time
+                    self._dead_bytes += self._index[k][1]
+                else:
+                    v["create_time"] = current_time
+                    v["update_time"] = current_time
+                v["_id"] = k
+                encoded = _encode(v)
+                self._writer.write(encoded)
+                self._index[k] = (offset, len(encoded))
+                offset += len(encoded)
+                self._cache.pop(k, None)
+            self._dirty = True
+
+    async def delete(self, ids: list[str]) -> None:
+        async with self._storage_lock:
+            for id in ids:
+                location = self._index.pop(id, None)
+                self._cache.pop(id, None)
+                if location is not None:
+                    self._dead_bytes += location[1]
+                    self._dirty = True
+
+    async def is_empty(self) -> bool:
+        async with self._storage_lock:
+            return len(self._index) == 0
+
+    async def index_done_callback(self) -> None:
+        async with self._storage_lock:
+            if not self._dirty:
+                return
+            if self._writer is not None:
+                self._writer.flush()
+                os.fsync(self._writer.fileno())
+            if self._needs_compaction():
+                await asyncio.to_thread(self._compact)
+            else:
+                await asyncio.to_thread(
+                    write_index,
+                    self._index_file,
+                    dict(self._index),
+                    self._generation,
+                    self._dead_bytes,
+                )
+            self._dirty = False
+
+    def _needs_compaction(self) -> bool:
+        return (
+            self._dead_bytes >= COMPACTION_MIN_DEAD_BYTES
+            and self._dead_bytes * 2 > (self._data_file.stat().st_size)
+        )
+
+    def _compact(self):
+        """Copies the live records to a new generation of the data file."""
+        previous_data_file = self._data_file
+        index = write_data_file(
+            data_file_name(self._index_file, self._generation + 1),
+            ((id, self._read(*location)) for id, location in self._index.items()),
+        )
+        write_index(self._index_file, index, self._generation + 1, 0)
+        self._close_files()
+        self._index = index
+        self._generation += 1
+        self._dead_bytes = 0
+        previous_data_file.unlink(missing_ok=True)
+        logger.info(f"Compacted {previous_data_file} into {self._data_file}")
+
+    def _close_files(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    async def drop(self) -> dict[str, str]:
+        try:
+            async with self._storage_lock:
+                self._close_files()
+                self._data_file.unlink(missing_ok=True)
+                self._index = {}
+                self._cache.clear()
+                self._dead_bytes = 0
+                await asyncio.to_thread(
+                    write_index, self._index_file, {}, self._generation, 0
+                )
+            return {"status": "success", "message": "data dropped"}
+        except Exception as e:
+            logger.error(f"Error dropping {self.namespace}: {e}")
+            return {"status": "error", "message": str(e)}
+
+    async def finalize(self):
+        await self.index_done_callback()
+        self._close_files()
+
+    def memory_usage(self) -> int:
+        """Approximate memory of the offset index and the cached records in bytes."""
+        index = self._index or {}
+        cached_size = sum(index[id][1] for id in self._cache.keys() if id in index)
+        return len(index) * INDEX_ENTRY_SIZE + cached_size
+
+
+def install_chunk_store(rag: LightRAG, cache_size: int):
+    """
+    Replaces the JSON storages of the text chunks and the full documents of a LightRAG
+    instance. Must be called before the storages are initialized.
+    """
+    for attribute, namespace in CHUNK_STORE_NAMESPACES.items():
+        json_storage: BaseKVStorage = getattr(rag, attribute)
+        setattr(
+            rag,
+            attribute,
+            ChunkFileKVStorage(
+                namespace=namespace,
+                workspace=json_storage.workspace,
+                global_config=json_storage.global_config,
+                embedding_func=json_storage.embedding_func,
+                cache_size=cache_size,
+            ),
+        )
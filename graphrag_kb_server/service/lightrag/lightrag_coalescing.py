@@ -0,0 +1,182 @@
+import asyncio
+import json
+import re
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from graphrag_kb_server.logger import logger
+from graphrag_kb_server.model.chat_response import ChatResponse
+from graphrag_kb_server.model.rag_parameters import QueryParameters
+
+
+SearchFunction = Callable[[QueryParameters, bool], Awaitable[ChatResponse]]
+
+# Fields which do not change the outcome of a search and are therefore excluded from the key.
+_EXCLUDED_FIELDS = {"conversation_id", "callback", "context_params"}
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    return _WHITESPACE.sub(" ", query).strip().casefold()
+
+
+def build_flight_key(query_params: QueryParameters, only_need_context: bool) -> str:
+    """
+    Builds the key used to detect identical concurrent queries.
+    The key includes the project directory, the normalized query, the search mode
+    and all query parameters which influence the response.
+    """
+    context_params = query_params.context_params
+    relevant = {
+        name: getattr(query_params, name)
+        for name in QueryParameters.model_fields
+        if name not in _EXCLUDED_FIELDS
+    }
+    structured_output_format = relevant.get("structured_output_format")
+    if structured_output_format is not None:
+        relevant["structured_output_format"] = (
+            f"{structured_output_format.__module__}.{structured_output_format.__qualname__}"
+        )
+    relevant["project_dir"] = context_params.project_dir.as_posix()
+    relevant["query"] = normalize_query(context_params.query)
+    relevant["context_size"] = context_params.context_size
+    relevant["only_need_context"] = only_need_context
+    return json.dumps(relevant, sort_keys=True, default=str)
+
+
+class _StreamFanout:
+    """
+    Consumes a single LLM token stream and replays it to any number of subscribers.
+    Subscribers which join late receive all tokens produced so far before the live ones.
+    """
+
+    def __init__(self, source: AsyncIterator):
+        self._source = source
+        self._chunks: list[Any] = []
+        self._done = False
+        self._error: BaseException | None = None
+        self._condition = asyncio.Condition()
+        self._task = asyncio.create_task(self._pump())
+
+    async def _pump(self):
+        try:
+            async for chunk in self._source:
+                async with self._condition:
+                    self._chunks.append(chunk)
+                    self._condition.notify_all()
+        except Exception as e:
+            logger.error(f"Shared token stream failed: {e}")
+            self._error = e
+        finally:
+            async with self._condition:
+                self._done = True
+                self._condition.notify_all()
+
+    async def wait_done(self):
+        await asyncio.shield(self._task)
+
+    async def subscribe(self) -> AsyncIterator:
+        position = 0
+        while True:
+            async with self._condition:
+                await self._condition.wait_for(
+                    lambda: position < len(self._chunks) or self._done
+                )
+                pending = self._chunks[position:]
+                done = self._done
+            for chunk in pending:
+                yield chunk
+            position += len(pending)
+            if done and position >= len(self._chunks):
+                if self._error is not None:
+                    raise self._error
+                return
+
+
+class _Flight:
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.fanout: _StreamFanout | None = None
+        self.followers = 0
+
+
+class QueryCoalescer:
+    """
+    Single-flight layer for searches: concurrent calls with the same key share one computation.
+    The in-flight entry is removed as soon as the computation (and its token stream) completes,
+    so this never serves stale results.
+    """
+
+    def __init__(self):
+        self._flights: dict[str, _Flight] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def run(
+        self,
+        query_params: QueryParameters,
+        only_need_context: bool,
+        search_function: SearchFunction,
+    ) -> ChatResponse:
+        if query_params.callback is not None:
+            # Callbacks report progress to a single client, so these requests cannot be shared.
+            return await search_function(query_params, only_need_context)
+        key = build_flight_key(query_params, only_need_context)
+        flight = self._flights.get(key)
+        if flight is None:
+            self.leaders += 1
+            flight = _Flight(
+                asyncio.create_task(
+                    self._lead(key, query_params, only_need_context, search_function)
+                )
+            )
+            self._flights[key] = flight
+        else:
+            self.followers += 1
+            flight.followers += 1
+            logger.info(
+                f"Joining in-flight query ({flight.followers} followers): {query_params.context_params.query}"
+            )
+        chat_response: ChatResponse = await asyncio.shield(flight.task)
+        if flight.fanout is not None:
+            return chat_response.model_copy(
+                update={"response_iterator": flight.fanout.subscribe()}
+            )
+        return chat_response.model_copy(deep=True)
+
+    async def _lead(
+        self,
+        key: str,
+        query_params: QueryParameters,
+        only_need_context: bool,
+        search_function: SearchFunction,
+    ) -> ChatResponse:
+        release_now = True
+        try:
+            chat_response = await search_function(query_params, only_need_context)
+            if chat_response.response_iterator is not None:
+                fanout = _StreamFanout(chat_response.response_iterator)
+                self._flights[key].fanout = fanout
+                chat_response = chat_response.model_copy(
+                    update={"response_iterator": None}
+                )
+                # Late joiners can still attach to the stream while it is being produced.
+                release_now = False
+                asyncio.create_task(self._release_after_stream(key, fanout))
+            return chat_response
+        finally:
+            if release_now:
+                self._flights.pop(key, None)
+
+    async def _release_after_stream(self, key: str, fanout: _StreamFanout):
+        try:
+            await fanout.wait_done()
+        finally:
+            self._flights.pop(key, None)
+
+
+query_coalescer = QueryCoalescer()
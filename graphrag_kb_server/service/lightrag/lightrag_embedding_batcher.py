@@ -0,0 +1,243 @@
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from lightrag.llm.openai import openai_embed
+from lightrag.utils import EmbeddingFunc
+
+from graphrag_kb_server.config import cfg, lightrag_cfg
+from graphrag_kb_server.logger import logger
+
+EMBEDDING_CACHE_FILE = "embedding_cache.sqlite"
+# Keys per SELECT, below the SQLite limit of host parameters
+CACHE_QUERY_SIZE = 500
+
+
+class EmbeddingCache:
+    """
+    Embedding vectors stored in a SQLite file, keyed by the hash of the model and the text.
+    The vectors do not depend on the project, so the cache is shared by all tennants.
+    """
+
+    def __init__(self, cache_file: Path):
+        self.cache_file = cache_file
+        self._connection: sqlite3.Connection | None = None
+        # The connection is used by the threads of asyncio.to_thread
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.cache_file, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._connection = connection
+        return self._connection
+
+    def get_many(self, keys: list[str]) -> dict[str, np.ndarray]:
+        found = {}
+        with self._lock:
+            connection = self._connect()
+            for start in range(0, len(keys), CACHE_QUERY_SIZE):
+                batch = keys[start : start + CACHE_QUERY_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                for key, vector in connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch,
+                ):
+                    found[key] = np.frombuffer(vector, dtype=np.float32)
+        return found
+
+    def put_many(self, vectors: dict[str, np.ndarray]):
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [
+                        (key, np.asarray(vector, dtype=np.float32).tobytes())
+                        for key, vector in vectors.items()
+                    ],
+                )
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class EmbeddingBatcher:
+    """
+    Embeds the texts of concurrent callers with shared requests. The texts which arrive within
+    `wait_ms` are sent together (at most `batch_size` per request), identical texts are embedded
+    once, cached texts are not sent at all and at most `max_concurrency` requests run at once.
+    """
+
+    def __init__(
+        self,
+        embed_function: EmbeddingFunc,
+        batch_size: int,
+        wait_ms: float,
+        max_concurrency: int,
+        cache: EmbeddingCache | None = None,
+    ):
+        self.embed_function = embed_function
+        self.batch_size = batch_size
+        self.wait_ms = wait_ms
+        self.max_concurrency = max_concurrency
+        self.cache = cache
+        self.requested_texts = 0
+        self.cache_hits = 0
+        self.embedded_texts = 0
+        self.requests = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._pending: dict[str, asyncio.Future] = {}
+        self._queue: list[tuple[str, str]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def _bind_loop(self) -> asyncio.AbstractEventLoop:
+        # Futures, timers and semaphores belong to the event loop which created them
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._pending = {}
+            self._queue = []
+            self._timer = None
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._tasks = set()
+        return loop
+
+    def _key(self, text: str) -> str:
+        content = f"{self.embed_function.model_name}\n{text}"
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        self._bind_loop()
+        self.requested_texts += len(texts)
+        keys = [self._key(text) for text in texts]
+        # Texts which are already requested by other callers
+        futures = {key: self._pending[key] for key in keys if key in self._pending}
+        missing = {key: text for key, text in zip(keys, texts) if key not in futures}
+        vectors = {}
+        if self.cache is not None and missing:
+            try:
+                vectors = await asyncio.to_thread(self.cache.get_many, list(missing))
+            except Exception as e:
+                logger.warning(f"Could not read the embedding cache: {e}")
+            self.cache_hits += len(vectors)
+        for key, text in missing.items():
+            if key not in vectors:
+                futures[key] = self._pending.get(key) or self._enqueue(key, text)
+        if futures:
+            # Shielded, so that a cancelled caller does not cancel the texts of other callers
+            results = await asyncio.gather(
+                *(asyncio.shield(f) for f in futures.values())
+            )
+            vectors.update(zip(futures.keys(), results))
+        return np.array([vectors[key] for key in keys], dtype=np.float32)
+
+    def _enqueue(self, key: str, text: str) -> asyncio.Future:
+        future = self._loop.create_future()
+        self._pending[key] = future
+        self._queue.append((key, text))
+        if len(self._queue) >= self.batch_size:
+            self._flush(complete_batches_only=True)
+        if self._queue and self._timer is None:
+            self._timer = self._loop.call_later(self.wait_ms / 1000, self._flush)
+        return future
+
+    def _flush(self, complete_batches_only: bool = False):
+        if not complete_batches_only:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = None
+        while self._queue and (
+            not complete_batches_only or len(self._queue) >= self.batch_size
+        ):
+            batch = self._queue[: self.batch_size]
+            self._queue = self._queue[self.batch_size :]
+            task = self._loop.create_task(self._embed_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _embed_batch(self, batch: list[tuple[str, str]]):
+        futures = [self._pending[key] for key, _ in batch]
+        try:
+            async with self._semaphore:
+                self.requests += 1
+                result = await self.embed_function([text for _, text in batch])
+            result = np.asarray(result, dtype=np.float32).reshape(len(batch), -1)
+            self.embedded_texts += len(batch)
+            for future, vector in zip(futures, result):
+                future.set_result(vector)
+            if self.cache is not None:
+                # The resolved futures serve identical texts until the cache has them
+                await asyncio.to_thread(
+                    self.cache.put_many,
+                    {key: vector for (key, _), vector in zip(batch, result)},
+                )
+        except Exception as e:
+            if all(future.done() for future in futures):
+                logger.warning(f"Could not write the embedding cache: {e}")
+            else:
+                logger.error(f"Embedding of {len(batch)} texts failed: {e}")
+                for future in futures:
+                    future.set_exception(e)
+        finally:
+            for key, _ in batch:
+                self._pending.pop(key, None)
+            for future in futures:
+                if not future.done():
+                    future.cancel()
+
+    async def close(self):
+        """Waits for the running requests and their cache writes, then closes the cache."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self.cache is not None:
+            self.cache.close()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "requested_texts": self.requested_texts,
+            "cache_hits": self.cache_hits,
+            "embedded_texts": self.embedded_texts,
+            "requests": self.requests,
+            "texts_per_request": (
+                self.embedded_texts / self.requests if self.requests > 0 else 0.0
+            ),
+        }
+
+
+embedding_batcher = EmbeddingBatcher(
+    openai_embed,
+    lightrag_cfg.lightrag_embedding_batch_size,
+    lightrag_cfg.lightrag_embedding_batch_wait_ms,
+    lightrag_cfg.lightrag_embedding_max_concurrency,
+    (
+        EmbeddingCache(cfg.graphrag_root_dir_path / EMBEDDING_CACHE_FILE)
+        if lightrag_cfg.lightrag_embedding_cache
+        else None
+    ),
+)
+
+
+def create_embedding_func() -> EmbeddingFunc:
+    """The embedding function of the LightRAG instances, which uses the shared batcher if enabled."""
+    if not lightrag_cfg.lightrag_embedding_batcher:
+        return openai_embed
+    return EmbeddingFunc(
+        embedding_dim=openai_embed.embedding_dim,
+        func=embedding_batcher.embed,
+        max_token_size=openai_embed.max_token_size,
+        model_name=openai_embed.model_name,
+    )
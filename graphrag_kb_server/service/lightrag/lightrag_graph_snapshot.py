@@ -0,0 +1,289 @@
+import pickle
+import threading
+import weakref
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import networkx as nx
+import numpy as np
+from lightrag.kg.networkx_impl import NetworkXStorage
+
+from graphrag_kb_server.config import lightrag_cfg
+from graphrag_kb_server.logger import logger
+from graphrag_kb_server.service.lightrag.lightrag_versions import get_working_dir
+
+GRAPHML_FILE = "graph_chunk_entity_relation.graphml"
+SNAPSHOT_SUFFIX = ".snapshot.pkl"
+
+_graphml_write = NetworkXStorage.write_nx_graph
+
+
+@dataclass
+class GraphSnapshot:
+    """
+    Column oriented copy of a graph. The adjacency is stored in CSR format: the neighbours of
+    node i are indices[indptr[i]:indptr[i + 1]] and edge_index points to their edge attributes.
+    Missing attribute values are None.
+    """
+
+    node_ids: list[str]
+    node_columns: dict[str, list[Any]]
+    edge_sources: np.ndarray
+    edge_targets: np.ndarray
+    edge_columns: dict[str, list[Any]]
+    indptr: np.ndarray
+    indices: np.ndarray
+    edge_index: np.ndarray
+    directed: bool = False
+    graph_attributes: dict[str, Any] = field(default_factory=dict)
+
+    @staticmethod
+    def from_networkx(graph: nx.Graph) -> "GraphSnapshot":
+        node_ids = list(graph.nodes())
+        positions = {node_id: i for i, node_id in enumerate(node_ids)}
+        node_columns: dict[str, list[Any]] = {}
+        for i, (_, data) in enumerate(graph.nodes(data=True)):
+            for key, value in data.items():
+                node_columns.setdefault(key, [None] * len(node_ids))[i] = value
+        edges = list(graph.edges(data=True))
+        edge_columns: dict[str, list[Any]] = {}
+        for i, (_, _, data) in enumerate(edges):
+            for key, value in data.items():
+                edge_columns.setdefault(key, [None] * len(edges))[i] = value
+        edge_sources = np.fromiter(
+            (positions[s] for s, _, _ in edges), dtype=np.int32, count=len(edges)
+        )
+        edge_targets = np.fromiter(
+            (positions[t] for _, t, _ in edges), dtype=np.int32, count=len(edges)
+        )
+        indptr, indices, edge_index = build_csr(
+            len(node_ids), edge_sources, edge_targets, graph.is_directed()
+        )
+        return GraphSnapshot(
+            node_ids=node_ids,
+            node_columns=node_columns,
+            edge_sources=edge_sources,
+            edge_targets=edge_targets,
+            edge_columns=edge_columns,
+            indptr=indptr,
+            indices=indices,
+            edge_index=edge_index,
+            directed=graph.is_directed(),
+            graph_attributes=dict(graph.graph),
+        )
+
+    def to_networkx(self) -> nx.Graph:
+        graph = nx.DiGraph() if self.directed else nx.Graph()
+        graph.graph.update(self.graph_attributes)
+        node_columns = list(self.node_columns.items())
+        graph.add_nodes_from(
+            (
+                node_id,
+                {k: column[i] for k, column in node_columns if column[i] is not None},
+            )
+            for i, node_id in enumerate(self.node_ids)
+        )
+        edge_columns = list(self.edge_columns.items())
+        node_ids = self.node_ids
+        graph.add_edges_from(
+            (
+                node_ids[source],
+                node_ids[target],
+                {k: column[i] for k, column in edge_columns if column[i] is not None},
+            )
+            for i, (source, target) in enumerate(
+                zip(self.edge_sources.tolist(), self.edge_targets.tolist())
+            )
+        )
+        return graph
+
+
+def build_csr(
+    number_of_nodes: int,
+    edge_sources: np.ndarray,
+    edge_targets: np.ndarray,
+    directed: bool,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """The CSR adjacency of the edges. Undirected edges appear in the rows of both nodes."""
+    edge_ids = np.arange(len(edge_sources), dtype=np.int32)
+    rows, columns = edge_sources, edge_targets
+    if not directed:
+        # Self loops are only listed once
+        reverse = edge_sources != edge_targets
+        rows = np.concatenate([edge_sources, edge_targets[reverse]])
+        columns = np.concatenate([edge_targets, edge_sources[reverse]])
+        edge_ids = np.concatenate([edge_ids, edge_ids[reverse]])
+    order = np.argsort(rows, kind="stable")
+    indptr = np.zeros(number_of_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=number_of_nodes), out=indptr[1:])
+    return indptr, columns[order].astype(np.int32), edge_ids[order].astype(np.int32)
+
+
+def snapshot_file(graphml_file: str | Path) -> Path:
+    graphml_file = Path(graphml_file)
+    return graphml_file.with_suffix(SNAPSHOT_SUFFIX)
+
+
+def _signature(graphml_file: Path) -> tuple[int, int]:
+    stat = graphml_file.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def write_snapshot(graphml_file: str | Path, graph: nx.Graph) -> GraphSnapshot:
+    """Writes the snapshot of a graph, tagged with the size and modification time of its GraphML file."""
+    graphml_file = Path(graphml_file)
+    snapshot = GraphSnapshot.from_networkx(graph)
+    target = snapshot_file(graphml_file)
+    tmp_file = target.with_suffix(".tmp")
+    with open(tmp_file, "wb") as f:
+        pickle.dump(
+            {"signature": _signature(graphml_file), **snapshot.__dict__},
+            f,
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+    tmp_file.replace(target)
+    return snapshot
+
+
+def read_snapshot(graphml_file: str | Path) -> GraphSnapshot | None:
+    """Returns the snapshot, or None if it is missing or older than the GraphML file."""
+    graphml_file = Path(graphml_file)
+    target = snapshot_file(graphml_file)
+    if not target.exists():
+        return None
+    try:
+        with open(target, "rb") as f:
+            stored = pickle.load(f)
+        if stored.pop("signature") != _signature(graphml_file):
+            return None
+        return GraphSnapshot(**stored)
+    except Exception as e:
+        logger.warning(f"Ignoring invalid graph snapshot {target}: {e}")
+        return None
+
+
+# Incremented when a graph is modified, so that data derived from it can be rebuilt
+_graph_versions: weakref.WeakKeyDictionary[nx.Graph, int] = weakref.WeakKeyDictionary()
+
+
+def graph_version(graph: nx.Graph) -> int:
+    return _graph_versions.get(graph, 0)
+
+
+def graph_changed(graph: nx.Graph):
+    _graph_versions[graph] = graph_version(graph) + 1
+
+
+class SharedGraphs:
+    """
+    One in-memory graph per GraphML file, shared by the LightRAG graph storage and the
+    analytics. Concurrent loads of the same file wait for a single load.
+    Graphs of the LightRAG storage are pinned until released on residency eviction. The graphs
+    loaded only by the analytics are kept in least recently used order and the oldest are
+    dropped beyond max_unpinned.
+    """
+
+    def __init__(self, max_unpinned: int):
+        self.max_unpinned = max_unpinned
+        self.graphs: OrderedDict[str, tuple[tuple[int, int], nx.Graph]] = OrderedDict()
+        self.pinned: set[str] = set()
+        self.locks: defaultdict[str, threading.Lock] = defaultdict(threading.Lock)
+        self.lock = threading.Lock()
+
+    def load(self, graphml_file: str | Path, pin: bool = False) -> nx.Graph | None:
+        graphml_file = Path(graphml_file)
+        if not graphml_file.exists():
+            return None
+        key = graphml_file.resolve().as_posix()
+        with self.lock:
+            file_lock = self.locks[key]
+        with file_lock:
+            signature = _signature(graphml_file)
+            shared = self.graphs.get(key)
+            if shared is not None and shared[0] == signature:
+                graph = shared[1]
+            else:
+                graph = self._read(graphml_file)
+            self._register(key, signature, graph, pin)
+            return graph
+
+    def _read(self, graphml_file: Path) -> nx.Graph:
+        if not lightrag_cfg.lightrag_graph_snapshot:
+            return nx.read_graphml(graphml_file)
+        snapshot = read_snapshot(graphml_file)
+        if snapshot is not None:
+            return snapshot.to_networkx()
+        graph = nx.read_graphml(graphml_file)
+        try:
+            write_snapshot(graphml_file, graph)
+        except Exception as e:
+            logger.warning(f"Could not write the graph snapshot of {graphml_file}: {e}")
+        return graph
+
+    def _register(
+        self, key: str, signature: tuple[int, int], graph: nx.Graph, pin: bool
+    ):
+        with self.lock:
+            self.graphs[key] = (signature, graph)
+            self.graphs.move_to_end(key)
+            if pin:
+                self.pinned.add(key)
+            unpinned = [k for k in self.graphs if k not in self.pinned]
+            for k in unpinned[: max(len(unpinned) - self.max_unpinned, 0)]:
+                del self.graphs[k]
+
+    def update(self, graphml_file: str | Path, graph: nx.Graph):
+        """Registers a graph which was written to the GraphML file by the LightRAG storage."""
+        graphml_file = Path(graphml_file)
+        # LightRAG modifies the graph in place before writing it
+        graph_changed(graph)
+        self._register(
+            graphml_file.resolve().as_posix(), _signature(graphml_file), graph, True
+        )
+
+    def release(self, graphml_file: str | Path):
+        key = Path(graphml_file).resolve().as_posix()
+        with self.lock:
+            self.graphs.pop(key, None)
+            self.pinned.discard(key)
+
+
+shared_graphs = SharedGraphs(lightrag_cfg.lightrag_analytics_graphs)
+
+
+def _load_nx_graph(file_name: str) -> nx.Graph | None:
+    return shared_graphs.load(file_name, pin=True)
+
+
+def _write_nx_graph(graph: nx.Graph, file_name: str, workspace: str = "_"):
+    _graphml_write(graph, file_name, workspace)
+    if lightrag_cfg.lightrag_graph_snapshot:
+        try:
+            write_snapshot(file_name, graph)
+        except Exception as e:
+            logger.warning(f"Could not write the graph snapshot of {file_name}: {e}")
+    shared_graphs.update(file_name, graph)
+
+
+def install_graph_snapshot():
+    """Makes the LightRAG graph storage use the shared graphs and write the snapshots."""
+    NetworkXStorage.load_nx_graph = staticmethod(_load_nx_graph)
+    NetworkXStorage.write_nx_graph = staticmethod(_write_nx_graph)
+
+
+def get_graph_file(project_dir: Path) -> Path:
+    return get_working_dir(project_dir) / GRAPHML_FILE
+
+
+def release_graph(graphml_file: str | Path):
+    shared_graphs.release(graphml_file)
+
+
+def load_project_graph(project_dir: Path) -> nx.Graph | None:
+    return shared_graphs.load(get_graph_file(project_dir))
+
+
+def release_project_graph(project_dir: Path):
+    shared_graphs.release(get_graph_file(project_dir))
@@ -10,21 +10,26 @@ import rustworkx as rx
 
 from graphrag_kb_server.model.community import Community
 from graphrag_kb_server.model.graph import CommunityReport
-from graphrag_kb_server.utils.cache import GenericSimpleCache
+from graphrag_kb_server.service.lightrag.lightrag_graph_snapshot import (
+    GRAPHML_FILE,
+    get_graph_file,
+    load_project_graph,
+    shared_graphs,
+)
 
 
-graph_cache = GenericSimpleCache[nx.classes.graph.Graph, Path]()
+def create_network_from_project_dir(project_dir: Path) -> nx.classes.graph.Graph:
+    """The graph of the project. It is shared with the LightRAG graph storage, so do not modify it."""
+    graph_file = get_graph_file(project_dir)
+    assert graph_file.exists(), f"Graph file {graph_file} does not exist"
+    return load_project_graph(project_dir)
 
 
-def create_network_from_project_dir(project_dir: Path) -> nx.classes.graph.Graph:
-    graph = graph_cache.get(project_dir)
-    if graph is not None:
-        return graph
-    graph_file = project_dir / "lightrag" / "graph_chunk_entity_relation.graphml"
+def create_network_from_working_dir(working_dir: Path) -> nx.classes.graph.Graph:
+    """The graph of a LightRAG working directory, e.g. of a version which is being indexed."""
+    graph_file = working_dir / GRAPHML_FILE
     assert graph_file.exists(), f"Graph file {graph_file} does not exist"
-    G = nx.read_graphml(graph_file)
-    graph_cache.set(project_dir, G)
-    return G
+    return shared_graphs.load(graph_file)
 
 
 def networkx_to_rustworkx(nx_graph: nx.Graph) -> rx.PyGraph:
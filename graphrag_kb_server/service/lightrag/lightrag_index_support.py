@@ -1,12 +1,48 @@
 from pathlib import Path
+import asyncio
 import re
+import shutil
 import zipfile
 from lightrag import LightRAG
 
+from graphrag_kb_server.config import lightrag_cfg
 from graphrag_kb_server.model.project import GenerationStatus
 from graphrag_kb_server.logger import logger
-from graphrag_kb_server.service.lightrag.lightrag_init import initialize_rag
+from graphrag_kb_server.service.lightrag.lightrag_init import (
+    create_rag,
+    initialize_rag,
+    lightrag_cache,
+)
+from graphrag_kb_server.service.lightrag.lightrag_centrality import (
+    refresh_centrality_scores,
+)
 from graphrag_kb_server.service.lightrag.lightrag_constants import INPUT_FOLDER
+from graphrag_kb_server.service.lightrag.lightrag_keyword_matcher import (
+    get_keyword_matcher,
+)
+from graphrag_kb_server.service.lightrag.lightrag_token_cache import (
+    precompute_token_counts,
+)
+from graphrag_kb_server.service.lightrag.lightrag_versions import (
+    create_staging_dir,
+    get_working_dir,
+    publish_version,
+    remove_graph_derived_files,
+    remove_retired_versions,
+)
+from graphrag_kb_server.service.db.common_operations import extract_elements_from_path
+from graphrag_kb_server.service.db.db_persistence_expanded_entities import (
+    delete_project_expanded_entities,
+)
+from graphrag_kb_server.service.db.db_persistence_topics import (
+    delete_topics_by_project_name,
+)
+from graphrag_kb_server.service.last_updated_service import save_path_properties
+from graphrag_kb_server.service.link_extraction_service import save_links
+from graphrag_kb_server.service.reference_index_service import (
+    invalidate_reference_index,
+)
+from graphrag_kb_server.service.resource_accounting import resource_accounting
 
 
 def override_lightrag_prompt():
@@ -44,9 +80,90 @@ async def acreate_lightrag(
     if not create_if_not_exists:
         if project_folder.exists():
             return GenerationStatus.EXISTS
-    rag = await initialize_rag(project_folder)
+    with resource_accounting.track_indexing(project_folder):
+        if lightrag_cfg.lightrag_hot_swap:
+            async with _index_lock(project_folder):
+                version, staging_dir = await asyncio.to_thread(
+                    create_staging_dir, project_folder, incremental
+                )
+                rag = await create_rag(project_folder, staging_dir)
+                try:
+                    await _index_files(rag, project_folder, incremental, zip_file)
+                    await _build_derived_artifacts(
+                        project_folder, incremental, staging_dir
+                    )
+                except Exception:
+                    await rag.finalize_storages()
+                    shutil.rmtree(staging_dir, ignore_errors=True)
+                    raise
+                await swap_project_version(project_folder, version, rag)
+                if not incremental:
+                    await _clear_graph_derived_rows(project_folder)
+            await precompute_token_counts(project_folder, rag)
+        else:
+            rag = await initialize_rag(project_folder)
+            await _index_files(rag, project_folder, incremental, zip_file)
+            await precompute_token_counts(project_folder, rag)
+            await refresh_centrality_scores(project_folder, incremental)
+    return GenerationStatus.CREATED
+
+
+async def _build_derived_artifacts(
+    project_folder: Path, incremental: bool, staging_dir: Path
+):
+    """
+    Stores the centrality of the staged graph and, after a full index, replaces the links
+    and path properties of the previous input, so that they are ready when the version is served.
+    """
+    await refresh_centrality_scores(project_folder, incremental, staging_dir)
+    if not incremental:
+        await save_links(project_folder, replace=True)
+        await save_path_properties(project_folder, replace=True)
+
+
+async def _clear_graph_derived_rows(project_folder: Path):
+    """
+    Deletes the topics and expanded entities of the previous graph, which a full index without
+    hot swap removes with the project. They are generated again from the new graph on request.
+    """
+    simple_project = extract_elements_from_path(project_folder)
+    await delete_topics_by_project_name(
+        simple_project.schema_name, simple_project.project_name, simple_project.engine
+    )
+    await delete_project_expanded_entities(project_folder)
+
+
+_index_locks: dict[str, asyncio.Lock] = {}
+
+
+def _index_lock(project_folder: Path) -> asyncio.Lock:
+    """Only one version of a project is indexed at a time."""
+    return _index_locks.setdefault(project_folder.as_posix(), asyncio.Lock())
+
+
+async def swap_project_version(project_folder: Path, version: int, rag: LightRAG):
+    """
+    Serves the instance indexed in a staging directory. Its storages, graph snapshot and
+    vector sidecars are complete, so the new version is served without a reload.
+    The previous working directory is kept for in-flight queries until the next swap.
+    """
+    previous_dir = get_working_dir(project_folder)
     working_dir = Path(rag.working_dir)
-    input_folder = working_dir.parent / INPUT_FOLDER
+    await asyncio.to_thread(publish_version, project_folder, version, working_dir)
+    await lightrag_cache.swap(project_folder, rag)
+    invalidate_reference_index(project_folder)
+    await asyncio.to_thread(remove_graph_derived_files, project_folder)
+    logger.info(f"Serving version {version} of {project_folder} from {working_dir}")
+    await get_keyword_matcher(project_folder, rag)
+    await asyncio.to_thread(
+        remove_retired_versions, project_folder, [working_dir, previous_dir]
+    )
+
+
+async def _index_files(
+    rag: LightRAG, project_folder: Path, incremental: bool, zip_file: Path | None
+):
+    input_folder = project_folder / INPUT_FOLDER
     assert input_folder.exists(), f"Input folder does not exist: {input_folder}"
     all_files = list(input_folder.rglob("**/*.txt"))
     if incremental:
@@ -68,7 +185,6 @@ async def acreate_lightrag(
     else:
 
         await lightrag_index(rag, all_files)
-    return GenerationStatus.CREATED
 
 
 async def lightrag_index(rag: LightRAG, files_to_index: list[Path]):
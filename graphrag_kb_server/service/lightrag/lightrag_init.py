@@ -9,16 +9,44 @@ from lightrag.base import (
     BaseVectorStorage,
     DocStatusStorage,
 )
-from lightrag.llm.openai import openai_embed
 from lightrag.kg.shared_storage import get_namespace_data, initialize_pipeline_status
 
+from graphrag_kb_server.config import lightrag_cfg
+from graphrag_kb_server.service.lightrag.lightrag_chunk_store import install_chunk_store
+from graphrag_kb_server.service.lightrag.lightrag_graph_snapshot import (
+    install_graph_snapshot,
+)
+from graphrag_kb_server.service.lightrag.lightrag_embedding_batcher import (
+    create_embedding_func,
+)
 from graphrag_kb_server.service.lightrag.lightrag_model_support import select_model_func
-from graphrag_kb_server.utils.cache import GenericProjectSimpleCache
+from graphrag_kb_server.service.lightrag.lightrag_ann_index import install_ann_index
+from graphrag_kb_server.service.lightrag.lightrag_quantization import (
+    install_quantization,
+)
+from graphrag_kb_server.service.lightrag.lightrag_vector_sidecar import (
+    install_vector_sidecar,
+)
+from graphrag_kb_server.service.lightrag.lightrag_residency import (
+    LightRAGResidencyManager,
+)
 from graphrag_kb_server.utils.quick_json_loader import load_json
-from graphrag_kb_server.service.lightrag.lightrag_constants import LIGHTRAG_FOLDER
+from graphrag_kb_server.service.lightrag.lightrag_versions import get_working_dir
+
 
+lightrag_cache = LightRAGResidencyManager(
+    lightrag_cfg.lightrag_memory_budget_mb * 2**20
+)
+
+if lightrag_cfg.lightrag_vector_sidecar:
+    install_vector_sidecar()
+if lightrag_cfg.lightrag_ann_index:
+    install_ann_index()
+if lightrag_cfg.lightrag_quantization != "none":
+    install_quantization()
 
-lightrag_cache = GenericProjectSimpleCache[LightRAG]()
+# The shared graphs are always used, the snapshot files only if enabled
+install_graph_snapshot()
 
 
 from lightrag.operate import chunking_by_token_size
@@ -72,7 +100,15 @@ async def initialize_rag(project_folder: Path) -> LightRAG:
     lightrag = lightrag_cache.get(project_folder)
     if lightrag:
         return lightrag
-    working_dir = (project_folder / LIGHTRAG_FOLDER).resolve()
+    return await lightrag_cache.load(project_folder, create_rag)
+
+
+async def create_rag(project_folder: Path, working_dir: Path | None = None) -> LightRAG:
+    """
+    Creates a LightRAG instance which is not cached. Uses the working directory of the
+    served version of the project, unless another one (e.g. a staging directory) is given.
+    """
+    working_dir = (working_dir or get_working_dir(project_folder)).resolve()
     await asyncio.to_thread(working_dir.mkdir, parents=True, exist_ok=True)
     # Pass absolute path as string so LightRAG and JSON storage resolve paths correctly (e.g. on Windows)
     working_dir_str = str(working_dir)
@@ -80,14 +116,15 @@ async def initialize_rag(project_folder: Path) -> LightRAG:
     rag = LightRAG(
         working_dir=working_dir_str,
         workspace=working_dir_str,
-        embedding_func=openai_embed,
+        embedding_func=create_embedding_func(),
         llm_model_func=llm_model_func,
         chunking_func=chunking_with_special_tokens,
     )
+    if lightrag_cfg.lightrag_chunk_store:
+        install_chunk_store(rag, lightrag_cfg.lightrag_chunk_store_cache_size)
     await rag.initialize_storages()
     await initialize_storages(rag)
     await initialize_pipeline_status()
-    lightrag_cache.set(project_folder, rag)
     # Enable LLM cache for now
     rag.llm_response_cache.global_config["enable_llm_cache"] = False
     return rag
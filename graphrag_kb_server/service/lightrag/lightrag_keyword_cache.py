@@ -0,0 +1,151 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+from graphrag_kb_server.config import lightrag_cfg
+from graphrag_kb_server.logger import logger
+from graphrag_kb_server.service.lightrag.lightrag_coalescing import normalize_query
+from graphrag_kb_server.utils.cache import DelayedProjectWriter
+
+KEYWORD_CACHE_FILE = "keywords.json"
+
+
+class KeywordCache:
+    """
+    Cache for the high and low level keywords extracted from queries.
+    It is independent of the LightRAG LLM cache (which is disabled) and keeps a bounded
+    LRU per project in memory, persisted to the project's cache folder `write_delay`
+    seconds after it changes.
+    """
+
+    def __init__(self, max_entries: int, timeout: int, write_delay: float = 0):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.projects: dict[str, OrderedDict[str, dict[str, Any]]] = {}
+        self.hits = 0
+        self.misses = 0
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._writer = DelayedProjectWriter(write_delay, self._write)
+
+    @staticmethod
+    def _cache_file(project_dir: Path) -> Path:
+        return project_dir / "cache" / KEYWORD_CACHE_FILE
+
+    @staticmethod
+    def _key(text: str, mode: str) -> str:
+        return f"{mode}:{normalize_query(text)}"
+
+    def _lock(self, project_dir: Path) -> asyncio.Lock:
+        return self._locks.setdefault(project_dir.as_posix(), asyncio.Lock())
+
+    async def _entries(self, project_dir: Path) -> OrderedDict[str, dict[str, Any]]:
+        entries = self.projects.get(project_dir.as_posix())
+        if entries is not None:
+            return entries
+        # Concurrent first requests share a single load
+        async with self._lock(project_dir):
+            return await asyncio.to_thread(self._load, project_dir)
+
+    def _load(self, project_dir: Path) -> OrderedDict[str, dict[str, Any]]:
+        posix_path = project_dir.as_posix()
+        entries = self.projects.get(posix_path)
+        if entries is not None:
+            return entries
+        entries = OrderedDict()
+        cache_file = self._cache_file(project_dir)
+        if cache_file.exists():
+            try:
+                stored = json.loads(cache_file.read_text(encoding="utf-8"))
+                for key, entry in sorted(
+                    stored.items(), key=lambda e: e[1]["timestamp"]
+                ):
+                    entries[key] = entry
+            except (json.JSONDecodeError, KeyError, TypeError) as e:
+                logger.warning(f"Ignoring invalid keyword cache {cache_file}: {e}")
+        self.projects[posix_path] = entries
+        return entries
+
+    def _expired(self, entry: dict[str, Any]) -> bool:
+        return time.time() - entry["timestamp"] >= self.timeout
+
+    async def get(
+        self, project_dir: Path, text: str, mode: str
+    ) -> tuple[list[str], list[str]] | None:
+        entries = await self._entries(project_dir)
+        key = self._key(text, mode)
+        entry = entries.get(key)
+        if entry is None or self._expired(entry):
+            if entry is not None:
+                del entries[key]
+            self.misses += 1
+            return None
+        entries.move_to_end(key)
+        self.hits += 1
+        return entry["hl_keywords"], entry["ll_keywords"]
+
+    async def set(
+        self,
+        project_dir: Path,
+        text: str,
+        mode: str,
+        hl_keywords: list[str],
+        ll_keywords: list[str],
+    ):
+        entries = await self._entries(project_dir)
+        key = self._key(text, mode)
+        entries[key] = {
+            "hl_keywords": hl_keywords,
+            "ll_keywords": ll_keywords,
+            "timestamp": time.time(),
+        }
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+        self._writer.schedule(project_dir)
+
+    async def _write(self, project_dir: Path):
+        entries = self.projects.get(project_dir.as_posix())
+        if entries is None:
+            return
+        async with self._lock(project_dir):
+            await asyncio.to_thread(self._persist, project_dir, dict(entries))
+
+    async def flush(self):
+        """Writes the changed entries of all projects."""
+        await self._writer.flush()
+
+    def _persist(self, project_dir: Path, entries: dict[str, dict[str, Any]]):
+        if not project_dir.exists():
+            return  # The project was deleted in the meantime
+        cache_file = self._cache_file(project_dir)
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_suffix(".tmp")
+        tmp_file.write_text(json.dumps(entries), encoding="utf-8")
+        tmp_file.replace(cache_file)
+
+    def clear(self, project_dir: Path):
+        self._writer.cancel(project_dir)
+        self.projects.pop(project_dir.as_posix(), None)
+        cache_file = self._cache_file(project_dir)
+        if cache_file.exists():
+            cache_file.unlink()
+
+    def stats(self) -> dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total > 0 else 0.0,
+            "projects": len(self.projects),
+            "entries": sum(len(e) for e in self.projects.values()),
+        }
+
+
+keyword_cache = KeywordCache(
+    lightrag_cfg.lightrag_keyword_cache_size,
+    lightrag_cfg.lightrag_keyword_cache_timeout,
+    lightrag_cfg.lightrag_cache_write_delay,
+)
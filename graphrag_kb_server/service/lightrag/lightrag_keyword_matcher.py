@@ -0,0 +1,301 @@
+import asyncio
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import networkx as nx
+import pandas as pd
+from lightrag import LightRAG
+
+from graphrag_kb_server.logger import logger
+from graphrag_kb_server.service.lightrag.lightrag_semantic_cache import (
+    get_index_version,
+)
+from graphrag_kb_server.utils.cache import GenericProjectSimpleCache
+
+TOKEN_PATTERN = re.compile(r"\w+")
+PARENTHESIS_PATTERN = re.compile(r"^(.*?)\s*\((.+)\)\s*$")
+# Node types which do not make meaningful high level keywords
+IGNORED_ENTITY_TYPES = {"", "unknown", "other"}
+
+STOP_WORDS = {
+    "a",
+    "about",
+    "all",
+    "also",
+    "an",
+    "and",
+    "any",
+    "are",
+    "as",
+    "at",
+    "be",
+    "been",
+    "but",
+    "by",
+    "can",
+    "could",
+    "did",
+    "do",
+    "does",
+    "for",
+    "from",
+    "had",
+    "has",
+    "have",
+    "how",
+    "i",
+    "if",
+    "in",
+    "into",
+    "is",
+    "it",
+    "its",
+    "me",
+    "more",
+    "most",
+    "my",
+    "no",
+    "not",
+    "of",
+    "on",
+    "or",
+    "our",
+    "please",
+    "should",
+    "so",
+    "some",
+    "tell",
+    "than",
+    "that",
+    "the",
+    "their",
+    "them",
+    "there",
+    "these",
+    "they",
+    "this",
+    "those",
+    "to",
+    "us",
+    "was",
+    "we",
+    "were",
+    "what",
+    "when",
+    "where",
+    "which",
+    "who",
+    "whom",
+    "why",
+    "will",
+    "with",
+    "would",
+    "you",
+    "your",
+}
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def entity_aliases(name: str) -> list[list[str]]:
+    """
+    The token sequences under which an entity is matched: its name and, for names like
+    'Artificial Intelligence (AI)', the name without and the text within the parenthesis.
+    """
+    names = [name]
+    parenthesis = PARENTHESIS_PATTERN.match(name)
+    if parenthesis is not None:
+        names.extend(parenthesis.groups())
+    aliases = []
+    for alias in names:
+        tokens = tokenize(alias)
+        if not tokens or all(t in STOP_WORDS for t in tokens):
+            continue
+        if len(tokens) == 1 and len(tokens[0]) < 2:
+            continue
+        if tokens not in aliases:
+            aliases.append(tokens)
+    return aliases
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton over word tokens. Finds all aliases of all entities in one pass."""
+
+    def __init__(self):
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        # Per state: the (alias length in tokens, entity) pairs ending in that state
+        self.output: list[list[tuple[int, str]]] = [[]]
+
+    def add(self, tokens: list[str], entity: str):
+        state = 0
+        for token in tokens:
+            next_state = self.goto[state].get(token)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][token] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = next_state
+        if (len(tokens), entity) not in self.output[state]:
+            self.output[state].append((len(tokens), entity))
+
+    def build(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and token not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(token, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                self.output[next_state] = (
+                    self.output[next_state] + self.output[self.fail[next_state]]
+                )
+
+    def find(self, tokens: list[str]) -> list[tuple[int, int, str]]:
+        """Returns (start, end, entity) of all matches, end exclusive."""
+        matches = []
+        state = 0
+        for i, token in enumerate(tokens):
+            while state and token not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(token, 0)
+            for length, entity in self.output[state]:
+                matches.append((i + 1 - length, i + 1, entity))
+        return matches
+
+
+@dataclass
+class KeywordMatcher:
+    """The keyword automaton of a project with the entity types and communities of its nodes."""
+
+    index_version: str
+    automaton: KeywordAutomaton
+    entity_types: dict[str, str]
+    communities: dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class KeywordMatch:
+    hl_keywords: list[str]
+    ll_keywords: list[str]
+    coverage: float
+
+
+def _select_longest(matches: list[tuple[int, int, str]]) -> list[tuple[int, int, str]]:
+    """Keeps the longest matches which do not overlap with a longer one, in query order."""
+    selected = []
+    covered: set[int] = set()
+    for start, end, entity in sorted(matches, key=lambda m: (m[0] - m[1], m[0])):
+        span = set(range(start, end))
+        if span & covered and not any((s, e) == (start, end) for s, e, _ in selected):
+            continue
+        covered |= span
+        selected.append((start, end, entity))
+    return sorted(selected)
+
+
+def match_keywords(matcher: KeywordMatcher, query: str) -> KeywordMatch:
+    tokens = tokenize(query)
+    matches = _select_longest(matcher.automaton.find(tokens))
+    content_positions = {i for i, t in enumerate(tokens) if t not in STOP_WORDS}
+    covered = {i for start, end, _ in matches for i in range(start, end)}
+    coverage = (
+        len(content_positions & covered) / len(content_positions)
+        if content_positions
+        else 0.0
+    )
+    ll_keywords = list(dict.fromkeys(entity for _, _, entity in matches))
+    hl_keywords = []
+    for entity in ll_keywords:
+        for keyword in [
+            matcher.entity_types.get(entity, ""),
+            matcher.communities.get(entity, ""),
+        ]:
+            if (
+                keyword.lower() not in IGNORED_ENTITY_TYPES
+                and keyword not in hl_keywords
+            ):
+                hl_keywords.append(keyword)
+    return KeywordMatch(hl_keywords, ll_keywords, coverage)
+
+
+def _read_communities(project_dir: Path) -> dict[str, str]:
+    """Names of the top level communities of the nodes, if the communities were generated."""
+    communities = {}
+    communities_file = next(iter(sorted(project_dir.glob("communities_*.json"))), None)
+    if communities_file is None:
+        return communities
+    try:
+        df = pd.read_json(communities_file)
+        for _, community in df[df["level"] == 0].iterrows():
+            if community["name"] and community["name"] != "Unknown":
+                for node in community["nodes"]:
+                    communities.setdefault(node, community["name"])
+    except Exception as e:
+        logger.warning(f"Could not read communities {communities_file}: {e}")
+    return communities
+
+
+def build_keyword_matcher(
+    graph: nx.Graph, project_dir: Path, index_version: str
+) -> KeywordMatcher:
+    automaton = KeywordAutomaton()
+    entity_types = {}
+    for node_id, data in graph.nodes(data=True):
+        for alias in entity_aliases(node_id):
+            automaton.add(alias, node_id)
+        entity_types[node_id] = str(data.get("entity_type", "")).strip().lower()
+    automaton.build()
+    return KeywordMatcher(
+        index_version, automaton, entity_types, _read_communities(project_dir)
+    )
+
+
+keyword_matcher_cache = GenericProjectSimpleCache[KeywordMatcher]()
+
+
+async def get_keyword_matcher(project_dir: Path, rag: LightRAG) -> KeywordMatcher:
+    index_version = await asyncio.to_thread(get_index_version, project_dir)
+    matcher = keyword_matcher_cache.get(project_dir)
+    if matcher is not None and matcher.index_version == index_version:
+        return matcher
+    graph = await rag.chunk_entity_relation_graph._get_graph()
+    matcher = await asyncio.to_thread(
+        build_keyword_matcher, graph, project_dir, index_version
+    )
+    keyword_matcher_cache.set(project_dir, matcher)
+    logger.info(
+        f"Built the keyword matcher of {project_dir} with {len(matcher.entity_types)} entities"
+    )
+    return matcher
+
+
+async def extract_keywords_fast(
+    rag: LightRAG, project_dir: Path, query: str, min_coverage: float
+) -> tuple[list[str], list[str]] | None:
+    """
+    Extracts the keywords by matching the query against the entity names of the graph.
+    Returns None if the matched entities cover less than `min_coverage` of the query words,
+    in which case the keywords should be extracted by the LLM.
+    """
+    matcher = await get_keyword_matcher(project_dir, rag)
+    keyword_match = match_keywords(matcher, query)
+    if keyword_match.coverage < min_coverage or not keyword_match.ll_keywords:
+        logger.info(
+            f"Keyword coverage {keyword_match.coverage:.2f} too low for '{query}', using the LLM"
+        )
+        return None
+    return keyword_match.hl_keywords, keyword_match.ll_keywords
+
+
+def clear_keyword_matcher(project_dir: Path):
+    keyword_matcher_cache.clear(project_dir)
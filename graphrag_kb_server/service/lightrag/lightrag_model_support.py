@@ -6,14 +6,16 @@ from google import genai
 from google.genai import types
 from openai import AsyncOpenAI
 
-from lightrag.utils import TokenTracker
-
 from lightrag.llm.openai import openai_complete_if_cache
 from lightrag.types import GPTKeywordExtractionFormat
 
 from graphrag_kb_server.config import LightRAGModelType, cfg, lightrag_cfg
 from graphrag_kb_server.model.chat_response import ResponseSchema
 from graphrag_kb_server.logger import logger
+from graphrag_kb_server.service.resource_accounting import (
+    llm_project,
+    resource_accounting,
+)
 
 from openrouter import OpenRouter
 
@@ -72,20 +74,10 @@ async def gemini_model_func(
     usage = getattr(response, "usage_metadata", None)
     prompt_tokens = getattr(usage, "prompt_token_count", 0) or 0
     completion_tokens = getattr(usage, "candidates_token_count", 0) or 0
-    total_tokens = getattr(usage, "total_token_count", 0) or (
-        prompt_tokens + completion_tokens
+    resource_accounting.record_llm_usage(
+        llm_project(kwargs.get("hashing_kv")), prompt_tokens, completion_tokens
     )
 
-    token_counts = {
-        "prompt_tokens": prompt_tokens,
-        "completion_tokens": completion_tokens,
-        "total_tokens": total_tokens,
-    }
-
-    token_tracker = TokenTracker()
-
-    token_tracker.add_usage(token_counts)
-
     if structured_output:
         # Simulate error temporarily
         return jiter.from_json(response.text.encode(encoding="utf-8"))
@@ -176,6 +168,9 @@ async def structured_completion(
 
     if stream:
         config_dict["stream"] = True
+        if is_openai or is_openrouter:
+            # The last chunk then carries the token usage. Together AI always sends it
+            config_dict["stream_options"] = {"include_usage": True}
 
     logger.info(f"Calling structured completion with config: {config_dict['model']}")
     logger.debug(
@@ -186,9 +181,11 @@ async def structured_completion(
     else:
         response = await client.chat.completions.create(**config_dict)
 
+    project = llm_project(kwargs.get("hashing_kv"))
     if stream:
-        return _stream_tokens(response, _client_ref=client)
+        return _stream_tokens(response, project, _client_ref=client)
 
+    _record_usage(project, getattr(response, "usage", None))
     content = response.choices[0].message.content
     return (
         jiter.from_json(content.encode(encoding="utf-8"))
@@ -197,22 +194,38 @@ async def structured_completion(
     )
 
 
-async def _stream_tokens(response_stream, _client_ref=None) -> AsyncIterator[str]:
+def _record_usage(project: str, usage):
+    resource_accounting.record_llm_usage(
+        project,
+        getattr(usage, "prompt_tokens", 0) or 0,
+        getattr(usage, "completion_tokens", 0) or 0,
+    )
+
+
+async def _stream_tokens(
+    response_stream, project: str, _client_ref=None
+) -> AsyncIterator[str]:
     """Extract text content from streaming API response chunks.
 
+    The token usage of the last chunk is recorded when the stream ends.
     _client_ref prevents the API client from being garbage-collected
     while the async generator is alive (important for OpenRouter).
     """
-    async for chunk in response_stream:
-        choices = getattr(chunk, "choices", None)
-        if not choices:
-            continue
-        delta = getattr(choices[0], "delta", None)
-        if delta is None:
-            continue
-        content = getattr(delta, "content", None)
-        if content:
-            yield content
+    usage = None
+    try:
+        async for chunk in response_stream:
+            usage = getattr(chunk, "usage", None) or usage
+            choices = getattr(chunk, "choices", None)
+            if not choices:
+                continue
+            delta = getattr(choices[0], "delta", None)
+            if delta is None:
+                continue
+            content = getattr(delta, "content", None)
+            if content:
+                yield content
+    finally:
+        _record_usage(project, usage)
 
 
 async def togetherai_model_func(
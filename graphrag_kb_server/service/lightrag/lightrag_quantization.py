@@ -0,0 +1,362 @@
+from dataclasses import dataclass
+from enum import StrEnum
+from pathlib import Path
+
+import numpy as np
+import nano_vectordb.dbs as nano_dbs
+from nano_vectordb import NanoVectorDB
+from numba import njit
+
+from graphrag_kb_server.config import lightrag_cfg
+from graphrag_kb_server.logger import logger
+
+QUANTIZED_SUFFIX = ".quantized.npz"
+# Candidates of the first pass per requested result, which are rescored with the float32 matrix
+RESCORE_FACTOR = 4
+INT8_MAX = 127
+# The float32 value of each float16 bit pattern
+FLOAT16_VALUES = np.arange(2**16, dtype=np.uint16).view(np.float16).astype(np.float32)
+
+
+class Quantization(StrEnum):
+    NONE = "none"
+    INT8 = "int8"
+    FLOAT16 = "float16"
+
+
+def _storage(db: NanoVectorDB) -> dict:
+    return getattr(db, "_NanoVectorDB__storage")
+
+
+@dataclass
+class QuantizedMatrix:
+    """
+    Compressed copy of a normalized embedding matrix used to rank the rows approximately.
+    int8 rows are scaled by their largest absolute value (4x smaller than float32),
+    float16 rows are stored as is (2x smaller).
+    """
+
+    quantization: Quantization
+    values: np.ndarray
+    scales: np.ndarray | None = None
+
+    @staticmethod
+    def from_matrix(
+        matrix: np.ndarray, quantization: Quantization
+    ) -> "QuantizedMatrix":
+        values, scales = _quantize(matrix, quantization)
+        return QuantizedMatrix(quantization, values, scales)
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + (
+            self.scales.nbytes if self.scales is not None else 0
+        )
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def scores(self, query: np.ndarray, rows: np.ndarray | None = None) -> np.ndarray:
+        values = self.values if rows is None else self.values[rows]
+        scores = np.empty(len(values), dtype=np.float32)
+        query = np.ascontiguousarray(query, dtype=np.float32)
+        if self.quantization == Quantization.FLOAT16:
+            # numba has no float16 type, the values are decoded through a lookup table
+            _dot_float16(values.view(np.uint16), FLOAT16_VALUES, query, scores)
+        else:
+            _dot_int8(values, query, scores)
+            scores *= self.scales if rows is None else self.scales[rows]
+        return scores
+
+    def append(self, matrix: np.ndarray):
+        values, scales = _quantize(matrix, self.quantization)
+        self.values = np.concatenate([self.values, values])
+        if scales is not None:
+            self.scales = np.concatenate([self.scales, scales])
+
+    def update(self, rows: np.ndarray, matrix: np.ndarray):
+        values, scales = _quantize(matrix, self.quantization)
+        self.values[rows] = values
+        if scales is not None:
+            self.scales[rows] = scales
+
+    def delete(self, rows: list[int]):
+        self.values = np.delete(self.values, rows, axis=0)
+        if self.scales is not None:
+            self.scales = np.delete(self.scales, rows)
+
+
+# numpy converts int8 and float16 matrices to float32 before a product, which is slower than
+# the float32 scan. These kernels convert the values while reading them. They are not parallel:
+# queries run concurrently in threads, which a parallel numba kernel does not support safely.
+@njit(fastmath=True, cache=True)
+def _dot_int8(values: np.ndarray, query: np.ndarray, out: np.ndarray):
+    for i in range(values.shape[0]):
+        acc = np.float32(0.0)
+        row = values[i]
+        for j in range(values.shape[1]):
+            acc += np.float32(row[j]) * query[j]
+        out[i] = acc
+
+
+@njit(fastmath=True, cache=True)
+def _dot_float16(
+    values: np.ndarray, float16_values: np.ndarray, query: np.ndarray, out: np.ndarray
+):
+    for i in range(values.shape[0]):
+        acc = np.float32(0.0)
+        row = values[i]
+        for j in range(values.shape[1]):
+            acc += float16_values[row[j]] * query[j]
+        out[i] = acc
+
+
+def _quantize(
+    matrix: np.ndarray, quantization: Quantization
+) -> tuple[np.ndarray, np.ndarray | None]:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if quantization == Quantization.FLOAT16:
+        return matrix.astype(np.float16), None
+    scales = np.abs(matrix).max(axis=1) / INT8_MAX
+    scales[scales == 0] = 1.0
+    values = np.rint(matrix / scales[:, None]).astype(np.int8)
+    return values, scales.astype(np.float32)
+
+
+def rescored_search(
+    quantized: QuantizedMatrix,
+    matrix: np.ndarray,
+    query: np.ndarray,
+    top_k: int,
+    rows: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Ranks the rows (all or the given candidates) with the quantized matrix and rescores the
+    best ones with the float32 matrix. Returns the rows and exact scores, the best first.
+    """
+    scores = quantized.scores(query, rows)
+    if rows is None:
+        rows = np.arange(len(scores))
+    candidates = min(len(rows), top_k * RESCORE_FACTOR)
+    if candidates < len(rows):
+        best = np.argpartition(-scores, candidates - 1)[:candidates]
+        rows = rows[best]
+    # Sorted, so that the memory-mapped matrix is read sequentially
+    rows = np.sort(rows)
+    exact = matrix[rows] @ query
+    ranking = np.argsort(-exact, kind="stable")[:top_k]
+    return rows[ranking], exact[ranking]
+
+
+def quantization_for(storage_file: str | Path) -> Quantization:
+    """The quantization configured for the project of a vector storage."""
+    quantization = Quantization(lightrag_cfg.lightrag_quantization)
+    if (
+        quantization == Quantization.NONE
+        or not lightrag_cfg.lightrag_quantization_projects
+    ):
+        return quantization
+    # The storage is in the working directory of the project
+    project_dir = Path(storage_file).parent.parent
+    project = f"{project_dir.parent.parent.name}/{project_dir.name}"
+    if project in lightrag_cfg.lightrag_quantization_projects:
+        return quantization
+    return Quantization.NONE
+
+
+def quantized_file(storage_file: str | Path) -> Path:
+    return Path(storage_file).with_suffix(QUANTIZED_SUFFIX)
+
+
+def _signature(storage_file: Path) -> np.ndarray:
+    stat = storage_file.stat()
+    return np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+
+def write_quantized(storage_file: str | Path, quantized: QuantizedMatrix):
+    """Writes the quantized matrix, tagged with the size and modification time of the JSON storage."""
+    storage_file = Path(storage_file)
+    target = quantized_file(storage_file)
+    tmp_file = target.with_suffix(".tmp")
+    arrays = {"values": quantized.values}
+    if quantized.scales is not None:
+        arrays["scales"] = quantized.scales
+    with open(tmp_file, "wb") as f:
+        np.savez(
+            f,
+            signature=_signature(storage_file),
+            quantization=np.array(quantized.quantization.value),
+            **arrays,
+        )
+    tmp_file.replace(target)
+
+
+def read_quantized(
+    storage_file: str | Path, quantization: Quantization, rows: int
+) -> QuantizedMatrix | None:
+    """Returns the quantized matrix, or None if it is missing or does not match the storage."""
+    storage_file = Path(storage_file)
+    target = quantized_file(storage_file)
+    if not target.exists() or not storage_file.exists():
+        return None
+    try:
+        with np.load(target) as stored:
+            if not np.array_equal(stored["signature"], _signature(storage_file)):
+                return None
+            if str(stored["quantization"]) != quantization.value:
+                return None
+            if len(stored["values"]) != rows:
+                return None
+            return QuantizedMatrix(
+                quantization,
+                stored["values"],
+                stored["scales"] if "scales" in stored else None,
+            )
+    except Exception as e:
+        logger.warning(f"Ignoring invalid quantized matrix {target}: {e}")
+        return None
+
+
+def attach_quantized(db: NanoVectorDB):
+    """Loads the quantized matrix of a storage, or quantizes the matrix if it is missing."""
+    quantization = quantization_for(db.storage_file)
+    quantized = None
+    if quantization != Quantization.NONE and db.metric == "cosine":
+        quantized = read_quantized(db.storage_file, quantization, len(db))
+        if quantized is None:
+            quantized = QuantizedMatrix.from_matrix(
+                _storage(db)["matrix"], quantization
+            )
+            if Path(db.storage_file).exists():
+                write_quantized(db.storage_file, quantized)
+    db._quantized = quantized
+
+
+def _query_with_quantized(query_function):
+    def _query(
+        self: NanoVectorDB,
+        query: np.ndarray,
+        top_k: int = 10,
+        better_than_threshold: float = None,
+        filter_lambda: nano_dbs.ConditionLambda = None,
+    ) -> list[dict]:
+        if not hasattr(self, "_quantized"):
+            attach_quantized(self)
+        quantized: QuantizedMatrix | None = self._quantized
+        if quantized is None or filter_lambda is not None or len(quantized) == 0:
+            return query_function(
+                self, query, top_k, better_than_threshold, filter_lambda
+            )
+        storage = _storage(self)
+        query = nano_dbs.normalize(query).astype(nano_dbs.Float)
+        index = getattr(self, "_ann_index", None)
+        candidates = (
+            index.candidates(query, lightrag_cfg.lightrag_ann_nprobe)
+            if index is not None
+            else None
+        )
+        rows, scores = rescored_search(
+            quantized, storage["matrix"], query, top_k, candidates
+        )
+        results = []
+        for row, score in zip(rows, scores):
+            if better_than_threshold is not None and score < better_than_threshold:
+                break
+            results.append({**storage["data"][row], nano_dbs.f_METRICS: score})
+        return results
+
+    _query.with_quantization = True
+    return _query
+
+
+def _upsert_with_quantized(upsert_function):
+    def _upsert(self: NanoVectorDB, datas: list[nano_dbs.Data]):
+        if not hasattr(self, "_quantized"):
+            attach_quantized(self)
+        report = upsert_function(self, datas)
+        quantized: QuantizedMatrix | None = self._quantized
+        if quantized is None:
+            return report
+        storage = _storage(self)
+        if report["update"]:
+            updated = set(report["update"])
+            rows = np.array(
+                [
+                    i
+                    for i, d in enumerate(storage["data"])
+                    if d[nano_dbs.f_ID] in updated
+                ]
+            )
+            quantized.update(rows, storage["matrix"][rows])
+        added = len(storage["data"]) - len(quantized)
+        if added > 0:
+            quantized.append(storage["matrix"][-added:])
+        return report
+
+    _upsert.with_quantization = True
+    return _upsert
+
+
+def _delete_with_quantized(delete_function):
+    def _delete(self: NanoVectorDB, ids: list[str]):
+        if not hasattr(self, "_quantized"):
+            attach_quantized(self)
+        quantized: QuantizedMatrix | None = self._quantized
+        if quantized is not None:
+            deleted = set(ids)
+            quantized.delete(
+                [
+                    i
+                    for i, d in enumerate(_storage(self)["data"])
+                    if d[nano_dbs.f_ID] in deleted
+                ]
+            )
+        delete_function(self, ids)
+
+    _delete.with_quantization = True
+    return _delete
+
+
+def _save_with_quantized(save_function):
+    def _save(self: NanoVectorDB):
+        save_function(self)
+        quantized: QuantizedMatrix | None = getattr(self, "_quantized", None)
+        if quantized is None:
+            quantized_file(self.storage_file).unlink(missing_ok=True)
+            return
+        try:
+            write_quantized(self.storage_file, quantized)
+        except Exception as e:
+            logger.warning(
+                f"Could not write the quantized matrix of {self.storage_file}: {e}"
+            )
+
+    _save.with_quantization = True
+    return _save
+
+
+def _pre_process_with_quantized(pre_process_function):
+    def _pre_process(self: NanoVectorDB):
+        pre_process_function(self)
+        attach_quantized(self)
+
+    _pre_process.with_quantization = True
+    return _pre_process
+
+
+def install_quantization():
+    """
+    Makes the nano-vectordb storages of the configured projects rank the rows with a
+    quantized matrix and rescore the best ones with the (memory-mapped) float32 matrix.
+    Wraps the current functions, so it must be installed after the vector sidecar and the ANN index.
+    """
+    for name, wrapper in (
+        ("query", _query_with_quantized),
+        ("upsert", _upsert_with_quantized),
+        ("delete", _delete_with_quantized),
+        ("save", _save_with_quantized),
+        ("pre_process", _pre_process_with_quantized),
+    ):
+        function = getattr(NanoVectorDB, name)
+        if not getattr(function, "with_quantization", False):
+            setattr(NanoVectorDB, name, wrapper(function))
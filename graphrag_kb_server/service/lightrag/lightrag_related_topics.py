@@ -71,7 +71,11 @@ async def get_related_topics_lightrag(
             request.text, request.project_dir, G
         )
         if len(existing_keywords) > 0:
-            args = {**request.model_dump(), "source": existing_keywords[0]}
+            args = {
+                **request.model_dump(),
+                "source": existing_keywords[0],
+                "sources": existing_keywords,
+            }
             request = SimilarityTopicsRequest(**args)
         else:
             return None
@@ -0,0 +1,252 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+import numpy as np
+from lightrag import LightRAG
+from lightrag.kg import shared_storage
+
+from graphrag_kb_server.logger import logger
+from graphrag_kb_server.service.lightrag.lightrag_chunk_store import ChunkFileKVStorage
+from graphrag_kb_server.service.lightrag.lightrag_graph_snapshot import release_graph
+
+# Rough ratio between the in-memory size of parsed JSON / GraphML data and the file size
+PARSED_SIZE_FACTOR = 3
+PIPELINE_STATUS = "pipeline_status"
+
+
+def _file_size(file_name: str | None) -> int:
+    if file_name and os.path.exists(file_name):
+        return os.path.getsize(file_name)
+    return 0
+
+
+def estimate_memory(rag: LightRAG) -> int:
+    """
+    Approximate memory used by a LightRAG instance in bytes: the KV stores and the graph
+    are estimated from their file sizes, the vector storages from their (quantized) matrices.
+    Memory-mapped matrices are not counted, as they live in the shared page cache.
+    """
+    size = 0
+    for storage in (
+        rag.full_docs,
+        rag.text_chunks,
+        rag.full_entities,
+        rag.full_relations,
+        rag.entity_chunks,
+        rag.relation_chunks,
+        rag.llm_response_cache,
+        rag.doc_status,
+    ):
+        if isinstance(storage, ChunkFileKVStorage):
+            size += storage.memory_usage()
+            continue
+        size += _file_size(getattr(storage, "_file_name", None)) * PARSED_SIZE_FACTOR
+    for vdb in (rag.entities_vdb, rag.relationships_vdb, rag.chunks_vdb):
+        client = getattr(vdb, "_client", None)
+        file_size = _file_size(getattr(vdb, "_client_file_name", None))
+        if client is None:
+            size += file_size * PARSED_SIZE_FACTOR
+            continue
+        matrix = getattr(client, "_NanoVectorDB__storage")["matrix"]
+        # The JSON file holds the matrix in base64, the rest is the metadata
+        metadata_size = max(file_size - matrix.nbytes * 4 // 3, 0)
+        size += metadata_size * PARSED_SIZE_FACTOR
+        if not isinstance(matrix, np.memmap):
+            size += matrix.nbytes
+        quantized = getattr(client, "_quantized", None)
+        if quantized is not None:
+            size += quantized.nbytes
+    size += (
+        _file_size(getattr(rag.chunk_entity_relation_graph, "_graphml_xml_file", None))
+        * PARSED_SIZE_FACTOR
+    )
+    return size
+
+
+def release_shared_data(workspace: str):
+    """Drops the data which LightRAG keeps per workspace in its shared storage."""
+    prefix = f"{workspace}:"
+    for shared in (
+        shared_storage._shared_dicts,
+        shared_storage._init_flags,
+        shared_storage._update_flags,
+    ):
+        if shared is None:
+            continue
+        for key in [k for k in shared.keys() if k.startswith(prefix)]:
+            if not key.endswith(f":{PIPELINE_STATUS}"):
+                shared.pop(key, None)
+
+
+def _is_busy(rag: LightRAG) -> bool:
+    """Whether the pipeline of the project is indexing documents."""
+    if shared_storage._shared_dicts is None:
+        return False
+    pipeline_status = shared_storage._shared_dicts.get(
+        f"{rag.workspace}:{PIPELINE_STATUS}"
+    )
+    return bool(pipeline_status and pipeline_status.get("busy"))
+
+
+def _release_rag(rag: LightRAG):
+    release_shared_data(rag.workspace)
+    graph_file = getattr(
+        getattr(rag, "chunk_entity_relation_graph", None), "_graphml_xml_file", None
+    )
+    if graph_file:
+        release_graph(graph_file)
+
+
+@dataclass
+class ResidentProject:
+    rag: LightRAG
+    memory: int
+    load_ms: float
+
+
+class LightRAGResidencyManager:
+    """
+    Keeps the loaded LightRAG instances within a memory budget. When the budget is exceeded,
+    the least recently used projects are evicted and loaded again on their next query.
+    Concurrent loads of the same project share a single load.
+    """
+
+    def __init__(self, memory_budget: int):
+        # No limit if the budget is 0
+        self.memory_budget = memory_budget
+        self.projects: OrderedDict[str, ResidentProject] = OrderedDict()
+        self.loading: dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.swaps = 0
+        self.loads = 0
+        self.total_load_ms = 0.0
+        self.max_load_ms = 0.0
+
+    def get(self, project_dir: Path) -> LightRAG | None:
+        posix_path = project_dir.as_posix()
+        resident = self.projects.get(posix_path)
+        if resident is None:
+            return None
+        self.projects.move_to_end(posix_path)
+        self.hits += 1
+        return resident.rag
+
+    async def load(
+        self, project_dir: Path, loader: Callable[[Path], Awaitable[LightRAG]]
+    ) -> LightRAG:
+        rag = self.get(project_dir)
+        if rag is not None:
+            return rag
+        posix_path = project_dir.as_posix()
+        loading = self.loading.get(posix_path)
+        if loading is not None:
+            return await asyncio.shield(loading)
+        self.misses += 1
+        loading = asyncio.get_running_loop().create_future()
+        self.loading[posix_path] = loading
+        try:
+            start = time.perf_counter()
+            rag = await loader(project_dir)
+            load_ms = (time.perf_counter() - start) * 1000
+            memory = await asyncio.to_thread(estimate_memory, rag)
+            if posix_path not in self.projects:
+                self._add(posix_path, ResidentProject(rag, memory, load_ms))
+            else:
+                # A new version was swapped in during the load
+                rag = self.projects[posix_path].rag
+            loading.set_result(rag)
+            return rag
+        except BaseException as e:
+            loading.set_exception(e)
+            # Avoid "exception was never retrieved" if nobody else waits for this load
+            loading.exception()
+            raise
+        finally:
+            self.loading.pop(posix_path, None)
+
+    def _add(self, posix_path: str, resident: ResidentProject):
+        self.loads += 1
+        self.total_load_ms += resident.load_ms
+        self.max_load_ms = max(self.max_load_ms, resident.load_ms)
+        self.projects[posix_path] = resident
+        self.projects.move_to_end(posix_path)
+        logger.info(
+            f"Loaded {posix_path} in {resident.load_ms:.0f} ms using about {resident.memory / 2**20:.1f} MB"
+        )
+        self._evict(keep=posix_path)
+
+    def _evict(self, keep: str):
+        if self.memory_budget <= 0:
+            return
+        for posix_path in list(self.projects.keys()):
+            if self.resident_memory() <= self.memory_budget:
+                return
+            resident = self.projects[posix_path]
+            if posix_path == keep or _is_busy(resident.rag):
+                continue
+            self._release(posix_path)
+            self.evictions += 1
+            logger.info(f"Evicted {posix_path} to stay within the memory budget")
+
+    def _release(self, posix_path: str):
+        resident = self.projects.pop(posix_path, None)
+        if resident is not None:
+            _release_rag(resident.rag)
+
+    async def swap(self, project_dir: Path, rag: LightRAG) -> LightRAG | None:
+        """
+        Serves a new version of the project, e.g. after a reindex in a staging directory.
+        Queries which already hold the previous instance finish on it.
+        Returns the previous instance, if it was loaded.
+        """
+        posix_path = project_dir.as_posix()
+        memory = await asyncio.to_thread(estimate_memory, rag)
+        previous = self.projects.pop(posix_path, None)
+        self.projects[posix_path] = ResidentProject(rag, memory, 0.0)
+        self.swaps += 1
+        logger.info(f"Swapped in a new version of {posix_path}")
+        if previous is not None and previous.rag is not rag:
+            _release_rag(previous.rag)
+        self._evict(keep=posix_path)
+        return previous.rag if previous is not None else None
+
+    def has_capacity(self) -> bool:
+        return self.memory_budget <= 0 or self.resident_memory() < self.memory_budget
+
+    def resident_memory(self) -> int:
+        return sum(resident.memory for resident in self.projects.values())
+
+    def clear(self, project_dir: Path):
+        self._release(project_dir.as_posix())
+
+    def stats(self) -> dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "memory_budget_mb": round(self.memory_budget / 2**20, 1),
+            "resident_memory_mb": round(self.resident_memory() / 2**20, 1),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total > 0 else 0.0,
+            "evictions": self.evictions,
+            "swaps": self.swaps,
+            "loads": self.loads,
+            "mean_load_ms": (
+                round(self.total_load_ms / self.loads, 2) if self.loads else 0.0
+            ),
+            "max_load_ms": round(self.max_load_ms, 2),
+            "projects": [
+                {
+                    "project": posix_path,
+                    "memory_mb": round(resident.memory / 2**20, 1),
+                    "load_ms": round(resident.load_ms, 2),
+                }
+                for posix_path, resident in reversed(self.projects.items())
+            ],
+        }
@@ -1,9 +1,11 @@
+import copy
 import datetime
+import logging
 import time
 import asyncio
 from pathlib import Path
-from dataclasses import asdict, dataclass
-from typing import Any
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable
 from functools import partial
 import json
 
@@ -47,16 +49,49 @@ from lightrag.base import (
 )
 
 from graphrag_kb_server.callbacks.callback_support import BaseCallback
+from graphrag_kb_server.config import lightrag_cfg
 from graphrag_kb_server.service.lightrag.lightrag_init import initialize_rag
+from graphrag_kb_server.service.lightrag.lightrag_coalescing import query_coalescer
+from graphrag_kb_server.service.lightrag.lightrag_keyword_cache import keyword_cache
+from graphrag_kb_server.service.lightrag.lightrag_keyword_matcher import (
+    extract_keywords_fast,
+)
+from graphrag_kb_server.service.lightrag.lightrag_semantic_cache import (
+    hash_parameters,
+    semantic_answer_cache,
+)
+from graphrag_kb_server.service.lightrag.lightrag_token_cache import (
+    TokenCountCache,
+    get_token_count_cache,
+    serialize_fragment,
+)
 from graphrag_kb_server.model.rag_parameters import (
     ContextFormat,
+    KeywordMode,
     QueryParameters,
     convert_to_lightrag_query_params,
 )
 from graphrag_kb_server.logger import logger
 from graphrag_kb_server.model.chat_response import ChatResponse
-from graphrag_kb_server.service.db.common_operations import extract_elements_from_path, get_project_id_from_path
-from graphrag_kb_server.service.db.db_persistence_path_properties import get_lastmodified_by_path
+from graphrag_kb_server.service.reference_index_service import get_reference_index
+from graphrag_kb_server.service.query_metrics import (
+    SPAN_BUILD_CONTEXT,
+    SPAN_EDGE_DATA,
+    SPAN_KEYWORDS,
+    SPAN_KG_SEARCH,
+    SPAN_LLM_GENERATION,
+    SPAN_MERGE_CHUNKS,
+    SPAN_NODE_DATA,
+    SPAN_QUERY_EMBEDDING,
+    SPAN_REFERENCE_LOOKUP,
+    SPAN_TRUNCATION,
+    SPAN_VECTOR_CHUNKS,
+    current_trace,
+    start_trace,
+    timed,
+    trace_span,
+    traced_stream,
+)
 from graphrag_kb_server.service.lightrag.lightrag_constants import (
     KEYWORDS_SEPARATOR,
     PREFIX_HIGH_LEVEL_KEYWORDS,
@@ -80,6 +115,185 @@ class ExtendedQueryResult(QueryResult):
     response: dict | None = None
 
 
+@dataclass
+class QueryStages:
+    """
+    Results of the retrieval stages of a search. They are kept across the retries of
+    lightrag_search, so that a retry only redoes the stages after the last completed one.
+    """
+
+    keywords: tuple[list[str], list[str]] | None = None
+    query_embedding: Any | None = None
+    search_result: dict[str, Any] | None = None
+    # Set by the retries, which cap the entities and relations of the context at
+    # max_entity_size and max_relation_size. The first attempt is only limited by the tokens
+    reduced_context: bool = False
+    # Keyed by the (entity, relation) caps, as retries reduce these limits
+    truncation_results: dict[tuple[int, int], dict[str, Any]] = field(
+        default_factory=dict
+    )
+    # Chunks retrieved by vector similarity while the keywords were being extracted
+    vector_chunks: list[dict] | None = None
+    vector_prefetch: asyncio.Task | None = None
+    # Replaces the text chunk storage of the project, e.g. to share chunk reads in a batch
+    text_chunks_db: BaseKVStorage | None = None
+    # Awaited with the chunk ids of the truncated entities and relations before the chunk
+    # merge, e.g. to read the chunks of all the questions of a batch together
+    before_chunk_merge: Callable[[list[str]], Awaitable[None]] | None = None
+
+
+def _cancel_vector_prefetch(stages: QueryStages):
+    if stages.vector_prefetch is not None and not stages.vector_prefetch.done():
+        stages.vector_prefetch.cancel()
+    stages.vector_prefetch = None
+
+
+def _uses_vector_chunks(
+    query_param: QueryParam, chunks_vdb: BaseVectorStorage | None
+) -> bool:
+    return (
+        query_param.mode == "mix"
+        or query_param.mode == "hybrid"
+        and chunks_vdb is not None
+    )
+
+
+async def _prefetch_vector_chunks(
+    query: str,
+    text_chunks_db: BaseKVStorage,
+    chunks_vdb: BaseVectorStorage,
+    query_param: QueryParam,
+    stages: QueryStages,
+):
+    """
+    Computes the query embedding and retrieves the chunks by vector similarity.
+    Neither depends on the keywords, so this runs concurrently with the keyword extraction.
+    """
+    embedding_func_config = text_chunks_db.embedding_func
+    if (
+        stages.query_embedding is None
+        and embedding_func_config
+        and embedding_func_config.func
+    ):
+        with trace_span(SPAN_QUERY_EMBEDDING):
+            stages.query_embedding = (await embedding_func_config.func([query]))[0]
+    stages.vector_chunks = await timed(
+        SPAN_VECTOR_CHUNKS,
+        _get_vector_context(query, chunks_vdb, query_param, stages.query_embedding),
+    )
+
+
+def _semantic_cache_parameters(
+    query_param: QueryParam,
+    system_prompt: str | None,
+    query_params: QueryParameters | None,
+) -> str | None:
+    """
+    Hash of the parameters of a query whose answer can be reused for similar queries.
+    None if the semantic cache does not apply, e.g. for streamed or conversational queries.
+    """
+    if (
+        query_params is None
+        or query_param.stream
+        or query_param.only_need_prompt
+        or query_param.conversation_history
+        or query_params.callback is not None
+        or not semantic_answer_cache.is_enabled(query_params.context_params.project_dir)
+    ):
+        return None
+    return hash_parameters(
+        query_param.mode,
+        query_param.only_need_context,
+        query_param.response_type,
+        query_param.top_k,
+        query_param.chunk_top_k,
+        query_param.max_entity_tokens,
+        query_param.max_relation_tokens,
+        query_param.max_total_tokens,
+        query_param.hl_keywords,
+        query_param.ll_keywords,
+        query_param.user_prompt or "",
+        query_param.enable_rerank,
+        system_prompt or "",
+        query_params.structured_output,
+        (
+            query_params.structured_output_format.__name__
+            if query_params.structured_output_format
+            else None
+        ),
+        query_params.max_entity_size,
+        query_params.max_relation_size,
+        query_params.max_filepath_depth,
+        query_params.keyword_mode,
+    )
+
+
+async def _get_cached_answer(
+    rag: LightRAG,
+    query: str,
+    project_dir: Path,
+    params_hash: str,
+    stages: QueryStages,
+) -> dict[str, Any] | None:
+    """Looks up the semantic answer cache. The query embedding is kept for the search."""
+    try:
+        if stages.query_embedding is None:
+            embedding_func_config = rag.text_chunks.embedding_func
+            if not embedding_func_config or not embedding_func_config.func:
+                return None
+            with trace_span(SPAN_QUERY_EMBEDDING):
+                stages.query_embedding = (await embedding_func_config.func([query]))[0]
+        return await semantic_answer_cache.get(
+            project_dir, stages.query_embedding, params_hash
+        )
+    except Exception as e:
+        logger.warning(f"Semantic answer cache lookup failed: {e}")
+        return None
+
+
+async def _cache_answer(
+    query: str,
+    project_dir: Path,
+    params_hash: str,
+    stages: QueryStages,
+    query_result: ExtendedQueryResult,
+):
+    if stages.query_embedding is None or query_result.is_streaming:
+        return
+    try:
+        await semantic_answer_cache.set(
+            project_dir,
+            query,
+            stages.query_embedding,
+            params_hash,
+            {
+                "content": query_result.content,
+                "response": query_result.response,
+                "context": query_result.context,
+                "raw_data": copy.deepcopy(query_result.raw_data),
+            },
+        )
+    except Exception as e:
+        logger.warning(f"Could not save the answer in the semantic answer cache: {e}")
+
+
+def _cached_query_result(cached_answer: dict[str, Any]) -> ExtendedQueryResult:
+    raw_data = copy.deepcopy(cached_answer["raw_data"]) or {}
+    raw_data.setdefault("metadata", {}).setdefault("processing_info", {})[
+        "semantic_cache"
+    ] = {
+        "query": cached_answer["query"],
+        "similarity": round(cached_answer["similarity"], 4),
+        "context_hash": cached_answer["context_hash"],
+    }
+    return ExtendedQueryResult(
+        content=cached_answer["content"],
+        response=cached_answer["response"],
+        raw_data=raw_data,
+        context=cached_answer["context"],
+    )
+
+
 def _combine_keywords(old_keywords: list[str], new_keywords: list[str]) -> list[str]:
     return list(set(old_keywords + new_keywords))
 
@@ -133,14 +347,36 @@ async def extract_keywords_only_lightrag(
 ) -> tuple[list[str], list[str]]:
     rag: LightRAG = await initialize_rag(project_folder)
     global_config = asdict(rag)
-    return await extract_keywords_only(
-        text, param, global_config, rag.llm_response_cache
+    return await cached_extract_keywords(
+        text, param, global_config, rag.llm_response_cache, project_folder
+    )
+
+
+async def cached_extract_keywords(
+    text: str,
+    param: QueryParam,
+    global_config: dict[str, Any],
+    hashing_kv: BaseKVStorage | None,
+    project_folder: Path,
+) -> tuple[list[str], list[str]]:
+    """Extracts the query keywords, using the keyword cache to avoid repeated LLM calls."""
+    cached = await keyword_cache.get(project_folder, text, param.mode)
+    if cached is not None:
+        return cached
+    hl_keywords, ll_keywords = await extract_keywords_only(
+        text, param, global_config, hashing_kv
     )
+    if hl_keywords or ll_keywords:
+        await keyword_cache.set(
+            project_folder, text, param.mode, hl_keywords, ll_keywords
+        )
+    return hl_keywords, ll_keywords
 
 
 async def _lightrag_search_impl(
     query_params: QueryParameters,
     only_need_context: bool = False,
+    stages: QueryStages | None = None,
 ) -> ChatResponse:
     """Internal implementation of lightrag_search without retry logic."""
     project_folder = query_params.context_params.project_dir
@@ -163,7 +399,9 @@ In case of a coloquial question or non context related sentence you can respond
 {PROMPTS["rag_response"]}
 """
     if param.mode in ["local", "global", "hybrid", "mix"]:
-        response_dict = await aquery_llm(rag, query, param, system_prompt, query_params)
+        response_dict = await aquery_llm(
+            rag, query, param, system_prompt, query_params, stages
+        )
         entities_context = response_dict["data"].get("entities", [])
         relations_context = response_dict["data"].get("relationships", [])
         text_units_context = response_dict["data"].get("chunks", [])
@@ -202,21 +440,35 @@ In case of a coloquial question or non context related sentence you can respond
 async def lightrag_search(
     query_params: QueryParameters,
     only_need_context: bool = False,
+    stages: QueryStages | None = None,
 ) -> ChatResponse:
     """
     Execute LightRAG search with automatic retry logic.
 
     On failure, retries up to 5 times with reduced parameters:
-    - max_entity_size: reduced to 10
-    - max_relation_size: reduced to 10
+    - max_entity_size: reduced to 10, which also caps the entities of the context
+    - max_relation_size: reduced to 10, which also caps the relations of the context
     - max_filepath_depth: reduced to 10
+
+    The completed retrieval stages (keywords, query embedding, graph search and truncation)
+    are reused by the retries, so a failure in the generation does not repeat the retrieval.
+    Pre-computed stages can be passed in, e.g. by the batch search.
+
+    Identical concurrent searches share a single computation (see lightrag_coalescing).
     """
     retries = 5
     current_params = query_params
+    if stages is None:
+        stages = QueryStages()
+    search_function = partial(_lightrag_search_impl, stages=stages)
 
     while retries > 0:
         try:
-            return await _lightrag_search_impl(current_params, only_need_context)
+            if lightrag_cfg.lightrag_coalesce_queries:
+                return await query_coalescer.run(
+                    current_params, only_need_context, search_function
+                )
+            return await search_function(current_params, only_need_context)
         except Exception as e:
             logger.error(f"Error in lightrag_search: {e}")
             retries -= 1
@@ -229,6 +481,7 @@ async def lightrag_search(
             params_dict["max_relation_size"] = 10
             params_dict["max_filepath_depth"] = 10
             current_params = QueryParameters(**params_dict)
+            stages.reduced_context = True
 
             # Notify callback if available
             if current_params.callback:
@@ -246,6 +499,7 @@ async def aquery_llm(
     param: QueryParam,
     system_prompt: str | None = None,
     query_params: QueryParameters = None,
+    stages: QueryStages | None = None,
 ) -> dict[str, Any]:
     """
     Asynchronous complete query API: returns structured retrieval results with LLM generation.
@@ -257,6 +511,7 @@ async def aquery_llm(
         query: Query text for retrieval and LLM generation.
         param: Query parameters controlling retrieval and LLM behavior.
         system_prompt: Optional custom system prompt for LLM generation.
+        stages: Optional results of the retrieval stages of a previous attempt.
 
     Returns:
         dict[str, Any]: Complete response with structured data and LLM response.
@@ -264,25 +519,53 @@ async def aquery_llm(
     logger.debug(f"[aquery_llm] Query param: {param}")
 
     global_config = asdict(rag)
+    trace = (
+        start_trace(query_params.context_params.project_dir, param.mode)
+        if query_params is not None
+        else None
+    )
 
     try:
         query_result = None
+        cached_answer = None
+        params_hash = _semantic_cache_parameters(param, system_prompt, query_params)
+        if params_hash is not None:
+            if stages is None:
+                stages = QueryStages()
+            project_dir = query_params.context_params.project_dir
+            cached_answer = await _get_cached_answer(
+                rag, query.strip(), project_dir, params_hash, stages
+            )
 
-        if param.mode in ["local", "global", "hybrid", "mix"]:
+        if param.mode in ["local", "global", "hybrid", "mix"] and cached_answer:
+            logger.info(
+                f"Semantic answer cache hit for '{query}' with '{cached_answer['query']}'"
+            )
+            query_result = _cached_query_result(cached_answer)
+        elif param.mode in ["local", "global", "hybrid", "mix"]:
             query_result = await kg_query(
                 rag,
                 query.strip(),
                 rag.chunk_entity_relation_graph,
                 rag.entities_vdb,
                 rag.relationships_vdb,
-                rag.text_chunks,
+                (
+                    stages.text_chunks_db
+                    if stages is not None and stages.text_chunks_db is not None
+                    else rag.text_chunks
+                ),
                 param,
                 global_config,
                 hashing_kv=rag.llm_response_cache,
                 system_prompt=system_prompt,
                 chunks_vdb=rag.chunks_vdb,
                 query_params=query_params,
+                stages=stages,
             )
+            if params_hash is not None and query_result is not None:
+                await _cache_answer(
+                    query.strip(), project_dir, params_hash, stages, query_result
+                )
         else:
             raise ValueError(f"Unknown mode {param.mode}")
 
@@ -290,6 +573,8 @@ async def aquery_llm(
 
         # Check if query_result is None
         if query_result is None:
+            if trace is not None:
+                trace.finish()
             return {
                 "status": "failure",
                 "message": "Query returned no results",
@@ -307,6 +592,19 @@ async def aquery_llm(
 
         # Extract structured data from query result
         raw_data = query_result.raw_data or {}
+        if trace is not None:
+            if query_result.is_streaming and query_result.response_iterator is not None:
+                # The LLM spans of streamed responses are recorded once the stream is consumed
+                query_result.response_iterator = traced_stream(
+                    query_result.response_iterator,
+                    trace,
+                    trace.llm_start or trace.start,
+                )
+            else:
+                trace.finish()
+            raw_data.setdefault("metadata", {}).setdefault("processing_info", {})[
+                "timings_ms"
+            ] = trace.timings_ms()
         raw_data["llm_response"] = {
             "content": (
                 query_result.content
@@ -340,6 +638,7 @@ async def kg_query(
     system_prompt: str | None = None,
     chunks_vdb: BaseVectorStorage = None,
     query_params: QueryParameters = None,
+    stages: QueryStages | None = None,
 ) -> ExtendedQueryResult | None:
     """
     Execute knowledge graph query and return unified ExtendedQueryResult object.
@@ -355,6 +654,7 @@ async def kg_query(
         hashing_kv: Cache storage
         system_prompt: System prompt
         chunks_vdb: Document chunks vector database
+        stages: Results of the retrieval stages which are reused across retries
 
     Returns:
         ExtendedQueryResult | None: Unified query result object containing:
@@ -382,9 +682,45 @@ async def kg_query(
         # Apply higher priority (5) to query relation LLM function
         use_model_func = partial(use_model_func, _priority=5)
 
-    hl_keywords, ll_keywords = await extract_keywords_only(
-        query, query_param, global_config, rag.llm_response_cache
-    )
+    if stages is None:
+        stages = QueryStages()
+    if (
+        lightrag_cfg.lightrag_pipelined_retrieval
+        and stages.search_result is None
+        and stages.vector_chunks is None
+        and chunks_vdb is not None
+        and _uses_vector_chunks(query_param, chunks_vdb)
+    ):
+        stages.vector_prefetch = asyncio.create_task(
+            _prefetch_vector_chunks(
+                query, text_chunks_db, chunks_vdb, query_param, stages
+            )
+        )
+    if stages.keywords is None and query_params.keyword_mode == KeywordMode.FAST:
+        try:
+            with trace_span(SPAN_KEYWORDS):
+                stages.keywords = await extract_keywords_fast(
+                    rag,
+                    query_params.context_params.project_dir,
+                    query,
+                    lightrag_cfg.lightrag_fast_keywords_min_coverage,
+                )
+        except Exception as e:
+            logger.warning(f"Fast keyword extraction failed: {e}")
+    if stages.keywords is None:
+        try:
+            with trace_span(SPAN_KEYWORDS):
+                stages.keywords = await cached_extract_keywords(
+                    query,
+                    query_param,
+                    global_config,
+                    rag.llm_response_cache,
+                    query_params.context_params.project_dir,
+                )
+        except Exception:
+            _cancel_vector_prefetch(stages)
+            raise
+    hl_keywords, ll_keywords = stages.keywords
     # Add the keywords to the query parameters
     query_param.hl_keywords = _combine_keywords(query_param.hl_keywords, hl_keywords)
     query_param.ll_keywords = _combine_keywords(query_param.ll_keywords, ll_keywords)
@@ -410,6 +746,7 @@ async def kg_query(
             logger.warning(f"Forced low_level_keywords to origin query: {query}")
             ll_keywords = [query]
         else:
+            _cancel_vector_prefetch(stages)
             return ExtendedQueryResult(content=PROMPTS["fail_response"], context=None)
 
     ll_keywords_str = ", ".join(ll_keywords) if ll_keywords else ""
@@ -427,6 +764,7 @@ async def kg_query(
         query_param,
         chunks_vdb,
         query_params,
+        stages,
     )
 
     if context_result is None:
@@ -487,11 +825,13 @@ async def kg_query(
         )
 
     # Call LLM
-    tokenizer: Tokenizer = global_config["tokenizer"]
-    len_of_prompts = len(tokenizer.encode(query + sys_prompt))
-    logger.debug(
-        f"[kg_query] Sending to LLM: {len_of_prompts:,} tokens (Query: {len(tokenizer.encode(query))}, System: {len(tokenizer.encode(sys_prompt))})"
-    )
+    if logger.isEnabledFor(logging.DEBUG):
+        # Encoding the whole prompt is expensive, so only do it when it is logged.
+        tokenizer: Tokenizer = global_config["tokenizer"]
+        len_of_prompts = len(tokenizer.encode(query + sys_prompt))
+        logger.debug(
+            f"[kg_query] Sending to LLM: {len_of_prompts:,} tokens (Query: {len(tokenizer.encode(query))}, System: {len(tokenizer.encode(sys_prompt))})"
+        )
 
     # Handle cache
     # Add the project name to the args hash
@@ -523,6 +863,9 @@ async def kg_query(
         )
         response = cached_response
     else:
+        trace = current_trace()
+        if trace is not None:
+            trace.llm_start = time.perf_counter()
         response = await use_model_func(
             query,
             system_prompt=sys_prompt,
@@ -532,6 +875,10 @@ async def kg_query(
             structured_output=query_params.structured_output,
             structured_output_format=query_params.structured_output_format,
         )
+        if trace is not None and (isinstance(response, (str, dict))):
+            trace.record(
+                SPAN_LLM_GENERATION, (time.perf_counter() - trace.llm_start) * 1000
+            )
 
         if (
             hashing_kv
@@ -597,6 +944,20 @@ async def kg_query(
         )
 
 
+def _related_chunk_ids(truncation_result: dict[str, Any]) -> list[str]:
+    """The chunks which the chunk merge can select for the truncated entities and relations."""
+    chunk_ids = {}
+    for data in (
+        truncation_result["filtered_entities"] + truncation_result["filtered_relations"]
+    ):
+        if data.get("source_id"):
+            for chunk_id in split_string_by_multi_markers(
+                data["source_id"], [GRAPH_FIELD_SEP]
+            ):
+                chunk_ids[chunk_id] = None
+    return list(chunk_ids)
+
+
 async def _build_query_context(
     query: str,
     ll_keywords: str,
@@ -608,11 +969,14 @@ async def _build_query_context(
     query_param: QueryParam,
     chunks_vdb: BaseVectorStorage = None,
     query_params: QueryParameters = None,
+    stages: QueryStages | None = None,
 ) -> QueryContextResult | None:
     """
     Main query context building function using the new 4-stage architecture:
     1. Search -> 2. Truncate -> 3. Merge chunks -> 4. Build LLM context
 
+    The results of stages 1 and 2 are stored in `stages` and reused on retries.
+
     Returns unified QueryContextResult containing both context and raw_data.
     """
 
@@ -622,18 +986,41 @@ async def _build_query_context(
         logger.warning("Query is empty, skipping context building")
         return None
 
+    if stages is None:
+        stages = QueryStages()
+
+    if stages.vector_prefetch is not None:
+        prefetch, stages.vector_prefetch = stages.vector_prefetch, None
+        try:
+            await prefetch
+        except Exception as e:
+            # The search below computes what is missing.
+            logger.warning(f"Vector chunk prefetch failed: {e}")
+
     # Stage 1: Pure search
-    search_result = await _perform_kg_search(
-        query,
-        ll_keywords,
-        hl_keywords,
-        knowledge_graph_inst,
-        entities_vdb,
-        relationships_vdb,
-        text_chunks_db,
-        query_param,
-        chunks_vdb,
-    )
+    if stages.search_result is None:
+        with trace_span(SPAN_KG_SEARCH):
+            stages.search_result = await _perform_kg_search(
+                query,
+                ll_keywords,
+                hl_keywords,
+                knowledge_graph_inst,
+                entities_vdb,
+                relationships_vdb,
+                text_chunks_db,
+                query_param,
+                chunks_vdb,
+                stages=stages,
+            )
+    else:
+        logger.info(
+            "Reusing the knowledge graph search results of the previous attempt"
+        )
+    # The chunk tracking is updated by the chunk merge, so each attempt gets its own copy
+    search_result = {
+        **stages.search_result,
+        "chunk_tracking": copy.deepcopy(stages.search_result["chunk_tracking"]),
+    }
 
     if not search_result["final_entities"] and not search_result["final_relations"]:
         if query_param.mode != "mix":
@@ -642,26 +1029,48 @@ async def _build_query_context(
             if not search_result["chunk_tracking"]:
                 return None
 
+    tokenizer = text_chunks_db.global_config.get("tokenizer")
+    token_cache = (
+        await get_token_count_cache(query_params.context_params.project_dir, tokenizer)
+        if tokenizer
+        else None
+    )
+
     # Stage 2: Apply token truncation for LLM efficiency
-    truncation_result = await _apply_token_truncation(
-        search_result,
-        query_param,
-        text_chunks_db.global_config,
+    truncation_key = (
+        (query_params.max_entity_size, query_params.max_relation_size)
+        if stages.reduced_context
+        else (0, 0)
     )
+    truncation_result = stages.truncation_results.get(truncation_key)
+    if truncation_result is None:
+        with trace_span(SPAN_TRUNCATION):
+            truncation_result = await _apply_token_truncation(
+                search_result,
+                query_param,
+                text_chunks_db.global_config,
+                token_cache=token_cache,
+                max_entity_size=truncation_key[0],
+                max_relation_size=truncation_key[1],
+            )
+        stages.truncation_results[truncation_key] = truncation_result
 
     # Stage 3: Merge chunks using filtered entities/relations
-    merged_chunks = await _merge_all_chunks(
-        filtered_entities=truncation_result["filtered_entities"],
-        filtered_relations=truncation_result["filtered_relations"],
-        vector_chunks=search_result["vector_chunks"],
-        query=query,
-        knowledge_graph_inst=knowledge_graph_inst,
-        text_chunks_db=text_chunks_db,
-        query_param=query_param,
-        chunks_vdb=chunks_vdb,
-        chunk_tracking=search_result["chunk_tracking"],
-        query_embedding=search_result["query_embedding"],
-    )
+    if stages.before_chunk_merge is not None:
+        await stages.before_chunk_merge(_related_chunk_ids(truncation_result))
+    with trace_span(SPAN_MERGE_CHUNKS):
+        merged_chunks = await _merge_all_chunks(
+            filtered_entities=truncation_result["filtered_entities"],
+            filtered_relations=truncation_result["filtered_relations"],
+            vector_chunks=search_result["vector_chunks"],
+            query=query,
+            knowledge_graph_inst=knowledge_graph_inst,
+            text_chunks_db=text_chunks_db,
+            query_param=query_param,
+            chunks_vdb=chunks_vdb,
+            chunk_tracking=search_result["chunk_tracking"],
+            query_embedding=search_result["query_embedding"],
+        )
 
     if (
         not merged_chunks
@@ -672,18 +1081,24 @@ async def _build_query_context(
 
     # Stage 4: Build final LLM context with dynamic token processing
     # _build_context_str now always returns tuple[str, dict]
-    context, raw_data = await _build_context_str(
-        entities_context=truncation_result["entities_context"],
-        relations_context=truncation_result["relations_context"],
-        merged_chunks=merged_chunks,
-        query=query,
-        query_param=query_param,
-        global_config=text_chunks_db.global_config,
-        chunk_tracking=search_result["chunk_tracking"],
-        entity_id_to_original=truncation_result["entity_id_to_original"],
-        relation_id_to_original=truncation_result["relation_id_to_original"],
-        query_params=query_params,
-    )
+    with trace_span(SPAN_BUILD_CONTEXT):
+        context, raw_data = await _build_context_str(
+            entities_context=truncation_result["entities_context"],
+            relations_context=truncation_result["relations_context"],
+            merged_chunks=merged_chunks,
+            query=query,
+            query_param=query_param,
+            global_config=text_chunks_db.global_config,
+            chunk_tracking=search_result["chunk_tracking"],
+            entity_id_to_original=truncation_result["entity_id_to_original"],
+            relation_id_to_original=truncation_result["relation_id_to_original"],
+            query_params=query_params,
+            token_cache=token_cache,
+            entities_fragments=truncation_result.get("entities_fragments"),
+            relations_fragments=truncation_result.get("relations_fragments"),
+        )
+    if token_cache is not None:
+        await token_cache.save_if_needed()
 
     # Convert keywords strings to lists and add complete metadata to raw_data
     hl_keywords_list = hl_keywords.split(", ") if hl_keywords else []
@@ -736,10 +1151,14 @@ async def _build_context_str(
     entity_id_to_original: dict = None,
     relation_id_to_original: dict = None,
     query_params: QueryParameters = None,
+    token_cache: TokenCountCache | None = None,
+    entities_fragments: list[str] | None = None,
+    relations_fragments: list[str] | None = None,
 ) -> tuple[str, dict[str, Any]]:
     """
     Build the final LLM context string with token processing.
     This includes dynamic token calculation and final chunk truncation.
+    With a token cache the token counts are looked up instead of encoding the context again.
     """
     tokenizer = global_config.get("tokenizer")
 
@@ -777,21 +1196,16 @@ async def _build_context_str(
         else "Multiple Paragraphs"
     )
 
-    entities_str = "\n".join(
-        json.dumps(entity, ensure_ascii=False) for entity in entities_context
-    )
-    relations_str = "\n".join(
-        json.dumps(relation, ensure_ascii=False) for relation in relations_context
-    )
-
-    # Calculate preliminary kg context tokens
-    pre_kg_context = kg_context_template.format(
-        entities_str=entities_str,
-        relations_str=relations_str,
-        text_chunks_str="",
-        reference_list_str="",
-    )
-    kg_context_tokens = len(tokenizer.encode(pre_kg_context))
+    if entities_fragments is None or len(entities_fragments) != len(entities_context):
+        entities_fragments = [serialize_fragment(entity) for entity in entities_context]
+    if relations_fragments is None or len(relations_fragments) != len(
+        relations_context
+    ):
+        relations_fragments = [
+            serialize_fragment(relation) for relation in relations_context
+        ]
+    entities_str = "\n".join(entities_fragments)
+    relations_str = "\n".join(relations_fragments)
 
     # Calculate preliminary system prompt tokens
     pre_sys_prompt = sys_prompt_template.format(
@@ -799,7 +1213,34 @@ async def _build_context_str(
         response_type=response_type,
         user_prompt=user_prompt,
     )
-    sys_prompt_tokens = len(tokenizer.encode(pre_sys_prompt))
+
+    # Calculate preliminary kg context tokens
+    if token_cache is not None:
+        # Sum of the fragment counts plus one token per line break and the template overhead.
+        kg_context_tokens = (
+            token_cache.count(
+                kg_context_template.format(
+                    entities_str="",
+                    relations_str="",
+                    text_chunks_str="",
+                    reference_list_str="",
+                )
+            )
+            + sum(token_cache.count(f) for f in entities_fragments)
+            + sum(token_cache.count(f) for f in relations_fragments)
+            + len(entities_fragments)
+            + len(relations_fragments)
+        )
+        sys_prompt_tokens = token_cache.count(pre_sys_prompt)
+    else:
+        pre_kg_context = kg_context_template.format(
+            entities_str=entities_str,
+            relations_str=relations_str,
+            text_chunks_str="",
+            reference_list_str="",
+        )
+        kg_context_tokens = len(tokenizer.encode(pre_kg_context))
+        sys_prompt_tokens = len(tokenizer.encode(pre_sys_prompt))
 
     # Calculate available tokens for text chunks
     query_tokens = len(tokenizer.encode(query))
@@ -817,10 +1258,25 @@ async def _build_context_str(
         query=query,
         unique_chunks=merged_chunks,
         query_param=query_param,
-        global_config=global_config,
+        # Without tokenizer the chunks are not truncated here, the token cache does it below.
+        global_config=(
+            {**global_config, "tokenizer": None}
+            if token_cache is not None
+            else global_config
+        ),
         source_type=query_param.mode,
         chunk_token_limit=available_chunk_tokens,  # Pass dynamic limit
     )
+    if token_cache is not None and truncated_chunks:
+        # The chunk ids are sequential, so truncating the numbered list keeps the same ids.
+        kept, _, _ = token_cache.truncate(
+            [
+                {k: v for k, v in chunk.items() if k != "id"}
+                for chunk in truncated_chunks
+            ],
+            available_chunk_tokens,
+        )
+        truncated_chunks = truncated_chunks[: len(kept)]
 
     # Generate reference list from truncated chunks using the new common function
     reference_list, truncated_chunks = generate_reference_list_from_chunks(
@@ -839,25 +1295,21 @@ async def _build_context_str(
         )
 
     text_units_str = "\n".join(
-        json.dumps(text_unit, ensure_ascii=False) for text_unit in chunks_context
+        serialize_fragment(text_unit) for text_unit in chunks_context
     )
 
-    simple_project = extract_elements_from_path(query_params.context_params.project_dir)
-    project_id = await get_project_id_from_path(query_params.context_params.project_dir)
-
-    async def _fmt_ref(ref: dict) -> str:
-        last_modified = await get_lastmodified_by_path(
-            simple_project.schema_name, ref["file_path"], project_id
+    with trace_span(SPAN_REFERENCE_LOOKUP):
+        reference_index = await get_reference_index(
+            query_params.context_params.project_dir
         )
+
+    def _fmt_ref(ref: dict) -> str:
+        last_modified = reference_index.get_last_modified(ref["file_path"])
         ts = f" (last_modified: {last_modified.isoformat()})" if last_modified else ""
         return f"[{ref['reference_id']}] {ref['file_path']}{ts}"
 
     reference_list_str = "\n".join(
-        await asyncio.gather(*[
-            _fmt_ref(ref)
-            for ref in reference_list
-            if ref["reference_id"]
-        ])
+        [_fmt_ref(ref) for ref in reference_list if ref["reference_id"]]
     )
 
     logger.info(
@@ -896,8 +1348,6 @@ async def _build_context_str(
         if chunk_tracking_log:
             logger.info(f"Final chunks S+F/O: {' '.join(chunk_tracking_log)}")
 
-    
-
     result = kg_context_template.format(
         entities_str=entities_str,
         relations_str=relations_str,
@@ -924,9 +1374,6 @@ async def _build_context_str(
     return result, final_data
 
 
-
-
-
 async def _perform_kg_search(
     query: str,
     ll_keywords: str,
@@ -937,10 +1384,12 @@ async def _perform_kg_search(
     text_chunks_db: BaseKVStorage,
     query_param: QueryParam,
     chunks_vdb: BaseVectorStorage = None,
+    stages: QueryStages | None = None,
 ) -> dict[str, Any]:
     """
     Pure search logic that retrieves raw entities, relations, and vector chunks.
     No token truncation or formatting - just raw search results.
+    The query embedding is stored in `stages`, so that it survives a failure of the lookups.
     """
 
     # Initialize result containers
@@ -960,15 +1409,20 @@ async def _perform_kg_search(
     kg_chunk_pick_method = text_chunks_db.global_config.get(
         "kg_chunk_pick_method", DEFAULT_KG_CHUNK_PICK_METHOD
     )
-    query_embedding = None
-    if query and (kg_chunk_pick_method == "VECTOR" or chunks_vdb):
+    query_embedding = stages.query_embedding if stages is not None else None
+    if query_embedding is not None:
+        logger.debug("Reusing the query embedding of the previous attempt")
+    elif query and (kg_chunk_pick_method == "VECTOR" or chunks_vdb):
         embedding_func_config = text_chunks_db.embedding_func
         if embedding_func_config and embedding_func_config.func:
             try:
-                query_embedding = await embedding_func_config.func([query])
+                with trace_span(SPAN_QUERY_EMBEDDING):
+                    query_embedding = await embedding_func_config.func([query])
                 query_embedding = query_embedding[
                     0
                 ]  # Extract first embedding from batch result
+                if stages is not None:
+                    stages.query_embedding = query_embedding
                 logger.debug("Pre-computed query embedding for all vector operations")
             except Exception as e:
                 logger.warning(f"Failed to pre-compute query embedding: {e}")
@@ -983,19 +1437,25 @@ async def _perform_kg_search(
 
     # Handle local and global modes
     if query_param.mode == "local" and len(ll_keywords) > 0:
-        local_entities, local_relations = await _get_node_data(
-            ll_keywords,
-            knowledge_graph_inst,
-            entities_vdb,
-            query_param,
+        local_entities, local_relations = await timed(
+            SPAN_NODE_DATA,
+            _get_node_data(
+                ll_keywords,
+                knowledge_graph_inst,
+                entities_vdb,
+                query_param,
+            ),
         )
 
     elif query_param.mode == "global" and len(hl_keywords) > 0:
-        global_relations, global_entities = await _get_edge_data(
-            hl_keywords,
-            knowledge_graph_inst,
-            relationships_vdb,
-            query_param,
+        global_relations, global_entities = await timed(
+            SPAN_EDGE_DATA,
+            _get_edge_data(
+                hl_keywords,
+                knowledge_graph_inst,
+                relationships_vdb,
+                query_param,
+            ),
         )
 
     else:  # hybrid or mix mode
@@ -1004,14 +1464,23 @@ async def _perform_kg_search(
         has_hl_keywords = len(hl_keywords) > 0
         if has_ll_keywords:
             tasks.append(
-                _get_node_data(
-                    ll_keywords, knowledge_graph_inst, entities_vdb, query_param
+                timed(
+                    SPAN_NODE_DATA,
+                    _get_node_data(
+                        ll_keywords, knowledge_graph_inst, entities_vdb, query_param
+                    ),
                 )
             )
         if has_hl_keywords:
             tasks.append(
-                _get_edge_data(
-                    hl_keywords, knowledge_graph_inst, relationships_vdb, query_param
+                timed(
+                    SPAN_EDGE_DATA,
+                    _get_edge_data(
+                        hl_keywords,
+                        knowledge_graph_inst,
+                        relationships_vdb,
+                        query_param,
+                    ),
                 )
             )
 
@@ -1025,24 +1494,29 @@ async def _perform_kg_search(
             global_relations, global_entities = results[0]
 
         # Get vector chunks for mix mode
-        if query_param.mode == "mix" or query_param.mode == "hybrid" and chunks_vdb:
-            vector_chunks = await _get_vector_context(
-                query,
-                chunks_vdb,
-                query_param,
-                query_embedding,
+        if stages is not None and stages.vector_chunks is not None:
+            vector_chunks = stages.vector_chunks
+        elif _uses_vector_chunks(query_param, chunks_vdb):
+            vector_chunks = await timed(
+                SPAN_VECTOR_CHUNKS,
+                _get_vector_context(
+                    query,
+                    chunks_vdb,
+                    query_param,
+                    query_embedding,
+                ),
             )
-            # Track vector chunks with source metadata
-            for i, chunk in enumerate(vector_chunks):
-                chunk_id = chunk.get("chunk_id") or chunk.get("id")
-                if chunk_id:
-                    chunk_tracking[chunk_id] = {
-                        "source": "C",
-                        "frequency": 1,  # Vector chunks always have frequency 1
-                        "order": i + 1,  # 1-based order in vector search results
-                    }
-                else:
-                    logger.warning(f"Vector chunk missing chunk_id: {chunk}")
+        # Track vector chunks with source metadata, also when they were prefetched
+        for i, chunk in enumerate(vector_chunks):
+            chunk_id = chunk.get("chunk_id") or chunk.get("id")
+            if chunk_id:
+                chunk_tracking[chunk_id] = {
+                    "source": "C",
+                    "frequency": 1,  # Vector chunks always have frequency 1
+                    "order": i + 1,  # 1-based order in vector search results
+                }
+            else:
+                logger.warning(f"Vector chunk missing chunk_id: {chunk}")
 
     # Round-robin merge entities
     final_entities = []
@@ -1117,9 +1591,14 @@ async def _apply_token_truncation(
     search_result: dict[str, Any],
     query_param: QueryParam,
     global_config: dict[str, str],
+    token_cache: TokenCountCache | None = None,
+    max_entity_size: int = 0,
+    max_relation_size: int = 0,
 ) -> dict[str, Any]:
     """
     Apply token-based truncation to entities and relations for LLM efficiency.
+    With a token cache the serialized fragments are returned too, so that they are not rebuilt later.
+    Positive max_entity_size and max_relation_size additionally limit the number of entities and relations.
     """
     tokenizer = global_config.get("tokenizer")
     if not tokenizer:
@@ -1205,6 +1684,8 @@ async def _apply_token_truncation(
     )
 
     # Apply token-based truncation
+    entities_fragments = None
+    relations_fragments = None
     if entities_context:
         # Remove file_path and created_at for token calculation
         entities_context_for_truncation = []
@@ -1214,14 +1695,19 @@ async def _apply_token_truncation(
             entity_copy.pop("created_at", None)
             entities_context_for_truncation.append(entity_copy)
 
-        entities_context = truncate_list_by_token_size(
-            entities_context_for_truncation,
-            key=lambda x: "\n".join(
-                json.dumps(item, ensure_ascii=False) for item in [x]
-            ),
-            max_token_size=max_entity_tokens,
-            tokenizer=tokenizer,
-        )
+        if token_cache is not None:
+            entities_context, entities_fragments, _ = token_cache.truncate(
+                entities_context_for_truncation, max_entity_tokens
+            )
+        else:
+            entities_context = truncate_list_by_token_size(
+                entities_context_for_truncation,
+                key=lambda x: "\n".join(
+                    json.dumps(item, ensure_ascii=False) for item in [x]
+                ),
+                max_token_size=max_entity_tokens,
+                tokenizer=tokenizer,
+            )
 
     if relations_context:
         # Remove file_path and created_at for token calculation
@@ -1232,14 +1718,28 @@ async def _apply_token_truncation(
             relation_copy.pop("created_at", None)
             relations_context_for_truncation.append(relation_copy)
 
-        relations_context = truncate_list_by_token_size(
-            relations_context_for_truncation,
-            key=lambda x: "\n".join(
-                json.dumps(item, ensure_ascii=False) for item in [x]
-            ),
-            max_token_size=max_relation_tokens,
-            tokenizer=tokenizer,
-        )
+        if token_cache is not None:
+            relations_context, relations_fragments, _ = token_cache.truncate(
+                relations_context_for_truncation, max_relation_tokens
+            )
+        else:
+            relations_context = truncate_list_by_token_size(
+                relations_context_for_truncation,
+                key=lambda x: "\n".join(
+                    json.dumps(item, ensure_ascii=False) for item in [x]
+                ),
+                max_token_size=max_relation_tokens,
+                tokenizer=tokenizer,
+            )
+
+    if max_entity_size > 0 and len(entities_context) > max_entity_size:
+        entities_context = entities_context[:max_entity_size]
+        if entities_fragments is not None:
+            entities_fragments = entities_fragments[:max_entity_size]
+    if max_relation_size > 0 and len(relations_context) > max_relation_size:
+        relations_context = relations_context[:max_relation_size]
+        if relations_fragments is not None:
+            relations_fragments = relations_fragments[:max_relation_size]
 
     logger.info(
         f"After truncation: {len(entities_context)} entities, {len(relations_context)} relations"
@@ -1281,6 +1781,8 @@ async def _apply_token_truncation(
         "filtered_relations": filtered_relations,
         "entity_id_to_original": filtered_entity_id_to_original,
         "relation_id_to_original": filtered_relation_id_to_original,
+        "entities_fragments": entities_fragments,
+        "relations_fragments": relations_fragments,
     }
 
 
@@ -0,0 +1,275 @@
+import asyncio
+import hashlib
+import json
+import pickle
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from graphrag_kb_server.config import lightrag_cfg
+from graphrag_kb_server.logger import logger
+from graphrag_kb_server.service.lightrag.lightrag_versions import read_project_version
+from graphrag_kb_server.utils.cache import DelayedProjectWriter
+
+SEMANTIC_CACHE_FILE = "semantic_answers.pkl"
+# The storages written by the indexing. Their sizes and modification times are the index version.
+INDEX_FILES = [
+    "graph_chunk_entity_relation.graphml",
+    "kv_store_text_chunks.json",
+    "kv_store_full_docs.json",
+    "chunk_store_text_chunks.idx",
+    "chunk_store_full_docs.idx",
+    "vdb_chunks.json",
+    "vdb_entities.json",
+    "vdb_relationships.json",
+]
+
+
+def get_index_version(project_dir: Path) -> str:
+    """Changes whenever the project is reindexed or a new version is swapped in."""
+    project_version = read_project_version(project_dir)
+    working_dir = project_dir / project_version["working_dir"]
+    version = hashlib.md5(f"version:{project_version['version']};".encode())
+    for file_name in INDEX_FILES:
+        index_file = working_dir / file_name
+        if index_file.exists():
+            stat = index_file.stat()
+            version.update(f"{file_name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return version.hexdigest()
+
+
+def hash_parameters(*args: Any) -> str:
+    """Hash of everything, except the query, which the answer depends on."""
+    return hashlib.md5(
+        json.dumps(args, default=str, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+def hash_context(context: str | None) -> str | None:
+    return hashlib.md5(context.encode("utf-8")).hexdigest() if context else None
+
+
+def _normalize(embedding: Any) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32).ravel()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class ProjectAnswers:
+    """
+    The cached answers of a project. The normalized query embeddings are the rows of
+    a matrix, so a lookup is a single matrix-vector product.
+    """
+
+    def __init__(self, index_version: str):
+        self.index_version = index_version
+        self.matrix: np.ndarray | None = None
+        self.entries: list[dict[str, Any]] = []
+        self.last_used: list[float] = []
+
+    def find(
+        self, embedding: np.ndarray, params_hash: str, threshold: float
+    ) -> tuple[int, float] | None:
+        if self.matrix is None or len(self.entries) == 0:
+            return None
+        if self.matrix.shape[1] != embedding.shape[0]:
+            return None
+        scores = self.matrix @ embedding
+        for i in np.argsort(-scores):
+            if scores[i] < threshold:
+                return None
+            if self.entries[i]["params_hash"] == params_hash:
+                return int(i), float(scores[i])
+        return None
+
+    def add(self, embedding: np.ndarray, entry: dict[str, Any], max_entries: int):
+        if self.matrix is None or self.matrix.shape[1] != embedding.shape[0]:
+            # First entry or the embedding model was changed
+            self.matrix = embedding[np.newaxis, :]
+            self.entries = [entry]
+            self.last_used = [time.time()]
+        else:
+            self.matrix = np.vstack([self.matrix, embedding])
+            self.entries.append(entry)
+            self.last_used.append(time.time())
+        while len(self.entries) > max_entries:
+            self.remove(int(np.argmin(self.last_used)))
+
+    def remove(self, i: int):
+        self.matrix = np.delete(self.matrix, i, axis=0)
+        del self.entries[i]
+        del self.last_used[i]
+
+
+class SemanticAnswerCache:
+    """
+    Cache of the answers of a project keyed by the similarity of the query embeddings,
+    so that paraphrased questions get the same answer. An entry is only used if the
+    other query parameters are identical and the project was not reindexed since.
+    The answers are written to disk `write_delay` seconds after they change.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        projects: list[str],
+        max_entries: int,
+        threshold: float,
+        write_delay: float = 0,
+    ):
+        self.enabled = enabled
+        self.enabled_projects = set(projects)
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.projects: dict[str, ProjectAnswers] = {}
+        self.hits = 0
+        self.misses = 0
+        self._locks: dict[str, asyncio.Lock] = {}
+        # Separate, so that the lookups do not wait for a write
+        self._write_locks: dict[str, asyncio.Lock] = {}
+        self._writer = DelayedProjectWriter(write_delay, self._write)
+
+    @staticmethod
+    def _cache_file(project_dir: Path) -> Path:
+        return project_dir / "cache" / SEMANTIC_CACHE_FILE
+
+    def _lock(self, project_dir: Path) -> asyncio.Lock:
+        return self._locks.setdefault(project_dir.as_posix(), asyncio.Lock())
+
+    def is_enabled(self, project_dir: Path) -> bool:
+        if not self.enabled:
+            return False
+        if not self.enabled_projects:
+            return True
+        return (
+            f"{project_dir.parent.parent.name}/{project_dir.name}"
+            in self.enabled_projects
+        )
+
+    async def _answers(self, project_dir: Path) -> ProjectAnswers:
+        # Concurrent first requests share a single load
+        async with self._lock(project_dir):
+            return await asyncio.to_thread(self._load, project_dir)
+
+    def _load(self, project_dir: Path) -> ProjectAnswers:
+        posix_path = project_dir.as_posix()
+        index_version = get_index_version(project_dir)
+        answers = self.projects.get(posix_path)
+        if answers is not None and answers.index_version == index_version:
+            return answers
+        if answers is None:
+            answers = self._read(project_dir)
+        if answers is None or answers.index_version != index_version:
+            logger.info(f"Semantic answer cache of {project_dir} is empty or outdated")
+            answers = ProjectAnswers(index_version)
+            self._cache_file(project_dir).unlink(missing_ok=True)
+        self.projects[posix_path] = answers
+        return answers
+
+    def _read(self, project_dir: Path) -> ProjectAnswers | None:
+        cache_file = self._cache_file(project_dir)
+        if not cache_file.exists():
+            return None
+        try:
+            with open(cache_file, "rb") as f:
+                stored = pickle.load(f)
+            answers = ProjectAnswers(stored["index_version"])
+            answers.matrix = stored["matrix"]
+            answers.entries = stored["entries"]
+            answers.last_used = stored["last_used"]
+            return answers
+        except Exception as e:
+            logger.warning(f"Ignoring invalid semantic answer cache {cache_file}: {e}")
+            return None
+
+    async def get(
+        self, project_dir: Path, embedding: Any, params_hash: str
+    ) -> dict[str, Any] | None:
+        answers = await self._answers(project_dir)
+        found = answers.find(_normalize(embedding), params_hash, self.threshold)
+        if found is None:
+            self.misses += 1
+            return None
+        i, similarity = found
+        answers.last_used[i] = time.time()
+        self.hits += 1
+        return {**answers.entries[i], "similarity": similarity}
+
+    async def set(
+        self,
+        project_dir: Path,
+        query: str,
+        embedding: Any,
+        params_hash: str,
+        answer: dict[str, Any],
+    ):
+        answers = await self._answers(project_dir)
+        entry = {
+            "query": query,
+            "params_hash": params_hash,
+            "context_hash": hash_context(answer.get("context")),
+            "index_version": answers.index_version,
+            "timestamp": time.time(),
+            **answer,
+        }
+        answers.add(_normalize(embedding), entry, self.max_entries)
+        self._writer.schedule(project_dir)
+
+    async def _write(self, project_dir: Path):
+        answers = self.projects.get(project_dir.as_posix())
+        if answers is None:
+            return
+        stored = {
+            "index_version": answers.index_version,
+            "matrix": answers.matrix,
+            "entries": list(answers.entries),
+            "last_used": list(answers.last_used),
+        }
+        write_lock = self._write_locks.setdefault(
+            project_dir.as_posix(), asyncio.Lock()
+        )
+        async with write_lock:
+            await asyncio.to_thread(self._persist, project_dir, stored)
+
+    async def flush(self):
+        """Writes the changed answers of all projects."""
+        await self._writer.flush()
+
+    def _persist(self, project_dir: Path, stored: dict[str, Any]):
+        if not project_dir.exists():
+            return  # The project was deleted in the meantime
+        if stored["index_version"] != get_index_version(project_dir):
+            return  # The project was reindexed in the meantime
+        cache_file = self._cache_file(project_dir)
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_suffix(".tmp")
+        with open(tmp_file, "wb") as f:
+            pickle.dump(stored, f)
+        tmp_file.replace(cache_file)
+
+    def clear(self, project_dir: Path):
+        self._writer.cancel(project_dir)
+        self.projects.pop(project_dir.as_posix(), None)
+        self._cache_file(project_dir).unlink(missing_ok=True)
+
+    def stats(self) -> dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total > 0 else 0.0,
+            "projects": len(self.projects),
+            "entries": sum(len(a.entries) for a in self.projects.values()),
+        }
+
+
+semantic_answer_cache = SemanticAnswerCache(
+    lightrag_cfg.lightrag_semantic_cache,
+    lightrag_cfg.lightrag_semantic_cache_projects,
+    lightrag_cfg.lightrag_semantic_cache_size,
+    lightrag_cfg.lightrag_semantic_cache_threshold,
+    lightrag_cfg.lightrag_cache_write_delay,
+)
@@ -3,6 +3,7 @@ import json
 
 import jiter
 
+from graphrag_kb_server.service.lightrag.lightrag_versions import get_working_dir
 from graphrag_kb_server.utils.cache import GenericProjectSimpleCache
 
 lightrag_summary_cache = GenericProjectSimpleCache[dict](timeout=3600 * 24)
@@ -18,7 +19,7 @@ def get_summary(project_dir: Path, file_path: str) -> str | None:
         with open(summary_file_path, "r", encoding="utf-8") as f:
             summary_dict = jiter.from_json(f.read().encode(encoding="utf-8"))
             return summary_dict.get(file_path)
-    kv_store_doc_status_path = project_dir / "lightrag/kv_store_doc_status.json"
+    kv_store_doc_status_path = get_working_dir(project_dir) / "kv_store_doc_status.json"
     if not kv_store_doc_status_path.exists():
         return None
     doc_summary_dict = {}
@@ -0,0 +1,201 @@
+import asyncio
+import hashlib
+import json
+import pickle
+from pathlib import Path
+from typing import Any, Iterable
+
+from lightrag import LightRAG
+from lightrag.utils import Tokenizer
+
+from graphrag_kb_server.logger import logger
+from graphrag_kb_server.service.lightrag.lightrag_chunk_store import ChunkFileKVStorage
+from graphrag_kb_server.service.lightrag.lightrag_versions import get_working_dir
+from graphrag_kb_server.utils.cache import GenericProjectSimpleCache
+
+TOKEN_COUNTS_FILE = "token_counts.pkl"
+# Number of new token counts after which the counts are written to disk again.
+SAVE_THRESHOLD = 200
+
+
+def _digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def serialize_fragment(item: dict[str, Any]) -> str:
+    """Canonical JSON serialization of an entity, relation or chunk in the LLM context."""
+    return json.dumps(item, ensure_ascii=False)
+
+
+class TokenCountCache:
+    """
+    Token counts of the serialized entities, relations and chunks of a project, keyed by
+    the digest of the serialized fragment. The counts are computed once, persisted next
+    to the LightRAG storages and reused by the truncation and context assembly.
+    """
+
+    def __init__(self, project_dir: Path, tokenizer: Tokenizer):
+        self.project_dir = project_dir
+        self.tokenizer = tokenizer
+        self.counts: dict[bytes, int] = {}
+        self.unsaved = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def counts_file(self) -> Path:
+        return get_working_dir(self.project_dir) / TOKEN_COUNTS_FILE
+
+    def count(self, text: str) -> int:
+        key = _digest(text)
+        count = self.counts.get(key)
+        if count is not None:
+            self.hits += 1
+            return count
+        self.misses += 1
+        count = len(self.tokenizer.encode(text))
+        self.counts[key] = count
+        self.unsaved += 1
+        return count
+
+    def fragment_and_count(self, item: dict[str, Any]) -> tuple[str, int]:
+        fragment = serialize_fragment(item)
+        return fragment, self.count(fragment)
+
+    def truncate(
+        self, items: list[dict[str, Any]], max_token_size: int
+    ) -> tuple[list[dict[str, Any]], list[str], int]:
+        """
+        Same semantics as lightrag.utils.truncate_list_by_token_size, but uses the cached counts.
+        Returns the kept items, their serialized fragments and their total token count.
+        """
+        if max_token_size <= 0:
+            return [], [], 0
+        fragments = []
+        tokens = 0
+        for i, item in enumerate(items):
+            fragment, count = self.fragment_and_count(item)
+            if tokens + count > max_token_size:
+                return items[:i], fragments, tokens
+            tokens += count
+            fragments.append(fragment)
+        return items, fragments, tokens
+
+    def load(self):
+        if self.counts_file.exists():
+            try:
+                with open(self.counts_file, "rb") as f:
+                    self.counts.update(pickle.load(f))
+            except Exception as e:
+                logger.warning(f"Could not read token counts {self.counts_file}: {e}")
+
+    def save(self):
+        if not self.counts_file.parent.exists():
+            return
+        tmp_file = self.counts_file.with_suffix(".tmp")
+        with open(tmp_file, "wb") as f:
+            pickle.dump(dict(self.counts), f)
+        tmp_file.replace(self.counts_file)
+        self.unsaved = 0
+
+    async def save_if_needed(self):
+        if self.unsaved >= SAVE_THRESHOLD:
+            self.unsaved = 0
+            await asyncio.to_thread(self.save)
+
+
+token_count_cache = GenericProjectSimpleCache[TokenCountCache]()
+
+
+def _storage_fragments(
+    rag: LightRAG, chunks: Iterable[tuple[str, dict[str, Any]]]
+) -> list[str]:
+    """Builds the fragments exactly as they are serialized during the query truncation."""
+    fragments = []
+    graph = getattr(rag.chunk_entity_relation_graph, "_graph", None)
+    if graph is not None:
+        for node_id, data in graph.nodes(data=True):
+            fragments.append(
+                serialize_fragment(
+                    {
+                        "entity": node_id,
+                        "type": data.get("entity_type", "UNKNOWN"),
+                        "description": data.get("description", "UNKNOWN"),
+                    }
+                )
+            )
+        for src, tgt, data in graph.edges(data=True):
+            fragments.append(
+                serialize_fragment(
+                    {
+                        "entity1": src,
+                        "entity2": tgt,
+                        "description": data.get("description", "UNKNOWN"),
+                    }
+                )
+            )
+    for chunk_id, chunk in chunks:
+        if not isinstance(chunk, dict) or "content" not in chunk:
+            continue
+        fragments.append(
+            serialize_fragment(
+                {
+                    "content": chunk["content"],
+                    "file_path": chunk.get("file_path", "unknown_source"),
+                    "chunk_id": chunk_id,
+                }
+            )
+        )
+    return fragments
+
+
+async def _chunk_records(rag: LightRAG) -> Iterable[tuple[str, dict[str, Any]]]:
+    if isinstance(rag.text_chunks, ChunkFileKVStorage):
+        return await rag.text_chunks.iter_records()
+    return list((getattr(rag.text_chunks, "_data", None) or {}).items())
+
+
+def _precompute(
+    cache: TokenCountCache,
+    rag: LightRAG,
+    chunks: Iterable[tuple[str, dict[str, Any]]],
+) -> dict[bytes, int]:
+    counts = {}
+    for fragment in _storage_fragments(rag, chunks):
+        key = _digest(fragment)
+        if key not in cache.counts:
+            counts[key] = len(cache.tokenizer.encode(fragment))
+    return counts
+
+
+async def precompute_token_counts(project_dir: Path, rag: LightRAG) -> TokenCountCache:
+    """Computes the token counts of all entities, relations and chunks and persists them."""
+    cache = await get_token_count_cache(project_dir, rag.tokenizer, precompute=False)
+    chunks = await _chunk_records(rag)
+    counts = await asyncio.to_thread(_precompute, cache, rag, chunks)
+    cache.counts.update(counts)
+    await asyncio.to_thread(cache.save)
+    logger.info(f"Precomputed {len(counts)} token counts for {project_dir}")
+    return cache
+
+
+async def get_token_count_cache(
+    project_dir: Path, tokenizer: Tokenizer, precompute: bool = True
+) -> TokenCountCache:
+    cache = token_count_cache.get(project_dir)
+    if cache is not None:
+        return cache
+    cache = TokenCountCache(project_dir, tokenizer)
+    token_count_cache.set(project_dir, cache)
+    await asyncio.to_thread(cache.load)
+    if precompute and not cache.counts_file.exists():
+        from graphrag_kb_server.service.lightrag.lightrag_init import initialize_rag
+
+        rag = await initialize_rag(project_dir)
+        # Do not block the current query; the counts fill up lazily in the meantime.
+        asyncio.create_task(precompute_token_counts(project_dir, rag))
+    return cache
+
+
+def clear_token_counts(project_dir: Path):
+    token_count_cache.clear(project_dir)
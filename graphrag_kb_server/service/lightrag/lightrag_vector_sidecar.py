@@ -0,0 +1,134 @@
+import os
+import pickle
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import nano_vectordb.dbs as nano_dbs
+from nano_vectordb import NanoVectorDB
+
+from graphrag_kb_server.logger import logger
+
+MATRIX_SUFFIX = ".matrix.npy"
+META_SUFFIX = ".meta.pkl"
+
+_json_load_storage = nano_dbs.load_storage
+_json_save = NanoVectorDB.save
+_normalize_storage = NanoVectorDB.pre_process
+
+
+def sidecar_files(storage_file: str | Path) -> tuple[Path, Path]:
+    storage_file = Path(storage_file)
+    return (
+        storage_file.with_suffix(MATRIX_SUFFIX),
+        storage_file.with_suffix(META_SUFFIX),
+    )
+
+
+def _signature(storage_file: Path) -> tuple[int, int]:
+    stat = storage_file.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def write_sidecar(storage_file: str | Path, storage: dict[str, Any]):
+    """
+    Writes the matrix of a nano-vectordb storage as .npy file and the ids and metadata
+    as a separate table. Both are tagged with the size and modification time of the JSON file.
+    """
+    storage_file = Path(storage_file)
+    matrix_file, meta_file = sidecar_files(storage_file)
+    matrix = np.ascontiguousarray(storage["matrix"], dtype=nano_dbs.Float)
+    tmp_matrix_file = matrix_file.with_suffix(".tmp")
+    with open(tmp_matrix_file, "wb") as f:
+        np.save(f, matrix)
+    tmp_matrix_file.replace(matrix_file)
+    meta = {
+        "signature": _signature(storage_file),
+        "embedding_dim": storage["embedding_dim"],
+        "rows": matrix.shape[0],
+        "data": storage["data"],
+        "additional_data": storage.get("additional_data", {}),
+    }
+    tmp_meta_file = meta_file.with_suffix(".tmp")
+    with open(tmp_meta_file, "wb") as f:
+        pickle.dump(meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+    # The metadata is written last, so that it is only valid with a complete matrix.
+    tmp_meta_file.replace(meta_file)
+
+
+def read_sidecar(storage_file: str | Path) -> dict[str, Any] | None:
+    """Returns the storage with a memory-mapped matrix, or None if the sidecar is missing or outdated."""
+    storage_file = Path(storage_file)
+    matrix_file, meta_file = sidecar_files(storage_file)
+    if not matrix_file.exists() or not meta_file.exists():
+        return None
+    try:
+        with open(meta_file, "rb") as f:
+            meta = pickle.load(f)
+        if meta["signature"] != _signature(storage_file):
+            return None
+        # Copy on write: the pages are shared with the page cache until they are modified
+        matrix = np.load(matrix_file, mmap_mode="c")
+        if matrix.shape != (meta["rows"], meta["embedding_dim"]):
+            return None
+    except Exception as e:
+        logger.warning(f"Ignoring invalid vector storage sidecar {meta_file}: {e}")
+        return None
+    storage = {
+        "embedding_dim": meta["embedding_dim"],
+        "data": meta["data"],
+        "matrix": matrix,
+    }
+    if meta["additional_data"]:
+        storage["additional_data"] = meta["additional_data"]
+    return storage
+
+
+def load_vector_storage(file_name: str | Path) -> dict[str, Any] | None:
+    """
+    Replacement of nano_vectordb.dbs.load_storage which prefers the sidecar files and
+    (re)generates them from the JSON file when they are missing or outdated.
+    """
+    if not os.path.exists(file_name):
+        return None
+    storage = read_sidecar(file_name)
+    if storage is not None:
+        return storage
+    storage = _json_load_storage(file_name)
+    if storage is not None:
+        try:
+            # Stored normalized, as the cosine metric normalizes the matrix on load
+            write_sidecar(
+                file_name,
+                {**storage, "matrix": nano_dbs.normalize(storage["matrix"])},
+            )
+        except Exception as e:
+            logger.warning(
+                f"Could not write the vector storage sidecar of {file_name}: {e}"
+            )
+    return storage
+
+
+def _pre_process(self: NanoVectorDB):
+    storage = getattr(self, "_NanoVectorDB__storage")
+    if isinstance(storage["matrix"], np.memmap):
+        # Sidecar matrices are normalized already. Normalizing would copy them into memory.
+        return
+    _normalize_storage(self)
+
+
+def _save(self: NanoVectorDB):
+    _json_save(self)
+    try:
+        write_sidecar(self.storage_file, getattr(self, "_NanoVectorDB__storage"))
+    except Exception as e:
+        logger.warning(
+            f"Could not write the vector storage sidecar of {self.storage_file}: {e}"
+        )
+
+
+def install_vector_sidecar():
+    """Makes nano-vectordb read and write the sidecar files."""
+    nano_dbs.load_storage = load_vector_storage
+    NanoVectorDB.pre_process = _pre_process
+    NanoVectorDB.save = _save
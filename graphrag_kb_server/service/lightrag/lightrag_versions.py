@@ -0,0 +1,95 @@
+import json
+import re
+import shutil
+from pathlib import Path
+from typing import Any
+
+from graphrag_kb_server.logger import logger
+from graphrag_kb_server.service.lightrag.lightrag_constants import LIGHTRAG_FOLDER
+
+VERSION_FILE = "lightrag_version.json"
+VERSION_DIR_PATTERN = re.compile(rf"^{LIGHTRAG_FOLDER}\.v(\d+)$")
+# Files written by the server into the working directory which an incremental index keeps
+STAGING_IGNORED_FILES = shutil.ignore_patterns("*.tmp", "knowledge_graph.html")
+# Files of the project folder derived from the graph of the served version, generated on request
+GRAPH_DERIVED_FILES = ["communities_*.json", "communities_*.gexf"]
+
+
+def read_project_version(project_dir: Path) -> dict[str, Any]:
+    """
+    The served version of a project and its LightRAG working directory. Projects indexed
+    before the versioning use the 'lightrag' folder as version 0.
+    """
+    version_file = project_dir / VERSION_FILE
+    if version_file.exists():
+        try:
+            return json.loads(version_file.read_text(encoding="utf-8"))
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning(f"Invalid project version file {version_file}: {e}")
+    return {"version": 0, "working_dir": LIGHTRAG_FOLDER}
+
+
+def get_project_version(project_dir: Path) -> int:
+    return read_project_version(project_dir)["version"]
+
+
+def get_working_dir(project_dir: Path) -> Path:
+    """The LightRAG working directory of the served version of the project."""
+    return project_dir / read_project_version(project_dir)["working_dir"]
+
+
+def version_working_dir(project_dir: Path, version: int) -> Path:
+    return project_dir / f"{LIGHTRAG_FOLDER}.v{version}"
+
+
+def create_staging_dir(project_dir: Path, incremental: bool) -> tuple[int, Path]:
+    """
+    Creates the working directory of the next version. An incremental index starts
+    from a copy of the served version, a full index from an empty directory.
+    """
+    version = get_project_version(project_dir) + 1
+    staging_dir = version_working_dir(project_dir, version)
+    if staging_dir.exists():
+        # Left over from a failed index
+        shutil.rmtree(staging_dir)
+    served_dir = get_working_dir(project_dir)
+    if incremental and served_dir.exists():
+        shutil.copytree(served_dir, staging_dir, ignore=STAGING_IGNORED_FILES)
+    else:
+        staging_dir.mkdir(parents=True)
+    return version, staging_dir
+
+
+def publish_version(project_dir: Path, version: int, working_dir: Path):
+    """Atomically switches the served version of the project."""
+    version_file = project_dir / VERSION_FILE
+    tmp_file = version_file.with_suffix(".tmp")
+    tmp_file.write_text(
+        json.dumps({"version": version, "working_dir": working_dir.name}),
+        encoding="utf-8",
+    )
+    tmp_file.replace(version_file)
+
+
+def remove_graph_derived_files(project_dir: Path):
+    """Deletes the files derived from the graph of the previous version, e.g. its communities."""
+    for pattern in GRAPH_DERIVED_FILES:
+        for derived_file in project_dir.glob(pattern):
+            derived_file.unlink(missing_ok=True)
+            logger.info(f"Removed {derived_file} of the previous project version")
+
+
+def remove_retired_versions(project_dir: Path, keep: list[Path]):
+    """
+    Deletes the working directories of old versions, except the ones to keep,
+    e.g. the previous version which in-flight queries may still read.
+    """
+    keep_names = {p.name for p in keep}
+    for candidate in project_dir.iterdir():
+        if not candidate.is_dir() or candidate.name in keep_names:
+            continue
+        if candidate.name == LIGHTRAG_FOLDER or VERSION_DIR_PATTERN.match(
+            candidate.name
+        ):
+            shutil.rmtree(candidate, ignore_errors=True)
+            logger.info(f"Removed retired project version {candidate}")
@@ -7,6 +7,7 @@ import networkx as nx
 from graphrag_kb_server.service.lightrag.lightrag_graph_support import (
     create_network_from_project_dir,
 )
+from graphrag_kb_server.service.lightrag.lightrag_versions import get_working_dir
 
 
 def _create_styled_network(G: nx.Graph) -> Network:
@@ -27,7 +28,7 @@ def _create_styled_network(G: nx.Graph) -> Network:
 
 
 def get_output_path(project_dir: Path) -> Path:
-    return project_dir / "lightrag" / "knowledge_graph.html"
+    return get_working_dir(project_dir) / "knowledge_graph.html"
 
 
 def generate_lightrag_graph_visualization(project_dir: Path) -> Path:
@@ -21,7 +21,10 @@ ACCEPTED_EXTENSIONS = set([".txt", ".md"])
 type DocLinks = list[tuple[str, list[str]]]
 
 
-async def save_links(project_dir: Path, insert_if_not_exists: bool = False):
+async def save_links(
+    project_dir: Path, insert_if_not_exists: bool = False, replace: bool = False
+):
+    """Extracts the links of the input files. With `replace`, they replace the saved links."""
     simple_project = extract_elements_from_path(project_dir)
     project_id = await get_project_id(
         simple_project.schema_name,
@@ -29,10 +32,13 @@ async def save_links(project_dir: Path, insert_if_not_exists: bool = False):
         simple_project.engine.value,
         create_if_not_exists=True,
     )
-    existing_links = await find_path_links(simple_project.schema_name, project_id)
-    if len(existing_links) > 0:
-        logger.info(f"Links already exist for project {simple_project.project_name}")
-        return
+    if not replace:
+        existing_links = await find_path_links(simple_project.schema_name, project_id)
+        if len(existing_links) > 0:
+            logger.info(
+                f"Links already exist for project {simple_project.project_name}"
+            )
+            return
     links = extract_links(project_dir)
     verified_links = await verify_links(links)
     path_links = [
@@ -40,7 +46,12 @@ async def save_links(project_dir: Path, insert_if_not_exists: bool = False):
         for file_path, links in verified_links
         for link in links
     ]
-    await save_path_links(simple_project.schema_name, path_links, insert_if_not_exists)
+    await save_path_links(
+        simple_project.schema_name,
+        path_links,
+        insert_if_not_exists,
+        project_id if replace else None,
+    )
 
 
 async def verify_links(doc_links: DocLinks) -> DocLinks:
@@ -111,4 +122,4 @@ URL: https://www.onepointltd.com/onepoint-labs/
 Last Scraped: 2025-08-09 14:11:04
 Content Type: Web Page
 """)
-    print(links)
\ No newline at end of file
+    print(links)
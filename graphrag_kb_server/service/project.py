@@ -19,12 +19,30 @@ from graphrag_kb_server.model.engines import Engine
 from graphrag_kb_server.service.db.common_operations import extract_elements_from_path
 from graphrag_kb_server.service.db.db_persistence_project import delete_project
 from graphrag_kb_server.service.docs_image_extraction import extract_images_from_docx
+from graphrag_kb_server.service.file_find_service import (
+    INPUT_FOLDER,
+    ORIGINAL_INPUT_FOLDER,
+)
 from graphrag_kb_server.service.last_updated_service import save_path_properties
 from graphrag_kb_server.service.lightrag.lightrag_constants import LIGHTRAG_FOLDER
 from graphrag_kb_server.service.lightrag.lightrag_init import (
     initialize_rag,
     lightrag_cache,
 )
+from graphrag_kb_server.service.lightrag.lightrag_graph_snapshot import (
+    release_project_graph,
+)
+from graphrag_kb_server.service.lightrag.lightrag_keyword_cache import keyword_cache
+from graphrag_kb_server.service.lightrag.lightrag_keyword_matcher import (
+    clear_keyword_matcher,
+)
+from graphrag_kb_server.service.lightrag.lightrag_semantic_cache import (
+    semantic_answer_cache,
+)
+from graphrag_kb_server.service.lightrag.lightrag_token_cache import clear_token_counts
+from graphrag_kb_server.service.reference_index_service import (
+    invalidate_reference_index,
+)
 from graphrag_kb_server.service.link_extraction_service import save_links
 from graphrag_kb_server.service.pdf_image_extraction import extract_images_from_pdfs
 
@@ -60,9 +78,21 @@ async def clear_rag(rag_folder: Path) -> bool:
     )
     # Delete also the cache
     lightrag_cache.clear(rag_folder)
+    keyword_cache.clear(rag_folder)
+    clear_keyword_matcher(rag_folder)
+    release_project_graph(rag_folder)
+    semantic_answer_cache.clear(rag_folder)
+    invalidate_reference_index(rag_folder)
+    clear_token_counts(rag_folder)
     return deleted
 
 
+def clear_project_input(project_folder: Path):
+    """Deletes the uploaded files of a project but keeps its served index."""
+    for folder in (INPUT_FOLDER, ORIGINAL_INPUT_FOLDER):
+        shutil.rmtree(project_folder / folder, ignore_errors=True)
+
+
 def list_projects(tennants_dir: Path) -> EngineProjectListing:
     if not tennants_dir.exists():
         return EngineProjectListing(
@@ -155,6 +185,11 @@ async def initialize_projects():
                     / LIGHTRAG_FOLDER
                     / project.name
                 )
+                if not lightrag_cache.has_capacity():
+                    logger.info(
+                        f"Memory budget reached, {project_folder} is loaded on its first query"
+                    )
+                    continue
                 await initialize_rag(project_folder)
                 if cfg.extract_links_on_start:
                     await prepare_project_extras(project_folder)
@@ -169,3 +204,4 @@ async def prepare_project_extras(project_folder: Path):
     await extract_images_from_pdfs(project_folder)
     await extract_images_from_docx(project_folder, image_format="png")
     await save_path_properties(project_folder, insert_if_not_exists=True)
+    invalidate_reference_index(project_folder)
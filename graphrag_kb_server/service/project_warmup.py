@@ -0,0 +1,153 @@
+import asyncio
+from datetime import datetime
+from enum import StrEnum
+from pathlib import Path
+from typing import Any
+
+from graphrag_kb_server.config import cfg
+from graphrag_kb_server.logger import logger
+from graphrag_kb_server.model.engines import Engine
+from graphrag_kb_server.service.db.db_persistence_search import (
+    find_last_search_by_project,
+)
+from graphrag_kb_server.service.lightrag.lightrag_constants import LIGHTRAG_FOLDER
+from graphrag_kb_server.service.lightrag.lightrag_init import (
+    initialize_rag,
+    lightrag_cache,
+)
+from graphrag_kb_server.service.tennant import list_tennants
+
+
+class WarmState(StrEnum):
+    COLD = "cold"
+    WARMING = "warming"
+    WARM = "warm"
+    FAILED = "failed"
+
+
+async def _last_searches(tennant_folder: str) -> dict[str, datetime]:
+    try:
+        return await find_last_search_by_project(tennant_folder, Engine.LIGHTRAG.value)
+    except Exception as e:
+        logger.warning(f"Cannot read the search history of {tennant_folder}: {e}")
+        return {}
+
+
+async def list_projects_by_usage() -> list[Path]:
+    """
+    The LightRAG project folders of all tennants, the most recently searched first.
+    Projects without searches follow, the most recently updated first.
+    """
+    # Imported here, as the project service imports the web layer
+    from graphrag_kb_server.service.project import list_projects
+
+    ranked = []
+    for tennant in list_tennants():
+        tennant_dir = cfg.graphrag_root_dir_path / tennant.folder_name
+        try:
+            projects = list_projects(tennant_dir).lightrag_projects.projects
+        except Exception as e:
+            logger.exception(f"Cannot list the projects of {tennant.folder_name}: {e}")
+            continue
+        if not projects:
+            continue
+        last_searches = await _last_searches(tennant.folder_name)
+        for project in projects:
+            last_search = last_searches.get(project.name)
+            ranked.append(
+                (
+                    last_search is not None,
+                    (last_search or project.updated_timestamp).timestamp(),
+                    tennant_dir / LIGHTRAG_FOLDER / project.name,
+                )
+            )
+    ranked.sort(key=lambda r: (r[0], r[1]), reverse=True)
+    return [project_folder for _, _, project_folder in ranked]
+
+
+class ProjectWarmup:
+    """
+    Loads the projects in the background after the server has started, with a limited
+    number of concurrent loads. Projects which are not warm yet are loaded on their first query.
+    """
+
+    def __init__(self):
+        self.projects: list[Path] = []
+        self.warming: set[str] = set()
+        self.failed: set[str] = set()
+        self.started = False
+        self.finished = False
+        self.task: asyncio.Task | None = None
+
+    def start(self) -> asyncio.Task:
+        self.task = asyncio.create_task(self.warm_up(cfg.startup_warmup_concurrency))
+        return self.task
+
+    def stop(self):
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+
+    async def warm_up(self, concurrency: int):
+        from graphrag_kb_server.service.project import prepare_project_extras
+
+        self.started = True
+        try:
+            self.projects = await list_projects_by_usage()
+            logger.info(f"Warming up {len(self.projects)} projects in the background")
+            semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+            async def warm_project(project_folder: Path):
+                posix_path = project_folder.as_posix()
+                async with semaphore:
+                    if not lightrag_cache.has_capacity():
+                        logger.info(
+                            f"Memory budget reached, {project_folder} is loaded on its first query"
+                        )
+                        return
+                    self.warming.add(posix_path)
+                    try:
+                        await initialize_rag(project_folder)
+                        if cfg.extract_links_on_start:
+                            await prepare_project_extras(project_folder)
+                    except Exception as e:
+                        self.failed.add(posix_path)
+                        logger.exception(f"Error warming up {project_folder}: {e}")
+                    finally:
+                        self.warming.discard(posix_path)
+
+            # Tasks are created in order of usage and acquire the semaphore in that order
+            await asyncio.gather(*[warm_project(p) for p in self.projects])
+        finally:
+            self.finished = True
+            logger.info(f"Warm-up finished: {self.snapshot()['counts']}")
+
+    def state(self, project_folder: Path) -> WarmState:
+        posix_path = project_folder.as_posix()
+        if posix_path in self.warming:
+            return WarmState.WARMING
+        if posix_path in lightrag_cache.projects:
+            return WarmState.WARM
+        if posix_path in self.failed:
+            return WarmState.FAILED
+        return WarmState.COLD
+
+    def is_ready(self) -> bool:
+        return self.started and self.finished
+
+    def snapshot(self) -> dict[str, Any]:
+        projects = [
+            {"project": "/".join(p.parts[-3::2]), "state": self.state(p).value}
+            for p in self.projects
+        ]
+        counts = {state.value: 0 for state in WarmState}
+        for project in projects:
+            counts[project["state"]] += 1
+        return {
+            "ready": self.is_ready(),
+            "total": len(projects),
+            "counts": counts,
+            "projects": projects,
+        }
+
+
+project_warmup = ProjectWarmup()
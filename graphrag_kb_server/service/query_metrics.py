@@ -0,0 +1,237 @@
+import bisect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Iterator, TypeVar
+
+from graphrag_kb_server.logger import logger
+
+T = TypeVar("T")
+
+# Upper bounds of the latency histogram buckets in milliseconds. The last bucket is unbounded.
+LATENCY_BUCKETS_MS = [
+    5,
+    10,
+    25,
+    50,
+    100,
+    250,
+    500,
+    1000,
+    2500,
+    5000,
+    10000,
+    30000,
+    60000,
+]
+
+SPAN_KEYWORDS = "keywords"
+SPAN_QUERY_EMBEDDING = "query_embedding"
+SPAN_NODE_DATA = "node_data"
+SPAN_EDGE_DATA = "edge_data"
+SPAN_VECTOR_CHUNKS = "vector_chunks"
+SPAN_KG_SEARCH = "kg_search"
+SPAN_TRUNCATION = "truncation"
+SPAN_MERGE_CHUNKS = "merge_chunks"
+SPAN_REFERENCE_LOOKUP = "reference_lookup"
+SPAN_BUILD_CONTEXT = "build_context"
+SPAN_LLM_FIRST_TOKEN = "llm_first_token"
+SPAN_LLM_GENERATION = "llm_generation"
+SPAN_TOTAL = "total"
+
+
+class QueryTrace:
+    """Latency spans of a single query, labelled with the project and the search mode."""
+
+    def __init__(self, project: str, mode: str):
+        self.project = project
+        self.mode = mode
+        self.start = time.perf_counter()
+        self.spans: dict[str, float] = {}
+        self.llm_start: float | None = None
+        self.finished = False
+
+    def record(self, name: str, elapsed_ms: float):
+        # Spans which run several times per query (e.g. on retries) are accumulated.
+        self.spans[name] = self.spans.get(name, 0.0) + elapsed_ms
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000)
+
+    def timings_ms(self) -> dict[str, float]:
+        return {name: round(elapsed, 2) for name, elapsed in self.spans.items()}
+
+    def finish(self):
+        if self.finished:
+            return
+        self.finished = True
+        self.record(SPAN_TOTAL, (time.perf_counter() - self.start) * 1000)
+        query_metrics.observe(self)
+
+
+class LatencyHistogram:
+
+    def __init__(self):
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, elapsed_ms: float):
+        self.bucket_counts[bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def percentile(self, p: float) -> float:
+        """Upper bound of the bucket containing the percentile (max for the open bucket)."""
+        if self.count == 0:
+            return 0.0
+        rank = p * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.bucket_counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return (
+                    float(LATENCY_BUCKETS_MS[i])
+                    if i < len(LATENCY_BUCKETS_MS)
+                    else self.max_ms
+                )
+        return self.max_ms
+
+    def add(self, other: "LatencyHistogram"):
+        for i, bucket_count in enumerate(other.bucket_counts):
+            self.bucket_counts[i] += bucket_count
+        self.count += other.count
+        self.total_ms += other.total_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+
+    def since(self, previous: "LatencyHistogram") -> "LatencyHistogram":
+        """
+        The observations made after `previous`, an earlier copy of this histogram.
+        The maximum cannot be split and remains the overall one.
+        """
+        histogram = LatencyHistogram()
+        histogram.bucket_counts = [
+            current - before
+            for current, before in zip(self.bucket_counts, previous.bucket_counts)
+        ]
+        histogram.count = self.count - previous.count
+        histogram.total_ms = self.total_ms - previous.total_ms
+        histogram.max_ms = self.max_ms if histogram.count else 0.0
+        return histogram
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "buckets": {
+                **{
+                    f"le_{bound}": count
+                    for bound, count in zip(LATENCY_BUCKETS_MS, self.bucket_counts)
+                },
+                "le_inf": self.bucket_counts[-1],
+            },
+        }
+
+
+class QueryMetrics:
+    """Aggregates the spans of all queries into histograms per project, mode and span."""
+
+    def __init__(self):
+        self.histograms: dict[tuple[str, str, str], LatencyHistogram] = {}
+
+    def observe(self, trace: QueryTrace):
+        for name, elapsed_ms in trace.spans.items():
+            key = (trace.project, trace.mode, name)
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = LatencyHistogram()
+                self.histograms[key] = histogram
+            histogram.observe(elapsed_ms)
+        logger.info(
+            f"Query timings for {trace.project} ({trace.mode}): {trace.timings_ms()}"
+        )
+
+    def snapshot(self, project: str | None = None) -> list[dict[str, Any]]:
+        return [
+            {"project": p, "mode": mode, "span": span, **histogram.as_dict()}
+            for (p, mode, span), histogram in sorted(self.histograms.items())
+            if project is None or p == project
+        ]
+
+    def project_totals(self) -> dict[str, LatencyHistogram]:
+        """The total query latency per project, over all search modes."""
+        totals: dict[str, LatencyHistogram] = {}
+        for (project, _, span), histogram in list(self.histograms.items()):
+            if span == SPAN_TOTAL:
+                totals.setdefault(project, LatencyHistogram()).add(histogram)
+        return totals
+
+    def reset(self):
+        self.histograms.clear()
+
+
+query_metrics = QueryMetrics()
+
+_current_trace: ContextVar[QueryTrace | None] = ContextVar("query_trace", default=None)
+
+
+def project_label(project_dir: Path) -> str:
+    return f"{project_dir.parent.parent.name}/{project_dir.name}"
+
+
+def start_trace(project_dir: Path, mode: str) -> QueryTrace:
+    trace = QueryTrace(project_label(project_dir), mode)
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> QueryTrace | None:
+    return _current_trace.get()
+
+
+async def timed(name: str, awaitable: Awaitable[T]) -> T:
+    """Awaits and records a span, so that concurrently gathered operations are timed individually."""
+    with trace_span(name):
+        return await awaitable
+
+
+@contextmanager
+def trace_span(name: str) -> Iterator[None]:
+    """Records a span on the trace of the current query, if there is one."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    with trace.span(name):
+        yield
+
+
+async def traced_stream(
+    response_iterator: AsyncIterator, trace: QueryTrace, start: float
+) -> AsyncIterator:
+    """
+    Records the time to first token and the generation time of a streamed response.
+    `start` is the perf_counter value taken when the LLM was called.
+    """
+    first = True
+    try:
+        async for chunk in response_iterator:
+            if first:
+                trace.record(SPAN_LLM_FIRST_TOKEN, (time.perf_counter() - start) * 1000)
+                first = False
+            yield chunk
+    finally:
+        trace.record(SPAN_LLM_GENERATION, (time.perf_counter() - start) * 1000)
+        trace.finish()
@@ -0,0 +1,242 @@
+import random
+import threading
+import weakref
+from dataclasses import dataclass, field
+
+import networkx as nx
+import numpy as np
+from numba import njit
+
+from graphrag_kb_server.service.lightrag.lightrag_graph_snapshot import (
+    build_csr,
+    graph_version,
+)
+
+
+@dataclass
+class GraphCSR:
+    """
+    CSR adjacency of a networkx graph: the neighbours of node i are
+    indices[indptr[i]:indptr[i + 1]] and node_ids[i] is the networkx node.
+    """
+
+    node_ids: list
+    positions: dict
+    indptr: np.ndarray
+    indices: np.ndarray
+    # Version of the graph when the adjacency was built
+    version: int
+    directed: bool = False
+    _incoming: tuple[np.ndarray, np.ndarray] | None = field(default=None, repr=False)
+
+    @staticmethod
+    def from_networkx(G: nx.Graph) -> "GraphCSR":
+        node_ids = list(G.nodes())
+        positions = {node_id: i for i, node_id in enumerate(node_ids)}
+        edge_count = G.number_of_edges()
+        edge_sources = np.fromiter(
+            (positions[s] for s, _ in G.edges()), dtype=np.int32, count=edge_count
+        )
+        edge_targets = np.fromiter(
+            (positions[t] for _, t in G.edges()), dtype=np.int32, count=edge_count
+        )
+        indptr, indices, _ = build_csr(
+            len(node_ids), edge_sources, edge_targets, G.is_directed()
+        )
+        return GraphCSR(
+            node_ids=node_ids,
+            positions=positions,
+            indptr=indptr,
+            indices=indices,
+            version=graph_version(G),
+            directed=G.is_directed(),
+        )
+
+    def incoming(self) -> tuple[np.ndarray, np.ndarray]:
+        """The CSR adjacency of the incoming edges, the same as the adjacency if undirected."""
+        if not self.directed:
+            return self.indptr, self.indices
+        if self._incoming is None:
+            sources = np.repeat(
+                np.arange(len(self.node_ids), dtype=np.int32), np.diff(self.indptr)
+            )
+            indptr, indices, _ = build_csr(
+                len(self.node_ids), self.indices, sources, True
+            )
+            self._incoming = (indptr, indices)
+        return self._incoming
+
+
+# The project graphs are shared and cached, so their adjacency is built once per graph version
+_csr_cache: weakref.WeakKeyDictionary[nx.Graph, GraphCSR] = weakref.WeakKeyDictionary()
+_csr_lock = threading.Lock()
+
+
+def get_graph_csr(G: nx.Graph) -> GraphCSR:
+    with _csr_lock:
+        csr = _csr_cache.get(G)
+        if csr is None or csr.version != graph_version(G):
+            csr = GraphCSR.from_networkx(G)
+            _csr_cache[G] = csr
+        return csr
+
+
+# xorshift64* generator: faster than the Mersenne Twister of np.random, which dominates the walk
+_MULTIPLIER = np.uint64(0x2545F4914F6CDD1D)
+_GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+_DOUBLE_SCALE = 1.0 / 2.0**53
+
+
+@njit(inline="always")
+def _next_random(state: np.uint64) -> tuple[np.uint64, float]:
+    state ^= state >> np.uint64(12)
+    state ^= state << np.uint64(25)
+    state ^= state >> np.uint64(27)
+    return state, ((state * _MULTIPLIER) >> np.uint64(11)) * _DOUBLE_SCALE
+
+
+# Not parallel: the walks of a request run in a thread of the server, and numba's parallel
+# threading layers either abort on concurrent calls or keep the process from exiting
+@njit(cache=True)
+def _random_walk_visits(
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    source: int,
+    samples: int,
+    path_length: int,
+    restart_prob: float,
+    runs: int,
+    seed: int,
+) -> np.ndarray:
+    visits = np.zeros((runs, len(indptr) - 1), dtype=np.int64)
+    for run in range(runs):
+        # One generator per run, so that the runs are independent
+        state = np.uint64(seed + run) * _GOLDEN_GAMMA + np.uint64(1)
+        run_visits = visits[run]
+        for _ in range(samples):
+            current = source
+            run_visits[current] += 1
+            for _ in range(path_length):
+                state, r = _next_random(state)
+                if r < restart_prob:
+                    current = source
+                else:
+                    start = indptr[current]
+                    degree = indptr[current + 1] - start
+                    if degree == 0:
+                        break
+                    # The same number, rescaled, picks the neighbour
+                    step = int((r - restart_prob) / (1.0 - restart_prob) * degree)
+                    current = indices[start + min(step, degree - 1)]
+                    run_visits[current] += 1
+    return visits
+
+
+def random_walk_visits(
+    G: nx.Graph,
+    source,
+    samples: int,
+    path_length: int,
+    restart_prob: float,
+    runs: int = 1,
+    seed: int | None = None,
+) -> tuple[GraphCSR, np.ndarray]:
+    """
+    Counts the visits of the nodes on random walks with restart from the source: each sample
+    starts at the source and takes up to `path_length` steps, returning to the source with
+    `restart_prob`. Returns the adjacency and the visit counts of each run (runs x nodes).
+    """
+    csr = get_graph_csr(G)
+    if seed is None:
+        seed = random.randrange(2**31)
+    visits = _random_walk_visits(
+        csr.indptr,
+        csr.indices,
+        csr.positions[source],
+        samples,
+        path_length,
+        restart_prob,
+        runs,
+        seed,
+    )
+    return csr, visits
+
+
+@njit(cache=True)
+def _personalized_pagerank(
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    incoming_indptr: np.ndarray,
+    incoming_indices: np.ndarray,
+    personalization: np.ndarray,
+    restart_prob: float,
+    tolerance: float,
+    max_iterations: int,
+) -> np.ndarray:
+    n = len(personalization)
+    scores = personalization.copy()
+    next_scores = np.empty(n)
+    shares = np.empty(n)
+    for _ in range(max_iterations):
+        dangling = 0.0
+        for i in range(n):
+            degree = indptr[i + 1] - indptr[i]
+            if degree > 0:
+                shares[i] = scores[i] / degree
+            else:
+                shares[i] = 0.0
+                dangling += scores[i]
+        restarted = restart_prob + (1 - restart_prob) * dangling
+        change = 0.0
+        for i in range(n):
+            received = 0.0
+            for j in range(incoming_indptr[i], incoming_indptr[i + 1]):
+                received += shares[incoming_indices[j]]
+            score = (1 - restart_prob) * received + restarted * personalization[i]
+            change += abs(score - scores[i])
+            next_scores[i] = score
+        scores, next_scores = next_scores, scores
+        if change < tolerance:
+            break
+    return scores
+
+
+def personalized_pagerank(
+    G: nx.Graph,
+    sources: list,
+    restart_prob: float,
+    tolerance: float = 1e-6,
+    max_iterations: int = 200,
+) -> tuple[GraphCSR, np.ndarray]:
+    """
+    Personalized PageRank of the nodes, solved with power iteration over the CSR adjacency:
+    the probability of being at each node for a random walk which jumps back to one of the
+    sources with `restart_prob` at each step, the value which the visit frequencies of the
+    random walks estimate. Walks at a node without neighbours jump back to the sources.
+    Iterates until the L1 change of the scores is below the tolerance.
+    """
+    csr = get_graph_csr(G)
+    positions = list({csr.positions[source] for source in sources})
+    personalization = np.zeros(len(csr.node_ids))
+    personalization[positions] = 1 / len(positions)
+    incoming_indptr, incoming_indices = csr.incoming()
+    scores = _personalized_pagerank(
+        csr.indptr,
+        csr.indices,
+        incoming_indptr,
+        incoming_indices,
+        personalization,
+        restart_prob,
+        tolerance,
+        max_iterations,
+    )
+    return csr, scores
+
+
+def top_nodes(values: np.ndarray, k: int) -> list[tuple[int, float]]:
+    """The positions and values of the k nodes with the highest positive values, the highest first."""
+    positive = np.flatnonzero(values > 0)
+    if len(positive) > k:
+        positive = np.sort(positive[np.argpartition(-values[positive], k - 1)[:k]])
+    ranking = positive[np.argsort(-values[positive], kind="stable")]
+    return [(int(i), values[i].item()) for i in ranking]
@@ -0,0 +1,116 @@
+import asyncio
+import datetime
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from graphrag_kb_server.logger import logger
+from graphrag_kb_server.service.db.common_operations import (
+    extract_elements_from_path,
+    get_project_id_from_path,
+)
+from graphrag_kb_server.service.db.db_persistence_path_properties import (
+    find_reference_metadata,
+)
+from graphrag_kb_server.utils.cache import GenericProjectSimpleCache
+
+
+type LinksImageLastModified = tuple[list[str], str | None, datetime.datetime | None]
+
+
+@dataclass
+class ReferenceIndex:
+    """
+    In-memory view of the reference metadata of a project: the links and last modified
+    dates stored in the database and the files used to resolve the document images.
+    """
+
+    project_dir: Path
+    metadata: dict[str, tuple[list[str], datetime.datetime | None]] = field(
+        default_factory=dict
+    )
+    input_files: set[str] = field(default_factory=set)
+    original_files: set[str] = field(default_factory=set)
+
+    def get_last_modified(self, path: str) -> datetime.datetime | None:
+        entry = self.metadata.get(path)
+        return entry[1] if entry is not None else None
+
+    def get_links_and_image(self, file_path: Path) -> LinksImageLastModified:
+        file_path_str = convert_path_to_text(file_path)
+        links, last_modified = self.metadata.get(file_path_str, ([], None))
+        return list(links), self._find_image(Path(file_path_str)), last_modified
+
+    def _find_image(self, file_path: Path) -> str | None:
+        try:
+            relative_path = file_path.relative_to(self.project_dir / "input")
+        except ValueError:
+            return None
+        if relative_path.as_posix() not in self.input_files:
+            return None
+        original_file_path = Path(relative_path.as_posix())
+        # Same resolution order as the original files on disk: pdf first, then docx.
+        for suffix in [".pdf", ".docx"]:
+            document_path = original_file_path.with_suffix(suffix)
+            if document_path.as_posix() not in self.original_files:
+                document_path = document_path.parent / document_path.name.replace(
+                    "_", " "
+                )
+                if document_path.as_posix() not in self.original_files:
+                    continue
+            image_path = document_path.with_suffix(".png")
+            if image_path.as_posix() in self.original_files:
+                return (Path("original_input") / image_path).as_posix()
+            return None
+        return None
+
+
+reference_index_cache = GenericProjectSimpleCache[ReferenceIndex]()
+_reference_index_locks: dict[str, asyncio.Lock] = {}
+
+
+def convert_path_to_text(file_path: Path) -> str:
+    # Strips the Windows drive prefix e.g. C:/ → / so paths indexed on Windows resolve on Linux.
+    return re.sub(r"^[^/]*/", "/", file_path.as_posix())
+
+
+def _list_relative_files(folder: Path) -> set[str]:
+    if not folder.exists():
+        return set()
+    return {f.relative_to(folder).as_posix() for f in folder.rglob("*") if f.is_file()}
+
+
+async def _load_reference_index(project_dir: Path) -> ReferenceIndex:
+    project_id = await get_project_id_from_path(project_dir)
+    schema_name = extract_elements_from_path(project_dir).schema_name
+    metadata = await find_reference_metadata(schema_name, project_id)
+    input_files, original_files = await asyncio.gather(
+        asyncio.to_thread(_list_relative_files, project_dir / "input"),
+        asyncio.to_thread(_list_relative_files, project_dir / "original_input"),
+    )
+    logger.info(
+        f"Loaded reference index for {project_dir} with {len(metadata)} paths and {len(original_files)} original files"
+    )
+    return ReferenceIndex(
+        project_dir=project_dir,
+        metadata=metadata,
+        input_files=input_files,
+        original_files=original_files,
+    )
+
+
+async def get_reference_index(project_dir: Path) -> ReferenceIndex:
+    reference_index = reference_index_cache.get(project_dir)
+    if reference_index is not None:
+        return reference_index
+    lock = _reference_index_locks.setdefault(project_dir.as_posix(), asyncio.Lock())
+    async with lock:
+        reference_index = reference_index_cache.get(project_dir)
+        if reference_index is None:
+            reference_index = await _load_reference_index(project_dir)
+            reference_index_cache.set(project_dir, reference_index)
+    return reference_index
+
+
+def invalidate_reference_index(project_dir: Path):
+    reference_index_cache.clear(project_dir)
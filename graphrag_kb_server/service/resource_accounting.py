@@ -0,0 +1,240 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator
+
+from graphrag_kb_server.config import cfg
+from graphrag_kb_server.logger import logger
+from graphrag_kb_server.model.engines import Engine
+from graphrag_kb_server.service.db.db_persistence_resource_usage import (
+    create_resource_usage_table,
+    insert_resource_usage,
+)
+from graphrag_kb_server.service.query_metrics import (
+    LatencyHistogram,
+    current_trace,
+    project_label,
+    query_metrics,
+)
+from graphrag_kb_server.service.tennant import list_tennants
+
+# LLM calls which cannot be related to a project, e.g. topic clustering
+UNATTRIBUTED = "unattributed"
+
+
+@dataclass
+class ProjectUsage:
+    llm_calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    indexing_runs: int = 0
+    indexing_seconds: float = 0.0
+
+    def copy(self) -> "ProjectUsage":
+        return ProjectUsage(**asdict(self))
+
+    def since(self, previous: "ProjectUsage") -> "ProjectUsage":
+        return ProjectUsage(
+            **{
+                f.name: getattr(self, f.name) - getattr(previous, f.name)
+                for f in fields(self)
+            }
+        )
+
+
+def llm_project(hashing_kv: Any) -> str:
+    """
+    The project of an LLM call. LightRAG passes its LLM cache storage to the model function,
+    whose working directory is inside the project folder. Calls made by the query pipeline
+    outside of LightRAG are attributed with the trace of the query.
+    """
+    global_config = getattr(hashing_kv, "global_config", None)
+    if global_config and global_config.get("working_dir"):
+        return project_label(Path(global_config["working_dir"]).parent)
+    trace = current_trace()
+    return trace.project if trace is not None else UNATTRIBUTED
+
+
+def dir_size(folder: Path) -> int:
+    return sum(f.stat().st_size for f in folder.rglob("*") if f.is_file())
+
+
+class ResourceAccounting:
+    """
+    Resource usage per project: the counters kept here (LLM tokens, indexing time) plus the
+    resident memory, the disk size and the query latencies read when a snapshot is taken.
+    Snapshots are periodically stored in the database with the usage during the interval.
+    """
+
+    def __init__(self):
+        self.usage: dict[str, ProjectUsage] = {}
+        self.started_at = datetime.now()
+        self.persisted_at = self.started_at
+        self.persisted_usage: dict[str, ProjectUsage] = {}
+        self.persisted_latencies: dict[str, LatencyHistogram] = {}
+        self.task: asyncio.Task | None = None
+
+    def _usage(self, project: str) -> ProjectUsage:
+        usage = self.usage.get(project)
+        if usage is None:
+            usage = ProjectUsage()
+            self.usage[project] = usage
+        return usage
+
+    def record_llm_usage(
+        self, project: str, prompt_tokens: int, completion_tokens: int
+    ):
+        usage = self._usage(project)
+        usage.llm_calls += 1
+        usage.prompt_tokens += prompt_tokens
+        usage.completion_tokens += completion_tokens
+
+    @contextmanager
+    def track_indexing(self, project_dir: Path) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            usage = self._usage(project_label(project_dir))
+            usage.indexing_runs += 1
+            usage.indexing_seconds += time.perf_counter() - start
+
+    async def project_rows(
+        self, tennant: str | None = None
+    ) -> list[tuple[str | None, dict[str, Any]]]:
+        """
+        The current usage of each project, with the label under which its LLM calls,
+        queries and indexing are accounted (None for the CAG projects).
+        """
+        # Imported here, as the project service imports the web layer and LightRAG
+        # initialisation imports the model functions which record the LLM usage
+        from graphrag_kb_server.service.lightrag.lightrag_init import lightrag_cache
+        from graphrag_kb_server.service.project import list_projects
+
+        latencies = query_metrics.project_totals()
+        rows = []
+        for t in list_tennants():
+            if tennant is not None and t.folder_name != tennant:
+                continue
+            tennant_dir = cfg.graphrag_root_dir_path / t.folder_name
+            try:
+                listing = list_projects(tennant_dir)
+            except Exception as e:
+                logger.exception(f"Cannot list the projects of {t.folder_name}: {e}")
+                continue
+            for engine, projects in (
+                (Engine.LIGHTRAG, listing.lightrag_projects.projects),
+                (Engine.CAG, listing.cag_projects.projects),
+            ):
+                for project in projects:
+                    project_dir = tennant_dir / engine.value / project.name
+                    resident = lightrag_cache.projects.get(project_dir.as_posix())
+                    label = project_label(project_dir)
+                    # Queries and LLM calls are only made by the LightRAG projects
+                    accounted = engine == Engine.LIGHTRAG
+                    usage = self.usage.get(label) if accounted else None
+                    latency = latencies.get(label) if accounted else None
+                    rows.append(
+                        (
+                            label if accounted else None,
+                            {
+                                "tennant": t.folder_name,
+                                "engine": engine.value,
+                                "project": project.name,
+                                "resident_memory_bytes": (
+                                    resident.memory if resident is not None else 0
+                                ),
+                                "disk_bytes": await asyncio.to_thread(
+                                    dir_size, project_dir
+                                ),
+                                **_latency_columns(latency or LatencyHistogram()),
+                                **asdict(usage or ProjectUsage()),
+                            },
+                        )
+                    )
+        return rows
+
+    async def snapshot(self, tennant: str | None = None) -> dict[str, Any]:
+        """The usage since the server started, per tennant and project."""
+        tennants: dict[str, dict[str, Any]] = {}
+        for _, row in await self.project_rows(tennant):
+            summary = tennants.setdefault(
+                row["tennant"],
+                {"tennant": row["tennant"], "totals": _empty_totals(), "projects": []},
+            )
+            summary["projects"].append(row)
+            for key in summary["totals"]:
+                summary["totals"][key] += row[key]
+        return {
+            "started_at": self.started_at.isoformat(),
+            "tennants": list(tennants.values()),
+            UNATTRIBUTED: asdict(self.usage.get(UNATTRIBUTED, ProjectUsage())),
+        }
+
+    async def persist(self):
+        """Stores the usage since the previous snapshot of each project."""
+        snapshot_at = datetime.now()
+        latencies = query_metrics.project_totals()
+        rows = []
+        for label, row in await self.project_rows():
+            if label is not None:
+                usage = self.usage.get(label, ProjectUsage())
+                latency = latencies.get(label, LatencyHistogram())
+                previous_usage = self.persisted_usage.get(label, ProjectUsage())
+                row.update(asdict(usage.since(previous_usage)))
+                row.update(
+                    _latency_columns(
+                        latency.since(
+                            self.persisted_latencies.get(label, LatencyHistogram())
+                        )
+                    )
+                )
+                self.persisted_usage[label] = usage.copy()
+                self.persisted_latencies[label] = latency
+            rows.append(row)
+        await create_resource_usage_table()
+        await insert_resource_usage(snapshot_at, self.persisted_at, rows)
+        self.persisted_at = snapshot_at
+        logger.info(f"Stored the resource usage of {len(rows)} projects")
+
+    async def persist_periodically(self, interval_minutes: int):
+        while True:
+            await asyncio.sleep(interval_minutes * 60)
+            try:
+                await self.persist()
+            except Exception as e:
+                logger.exception(f"Cannot store the resource usage: {e}")
+
+    def start(self):
+        if cfg.resource_snapshot_interval_minutes > 0:
+            self.task = asyncio.create_task(
+                self.persist_periodically(cfg.resource_snapshot_interval_minutes)
+            )
+
+    def stop(self):
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+
+
+def _latency_columns(histogram: LatencyHistogram) -> dict[str, Any]:
+    return {
+        "query_count": histogram.count,
+        "query_p50_ms": histogram.percentile(0.5),
+        "query_p95_ms": histogram.percentile(0.95),
+        "query_p99_ms": histogram.percentile(0.99),
+    }
+
+
+def _empty_totals() -> dict[str, Any]:
+    return {
+        "resident_memory_bytes": 0,
+        "disk_bytes": 0,
+        "query_count": 0,
+        **asdict(ProjectUsage()),
+    }
+
+
+resource_accounting = ResourceAccounting()
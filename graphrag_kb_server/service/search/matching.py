@@ -75,7 +75,7 @@ async def match_entities_with_lightrag(
             logger.info(f"Found cached expanded entities for query: {query}")
 
     entity_types, entities_limit = query.entity_types, query.entities_limit
-    df = await get_sorted_centrality_scores_as_pd(project_dir)
+    df = await get_sorted_centrality_scores_as_pd(project_dir, query.centrality_measure)
     df = df[df["entity_type"].isin(entity_types)][:entities_limit]
     all_entities = _convert_df_to_entities(df)
     entity_list = await match_entities(query, all_entities)
@@ -101,9 +101,10 @@ async def _dedupe_entities(
     project_dir: Path, entities: list[EntityWithScore], similarity_threshold=0.51
 ) -> list[EntityWithScore]:
     rag: LightRAG = await initialize_rag(project_dir)
-    embeddings = [rag.entities_vdb.embedding_func(entity.entity) for entity in entities]
-    embeddings = await asyncio.gather(*embeddings)
-    X = np.vstack(embeddings).astype(np.float32)
+    embeddings = await rag.entities_vdb.embedding_func(
+        [entity.entity for entity in entities]
+    )
+    X = np.asarray(embeddings, dtype=np.float32)
 
     norms = np.linalg.norm(X, axis=1, keepdims=True)
     X = X / np.maximum(norms, 1e-12)
@@ -1,12 +1,9 @@
 from pathlib import Path
-import random
-from collections import Counter
 
 import networkx as nx
 import numpy as np
 from sklearn.preprocessing import normalize
 from sklearn.neighbors import NearestNeighbors
-from nano_vectordb.dbs import load_storage
 
 from graphrag_kb_server.model.topics import (
     SimilarityTopics,
@@ -17,17 +14,20 @@ from graphrag_kb_server.model.engines import Engine
 from graphrag_kb_server.utils.cache import GenericSimpleCache
 from graphrag_kb_server.model.related_topics import RelatedTopicsNearestNeighbors
 from graphrag_kb_server.model.topics import SimilarityTopicsMethod
+from graphrag_kb_server.service.lightrag.lightrag_vector_sidecar import (
+    load_vector_storage,
+)
+from graphrag_kb_server.service.lightrag.lightrag_versions import get_working_dir
+from graphrag_kb_server.service.random_walk import (
+    personalized_pagerank,
+    random_walk_visits,
+    top_nodes,
+)
 
 
-def convert_to_similarity_topics(
-    G: nx.Graph, visited_nodes: list[str], request: SimilarityTopicsRequest
-) -> SimilarityTopics:
-    # Count node frequencies
-    counter = Counter(visited_nodes)
-    top_k = counter.most_common(request.k)
-
-    # Convert to similarity topics
-    similarity_topics = []
+def _similarity_topic(
+    G: nx.Graph, node_id: str, probability: float, request: SimilarityTopicsRequest
+) -> SimilarityTopic:
     match request.engine:
         case Engine.LIGHTRAG:
             entity_name_key = "entity_id"
@@ -35,71 +35,82 @@ def convert_to_similarity_topics(
         case Engine.CAG:
             entity_name_key = "entity_id"
             entity_type_key = "type"
+    node_data = G.nodes()[node_id]
+    return SimilarityTopic(
+        name=node_data[entity_name_key],
+        description=node_data["description"],
+        type=node_data[entity_type_key],
+        questions=[],
+        probability=probability,
+    )
 
-    for node_id, frequency in top_k:
-        if node_id in G.nodes():
-            node_data = G.nodes()[node_id]
-            # Normalize probability by total samples
-            probability = frequency / (request.samples * request.path_length)
-            similarity_topics.append(
-                SimilarityTopic(
-                    name=node_data[entity_name_key],
-                    description=node_data["description"],
-                    type=node_data[entity_type_key],
-                    questions=[],
-                    probability=probability,
-                )
-            )
 
-    return SimilarityTopics(topics=similarity_topics)
+def get_similar_nodes_runs(
+    G: nx.Graph, request: SimilarityTopicsRequest, runs: int
+) -> list[SimilarityTopics]:
+    """The most visited nodes of independent random walk runs with restart from the source."""
+    csr, visits = random_walk_visits(
+        G,
+        request.source,
+        request.samples,
+        request.path_length,
+        request.restart_prob,
+        runs,
+        request.seed,
+    )
+    total_steps = request.samples * request.path_length
+    return [
+        SimilarityTopics(
+            topics=[
+                _similarity_topic(
+                    G, csr.node_ids[position], frequency / total_steps, request
+                )
+                for position, frequency in top_nodes(run_visits, request.k)
+            ]
+        )
+        for run_visits in visits
+    ]
 
 
 def get_similar_nodes(
     G: nx.Graph, request: SimilarityTopicsRequest
 ) -> SimilarityTopics:
-    neighbors_cache = {}
-    visited_nodes = []
-    rand = random.random
-    randrange = random.randrange
-    samples, path_length, restart_prob, source = (
-        request.samples,
-        request.path_length,
-        request.restart_prob,
-        request.source,
-    )
-    for _ in range(samples):
-        current_node = source
-        path = [current_node]
+    return get_similar_nodes_runs(G, request, 1)[0]
 
-        for _ in range(path_length):
-            if rand() < restart_prob:
-                current_node = source
-            else:
-                neighbors = neighbors_cache.setdefault(
-                    current_node, tuple(G.neighbors(current_node))
-                )
-                if not neighbors:
-                    break
-                current_node = neighbors[randrange(len(neighbors))]
-                path.append(current_node)
 
-        visited_nodes.extend(path)
-    similarity_topics = convert_to_similarity_topics(G, visited_nodes, request)
-    return similarity_topics
+def get_similar_nodes_pagerank(
+    G: nx.Graph, request: SimilarityTopicsRequest
+) -> SimilarityTopics | None:
+    """The nodes with the highest personalized PageRank from the sources (or the source)."""
+    sources = [s for s in (request.sources or [request.source]) if s in G]
+    if not sources:
+        return None
+    csr, scores = personalized_pagerank(G, sources, request.restart_prob)
+    return SimilarityTopics(
+        topics=[
+            _similarity_topic(G, csr.node_ids[position], score, request)
+            for position, score in top_nodes(scores, request.k)
+        ]
+    )
 
 
 _nearest_neighbors_cache = GenericSimpleCache[Path, RelatedTopicsNearestNeighbors]()
 
 
+def _is_normalized(X: np.ndarray) -> bool:
+    return np.allclose(np.linalg.norm(X, axis=1), 1.0, atol=1e-4)
+
+
 def _get_nearest_neighbors_vectors(
     request: SimilarityTopicsRequest,
 ) -> RelatedTopicsNearestNeighbors:
-    project_dir = request.project_dir
-    nearest_neighbors = _nearest_neighbors_cache.get(project_dir)
+    # Keyed by the working directory, so that a new version of the project is not served old vectors
+    working_dir = get_working_dir(request.project_dir)
+    nearest_neighbors = _nearest_neighbors_cache.get(working_dir)
     if nearest_neighbors is not None:
         return nearest_neighbors
 
-    vdb_entities = load_storage(project_dir / "lightrag/vdb_entities.json")
+    vdb_entities = load_vector_storage(working_dir / "vdb_entities.json")
     X, vertex_labels = vdb_entities["matrix"], [
         e["entity_name"] for e in vdb_entities["data"]
     ]
@@ -110,7 +121,8 @@ def _get_nearest_neighbors_vectors(
         X = np.hstack(X[0])  # shape (n, 2d)
 
     # --- 4) (Optional) Normalize if you want cosine similarity ---
-    X_cos = normalize(X)  # row-wise L2 norm = 1
+    # The sidecar matrices are normalized already and are shared instead of copied
+    X_cos = X if _is_normalized(X) else normalize(X)  # row-wise L2 norm = 1
 
     # --- 5) Build a k-NN index over the embeddings ---
     # Choose 'cosine' or 'euclidean' to match your intention
@@ -129,7 +141,7 @@ def _get_nearest_neighbors_vectors(
         X_cos=X_cos,
         nn=nn,
     )
-    _nearest_neighbors_cache.set(project_dir, nearest_neighbors)
+    _nearest_neighbors_cache.set(working_dir, nearest_neighbors)
     return nearest_neighbors
 
 
@@ -170,18 +182,15 @@ def get_similar_nodes_nearest_neighbors(
 def get_sorted_related_entities_simple_rerank(
     G: nx.Graph, request: SimilarityTopicsRequest
 ) -> SimilarityTopics | None:
-    similarity_topics_results = []
     match request.method:
         case SimilarityTopicsMethod.RANDOM_WALK:
-            for _ in range(request.runs):
-                related_entities = get_similar_nodes(G, request)
-                if related_entities is None:
-                    return None
-                similarity_topics_results.append(related_entities)
+            similarity_topics_results = get_similar_nodes_runs(G, request, request.runs)
             return rerank_similarity_topics(similarity_topics_results, request.k)
         case SimilarityTopicsMethod.NEAREST_NEIGHBORS:
             related_entities = get_similar_nodes_nearest_neighbors(G, request)
             return related_entities
+        case SimilarityTopicsMethod.PERSONALIZED_PAGERANK:
+            return get_similar_nodes_pagerank(G, request)
 
 
 def rerank_similarity_topics(
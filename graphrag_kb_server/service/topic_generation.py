@@ -16,6 +16,7 @@ from graphrag_kb_server.service.db.db_persistence_topics import (
 
 
 async def generate_topics(topics_request: TopicsRequest) -> Topics:
+    # The LightRAG topics are stored per centrality measure
     result = await find_topics_by_project_name(topics_request)
     if result is not None and len(result.topics) > 0:
         return result
@@ -47,7 +48,7 @@ TOP_LEVEL: Final[int] = 0
 
 async def _generate_topics_lightrag(topics_request: TopicsRequest) -> Topics:
     centrality_scores = await get_sorted_centrality_scores_as_pd(
-        topics_request.project_dir
+        topics_request.project_dir, topics_request.centrality_measure
     )
     if topics_request.topics and len(topics_request.topics) > 0:
         centrality_scores = centrality_scores[
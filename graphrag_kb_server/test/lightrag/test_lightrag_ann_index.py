@@ -0,0 +1,72 @@
+import numpy as np
+
+
+def _vectors(rows: int, seed: int = 42) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((8, 16))
+    vectors = topics[rng.integers(0, 8, rows)] + 0.5 * rng.standard_normal((rows, 16))
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_search_matches_exact_scan_with_all_lists():
+    from graphrag_kb_server.service.lightrag.lightrag_ann_index import IVFIndex
+
+    matrix = _vectors(500).astype(np.float32)
+    index = IVFIndex.train(matrix, n_lists=10)
+    assert len(index.assignments) == 500
+    query = matrix[3]
+    rows, scores = index.search(matrix, query, 5, nprobe=10)
+    expected = np.argsort(matrix @ query)[::-1][:5]
+    assert rows.tolist() == expected.tolist()
+    assert np.allclose(scores, (matrix @ query)[expected])
+    # Fewer lists score fewer candidates but find the query row itself
+    assert len(index.candidates(query, 2)) < 500
+    assert index.search(matrix, query, 1, nprobe=2)[0][0] == 3
+
+
+def test_index_follows_storage_changes(tmp_path, monkeypatch):
+    from nano_vectordb import NanoVectorDB
+    from graphrag_kb_server.service.lightrag import lightrag_ann_index
+
+    monkeypatch.setattr(lightrag_ann_index.lightrag_cfg, "lightrag_ann_min_rows", 100)
+    monkeypatch.setattr(lightrag_ann_index.lightrag_cfg, "lightrag_ann_nprobe", 4)
+    lightrag_ann_index.install_ann_index()
+    storage_file = tmp_path / "vdb_chunks.json"
+    vectors = _vectors(300)
+    db = NanoVectorDB(16, storage_file=str(storage_file))
+    db.upsert(
+        [{"__id__": f"chunk-{i}", "__vector__": v} for i, v in enumerate(vectors[:50])]
+    )
+    assert db._ann_index is None  # Too small
+    db.upsert(
+        [
+            {"__id__": f"chunk-{i}", "__vector__": v}
+            for i, v in enumerate(vectors[50:], start=50)
+        ]
+    )
+    db.save()
+    index = db._ann_index
+    assert len(index.assignments) == 300
+    assert lightrag_ann_index.index_file(storage_file).exists()
+
+    # Incremental changes keep one list per row
+    new_vector = -vectors[0]
+    db.upsert(
+        [
+            {"__id__": "chunk-1", "__vector__": vectors[7]},
+            {"__id__": "chunk-new", "__vector__": new_vector},
+        ]
+    )
+    db.delete(["chunk-2", "chunk-3"])
+    assert len(index.assignments) == len(db) == 299
+    assert db.query(new_vector, top_k=1)[0]["__id__"] == "chunk-new"
+    assert {r["__id__"] for r in db.query(vectors[7], top_k=2)} == {
+        "chunk-1",
+        "chunk-7",
+    }
+
+    db.save()
+    reloaded = NanoVectorDB(16, storage_file=str(storage_file))
+    assert reloaded._ann_index is not None
+    assert np.array_equal(reloaded._ann_index.assignments, index.assignments)
+    assert reloaded.query(new_vector, top_k=1)[0]["__id__"] == "chunk-new"
@@ -0,0 +1,76 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+
+def test_batch_vector_scan():
+    from graphrag_kb_server.service.lightrag.lightrag_batch_search import (
+        batch_vector_scan,
+    )
+
+    vectors = np.array([[1.0, 0.0], [0.0, 1.0], [0.7071, 0.7071]])
+    storage = {
+        "matrix": vectors,
+        "data": [
+            {"__id__": f"chunk-{i}", "content": f"content {i}", "file_path": "a.txt"}
+            for i in range(3)
+        ],
+    }
+    results = batch_vector_scan(storage, np.array([[2.0, 0.0], [0.0, 3.0]]), 2, 0.5)
+    assert [[c["chunk_id"] for c in chunks] for chunks in results] == [
+        ["chunk-0", "chunk-2"],
+        ["chunk-1", "chunk-2"],
+    ]
+    assert results[0][0] == {
+        "content": "content 0",
+        "created_at": None,
+        "file_path": "a.txt",
+        "source_type": "vector",
+        "chunk_id": "chunk-0",
+    }
+    # The threshold excludes the orthogonal chunks
+    results = batch_vector_scan(storage, np.array([[1.0, 0.0]]), 3, 0.5)
+    assert [c["chunk_id"] for c in results[0]] == ["chunk-0", "chunk-2"]
+
+
+@pytest.mark.asyncio
+async def test_shared_chunk_reader_reads_the_batch_once():
+    from graphrag_kb_server.service.lightrag.lightrag_batch_search import (
+        SharedChunkReader,
+    )
+
+    calls = []
+
+    class FakeStorage:
+        global_config = {"tokenizer": None}
+
+        async def get_by_ids(self, ids):
+            calls.append(sorted(ids))
+            return [{"content": i} for i in ids]
+
+    reader = SharedChunkReader(FakeStorage(), 3)
+
+    async def question(i: int, ids: list[str]):
+        await asyncio.sleep(0.01 * i)
+        await reader.wait_for_batch(i, ids)
+        return await reader.get_by_ids(ids)
+
+    async def answered_from_cache():
+        # A question which finishes without reaching the chunk merge
+        await asyncio.sleep(0.05)
+        await reader.leave(2)
+
+    first, second, _ = await asyncio.gather(
+        question(0, ["a", "b"]), question(1, ["b", "c"]), answered_from_cache()
+    )
+    assert first == [{"content": "a"}, {"content": "b"}]
+    assert second == [{"content": "b"}, {"content": "c"}]
+    assert calls == [["a", "b", "c"]]
+    assert await reader.get_by_ids(["c", "a"]) == [{"content": "c"}, {"content": "a"}]
+    assert len(calls) == 1
+    # A retry reads the chunks which were not registered
+    await reader.wait_for_batch(0, ["d"])
+    assert await reader.get_by_ids(["a", "d"]) == [{"content": "a"}, {"content": "d"}]
+    assert calls[1:] == [["d"]]
+    assert reader.global_config == {"tokenizer": None}
@@ -1,17 +1,146 @@
+import shutil
 from pathlib import Path
 
 import pytest
 
 
+@pytest.fixture
+def project_dir(tmp_path: Path) -> Path:
+    """A copy of the dummy project, as the centrality computation writes derived files into it."""
+    project_dir = tmp_path / "dummy_projects/lightrag/dwell1"
+    shutil.copytree(
+        Path(__file__).parent.parent.parent.parent
+        / "docs/dummy_projects/lightrag/dwell1",
+        project_dir,
+    )
+    return project_dir
+
+
 @pytest.mark.asyncio
-async def test_get_sorted_centrality_scores():
+async def test_get_sorted_centrality_scores(project_dir: Path):
     from graphrag_kb_server.service.lightrag.lightrag_centrality import (
         get_sorted_centrality_scores,
     )
 
-    project_dir = (
-        Path(__file__).parent.parent.parent.parent
-        / "docs/dummy_projects/lightrag/dwell1"
-    )
     scores = await get_sorted_centrality_scores(project_dir)
     assert len(scores) > 0
+    assert scores == sorted(scores, key=lambda score: score[4], reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_centrality_measures_are_computed_together(
+    project_dir: Path, monkeypatch
+):
+    from graphrag_kb_server.model.node_centrality import CentralityMeasure
+    from graphrag_kb_server.service.lightrag import lightrag_centrality
+    from graphrag_kb_server.service.query_metrics import project_label
+
+    monkeypatch.setattr(
+        lightrag_centrality.lightrag_cfg, "lightrag_betweenness_worker", False
+    )
+    node_centralities = await lightrag_centrality.compute_centrality_measures(
+        project_dir
+    )
+    assert all(len(node_centrality) == 10 for node_centrality in node_centralities)
+    pagerank = lightrag_centrality.sort_by_measure(
+        node_centralities, CentralityMeasure.PAGERANK
+    )
+    assert sum(score[4] for score in pagerank) == pytest.approx(1.0)
+    assert pagerank[0][4] >= pagerank[-1][4]
+    label = project_label(project_dir)
+    timings = lightrag_centrality.centrality_stats(label)[label]
+    assert set(timings) == {f"{measure}_ms" for measure in CentralityMeasure}
+
+
+def test_sampled_betweenness_is_within_error_bound():
+    import networkx as nx
+    import numpy as np
+    from graphrag_kb_server.service.random_walk import GraphCSR
+    from graphrag_kb_server.utils.betweenness import (
+        connected_components,
+        normalize_betweenness,
+        pivot_count,
+        sample_betweenness,
+    )
+
+    G = nx.barabasi_albert_graph(300, 2, seed=1)
+    G.add_edges_from([(1000, 1001), (1001, 1002)])
+    csr = GraphCSR.from_networkx(G)
+    labels = connected_components(csr.indptr, csr.indices)
+    assert labels.max() == 1
+    components = np.unique(labels)
+    expected = nx.betweenness_centrality(G)
+    expected = np.array([expected[node_id] for node_id in csr.node_ids])
+
+    exact = sample_betweenness(csr.indptr, csr.indices, labels, components, None, 0)
+    assert np.allclose(normalize_betweenness(exact), expected)
+    epsilon = 0.15
+    samples = pivot_count(len(csr.node_ids), epsilon, 0.1)
+    assert samples < 300
+    approximate = sample_betweenness(
+        csr.indptr, csr.indices, labels, components, samples, 0
+    )
+    assert np.abs(normalize_betweenness(approximate) - expected).max() < epsilon
+    threaded = sample_betweenness(
+        csr.indptr, csr.indices, labels, components, samples, 0, threads=4
+    )
+    assert np.array_equal(threaded, approximate)
+
+
+@pytest.mark.asyncio
+async def test_incremental_betweenness_searches_changed_components(
+    tmp_path, monkeypatch
+):
+    import networkx as nx
+    import numpy as np
+    from graphrag_kb_server.service.lightrag import lightrag_centrality
+
+    monkeypatch.setattr(
+        lightrag_centrality.lightrag_cfg, "lightrag_betweenness_mode", "exact"
+    )
+    searched = []
+
+    async def sample_betweenness(indptr, indices, labels, components, *args):
+        searched.append(len(components))
+        return lightrag_centrality.sample_betweenness(
+            indptr, indices, labels, components, *args
+        )
+
+    monkeypatch.setattr(lightrag_centrality, "_sample_betweenness", sample_betweenness)
+    (tmp_path / "lightrag").mkdir()
+    G = nx.path_graph(["a", "b", "c", "d"])
+    G.add_edges_from([("x", "y"), ("y", "z"), ("z", "w")])
+    await lightrag_centrality.compute_betweenness(tmp_path, G)
+
+    # New edge in the first component, with a new node
+    G = G.copy()
+    G.add_edge("d", "e")
+    csr, betweenness = await lightrag_centrality.compute_betweenness(
+        tmp_path, G, incremental=True
+    )
+    assert searched == [2, 1]
+    expected = nx.betweenness_centrality(G)
+    assert np.allclose(betweenness, [expected[n] for n in csr.node_ids])
+
+
+@pytest.mark.asyncio
+async def test_betweenness_runs_in_worker_process(monkeypatch):
+    import networkx as nx
+    import numpy as np
+    from graphrag_kb_server.service.lightrag import lightrag_centrality
+    from graphrag_kb_server.service.random_walk import GraphCSR
+
+    monkeypatch.setattr(
+        lightrag_centrality.lightrag_cfg, "lightrag_betweenness_worker", True
+    )
+    G = nx.star_graph(5)
+    csr = GraphCSR.from_networkx(G)
+    labels = np.zeros(len(csr.node_ids), dtype=np.int64)
+    try:
+        betweenness = await lightrag_centrality._sample_betweenness(
+            csr.indptr, csr.indices, labels, np.array([0]), None, 0
+        )
+    finally:
+        lightrag_centrality.shutdown_betweenness_worker()
+    # The centre of the star is on the path of each of the 20 ordered pairs of leaves
+    assert betweenness[csr.positions[0]] == 20
@@ -0,0 +1,117 @@
+import json
+
+import pytest
+
+
+def _storage(tmp_path, cache_size: int = 2):
+    from graphrag_kb_server.service.lightrag.lightrag_chunk_store import (
+        ChunkFileKVStorage,
+    )
+
+    return ChunkFileKVStorage(
+        namespace="text_chunks",
+        workspace="",
+        global_config={"working_dir": str(tmp_path)},
+        embedding_func=None,
+        cache_size=cache_size,
+    )
+
+
+@pytest.mark.asyncio
+async def test_json_store_is_migrated(tmp_path):
+    json_file = tmp_path / "kv_store_text_chunks.json"
+    chunks = {
+        f"chunk-{i}": {"content": f"Chunk ä {i}", "full_doc_id": "doc-1"}
+        for i in range(5)
+    }
+    json_file.write_text(json.dumps(chunks), encoding="utf-8")
+
+    storage = _storage(tmp_path)
+    await storage.initialize()
+    assert not json_file.exists()
+    assert (tmp_path / "kv_store_text_chunks.json.migrated").exists()
+
+    results = await storage.get_by_ids(["chunk-3", "missing", "chunk-0"])
+    assert results[0]["content"] == "Chunk ä 3"
+    assert results[0]["_id"] == "chunk-3"
+    assert results[1] is None
+    assert results[2]["content"] == "Chunk ä 0"
+    assert await storage.filter_keys({"chunk-1", "chunk-9"}) == {"chunk-9"}
+
+    # Only the most recently read chunks stay in memory
+    await storage.get_by_id("chunk-4")
+    assert list(storage._cache.keys()) == ["chunk-0", "chunk-4"]
+    results[2]["content"] = "modified"
+    assert (await storage.get_by_id("chunk-0"))["content"] == "Chunk ä 0"
+
+
+@pytest.mark.asyncio
+async def test_upsert_delete_and_reload(tmp_path):
+    storage = _storage(tmp_path)
+    await storage.initialize()
+    assert await storage.is_empty()
+    await storage.upsert({"a": {"content": "first"}, "b": {"content": "second"}})
+    assert (await storage.get_by_id("a"))["llm_cache_list"] == []
+    await storage.upsert({"a": {"content": "updated"}})
+    await storage.delete(["b"])
+    await storage.index_done_callback()
+
+    reloaded = _storage(tmp_path)
+    await reloaded.initialize()
+    assert (await reloaded.get_by_id("a"))["content"] == "updated"
+    assert await reloaded.get_by_id("b") is None
+    assert [id for id, _ in await reloaded.iter_records()] == ["a"]
+
+    # Changes which were not followed by index_done_callback are not persisted
+    await storage.upsert({"c": {"content": "unsaved"}})
+    reloaded = _storage(tmp_path)
+    await reloaded.initialize()
+    assert await reloaded.get_by_id("c") is None
+
+
+@pytest.mark.asyncio
+async def test_compaction(tmp_path, monkeypatch):
+    from graphrag_kb_server.service.lightrag import lightrag_chunk_store
+
+    monkeypatch.setattr(lightrag_chunk_store, "COMPACTION_MIN_DEAD_BYTES", 0)
+    storage = _storage(tmp_path)
+    await storage.initialize()
+    await storage.upsert({f"c{i}": {"content": "x" * 100} for i in range(10)})
+    await storage.index_done_callback()
+    first_data_file = storage._data_file
+    await storage.delete([f"c{i}" for i in range(8)])
+    await storage.index_done_callback()
+
+    assert not first_data_file.exists()
+    assert storage._dead_bytes == 0
+    assert storage._data_file.stat().st_size == sum(
+        length for _, length in storage._index.values()
+    )
+    assert (await storage.get_by_id("c9"))["content"] == "x" * 100
+
+    reloaded = _storage(tmp_path)
+    await reloaded.initialize()
+    assert sorted(id for id, _ in await reloaded.iter_records()) == ["c8", "c9"]
+
+
+@pytest.mark.asyncio
+async def test_iter_records_reads_a_snapshot(tmp_path, monkeypatch):
+    from graphrag_kb_server.service.lightrag import lightrag_chunk_store
+
+    monkeypatch.setattr(lightrag_chunk_store, "COMPACTION_MIN_DEAD_BYTES", 0)
+    storage = _storage(tmp_path)
+    await storage.initialize()
+    await storage.upsert({f"c{i}": {"content": f"content {i}"} for i in range(4)})
+    records = await storage.iter_records()
+    assert next(records)[0] == "c0"
+
+    # The data file is rewritten and its memory map closed while the records are read
+    await storage.delete(["c0", "c1", "c2"])
+    await storage.upsert({"c3": {"content": "updated"}, "c4": {"content": "new"}})
+    await storage.index_done_callback()
+    assert [(id, record["content"]) for id, record in records] == [
+        ("c1", "content 1"),
+        ("c2", "content 2"),
+        ("c3", "content 3"),
+    ]
+    assert [id for id, _ in await storage.iter_records()] == ["c3", "c4"]
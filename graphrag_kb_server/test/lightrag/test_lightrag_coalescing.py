@@ -0,0 +1,78 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+
+def _create_query_params(query: str, stream: bool = False):
+    from graphrag_kb_server.model.rag_parameters import QueryParameters
+
+    return QueryParameters(
+        format="json",
+        search="hybrid",
+        engine="lightrag",
+        context_params={"query": query, "project_dir": Path("/tmp/project")},
+        stream=stream,
+    )
+
+
+@pytest.mark.asyncio
+async def test_identical_queries_are_coalesced():
+    from graphrag_kb_server.model.chat_response import ChatResponse
+    from graphrag_kb_server.service.lightrag.lightrag_coalescing import QueryCoalescer
+
+    calls = 0
+
+    async def search(query_params, only_need_context):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return ChatResponse(
+            question=query_params.context_params.query, response="answer"
+        )
+
+    coalescer = QueryCoalescer()
+    responses = await asyncio.gather(
+        coalescer.run(_create_query_params("What is  dwell?"), False, search),
+        coalescer.run(_create_query_params("what is dwell? "), False, search),
+        coalescer.run(_create_query_params("What is dwell?"), False, search),
+    )
+    assert calls == 1
+    assert all(r.response == "answer" for r in responses)
+    assert coalescer.followers == 2
+    assert coalescer.in_flight() == 0
+
+    await coalescer.run(_create_query_params("Something else"), False, search)
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_streaming_queries_fan_out():
+    from graphrag_kb_server.model.chat_response import ChatResponse
+    from graphrag_kb_server.service.lightrag.lightrag_coalescing import QueryCoalescer
+
+    calls = 0
+
+    async def tokens():
+        for token in ["a", "b", "c"]:
+            await asyncio.sleep(0.01)
+            yield token
+
+    async def search(query_params, only_need_context):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return ChatResponse(question="q", response_iterator=tokens())
+
+    async def consume():
+        chat_response = await coalescer.run(
+            _create_query_params("stream me", stream=True), False, search
+        )
+        return "".join([t async for t in chat_response.response_iterator])
+
+    coalescer = QueryCoalescer()
+    results = await asyncio.gather(consume(), consume(), consume())
+    assert calls == 1
+    assert results == ["abc", "abc", "abc"]
+    await asyncio.sleep(0)
+    assert coalescer.in_flight() == 0
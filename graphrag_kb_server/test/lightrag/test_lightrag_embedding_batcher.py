@@ -0,0 +1,74 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+
+class _FakeEmbedding:
+    model_name = "fake-embedding"
+
+    def __init__(self):
+        self.calls: list[list[str]] = []
+
+    async def __call__(self, texts: list[str]) -> np.ndarray:
+        self.calls.append(texts)
+        await asyncio.sleep(0.001)
+        return np.array([[len(t), t.count("a"), 1.0] for t in texts], dtype=np.float32)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_texts_are_batched_and_deduplicated():
+    from graphrag_kb_server.service.lightrag.lightrag_embedding_batcher import (
+        EmbeddingBatcher,
+    )
+
+    embedding = _FakeEmbedding()
+    batcher = EmbeddingBatcher(embedding, batch_size=8, wait_ms=5, max_concurrency=2)
+    texts = [f"text {i % 12}" + "a" * i for i in range(12)] + ["text 0"] * 8
+    results = await asyncio.gather(*(batcher.embed([t]) for t in texts))
+    # 12 distinct texts in batches of at most 8
+    assert sorted(len(c) for c in embedding.calls) == [4, 8]
+    assert batcher.embedded_texts == 12
+    for text, result in zip(texts, results):
+        assert result.tolist() == [[len(text), text.count("a"), 1.0]]
+
+
+@pytest.mark.asyncio
+async def test_cached_texts_are_not_embedded_again(tmp_path):
+    from graphrag_kb_server.service.lightrag.lightrag_embedding_batcher import (
+        EmbeddingBatcher,
+        EmbeddingCache,
+    )
+
+    cache_file = tmp_path / "embedding_cache.sqlite"
+    embedding = _FakeEmbedding()
+    batcher = EmbeddingBatcher(embedding, 8, 1, 2, EmbeddingCache(cache_file))
+    first = await batcher.embed(["alpha", "beta"])
+    await batcher.close()
+
+    # A new batcher, as after a restart of the server
+    embedding = _FakeEmbedding()
+    batcher = EmbeddingBatcher(embedding, 8, 1, 2, EmbeddingCache(cache_file))
+    second = await batcher.embed(["beta", "alpha", "gamma"])
+    assert embedding.calls == [["gamma"]]
+    assert batcher.cache_hits == 2
+    assert np.array_equal(second[:2], first[::-1])
+    await batcher.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_request_fails_its_callers():
+    from graphrag_kb_server.service.lightrag.lightrag_embedding_batcher import (
+        EmbeddingBatcher,
+    )
+
+    class _FailingEmbedding(_FakeEmbedding):
+        async def __call__(self, texts: list[str]) -> np.ndarray:
+            raise RuntimeError("rate limited")
+
+    batcher = EmbeddingBatcher(_FailingEmbedding(), 8, 1, 2)
+    results = await asyncio.gather(
+        batcher.embed(["a"]), batcher.embed(["b"]), return_exceptions=True
+    )
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert batcher._pending == {}
@@ -0,0 +1,110 @@
+import networkx as nx
+
+
+def _create_graph() -> nx.Graph:
+    graph = nx.Graph()
+    graph.add_node("Alice", entity_type="person", description="A person")
+    graph.add_node("Bob", entity_type="person")
+    graph.add_node("Acme", entity_type="organization", description="A company")
+    graph.add_edge("Alice", "Acme", weight=2.0, description="works at")
+    graph.add_edge("Bob", "Acme", weight=1.0)
+    graph.add_edge("Bob", "Bob", weight=0.5)
+    return graph
+
+
+def test_snapshot_roundtrip_and_csr():
+    from graphrag_kb_server.service.lightrag.lightrag_graph_snapshot import (
+        GraphSnapshot,
+    )
+
+    graph = _create_graph()
+    snapshot = GraphSnapshot.from_networkx(graph)
+    restored = snapshot.to_networkx()
+    assert list(restored.nodes(data=True)) == list(graph.nodes(data=True))
+    assert sorted(restored.edges(data=True)) == sorted(graph.edges(data=True))
+
+    for i, node_id in enumerate(snapshot.node_ids):
+        start, end = snapshot.indptr[i], snapshot.indptr[i + 1]
+        neighbours = [snapshot.node_ids[j] for j in snapshot.indices[start:end]]
+        assert sorted(neighbours) == sorted(graph.neighbors(node_id))
+        for j, edge in zip(snapshot.indices[start:end], snapshot.edge_index[start:end]):
+            assert (
+                snapshot.edge_columns["weight"][edge]
+                == graph.edges[node_id, snapshot.node_ids[j]]["weight"]
+            )
+
+
+def test_outdated_snapshot_is_ignored(tmp_path):
+    from graphrag_kb_server.service.lightrag.lightrag_graph_snapshot import (
+        read_snapshot,
+        write_snapshot,
+    )
+
+    graphml_file = tmp_path / "graph_chunk_entity_relation.graphml"
+    graph = _create_graph()
+    nx.write_graphml(graph, graphml_file)
+    write_snapshot(graphml_file, graph)
+    assert read_snapshot(graphml_file).node_ids == ["Alice", "Bob", "Acme"]
+
+    graph.add_node("Carol")
+    nx.write_graphml(graph, graphml_file)
+    assert read_snapshot(graphml_file) is None
+
+
+def test_graph_is_shared_with_lightrag(tmp_path):
+    from lightrag.kg.networkx_impl import NetworkXStorage
+    from graphrag_kb_server.service.lightrag.lightrag_graph_snapshot import (
+        install_graph_snapshot,
+        release_project_graph,
+        snapshot_file,
+    )
+    from graphrag_kb_server.service.lightrag.lightrag_graph_support import (
+        create_network_from_project_dir,
+    )
+
+    install_graph_snapshot()
+    project_dir = tmp_path / "project"
+    graphml_file = project_dir / "lightrag" / "graph_chunk_entity_relation.graphml"
+    graphml_file.parent.mkdir(parents=True)
+    NetworkXStorage.write_nx_graph(_create_graph(), str(graphml_file))
+    assert snapshot_file(graphml_file).exists()
+
+    graph = create_network_from_project_dir(project_dir)
+    assert NetworkXStorage.load_nx_graph(str(graphml_file)) is graph
+    assert graph.nodes["Acme"]["description"] == "A company"
+
+    # A write by LightRAG replaces the shared graph
+    updated = _create_graph()
+    updated.add_node("Carol", entity_type="person")
+    NetworkXStorage.write_nx_graph(updated, str(graphml_file))
+    assert create_network_from_project_dir(project_dir) is updated
+
+    release_project_graph(project_dir)
+    reloaded = create_network_from_project_dir(project_dir)
+    assert reloaded is not updated
+    assert reloaded.nodes["Carol"]["entity_type"] == "person"
+
+
+def test_analytics_graphs_are_evicted(tmp_path):
+    from graphrag_kb_server.service.lightrag.lightrag_graph_snapshot import (
+        SharedGraphs,
+    )
+
+    graph_files = []
+    for i in range(3):
+        graphml_file = tmp_path / f"graph_{i}.graphml"
+        nx.write_graphml(_create_graph(), graphml_file)
+        graph_files.append(graphml_file)
+
+    shared = SharedGraphs(max_unpinned=1)
+    pinned = shared.load(graph_files[0], pin=True)
+    first = shared.load(graph_files[1])
+    assert shared.load(graph_files[1]) is first
+    shared.load(graph_files[2])
+    # The least recently used analytics graph is dropped, the LightRAG graph is kept
+    assert shared.load(graph_files[0]) is pinned
+    assert shared.load(graph_files[1]) is not first
+    assert len(shared.graphs) == 2
+
+    shared.release(graph_files[0])
+    assert shared.load(graph_files[0]) is not pinned
@@ -0,0 +1,64 @@
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_keyword_cache(tmp_path):
+    from graphrag_kb_server.service.lightrag.lightrag_keyword_cache import KeywordCache
+
+    cache = KeywordCache(max_entries=2, timeout=3600)
+    assert await cache.get(tmp_path, "What is Dwell?", "hybrid") is None
+    await cache.set(tmp_path, "What is Dwell?", "hybrid", ["housing"], ["Dwell"])
+    assert await cache.get(tmp_path, "  what is   dwell? ", "hybrid") == (
+        ["housing"],
+        ["Dwell"],
+    )
+    assert await cache.get(tmp_path, "What is Dwell?", "local") is None
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+    # A new instance reads the persisted entries
+    await cache.flush()
+    reloaded = KeywordCache(max_entries=2, timeout=3600)
+    assert await reloaded.get(tmp_path, "What is Dwell?", "hybrid") is not None
+
+    # The least recently used entry is evicted
+    await cache.set(tmp_path, "q2", "hybrid", ["a"], [])
+    await cache.set(tmp_path, "q3", "hybrid", ["b"], [])
+    assert await cache.get(tmp_path, "What is Dwell?", "hybrid") is None
+
+    cache.clear(tmp_path)
+    assert await cache.get(tmp_path, "q3", "hybrid") is None
+
+
+@pytest.mark.asyncio
+async def test_keyword_cache_expiry(tmp_path):
+    from graphrag_kb_server.service.lightrag.lightrag_keyword_cache import KeywordCache
+
+    cache = KeywordCache(max_entries=10, timeout=0)
+    await cache.set(tmp_path, "q", "hybrid", ["a"], ["b"])
+    assert await cache.get(tmp_path, "q", "hybrid") is None
+
+
+@pytest.mark.asyncio
+async def test_keyword_cache_writes_changes_together(tmp_path, monkeypatch):
+    import asyncio
+    from graphrag_kb_server.service.lightrag.lightrag_keyword_cache import KeywordCache
+
+    cache = KeywordCache(max_entries=10, timeout=3600, write_delay=0.05)
+    writes = []
+    persist = cache._persist
+    monkeypatch.setattr(
+        cache, "_persist", lambda *args: writes.append(1) or persist(*args)
+    )
+    # Concurrent first requests share the loaded entries
+    await asyncio.gather(
+        cache.set(tmp_path, "q1", "hybrid", ["a"], []),
+        cache.set(tmp_path, "q2", "hybrid", ["b"], []),
+    )
+    assert writes == []
+    await asyncio.sleep(0.1)
+    assert writes == [1]
+    reloaded = KeywordCache(max_entries=10, timeout=3600)
+    assert await reloaded.get(tmp_path, "q1", "hybrid") == (["a"], [])
+    assert await reloaded.get(tmp_path, "q2", "hybrid") == (["b"], [])
@@ -0,0 +1,58 @@
+import networkx as nx
+
+
+def _create_graph() -> nx.Graph:
+    graph = nx.Graph()
+    graph.add_node("Onepoint", entity_type="organization")
+    graph.add_node("Onepoint Labs", entity_type="organization")
+    graph.add_node("Artificial Intelligence (AI)", entity_type="concept")
+    graph.add_node("Data Architecture", entity_type="concept")
+    graph.add_node("Alan", entity_type="UNKNOWN")
+    return graph
+
+
+def test_automaton_finds_all_aliases():
+    from graphrag_kb_server.service.lightrag.lightrag_keyword_matcher import (
+        KeywordAutomaton,
+        entity_aliases,
+    )
+
+    assert entity_aliases("Artificial Intelligence (AI)") == [
+        ["artificial", "intelligence", "ai"],
+        ["artificial", "intelligence"],
+        ["ai"],
+    ]
+    automaton = KeywordAutomaton()
+    for name in ["he", "she", "hers", "his"]:
+        automaton.add([*name], name)
+    automaton.build()
+    # The classic example with characters as tokens
+    assert sorted(automaton.find([*"ushers"])) == sorted(
+        [(2, 4, "he"), (1, 4, "she"), (2, 6, "hers")]
+    )
+
+
+def test_match_keywords(tmp_path):
+    from graphrag_kb_server.service.lightrag.lightrag_keyword_matcher import (
+        build_keyword_matcher,
+        match_keywords,
+    )
+
+    matcher = build_keyword_matcher(_create_graph(), tmp_path, "v1")
+    keyword_match = match_keywords(
+        matcher, "How does Onepoint Labs use AI for data architecture?"
+    )
+    # The longest match wins over the overlapping "Onepoint"
+    assert keyword_match.ll_keywords == [
+        "Onepoint Labs",
+        "Artificial Intelligence (AI)",
+        "Data Architecture",
+    ]
+    assert keyword_match.hl_keywords == ["organization", "concept"]
+    # "use" is the only content word without a match
+    assert keyword_match.coverage == 5 / 6
+
+    keyword_match = match_keywords(matcher, "Who was Alan Turing?")
+    assert keyword_match.ll_keywords == ["Alan"]
+    assert keyword_match.hl_keywords == []
+    assert keyword_match.coverage == 0.5
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+
+def _vectors(rows: int, dim: int = 32, seed: int = 42) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((rows, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("quantization", ["int8", "float16"])
+def test_rescored_search_matches_exact_scan(quantization):
+    from graphrag_kb_server.service.lightrag.lightrag_quantization import (
+        Quantization,
+        QuantizedMatrix,
+        rescored_search,
+    )
+
+    matrix = _vectors(400)
+    quantized = QuantizedMatrix.from_matrix(matrix, Quantization(quantization))
+    assert quantized.nbytes < matrix.nbytes
+    query = _vectors(1, seed=7)[0]
+    assert np.allclose(quantized.scores(query), matrix @ query, atol=0.02)
+
+    rows, scores = rescored_search(quantized, matrix, query, 10)
+    expected = np.argsort(matrix @ query)[::-1][:10]
+    assert rows.tolist() == expected.tolist()
+    assert np.array_equal(scores, (matrix @ query)[expected])
+
+    # Only the candidate rows are ranked
+    candidates = np.arange(0, 400, 2)
+    rows, _ = rescored_search(quantized, matrix, query, 5, candidates)
+    assert all(row % 2 == 0 for row in rows)
+
+
+def test_storage_of_configured_project_is_quantized(tmp_path, monkeypatch):
+    from nano_vectordb import NanoVectorDB
+    from graphrag_kb_server.service.lightrag import lightrag_quantization
+
+    monkeypatch.setattr(
+        lightrag_quantization.lightrag_cfg, "lightrag_quantization", "int8"
+    )
+    monkeypatch.setattr(
+        lightrag_quantization.lightrag_cfg, "lightrag_quantization_projects", ["t1/p1"]
+    )
+    lightrag_quantization.install_quantization()
+    working_dir = tmp_path / "t1" / "lightrag" / "p1" / "lightrag"
+    working_dir.mkdir(parents=True)
+    storage_file = working_dir / "vdb_chunks.json"
+    vectors = _vectors(100)
+    db = NanoVectorDB(32, storage_file=str(storage_file))
+    db.upsert([{"__id__": f"c{i}", "__vector__": v} for i, v in enumerate(vectors)])
+    db.upsert([{"__id__": "c1", "__vector__": vectors[50]}])
+    db.delete(["c2"])
+    assert len(db._quantized) == len(db) == 99
+    assert {r["__id__"] for r in db.query(vectors[50], top_k=2)} == {"c1", "c50"}
+
+    db.save()
+    assert lightrag_quantization.quantized_file(storage_file).exists()
+    reloaded = NanoVectorDB(32, storage_file=str(storage_file))
+    assert np.array_equal(reloaded._quantized.values, db._quantized.values)
+    result = reloaded.query(vectors[10], top_k=1)[0]
+    assert result["__id__"] == "c10"
+    assert result["__metrics__"] == pytest.approx(1.0, abs=1e-5)
+
+    other_dir = tmp_path / "t1" / "lightrag" / "p2" / "lightrag"
+    other_dir.mkdir(parents=True)
+    other = NanoVectorDB(32, storage_file=str(other_dir / "vdb_chunks.json"))
+    assert other._quantized is None
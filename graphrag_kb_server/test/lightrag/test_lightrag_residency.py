@@ -0,0 +1,76 @@
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_and_single_flight(monkeypatch):
+    from graphrag_kb_server.service.lightrag import lightrag_residency
+
+    monkeypatch.setattr(lightrag_residency, "estimate_memory", lambda rag: 100)
+    released = []
+    monkeypatch.setattr(lightrag_residency, "release_shared_data", released.append)
+    loads = []
+
+    async def loader(project_dir: Path):
+        loads.append(project_dir.name)
+        await asyncio.sleep(0.01)
+        return SimpleNamespace(workspace=project_dir.name)
+
+    manager = lightrag_residency.LightRAGResidencyManager(memory_budget=250)
+    first, second = await asyncio.gather(
+        manager.load(Path("/p/a"), loader), manager.load(Path("/p/a"), loader)
+    )
+    assert first is second
+    assert loads == ["a"]
+
+    await manager.load(Path("/p/b"), loader)
+    assert manager.get(Path("/p/a")) is first  # a is now more recent than b
+    await manager.load(Path("/p/c"), loader)
+    assert manager.get(Path("/p/b")) is None
+    assert released == ["b"]
+    assert manager.get(Path("/p/a")) is first
+
+    stats = manager.stats()
+    assert stats["evictions"] == 1
+    assert stats["loads"] == 3
+    assert [p["project"] for p in stats["projects"]] == ["/p/a", "/p/c"]
+    assert manager.resident_memory() == 200
+    assert manager.has_capacity()
+
+
+@pytest.mark.asyncio
+async def test_failed_load_is_not_cached():
+    from graphrag_kb_server.service.lightrag.lightrag_residency import (
+        LightRAGResidencyManager,
+    )
+
+    async def failing_loader(_: Path):
+        raise ValueError("cannot load")
+
+    manager = LightRAGResidencyManager(memory_budget=0)
+    with pytest.raises(ValueError):
+        await manager.load(Path("/p/a"), failing_loader)
+    assert manager.get(Path("/p/a")) is None
+    assert manager.loading == {}
+
+
+def test_release_shared_data(monkeypatch):
+    from lightrag.kg import shared_storage
+    from graphrag_kb_server.service.lightrag.lightrag_residency import (
+        release_shared_data,
+    )
+
+    shared = {
+        "/p/a:text_chunks": {"chunk": 1},
+        "/p/a:pipeline_status": {"busy": False},
+        "/p/ab:text_chunks": {"chunk": 2},
+    }
+    monkeypatch.setattr(shared_storage, "_shared_dicts", shared)
+    monkeypatch.setattr(shared_storage, "_init_flags", {"/p/a:text_chunks": True})
+    monkeypatch.setattr(shared_storage, "_update_flags", {})
+    release_shared_data("/p/a")
+    assert list(shared.keys()) == ["/p/a:pipeline_status", "/p/ab:text_chunks"]
+    assert shared_storage._init_flags == {}
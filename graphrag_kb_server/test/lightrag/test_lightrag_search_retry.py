@@ -0,0 +1,91 @@
+from pathlib import Path
+
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_retry_reuses_completed_stages(monkeypatch):
+    from graphrag_kb_server.model.chat_response import ChatResponse
+    from graphrag_kb_server.model.rag_parameters import QueryParameters
+    from graphrag_kb_server.service.lightrag import lightrag_search as search_module
+
+    attempts = []
+
+    async def failing_once_search(query_params, only_need_context=False, stages=None):
+        attempts.append(
+            (query_params.max_entity_size, stages.keywords, stages.reduced_context)
+        )
+        if stages.keywords is None:
+            stages.keywords = (["high"], ["low"])
+            raise ValueError("LLM failure")
+        return ChatResponse(question=query_params.context_params.query, response="ok")
+
+    monkeypatch.setattr(search_module, "_lightrag_search_impl", failing_once_search)
+    query_params = QueryParameters(
+        format="json",
+        search="hybrid",
+        engine="lightrag",
+        context_params={"query": "retry me", "project_dir": Path("/tmp/project")},
+    )
+    chat_response = await search_module.lightrag_search(query_params)
+    assert chat_response.response == "ok"
+    # Only the retry caps the entities and relations of the context
+    assert attempts == [(30, None, False), (10, (["high"], ["low"]), True)]
+
+
+@pytest.mark.asyncio
+async def test_prefetch_vector_chunks(monkeypatch):
+    from types import SimpleNamespace
+    from lightrag import QueryParam
+    from graphrag_kb_server.service.lightrag import lightrag_search as search_module
+
+    embedding_calls = []
+
+    async def embed(texts):
+        embedding_calls.append(texts)
+        return [[0.1, 0.2]]
+
+    async def get_vector_context(query, chunks_vdb, query_param, query_embedding):
+        assert query_embedding == [0.1, 0.2]
+        return [{"chunk_id": "chunk-1", "content": "content"}]
+
+    monkeypatch.setattr(search_module, "_get_vector_context", get_vector_context)
+    text_chunks_db = SimpleNamespace(embedding_func=SimpleNamespace(func=embed))
+    stages = search_module.QueryStages()
+    await search_module._prefetch_vector_chunks(
+        "query", text_chunks_db, object(), QueryParam(mode="mix"), stages
+    )
+    assert stages.query_embedding == [0.1, 0.2]
+    assert stages.vector_chunks == [{"chunk_id": "chunk-1", "content": "content"}]
+    assert len(embedding_calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_mix_search_tracks_prefetched_vector_chunks():
+    from types import SimpleNamespace
+    from lightrag import QueryParam
+    from graphrag_kb_server.service.lightrag import lightrag_search as search_module
+
+    stages = search_module.QueryStages(
+        query_embedding=[0.1, 0.2],
+        vector_chunks=[{"chunk_id": "chunk-1", "content": "content"}],
+    )
+    text_chunks_db = SimpleNamespace(global_config={}, embedding_func=None)
+    # No entity or relation matches, only the chunks found by vector similarity
+    search_result = await search_module._perform_kg_search(
+        "query",
+        [],
+        [],
+        None,
+        None,
+        None,
+        text_chunks_db,
+        QueryParam(mode="mix"),
+        object(),
+        stages=stages,
+    )
+    assert search_result["final_entities"] == []
+    assert search_result["final_relations"] == []
+    assert search_result["chunk_tracking"] == {
+        "chunk-1": {"source": "C", "frequency": 1, "order": 1}
+    }
@@ -0,0 +1,98 @@
+import pytest
+
+
+def _answer(text: str) -> dict:
+    return {"content": text, "response": None, "context": "ctx", "raw_data": {}}
+
+
+@pytest.mark.asyncio
+async def test_semantic_answer_cache(tmp_path):
+    from graphrag_kb_server.service.lightrag.lightrag_semantic_cache import (
+        SemanticAnswerCache,
+    )
+
+    cache = SemanticAnswerCache(True, [], max_entries=2, threshold=0.9)
+    assert await cache.get(tmp_path, [1.0, 0.0], "params") is None
+    await cache.set(
+        tmp_path, "What does Onepoint do?", [1.0, 0.0], "params", _answer("a")
+    )
+
+    # A similar query gets the answer, unless the other parameters differ
+    hit = await cache.get(tmp_path, [0.99, 0.1], "params")
+    assert hit["content"] == "a"
+    assert hit["query"] == "What does Onepoint do?"
+    assert hit["similarity"] > 0.9
+    assert await cache.get(tmp_path, [0.99, 0.1], "other params") is None
+    assert await cache.get(tmp_path, [0.0, 1.0], "params") is None
+
+    # A new instance reads the persisted entries
+    await cache.flush()
+    reloaded = SemanticAnswerCache(True, [], max_entries=2, threshold=0.9)
+    assert (await reloaded.get(tmp_path, [1.0, 0.0], "params"))["content"] == "a"
+
+    # The least recently used entry is evicted
+    await cache.set(tmp_path, "q2", [0.0, 1.0], "params", _answer("b"))
+    await cache.set(tmp_path, "q3", [-1.0, 0.0], "params", _answer("c"))
+    assert await cache.get(tmp_path, [1.0, 0.0], "params") is None
+    assert (await cache.get(tmp_path, [-1.0, 0.0], "params"))["content"] == "c"
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_semantic_answer_cache_invalidated_on_reindex(tmp_path):
+    from graphrag_kb_server.service.lightrag.lightrag_semantic_cache import (
+        SemanticAnswerCache,
+    )
+
+    graph_file = tmp_path / "lightrag" / "graph_chunk_entity_relation.graphml"
+    graph_file.parent.mkdir()
+    graph_file.write_text("<graphml/>")
+    cache = SemanticAnswerCache(True, [], max_entries=10, threshold=0.9)
+    await cache.set(tmp_path, "q", [1.0, 0.0], "params", _answer("a"))
+    assert await cache.get(tmp_path, [1.0, 0.0], "params") is not None
+
+    graph_file.write_text("<graphml>reindexed</graphml>")
+    assert await cache.get(tmp_path, [1.0, 0.0], "params") is None
+    assert not (tmp_path / "cache" / "semantic_answers.pkl").exists()
+
+
+def test_semantic_cache_enabled_projects(tmp_path):
+    from graphrag_kb_server.service.lightrag.lightrag_semantic_cache import (
+        SemanticAnswerCache,
+    )
+
+    project_dir = tmp_path / "tennant1" / "lightrag" / "project1"
+    assert not SemanticAnswerCache(False, [], 10, 0.9).is_enabled(project_dir)
+    assert SemanticAnswerCache(True, [], 10, 0.9).is_enabled(project_dir)
+    assert SemanticAnswerCache(True, ["tennant1/project1"], 10, 0.9).is_enabled(
+        project_dir
+    )
+    assert not SemanticAnswerCache(True, ["tennant1/other"], 10, 0.9).is_enabled(
+        project_dir
+    )
+
+
+@pytest.mark.asyncio
+async def test_semantic_answer_cache_writes_changes_together(tmp_path, monkeypatch):
+    import asyncio
+    from graphrag_kb_server.service.lightrag.lightrag_semantic_cache import (
+        SemanticAnswerCache,
+    )
+
+    cache = SemanticAnswerCache(
+        True, [], max_entries=10, threshold=0.9, write_delay=0.05
+    )
+    writes = []
+    persist = cache._persist
+    monkeypatch.setattr(
+        cache, "_persist", lambda *args: writes.append(1) or persist(*args)
+    )
+    await cache.set(tmp_path, "q1", [1.0, 0.0], "params", _answer("a"))
+    await cache.set(tmp_path, "q2", [0.0, 1.0], "params", _answer("b"))
+    assert writes == []
+    await asyncio.sleep(0.1)
+    assert writes == [1]
+    reloaded = SemanticAnswerCache(True, [], max_entries=10, threshold=0.9)
+    assert (await reloaded.get(tmp_path, [0.0, 1.0], "params"))["content"] == "b"
@@ -0,0 +1,57 @@
+from lightrag.utils import Tokenizer, truncate_list_by_token_size
+
+
+class _WhitespaceTokenizer:
+
+    def encode(self, content: str) -> list[int]:
+        return [len(t) for t in content.split()]
+
+    def decode(self, tokens: list[int]) -> str:
+        return ""
+
+
+def _create_items() -> list[dict]:
+    return [
+        {"entity": f"Entity {i}", "type": "concept", "description": "word " * i}
+        for i in range(20)
+    ]
+
+
+def test_truncate_matches_lightrag(tmp_path):
+    from graphrag_kb_server.service.lightrag.lightrag_token_cache import (
+        TokenCountCache,
+        serialize_fragment,
+    )
+
+    tokenizer = Tokenizer("whitespace", _WhitespaceTokenizer())
+    cache = TokenCountCache(tmp_path, tokenizer)
+    items = _create_items()
+    for max_tokens in [0, 10, 50, 100, 1000]:
+        expected = truncate_list_by_token_size(
+            items,
+            key=serialize_fragment,
+            max_token_size=max_tokens,
+            tokenizer=tokenizer,
+        )
+        kept, fragments, tokens = cache.truncate(items, max_tokens)
+        assert kept == expected
+        assert fragments == [serialize_fragment(i) for i in expected]
+        assert tokens <= max(max_tokens, 0)
+    assert cache.hits > 0
+
+
+def test_token_counts_are_persisted(tmp_path):
+    from graphrag_kb_server.service.lightrag.lightrag_token_cache import TokenCountCache
+
+    (tmp_path / "lightrag").mkdir()
+    tokenizer = Tokenizer("whitespace", _WhitespaceTokenizer())
+    cache = TokenCountCache(tmp_path, tokenizer)
+    assert cache.count("one two three") == 3
+    cache.save()
+    assert cache.counts_file.exists()
+
+    reloaded = TokenCountCache(tmp_path, tokenizer)
+    reloaded.load()
+    assert reloaded.count("one two three") == 3
+    assert reloaded.hits == 1
+    assert reloaded.misses == 0
@@ -0,0 +1,72 @@
+import json
+
+import numpy as np
+
+
+def _create_db(storage_file):
+    from nano_vectordb import NanoVectorDB
+
+    db = NanoVectorDB(4, storage_file=str(storage_file))
+    rng = np.random.default_rng(42)
+    db.upsert(
+        [
+            {"__id__": f"chunk-{i}", "__vector__": rng.random(4), "content": f"c{i}"}
+            for i in range(10)
+        ]
+    )
+    return db
+
+
+def test_sidecar_is_memory_mapped(tmp_path):
+    from nano_vectordb import NanoVectorDB
+    from graphrag_kb_server.service.lightrag.lightrag_vector_sidecar import (
+        install_vector_sidecar,
+        sidecar_files,
+    )
+
+    install_vector_sidecar()
+    storage_file = tmp_path / "vdb_chunks.json"
+    db = _create_db(storage_file)
+    db.save()
+    matrix_file, meta_file = sidecar_files(storage_file)
+    assert matrix_file.exists() and meta_file.exists()
+
+    query = np.array([0.1, 0.2, 0.3, 0.4])
+    expected = db.query(query, top_k=3)
+    reloaded = NanoVectorDB(4, storage_file=str(storage_file))
+    storage = getattr(reloaded, "_NanoVectorDB__storage")
+    assert isinstance(storage["matrix"], np.memmap)
+    assert [r["__id__"] for r in reloaded.query(query, top_k=3)] == [
+        r["__id__"] for r in expected
+    ]
+    assert len(reloaded) == 10
+
+    # Upserts and deletes work on the copy-on-write matrix
+    reloaded.upsert([{"__id__": "chunk-0", "__vector__": query, "content": "new"}])
+    reloaded.delete(["chunk-1"])
+    assert reloaded.query(query, top_k=1)[0]["__id__"] == "chunk-0"
+    assert len(NanoVectorDB(4, storage_file=str(storage_file))) == 10
+
+
+def test_outdated_sidecar_is_regenerated(tmp_path):
+    from nano_vectordb import NanoVectorDB
+    from nano_vectordb.dbs import array_to_buffer_string, buffer_string_to_array
+    from graphrag_kb_server.service.lightrag.lightrag_vector_sidecar import (
+        install_vector_sidecar,
+        read_sidecar,
+    )
+
+    install_vector_sidecar()
+    storage_file = tmp_path / "vdb_entities.json"
+    _create_db(storage_file).save()
+
+    # The JSON file is changed without the sidecar, e.g. by another version of the server
+    stored = json.loads(storage_file.read_text())
+    matrix = buffer_string_to_array(stored["matrix"]).reshape(-1, 4)
+    stored["data"] = stored["data"][:5]
+    stored["matrix"] = array_to_buffer_string(matrix[:5])
+    storage_file.write_text(json.dumps(stored))
+    assert read_sidecar(storage_file) is None
+
+    assert len(NanoVectorDB(4, storage_file=str(storage_file))) == 5
+    assert read_sidecar(storage_file)["matrix"].shape == (5, 4)
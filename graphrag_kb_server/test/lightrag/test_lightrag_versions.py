@@ -0,0 +1,136 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+
+def test_staging_publish_and_retire(tmp_path):
+    from graphrag_kb_server.service.lightrag.lightrag_versions import (
+        create_staging_dir,
+        get_project_version,
+        get_working_dir,
+        publish_version,
+        remove_retired_versions,
+    )
+
+    project_dir = tmp_path / "project"
+    served_dir = project_dir / "lightrag"
+    served_dir.mkdir(parents=True)
+    (served_dir / "vdb_entities.json").write_text("{}")
+    (served_dir / "knowledge_graph.html").write_text("<html/>")
+    assert get_project_version(project_dir) == 0
+    assert get_working_dir(project_dir) == served_dir
+
+    # An incremental index starts from the served version
+    version, staging_dir = create_staging_dir(project_dir, incremental=True)
+    assert version == 1
+    assert staging_dir.name == "lightrag.v1"
+    assert (staging_dir / "vdb_entities.json").exists()
+    assert not (staging_dir / "knowledge_graph.html").exists()
+    assert get_working_dir(project_dir) == served_dir
+
+    publish_version(project_dir, version, staging_dir)
+    assert get_project_version(project_dir) == 1
+    assert get_working_dir(project_dir) == staging_dir
+
+    # A full index starts from an empty directory
+    version, next_dir = create_staging_dir(project_dir, incremental=False)
+    assert version == 2
+    assert list(next_dir.iterdir()) == []
+    publish_version(project_dir, version, next_dir)
+
+    (project_dir / "input").mkdir()
+    remove_retired_versions(project_dir, [next_dir, staging_dir])
+    assert sorted(p.name for p in project_dir.iterdir() if p.is_dir()) == [
+        "input",
+        "lightrag.v1",
+        "lightrag.v2",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_residency_swap(monkeypatch):
+    from graphrag_kb_server.service.lightrag import lightrag_residency
+
+    monkeypatch.setattr(lightrag_residency, "estimate_memory", lambda rag: 100)
+    released = []
+    monkeypatch.setattr(lightrag_residency, "release_shared_data", released.append)
+
+    async def loader(project_dir: Path):
+        return SimpleNamespace(workspace=f"{project_dir.name}/lightrag")
+
+    manager = lightrag_residency.LightRAGResidencyManager(memory_budget=0)
+    previous = await manager.load(Path("/p/a"), loader)
+    staged = SimpleNamespace(workspace="a/lightrag.v1")
+    assert await manager.swap(Path("/p/a"), staged) is previous
+    assert manager.get(Path("/p/a")) is staged
+    assert released == ["a/lightrag"]
+    # The swapped version is not replaced by a later load
+    assert await manager.load(Path("/p/a"), loader) is staged
+    assert manager.stats()["swaps"] == 1
+
+    # A project which was not loaded is swapped in as well
+    assert await manager.swap(Path("/p/b"), staged) is None
+    assert manager.get(Path("/p/b")) is staged
+
+
+@pytest.mark.asyncio
+async def test_full_index_builds_derived_artifacts_before_swap(tmp_path, monkeypatch):
+    from graphrag_kb_server.service.lightrag import lightrag_index_support
+    from graphrag_kb_server.service.lightrag.lightrag_versions import (
+        get_project_version,
+    )
+
+    project_dir = tmp_path / "project"
+    (project_dir / "lightrag").mkdir(parents=True)
+    (project_dir / "communities_10.json").write_text("[]")
+    (project_dir / "communities_2024-01-01.xlsx").write_text("")
+    events = []
+
+    def record(event: str):
+        async def call(*args, **kwargs):
+            events.append((event, get_project_version(project_dir)))
+
+        return call
+
+    async def create_rag(project_folder: Path, working_dir: Path):
+        return SimpleNamespace(working_dir=str(working_dir))
+
+    async def swap(project_folder: Path, rag):
+        events.append(("swap", get_project_version(project_dir)))
+
+    monkeypatch.setattr(lightrag_index_support.lightrag_cfg, "lightrag_hot_swap", True)
+    monkeypatch.setattr(lightrag_index_support, "create_rag", create_rag)
+    monkeypatch.setattr(lightrag_index_support, "_index_files", record("index"))
+    monkeypatch.setattr(
+        lightrag_index_support, "refresh_centrality_scores", record("centrality")
+    )
+    monkeypatch.setattr(lightrag_index_support, "save_links", record("links"))
+    monkeypatch.setattr(
+        lightrag_index_support, "save_path_properties", record("path_properties")
+    )
+    monkeypatch.setattr(lightrag_index_support.lightrag_cache, "swap", swap)
+    monkeypatch.setattr(
+        lightrag_index_support, "get_keyword_matcher", record("keyword_matcher")
+    )
+    monkeypatch.setattr(
+        lightrag_index_support, "precompute_token_counts", record("token_counts")
+    )
+    monkeypatch.setattr(
+        lightrag_index_support, "_clear_graph_derived_rows", record("graph_rows")
+    )
+
+    await lightrag_index_support.acreate_lightrag(True, project_dir, False, None)
+    assert events == [
+        ("index", 0),
+        ("centrality", 0),
+        ("links", 0),
+        ("path_properties", 0),
+        ("swap", 1),
+        ("keyword_matcher", 1),
+        ("graph_rows", 1),
+        ("token_counts", 1),
+    ]
+    # The communities of the previous graph are generated again on request
+    assert not (project_dir / "communities_10.json").exists()
+    assert (project_dir / "communities_2024-01-01.xlsx").exists()
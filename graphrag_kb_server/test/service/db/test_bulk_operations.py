@@ -0,0 +1,219 @@
+from datetime import datetime
+
+import asyncpg
+import pytest
+
+from graphrag_kb_server.model.path_properties import PathProperties
+from graphrag_kb_server.model.project import FullProject
+from graphrag_kb_server.test.service.db.common_test_support import (
+    create_test_project_wrapper,
+)
+
+
+COLUMNS = ["PATH", "ORIGINAL_PATH", "LAST_MODIFIED", "PROJECT_ID"]
+CONFLICT_COLUMNS = ["PATH", "PROJECT_ID"]
+UPDATE_COLUMNS = ["ORIGINAL_PATH", "LAST_MODIFIED", "UPDATED_AT"]
+
+
+def _record(path: str, original_path: str, project_id: int, day: int = 1) -> tuple:
+    return (path, original_path, datetime(2024, 6, day, 12, 0, 0), project_id)
+
+
+def _props(
+    path: str, project_id: int, original_path: str | None = None
+) -> PathProperties:
+    return PathProperties(
+        path=path,
+        original_path=original_path,
+        project_id=project_id,
+        last_modified=datetime(2024, 6, 1, 12, 0, 0),
+    )
+
+
+async def _rows(schema_name: str, project_id: int) -> list[tuple[str, str]]:
+    from graphrag_kb_server.service.db.connection_pool import fetch_all
+    from graphrag_kb_server.service.db.db_persistence_path_properties import (
+        TB_PATH_PROPERTIES,
+    )
+
+    rows = await fetch_all(
+        f"""
+SELECT PATH, ORIGINAL_PATH FROM {schema_name}.{TB_PATH_PROPERTIES}
+WHERE PROJECT_ID = $1 ORDER BY ID;
+""",
+        project_id,
+    )
+    return [(row["path"], row["original_path"]) for row in rows]
+
+
+@pytest.mark.asyncio
+async def test_bulk_insert_keeps_the_first_record_without_update_columns():
+    """Without update columns, duplicates in the batch and existing rows are left unchanged."""
+    from graphrag_kb_server.service.db.bulk_operations import bulk_insert
+    from graphrag_kb_server.service.db.db_persistence_path_properties import (
+        TB_PATH_PROPERTIES,
+        create_path_properties_table,
+        drop_path_properties_table,
+    )
+
+    async def test_function(
+        full_project: FullProject,
+        found_project: FullProject,
+        schema_name: str,
+        project_name: str,
+    ):
+        project_id = found_project.id
+        try:
+            await create_path_properties_table(schema_name)
+            inserted = await bulk_insert(
+                schema_name,
+                TB_PATH_PROPERTIES,
+                COLUMNS,
+                [
+                    _record("/docs/b.pdf", "b1", project_id),
+                    _record("/docs/a.pdf", "a1", project_id),
+                    _record("/docs/b.pdf", "b2", project_id),
+                ],
+                CONFLICT_COLUMNS,
+            )
+            assert inserted == 2
+            # New rows are numbered in the order of the records
+            assert await _rows(schema_name, project_id) == [
+                ("/docs/b.pdf", "b1"),
+                ("/docs/a.pdf", "a1"),
+            ]
+
+            inserted = await bulk_insert(
+                schema_name,
+                TB_PATH_PROPERTIES,
+                COLUMNS,
+                [
+                    _record("/docs/a.pdf", "a2", project_id),
+                    _record("/docs/c.pdf", "c1", project_id),
+                ],
+                CONFLICT_COLUMNS,
+            )
+            assert inserted == 1
+            assert await _rows(schema_name, project_id) == [
+                ("/docs/b.pdf", "b1"),
+                ("/docs/a.pdf", "a1"),
+                ("/docs/c.pdf", "c1"),
+            ]
+        finally:
+            await drop_path_properties_table(schema_name)
+
+    await create_test_project_wrapper(test_function)
+
+
+@pytest.mark.asyncio
+async def test_bulk_insert_keeps_the_last_record_with_update_columns():
+    """With update columns, the last duplicate in the batch wins and existing rows are updated."""
+    from graphrag_kb_server.service.db.bulk_operations import bulk_insert
+    from graphrag_kb_server.service.db.db_persistence_path_properties import (
+        TB_PATH_PROPERTIES,
+        create_path_properties_table,
+        drop_path_properties_table,
+        find_path_properties,
+    )
+
+    async def test_function(
+        full_project: FullProject,
+        found_project: FullProject,
+        schema_name: str,
+        project_name: str,
+    ):
+        project_id = found_project.id
+        try:
+            await create_path_properties_table(schema_name)
+            await bulk_insert(
+                schema_name,
+                TB_PATH_PROPERTIES,
+                COLUMNS,
+                [_record("/docs/a.pdf", "a1", project_id)],
+                CONFLICT_COLUMNS,
+                UPDATE_COLUMNS,
+            )
+            updated = await bulk_insert(
+                schema_name,
+                TB_PATH_PROPERTIES,
+                COLUMNS,
+                [
+                    _record("/docs/a.pdf", "a2", project_id, day=2),
+                    _record("/docs/b.pdf", "b1", project_id),
+                    _record("/docs/a.pdf", "a3", project_id, day=3),
+                ],
+                CONFLICT_COLUMNS,
+                UPDATE_COLUMNS,
+            )
+            assert updated == 2
+            assert await _rows(schema_name, project_id) == [
+                ("/docs/a.pdf", "a3"),
+                ("/docs/b.pdf", "b1"),
+            ]
+            found = await find_path_properties(schema_name, "/docs/a.pdf", project_id)
+            assert found is not None
+            assert found.last_modified.day == 3
+        finally:
+            await drop_path_properties_table(schema_name)
+
+    await create_test_project_wrapper(test_function)
+
+
+@pytest.mark.asyncio
+async def test_upsert_path_properties_replaces_the_project_records():
+    """`replace_project_id` deletes the previous records in the same transaction as the insert."""
+    from graphrag_kb_server.service.db.db_persistence_path_properties import (
+        create_path_properties_table,
+        drop_path_properties_table,
+        upsert_path_properties,
+    )
+
+    async def test_function(
+        full_project: FullProject,
+        found_project: FullProject,
+        schema_name: str,
+        project_name: str,
+    ):
+        project_id = found_project.id
+        try:
+            await create_path_properties_table(schema_name)
+            await upsert_path_properties(
+                schema_name,
+                [
+                    _props("/docs/a.pdf", project_id, "a1"),
+                    _props("/docs/b.pdf", project_id, "b1"),
+                ],
+            )
+
+            await upsert_path_properties(
+                schema_name,
+                [
+                    _props("/docs/b.pdf", project_id, "b2"),
+                    _props("/docs/c.pdf", project_id, "c1"),
+                ],
+                replace_project_id=project_id,
+            )
+            assert await _rows(schema_name, project_id) == [
+                ("/docs/b.pdf", "b2"),
+                ("/docs/c.pdf", "c1"),
+            ]
+
+            # A failing insert rolls back the delete
+            with pytest.raises(asyncpg.ForeignKeyViolationError):
+                await upsert_path_properties(
+                    schema_name,
+                    [_props("/docs/d.pdf", project_id + 99999)],
+                    replace_project_id=project_id,
+                )
+            assert await _rows(schema_name, project_id) == [
+                ("/docs/b.pdf", "b2"),
+                ("/docs/c.pdf", "c1"),
+            ]
+
+            # Replacing with no records only deletes
+            await upsert_path_properties(schema_name, [], replace_project_id=project_id)
+            assert await _rows(schema_name, project_id) == []
+        finally:
+            await drop_path_properties_table(schema_name)
+
+    await create_test_project_wrapper(test_function)
@@ -45,3 +45,61 @@ async def test_create_expanded_entities():
             await drop_expanded_entities_table(schema_name)
 
     await create_test_project_wrapper(test_function)
+
+
+@pytest.mark.asyncio
+async def test_expanded_entities_per_centrality_measure():
+    from graphrag_kb_server.model.node_centrality import CentralityMeasure
+    from graphrag_kb_server.model.search.entity import (
+        Abstraction,
+        EntityList,
+        EntityWithScore,
+    )
+    from graphrag_kb_server.model.search.match_query import MatchOutput
+    from graphrag_kb_server.service.db.db_persistence_expanded_entities import (
+        create_expanded_entities_table,
+        drop_expanded_entities_table,
+        insert_expanded_entities,
+        get_expanded_entities,
+    )
+    from graphrag_kb_server.test.service.db.common_test_support import (
+        create_project_dir,
+        create_test_project_wrapper,
+    )
+
+    def match_output(entity: str) -> MatchOutput:
+        match = EntityWithScore(
+            entity=entity, score=0.9, reasoning="", abstraction=Abstraction.HIGH_LEVEL
+        )
+        return MatchOutput(entity_dict={"category": EntityList(entities=[match])})
+
+    async def test_function(
+        full_project: FullProject, _: Project, schema_name: str, project_name: str
+    ):
+        fake_project_dir = create_project_dir(
+            schema_name, full_project.engine, project_name
+        )
+        betweenness_query = create_match_query()
+        pagerank_query = betweenness_query.model_copy(
+            update={"centrality_measure": CentralityMeasure.PAGERANK}
+        )
+        try:
+            await create_expanded_entities_table(schema_name)
+            await insert_expanded_entities(
+                fake_project_dir, betweenness_query, match_output("Betweenness")
+            )
+            # The same profile with another measure is not served from the cache
+            assert await get_expanded_entities(fake_project_dir, pagerank_query) is None
+            await insert_expanded_entities(
+                fake_project_dir, pagerank_query, match_output("PageRank")
+            )
+            for query, entity in (
+                (betweenness_query, "Betweenness"),
+                (pagerank_query, "PageRank"),
+            ):
+                found = await get_expanded_entities(fake_project_dir, query)
+                assert found.entity_dict["category"].entities[0].entity == entity
+        finally:
+            await drop_expanded_entities_table(schema_name)
+
+    await create_test_project_wrapper(test_function)
@@ -183,3 +183,95 @@ async def test_find_path_links_returns_only_for_project():
             await drop_links_table_table(schema_name)
 
     await create_test_project_wrapper(test_function)
+
+
+@pytest.mark.asyncio
+async def test_save_path_links_with_duplicates_in_one_batch():
+    """Duplicates within one batch are loaded once."""
+
+    from graphrag_kb_server.service.db.db_persistence_links import (
+        create_path_links_table,
+        drop_links_table_table,
+        save_path_links,
+        find_path_links,
+    )
+
+    async def test_function(
+        full_project: FullProject,
+        found_project: FullProject,
+        schema_name: str,
+        project_name: str,
+    ):
+        project_id = found_project.id
+        assert project_id is not None
+
+        try:
+            await create_path_links_table(schema_name)
+            links = [
+                PathLink(
+                    path=f"/doc/{i % 50}",
+                    link=f"https://example.com/{i % 50}",
+                    project_id=project_id,
+                )
+                for i in range(200)
+            ]
+            await save_path_links(schema_name, links)
+            found = await find_path_links(schema_name, project_id)
+            assert len(found) == 50
+        finally:
+            await drop_links_table_table(schema_name)
+
+    await create_test_project_wrapper(test_function)
+
+
+@pytest.mark.asyncio
+async def test_save_path_links_replaces_project_links():
+    """Links saved with replace_project_id replace the previous links of the project."""
+
+    from graphrag_kb_server.service.db.db_persistence_links import (
+        create_path_links_table,
+        drop_links_table_table,
+        save_path_links,
+        find_path_links,
+    )
+
+    async def test_function(
+        full_project: FullProject,
+        found_project: FullProject,
+        schema_name: str,
+        project_name: str,
+    ):
+        project_id = found_project.id
+        assert project_id is not None
+
+        try:
+            await create_path_links_table(schema_name)
+            await save_path_links(
+                schema_name,
+                [
+                    PathLink(
+                        path="/doc/old",
+                        link="https://example.com/old",
+                        project_id=project_id,
+                    )
+                ],
+            )
+            await save_path_links(
+                schema_name,
+                [
+                    PathLink(
+                        path="/doc/new",
+                        link="https://example.com/new",
+                        project_id=project_id,
+                    )
+                ],
+                replace_project_id=project_id,
+            )
+            found = await find_path_links(schema_name, project_id)
+            assert [(p.path, p.link) for p in found] == [
+                ("/doc/new", "https://example.com/new")
+            ]
+        finally:
+            await drop_links_table_table(schema_name)
+
+    await create_test_project_wrapper(test_function)
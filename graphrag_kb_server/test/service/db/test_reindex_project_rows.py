@@ -0,0 +1,143 @@
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from graphrag_kb_server.model.project import FullProject, Project
+from graphrag_kb_server.model.search.entity import (
+    Abstraction,
+    EntityList,
+    EntityWithScore,
+)
+from graphrag_kb_server.model.search.match_query import MatchOutput
+from graphrag_kb_server.model.topics import Topic, Topics, TopicsRequest
+from graphrag_kb_server.test.model.match_query_provider import create_match_query
+
+
+def _centrality_scores(entity_id: str) -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            {
+                "entity_id": entity_id,
+                "entity_type": "category",
+                "description": f"{entity_id} description",
+                "centrality_score": 1.0,
+            }
+        ]
+    )
+
+
+@pytest.mark.asyncio
+async def test_full_reindex_serves_topics_and_matches_of_the_new_graph(
+    tmp_path, monkeypatch
+):
+    from graphrag_kb_server.service import topic_generation
+    from graphrag_kb_server.service.db.db_persistence_expanded_entities import (
+        create_expanded_entities_table,
+        drop_expanded_entities_table,
+        insert_expanded_entities,
+    )
+    from graphrag_kb_server.service.db.db_persistence_topics import (
+        create_topics_table,
+        drop_topics_table,
+        save_topics_request,
+    )
+    from graphrag_kb_server.service.lightrag import lightrag_index_support
+    from graphrag_kb_server.service.search import matching
+    from graphrag_kb_server.test.service.db.common_test_support import (
+        create_test_project_wrapper,
+    )
+
+    async def noop(*args, **kwargs):
+        pass
+
+    async def create_rag(project_folder, working_dir):
+        return SimpleNamespace(working_dir=str(working_dir))
+
+    monkeypatch.setattr(lightrag_index_support.lightrag_cfg, "lightrag_hot_swap", True)
+    monkeypatch.setattr(lightrag_index_support, "create_rag", create_rag)
+    for name in (
+        "_index_files",
+        "refresh_centrality_scores",
+        "save_links",
+        "save_path_properties",
+        "get_keyword_matcher",
+        "precompute_token_counts",
+    ):
+        monkeypatch.setattr(lightrag_index_support, name, noop)
+    monkeypatch.setattr(lightrag_index_support.lightrag_cache, "swap", noop)
+
+    async def test_function(
+        full_project: FullProject, _: Project, schema_name: str, project_name: str
+    ):
+        project_dir = tmp_path / schema_name / full_project.engine.value / project_name
+        (project_dir / "lightrag").mkdir(parents=True)
+        topics_request = TopicsRequest(
+            project_dir=project_dir, engine=full_project.engine, limit=10
+        )
+        match_query = create_match_query()
+        try:
+            await create_topics_table(schema_name)
+            await create_expanded_entities_table(schema_name)
+            # Generated from the graph of the previous version
+            await save_topics_request(
+                topics_request,
+                Topics(
+                    topics=[
+                        Topic(name="Old", description="", type="category", questions=[])
+                    ]
+                ),
+            )
+            old_match = EntityWithScore(
+                entity="Old",
+                score=0.9,
+                reasoning="",
+                abstraction=Abstraction.HIGH_LEVEL,
+            )
+            await insert_expanded_entities(
+                project_dir,
+                match_query,
+                MatchOutput(entity_dict={"category": EntityList(entities=[old_match])}),
+            )
+
+            await lightrag_index_support.acreate_lightrag(
+                True, project_dir, False, None
+            )
+
+            async def new_graph_scores(project_dir, centrality_measure):
+                return _centrality_scores("New")
+
+            async def match_entities(query, entities):
+                return EntityList(
+                    entities=[
+                        EntityWithScore(
+                            entity=entity.name,
+                            score=0.9,
+                            reasoning="",
+                            abstraction=Abstraction.HIGH_LEVEL,
+                        )
+                        for entity in entities
+                    ]
+                )
+
+            monkeypatch.setattr(
+                topic_generation, "get_sorted_centrality_scores_as_pd", new_graph_scores
+            )
+            monkeypatch.setattr(
+                matching, "get_sorted_centrality_scores_as_pd", new_graph_scores
+            )
+            monkeypatch.setattr(matching, "match_entities", match_entities)
+            topics = await topic_generation.generate_topics(topics_request)
+            assert [topic.name for topic in topics.topics] == ["New"]
+            match_output = await matching.match_entities_with_lightrag(
+                project_dir, match_query
+            )
+            assert [
+                entity.entity
+                for entity in match_output.entity_dict["category"].entities
+            ] == ["New"]
+        finally:
+            await drop_expanded_entities_table(schema_name)
+            await drop_topics_table(schema_name)
+
+    await create_test_project_wrapper(test_function)
@@ -76,3 +76,64 @@ async def test_create_topic():
             await drop_topics_table(schema_name)
 
     await create_test_project_wrapper(test_function)
+
+
+@pytest.mark.asyncio
+async def test_topics_per_centrality_measure():
+    from graphrag_kb_server.model.node_centrality import CentralityMeasure
+    from graphrag_kb_server.model.topics import Topics
+    from graphrag_kb_server.test.service.db.common_test_support import (
+        create_test_project_wrapper,
+        create_project_dir,
+    )
+    from graphrag_kb_server.service.db.db_persistence_topics import (
+        create_topics_table,
+        drop_topics_table,
+        find_topics_by_project_name,
+        save_topics_request,
+    )
+
+    async def test_function(
+        full_project: FullProject,
+        found_project: Project,
+        schema_name: str,
+        project_name: str,
+    ):
+        project_dir = create_project_dir(schema_name, full_project.engine, project_name)
+        try:
+            await create_topics_table(schema_name)
+            for measure, names in (
+                (CentralityMeasure.BETWEENNESS, ["Bridge", "Hub"]),
+                (CentralityMeasure.PAGERANK, ["Hub", "Authority"]),
+            ):
+                topics_request = TopicsRequest(
+                    engine=full_project.engine,
+                    project_dir=project_dir,
+                    centrality_measure=measure,
+                )
+                await save_topics_request(
+                    topics_request,
+                    Topics(
+                        topics=[
+                            Topic(name=name, description="", type="category")
+                            for name in names
+                        ]
+                    ),
+                )
+            for measure, names in (
+                (CentralityMeasure.BETWEENNESS, ["Bridge", "Hub"]),
+                (CentralityMeasure.PAGERANK, ["Hub", "Authority"]),
+                (CentralityMeasure.DEGREE, []),
+            ):
+                topics = await find_topics_by_project_name(
+                    TopicsRequest(
+                        engine=full_project.engine,
+                        project_dir=project_dir,
+                        centrality_measure=measure,
+                    )
+                )
+                assert [topic.name for topic in topics.topics] == names
+        finally:
+            await drop_topics_table(schema_name)
+
+    await create_test_project_wrapper(test_function)
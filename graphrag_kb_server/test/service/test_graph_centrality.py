@@ -0,0 +1,48 @@
+import networkx as nx
+import numpy as np
+
+
+def _graph() -> nx.Graph:
+    # Two cliques joined by a bridge, and a separate pair
+    G = nx.Graph()
+    G.add_edges_from(nx.complete_graph(["a1", "a2", "a3", "a4"]).edges())
+    G.add_edges_from(nx.complete_graph(["b1", "b2", "b3", "b4"]).edges())
+    G.add_edges_from([("a1", "b1"), ("x", "y")])
+    return G
+
+
+def test_measures_match_networkx():
+    from graphrag_kb_server.service.graph_centrality import (
+        degree_centrality,
+        eigenvector_centrality,
+    )
+    from graphrag_kb_server.service.random_walk import GraphCSR
+
+    G = _graph()
+    csr = GraphCSR.from_networkx(G)
+    expected = nx.degree_centrality(G)
+    assert np.allclose(degree_centrality(csr), [expected[n] for n in csr.node_ids])
+    connected = G.subgraph(nx.node_connected_component(G, "a1"))
+    csr = GraphCSR.from_networkx(connected)
+    expected = nx.eigenvector_centrality(connected, tol=1e-10, max_iter=1000)
+    scores = eigenvector_centrality(csr, tolerance=1e-10, max_iterations=1000)
+    assert np.allclose(scores, [expected[n] for n in csr.node_ids], atol=1e-6)
+
+
+def test_communities_of_cliques():
+    from graphrag_kb_server.service.graph_centrality import (
+        community_centrality,
+        label_propagation,
+    )
+    from graphrag_kb_server.service.random_walk import GraphCSR
+
+    csr = GraphCSR.from_networkx(_graph())
+    communities = label_propagation(csr)
+    community_of = dict(zip(csr.node_ids, communities.tolist()))
+    assert community_of["a1"] == 0
+    assert len({community_of[n] for n in ["a1", "a2", "a3", "a4"]}) == 1
+    assert len({community_of[n] for n in ["b1", "b2", "b3", "b4"]}) == 1
+    assert len(set(community_of.values())) == 3
+    scores = dict(zip(csr.node_ids, community_centrality(csr, communities).tolist()))
+    # Every node of a clique is connected to the rest of its community
+    assert scores["a1"] == scores["b4"] == scores["x"] == 1.0
@@ -0,0 +1,92 @@
+import asyncio
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+
+def _project(name: str, updated: datetime):
+    return SimpleNamespace(name=name, updated_timestamp=updated)
+
+
+@pytest.mark.asyncio
+async def test_projects_ordered_by_usage(monkeypatch, tmp_path):
+    from graphrag_kb_server.service import project, project_warmup
+
+    monkeypatch.setattr(project_warmup.cfg, "graphrag_root_dir_path", tmp_path)
+    monkeypatch.setattr(
+        project_warmup,
+        "list_tennants",
+        lambda: [SimpleNamespace(folder_name="t1")],
+    )
+    listing = SimpleNamespace(
+        lightrag_projects=SimpleNamespace(
+            projects=[
+                _project("old", datetime(2024, 1, 1)),
+                _project("new", datetime(2025, 1, 1)),
+                _project("searched", datetime(2023, 1, 1)),
+                _project("searched_recently", datetime(2023, 1, 1)),
+            ]
+        )
+    )
+    monkeypatch.setattr(project, "list_projects", lambda _: listing)
+
+    async def last_searches(schema_name: str, engine: str):
+        return {
+            "searched": datetime(2024, 6, 1),
+            "searched_recently": datetime(2024, 7, 1),
+        }
+
+    monkeypatch.setattr(project_warmup, "find_last_search_by_project", last_searches)
+    projects = await project_warmup.list_projects_by_usage()
+    assert [p.name for p in projects] == ["searched_recently", "searched", "new", "old"]
+    assert projects[0] == tmp_path / "t1" / "lightrag" / "searched_recently"
+
+
+@pytest.mark.asyncio
+async def test_warm_up_bounded_concurrency(monkeypatch):
+    from graphrag_kb_server.service import project_warmup
+    from graphrag_kb_server.service.lightrag.lightrag_residency import (
+        LightRAGResidencyManager,
+    )
+
+    folders = [Path(f"/root/t1/lightrag/p{i}") for i in range(5)]
+
+    async def by_usage():
+        return folders
+
+    monkeypatch.setattr(project_warmup, "list_projects_by_usage", by_usage)
+    monkeypatch.setattr(project_warmup.cfg, "extract_links_on_start", False)
+    cache = LightRAGResidencyManager(memory_budget=0)
+    monkeypatch.setattr(project_warmup, "lightrag_cache", cache)
+    running = 0
+    max_running = 0
+    order = []
+
+    async def initialize_rag(project_folder: Path):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        order.append(project_folder.name)
+        await asyncio.sleep(0.01)
+        running -= 1
+        if project_folder.name == "p3":
+            raise ValueError("Broken index")
+        cache.projects[project_folder.as_posix()] = object()
+
+    monkeypatch.setattr(project_warmup, "initialize_rag", initialize_rag)
+    warmup = project_warmup.ProjectWarmup()
+    assert not warmup.is_ready()
+    await warmup.warm_up(concurrency=2)
+
+    assert warmup.is_ready()
+    assert max_running == 2
+    assert order == ["p0", "p1", "p2", "p3", "p4"]
+    snapshot = warmup.snapshot()
+    assert snapshot["counts"] == {"cold": 0, "warming": 0, "warm": 4, "failed": 1}
+    assert snapshot["projects"][3] == {"project": "t1/p3", "state": "failed"}
+
+    # Evicted projects are cold again and loaded on their next query
+    cache.projects.pop(folders[0].as_posix())
+    assert warmup.state(folders[0]) == project_warmup.WarmState.COLD
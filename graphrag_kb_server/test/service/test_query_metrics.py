@@ -0,0 +1,60 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+
+def test_latency_histogram():
+    from graphrag_kb_server.service.query_metrics import LatencyHistogram
+
+    histogram = LatencyHistogram()
+    for elapsed_ms in [1, 20, 20, 200, 70000]:
+        histogram.observe(elapsed_ms)
+    result = histogram.as_dict()
+    assert result["count"] == 5
+    assert result["p50_ms"] == 25
+    assert result["p99_ms"] == 70000
+    assert result["buckets"]["le_5"] == 1
+    assert result["buckets"]["le_inf"] == 1
+
+
+@pytest.mark.asyncio
+async def test_trace_spans_are_aggregated():
+    from graphrag_kb_server.service.query_metrics import (
+        SPAN_NODE_DATA,
+        SPAN_TOTAL,
+        query_metrics,
+        start_trace,
+        timed,
+        trace_span,
+        traced_stream,
+    )
+
+    query_metrics.reset()
+    trace = start_trace(Path("/data/tennant1/lightrag/project1"), "hybrid")
+    with trace_span("keywords"):
+        await asyncio.sleep(0.01)
+    await asyncio.gather(
+        timed(SPAN_NODE_DATA, asyncio.sleep(0.01)), timed("edge_data", asyncio.sleep(0))
+    )
+
+    async def tokens():
+        yield "a"
+        yield "b"
+
+    collected = [t async for t in traced_stream(tokens(), trace, trace.start)]
+    assert collected == ["a", "b"]
+    assert trace.finished
+    assert trace.timings_ms()["keywords"] >= 10
+
+    snapshot = query_metrics.snapshot("tennant1/project1")
+    spans = {s["span"] for s in snapshot}
+    assert {
+        "keywords",
+        SPAN_NODE_DATA,
+        "edge_data",
+        "llm_first_token",
+        SPAN_TOTAL,
+    } <= spans
+    assert all(s["mode"] == "hybrid" and s["count"] == 1 for s in snapshot)
+    assert query_metrics.snapshot("other/project") == []
@@ -0,0 +1,68 @@
+import datetime
+from pathlib import Path
+
+
+def _create_project(tmp_path: Path) -> Path:
+    project_dir = tmp_path / "tenant" / "lightrag" / "project"
+    (project_dir / "input" / "docs").mkdir(parents=True)
+    (project_dir / "original_input" / "docs").mkdir(parents=True)
+    (project_dir / "input" / "docs" / "report_2024.txt").write_text("report")
+    (project_dir / "input" / "docs" / "notes.txt").write_text("notes")
+    (project_dir / "original_input" / "docs" / "report 2024.pdf").write_bytes(b"%PDF")
+    (project_dir / "original_input" / "docs" / "report 2024.png").write_bytes(b"png")
+    (project_dir / "original_input" / "docs" / "notes.docx").write_bytes(b"docx")
+    return project_dir
+
+
+def _create_index(project_dir: Path):
+    from graphrag_kb_server.service.reference_index_service import (
+        ReferenceIndex,
+        _list_relative_files,
+    )
+
+    report_path = (project_dir / "input" / "docs" / "report_2024.txt").as_posix()
+    last_modified = datetime.datetime(2024, 5, 1, tzinfo=datetime.timezone.utc)
+    return ReferenceIndex(
+        project_dir=project_dir,
+        metadata={report_path: (["https://example.com/report"], last_modified)},
+        input_files=_list_relative_files(project_dir / "input"),
+        original_files=_list_relative_files(project_dir / "original_input"),
+    )
+
+
+def test_get_links_and_image(tmp_path):
+    project_dir = _create_project(tmp_path)
+    reference_index = _create_index(project_dir)
+
+    links, image, last_modified = reference_index.get_links_and_image(
+        project_dir / "input" / "docs" / "report_2024.txt"
+    )
+    assert links == ["https://example.com/report"]
+    assert image == "original_input/docs/report 2024.png"
+    assert last_modified.year == 2024
+
+
+def test_get_links_and_image_without_image(tmp_path):
+    project_dir = _create_project(tmp_path)
+    reference_index = _create_index(project_dir)
+
+    links, image, last_modified = reference_index.get_links_and_image(
+        project_dir / "input" / "docs" / "notes.txt"
+    )
+    assert links == []
+    assert image is None
+    assert last_modified is None
+
+    _, image, _ = reference_index.get_links_and_image(
+        project_dir / "input" / "docs" / "missing.txt"
+    )
+    assert image is None
+
+
+def test_get_last_modified(tmp_path):
+    project_dir = _create_project(tmp_path)
+    reference_index = _create_index(project_dir)
+
+    path = (project_dir / "input" / "docs" / "report_2024.txt").as_posix()
+    assert reference_index.get_last_modified(path) is not None
+    assert reference_index.get_last_modified("/unknown.txt") is None
@@ -0,0 +1,156 @@
+import contextvars
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+
+def test_llm_usage_is_attributed_to_the_project():
+    from graphrag_kb_server.service.query_metrics import start_trace
+    from graphrag_kb_server.service.resource_accounting import (
+        UNATTRIBUTED,
+        ResourceAccounting,
+        llm_project,
+    )
+
+    hashing_kv = SimpleNamespace(
+        global_config={"working_dir": "/data/t1/lightrag/p1/lightrag.v2"}
+    )
+    assert llm_project(hashing_kv) == "t1/p1"
+    assert llm_project(None) == UNATTRIBUTED
+
+    def traced_project() -> str:
+        start_trace(Path("/data/t1/lightrag/p2"), "hybrid")
+        return llm_project(None)
+
+    # Runs in a copy of the context, so that the trace does not leak into other tests
+    assert contextvars.copy_context().run(traced_project) == "t1/p2"
+
+    accounting = ResourceAccounting()
+    accounting.record_llm_usage("t1/p1", 100, 20)
+    accounting.record_llm_usage("t1/p1", 50, 10)
+    usage = accounting.usage["t1/p1"]
+    assert (usage.llm_calls, usage.prompt_tokens, usage.completion_tokens) == (
+        2,
+        150,
+        30,
+    )
+
+
+def test_latency_histogram_since():
+    from graphrag_kb_server.service.query_metrics import LatencyHistogram
+
+    histogram = LatencyHistogram()
+    for elapsed_ms in (3, 40, 40):
+        histogram.observe(elapsed_ms)
+    previous = LatencyHistogram()
+    previous.add(histogram)
+    for elapsed_ms in (2000, 2000, 4000):
+        histogram.observe(elapsed_ms)
+
+    interval = histogram.since(previous)
+    assert interval.count == 3
+    assert interval.percentile(0.5) == 2500
+    assert interval.total_ms == 8000
+    assert histogram.percentile(0.5) == 50
+
+
+@pytest.mark.asyncio
+async def test_snapshot_and_persist(monkeypatch, tmp_path):
+    from graphrag_kb_server.service import project, resource_accounting
+    from graphrag_kb_server.service.lightrag import lightrag_init
+    from graphrag_kb_server.service.query_metrics import QueryMetrics, QueryTrace
+
+    monkeypatch.setattr(resource_accounting.cfg, "graphrag_root_dir_path", tmp_path)
+    monkeypatch.setattr(
+        resource_accounting,
+        "list_tennants",
+        lambda: [SimpleNamespace(folder_name="t1")],
+    )
+    listing = SimpleNamespace(
+        lightrag_projects=SimpleNamespace(projects=[SimpleNamespace(name="p1")]),
+        cag_projects=SimpleNamespace(projects=[SimpleNamespace(name="p1")]),
+    )
+    monkeypatch.setattr(project, "list_projects", lambda _: listing)
+    (tmp_path / "t1" / "lightrag" / "p1").mkdir(parents=True)
+    (tmp_path / "t1" / "lightrag" / "p1" / "input.txt").write_bytes(b"x" * 10)
+    (tmp_path / "t1" / "cag" / "p1").mkdir(parents=True)
+    monkeypatch.setattr(
+        lightrag_init.lightrag_cache,
+        "projects",
+        {(tmp_path / "t1" / "lightrag" / "p1").as_posix(): SimpleNamespace(memory=64)},
+    )
+    metrics = QueryMetrics()
+    monkeypatch.setattr(resource_accounting, "query_metrics", metrics)
+
+    def observe_query(elapsed_ms: float):
+        trace = QueryTrace("t1/p1", "hybrid")
+        trace.record("total", elapsed_ms)
+        metrics.observe(trace)
+
+    observe_query(20)
+    accounting = resource_accounting.ResourceAccounting()
+    accounting.record_llm_usage("t1/p1", 100, 20)
+    with accounting.track_indexing(tmp_path / "t1" / "lightrag" / "p1"):
+        pass
+
+    snapshot = await accounting.snapshot()
+    [tennant] = snapshot["tennants"]
+    lightrag_row, cag_row = tennant["projects"]
+    assert lightrag_row["engine"] == "lightrag"
+    assert lightrag_row["resident_memory_bytes"] == 64
+    assert lightrag_row["disk_bytes"] == 10
+    assert lightrag_row["query_count"] == 1
+    assert lightrag_row["prompt_tokens"] == 100
+    assert lightrag_row["indexing_runs"] == 1
+    assert cag_row["prompt_tokens"] == 0
+    assert tennant["totals"]["completion_tokens"] == 20
+
+    stored = []
+
+    async def insert(snapshot_at, interval_start, rows):
+        stored.append(rows)
+
+    async def create_table():
+        pass
+
+    monkeypatch.setattr(resource_accounting, "insert_resource_usage", insert)
+    monkeypatch.setattr(
+        resource_accounting, "create_resource_usage_table", create_table
+    )
+    await accounting.persist()
+    accounting.record_llm_usage("t1/p1", 7, 3)
+    observe_query(30)
+    await accounting.persist()
+    # The second snapshot only contains the usage of its interval
+    assert stored[1][0]["prompt_tokens"] == 7
+    assert stored[1][0]["query_count"] == 1
+    assert stored[1][0]["indexing_runs"] == 0
+    assert stored[0][0]["prompt_tokens"] == 100
+
+
+@pytest.mark.asyncio
+async def test_streamed_completion_usage_is_recorded(monkeypatch):
+    from graphrag_kb_server.service.lightrag import lightrag_model_support
+    from graphrag_kb_server.service.resource_accounting import ResourceAccounting
+
+    accounting = ResourceAccounting()
+    monkeypatch.setattr(lightrag_model_support, "resource_accounting", accounting)
+
+    async def response_stream():
+        for content in ("Hello", " world"):
+            delta = SimpleNamespace(content=content)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+        # The last chunk has no choices, only the usage of the whole completion
+        usage = SimpleNamespace(prompt_tokens=12, completion_tokens=2)
+        yield SimpleNamespace(choices=[], usage=usage)
+
+    tokens = [
+        token
+        async for token in lightrag_model_support._stream_tokens(
+            response_stream(), "t1/p1"
+        )
+    ]
+    assert tokens == ["Hello", " world"]
+    usage = accounting.usage["t1/p1"]
+    assert (usage.llm_calls, usage.prompt_tokens, usage.completion_tokens) == (1, 12, 2)
@@ -0,0 +1,121 @@
+from pathlib import Path
+
+import networkx as nx
+import numpy as np
+import pytest
+
+
+def _graph() -> nx.Graph:
+    G = nx.Graph()
+    for name in ["AI", "LLMs", "Agents", "RAG", "Graphs", "Isolated"]:
+        G.add_node(
+            name, entity_id=name, entity_type="category", description=f"About {name}"
+        )
+    G.add_edges_from(
+        [("AI", "LLMs"), ("AI", "Agents"), ("LLMs", "RAG"), ("RAG", "Graphs")]
+    )
+    return G
+
+
+def test_random_walk_visits_are_seeded():
+    from graphrag_kb_server.service.random_walk import top_nodes, random_walk_visits
+
+    G = _graph()
+    csr, visits = random_walk_visits(G, "AI", 2000, 4, 0.15, runs=3, seed=11)
+    assert visits.shape == (3, 6)
+    _, same_visits = random_walk_visits(G, "AI", 2000, 4, 0.15, runs=3, seed=11)
+    assert np.array_equal(visits, same_visits)
+    # Every sample starts at the source and the isolated node is never reached
+    assert (visits[:, csr.positions["AI"]] >= 2000).all()
+    assert (visits[:, csr.positions["Isolated"]] == 0).all()
+    ranking = [csr.node_ids[i] for i, _ in top_nodes(visits[0], 3)]
+    assert ranking[0] == "AI"
+    assert "Graphs" not in ranking
+
+    # Walks from a node without neighbours stop immediately
+    _, visits = random_walk_visits(G, "Isolated", 100, 4, 0.15, seed=1)
+    assert visits.sum() == 100
+
+
+def test_adjacency_follows_graph_changes():
+    from graphrag_kb_server.service.lightrag.lightrag_graph_snapshot import (
+        graph_changed,
+    )
+    from graphrag_kb_server.service.random_walk import get_graph_csr
+
+    G = _graph()
+    assert get_graph_csr(G) is get_graph_csr(G)
+    G.add_edge("Graphs", "Isolated")
+    graph_changed(G)
+    csr = get_graph_csr(G)
+    isolated = csr.positions["Isolated"]
+    neighbours = csr.indices[csr.indptr[isolated] : csr.indptr[isolated + 1]]
+    assert [csr.node_ids[i] for i in neighbours] == ["Graphs"]
+
+
+def test_related_topics_of_random_walk_runs():
+    from graphrag_kb_server.model.topics import (
+        SimilarityTopicsMethod,
+        SimilarityTopicsRequest,
+    )
+    from graphrag_kb_server.service.similar_topics import (
+        get_sorted_related_entities_simple_rerank,
+    )
+
+    request = SimilarityTopicsRequest(
+        project_dir=Path("unused"),
+        source="LLMs",
+        text="",
+        samples=1000,
+        k=3,
+        runs=4,
+        seed=5,
+        method=SimilarityTopicsMethod.RANDOM_WALK,
+    )
+    similarity_topics = get_sorted_related_entities_simple_rerank(_graph(), request)
+    assert [t.name for t in similarity_topics.topics][0] == "LLMs"
+    assert len(similarity_topics.topics) == 3
+    assert all(t.type == "category" for t in similarity_topics.topics)
+    assert all(0 < t.probability <= 1 for t in similarity_topics.topics)
+    again = get_sorted_related_entities_simple_rerank(_graph(), request)
+    assert again == similarity_topics
+
+
+def test_personalized_pagerank_matches_networkx():
+    from graphrag_kb_server.model.topics import (
+        SimilarityTopicsMethod,
+        SimilarityTopicsRequest,
+    )
+    from graphrag_kb_server.service.random_walk import personalized_pagerank
+    from graphrag_kb_server.service.similar_topics import (
+        get_sorted_related_entities_simple_rerank,
+    )
+
+    G = _graph()
+    G.remove_node("Isolated")
+    personalization = {"AI": 1, "RAG": 1}
+    for graph in (
+        G,
+        nx.DiGraph([("AI", "LLMs"), ("LLMs", "RAG"), ("RAG", "AI"), ("AI", "Graphs")]),
+    ):
+        csr, scores = personalized_pagerank(graph, ["AI", "RAG"], 0.15, tolerance=1e-12)
+        expected = nx.pagerank(
+            graph, alpha=0.85, personalization=personalization, tol=1e-12, max_iter=1000
+        )
+        assert np.allclose(scores, [expected[n] for n in csr.node_ids], atol=1e-8)
+    expected = nx.pagerank(
+        G, alpha=0.85, personalization=personalization, tol=1e-12, max_iter=1000
+    )
+
+    request = SimilarityTopicsRequest(
+        project_dir=Path("unused"),
+        source="AI",
+        sources=["AI", "RAG", "Unknown"],
+        text="",
+        k=3,
+        method=SimilarityTopicsMethod.PERSONALIZED_PAGERANK,
+    )
+    similarity_topics = get_sorted_related_entities_simple_rerank(_graph(), request)
+    ranked = sorted(expected, key=expected.get, reverse=True)[:3]
+    assert [t.name for t in similarity_topics.topics] == ranked
+    assert similarity_topics.topics[0].probability == pytest.approx(expected[ranked[0]])
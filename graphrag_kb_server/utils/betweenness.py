@@ -0,0 +1,176 @@
+"""
+Betweenness centrality of undirected graphs in CSR form, estimated from the shortest paths of
+sampled pivot nodes (Brandes and Pich). This module only depends on numpy and numba, so that
+the worker processes which run it do not import the server.
+"""
+
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from numba import njit
+
+# The pivots are split in a fixed number of chunks, so that the sums do not depend on the threads.
+# The chunks run in Python threads rather than numba's parallel threading layers, which cannot be
+# called safely from the concurrent threads of the server.
+PIVOT_CHUNKS = 8
+
+
+def pivot_count(number_of_nodes: int, epsilon: float, delta: float) -> int:
+    """
+    Pivots per connected component for which every normalized betweenness score is within
+    `epsilon` of the exact score with probability 1 - `delta` (Hoeffding and union bounds).
+    """
+    if number_of_nodes < 1:
+        return 0
+    return math.ceil(math.log(2 * number_of_nodes / delta) / (2 * epsilon**2))
+
+
+@njit(cache=True)
+def connected_components(indptr: np.ndarray, indices: np.ndarray) -> np.ndarray:
+    """The component label of each node, numbered in the order of their first node."""
+    n = len(indptr) - 1
+    labels = np.full(n, -1, dtype=np.int64)
+    queue = np.empty(n, dtype=np.int64)
+    label = 0
+    for start in range(n):
+        if labels[start] >= 0:
+            continue
+        labels[start] = label
+        queue[0] = start
+        head, tail = 0, 1
+        while head < tail:
+            v = queue[head]
+            head += 1
+            for j in range(indptr[v], indptr[v + 1]):
+                w = indices[j]
+                if labels[w] < 0:
+                    labels[w] = label
+                    queue[tail] = w
+                    tail += 1
+        label += 1
+    return labels
+
+
+@njit(cache=True)
+def neighbourhood_fingerprints(
+    indptr: np.ndarray, indices: np.ndarray, node_hashes: np.ndarray
+) -> np.ndarray:
+    """The sum of the hashes of the neighbours of each node, which changes with its edges."""
+    n = len(indptr) - 1
+    fingerprints = np.zeros(n, dtype=np.uint64)
+    for v in range(n):
+        fingerprint = np.uint64(0)
+        for j in range(indptr[v], indptr[v + 1]):
+            fingerprint += node_hashes[indices[j]]
+        fingerprints[v] = fingerprint
+    return fingerprints
+
+
+@njit(nogil=True, cache=True)
+def _accumulate_dependencies(
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    pivots: np.ndarray,
+    weights: np.ndarray,
+    chunk: int,
+    betweenness: np.ndarray,
+):
+    n = len(indptr) - 1
+    paths = np.zeros(n)
+    distance = np.full(n, -1, dtype=np.int64)
+    dependency = np.zeros(n)
+    order = np.empty(n, dtype=np.int64)
+    for p in range(chunk, len(pivots), PIVOT_CHUNKS):
+        source = pivots[p]
+        paths[source] = 1.0
+        distance[source] = 0
+        order[0] = source
+        head, tail = 0, 1
+        # Breadth first search counting the shortest paths from the pivot
+        while head < tail:
+            v = order[head]
+            head += 1
+            for j in range(indptr[v], indptr[v + 1]):
+                w = indices[j]
+                if distance[w] < 0:
+                    distance[w] = distance[v] + 1
+                    order[tail] = w
+                    tail += 1
+                if distance[w] == distance[v] + 1:
+                    paths[w] += paths[v]
+        # Dependencies in the reverse order of the search, the pivot itself excluded
+        for i in range(tail - 1, 0, -1):
+            w = order[i]
+            coefficient = (1.0 + dependency[w]) / paths[w]
+            for j in range(indptr[w], indptr[w + 1]):
+                v = indices[j]
+                if distance[v] == distance[w] - 1:
+                    dependency[v] += paths[v] * coefficient
+            betweenness[w] += weights[p] * dependency[w]
+        for i in range(tail):
+            w = order[i]
+            paths[w] = 0.0
+            distance[w] = -1
+            dependency[w] = 0.0
+
+
+def sample_betweenness(
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    labels: np.ndarray,
+    components: np.ndarray,
+    samples: int | None,
+    seed: int,
+    threads: int = 1,
+) -> np.ndarray:
+    """
+    Unnormalized betweenness of the nodes of the given components, zero for the other nodes.
+    Each component is searched from `samples` of its nodes drawn without replacement, or from
+    all of them if it is not larger (or `samples` is None), which gives the exact scores.
+    The dependencies of a sample are scaled by the size of its component. The chunks of pivots
+    are searched by up to `threads` threads, with the same result for any number of them.
+    """
+    rng = np.random.default_rng(seed)
+    order = np.argsort(labels, kind="stable")
+    bounds = np.searchsorted(labels[order], np.arange(labels.max(initial=-1) + 2))
+    pivots, weights = [], []
+    for component in np.sort(components):
+        members = order[bounds[component] : bounds[component + 1]]
+        # Nodes of a component with up to 2 nodes are on no shortest path between other nodes
+        if len(members) < 3:
+            continue
+        if samples is not None and samples < len(members):
+            pivots.append(rng.choice(members, samples, replace=False))
+            weights.append(np.full(samples, len(members) / samples))
+        else:
+            pivots.append(members)
+            weights.append(np.ones(len(members)))
+    if not pivots:
+        return np.zeros(len(labels))
+    pivots, weights = np.concatenate(pivots), np.concatenate(weights)
+    partial = np.zeros((PIVOT_CHUNKS, len(labels)))
+
+    def accumulate(chunk: int):
+        _accumulate_dependencies(
+            indptr, indices, pivots, weights, chunk, partial[chunk]
+        )
+
+    if threads > 1:
+        with ThreadPoolExecutor(min(threads, PIVOT_CHUNKS)) as executor:
+            list(executor.map(accumulate, range(PIVOT_CHUNKS)))
+    else:
+        for chunk in range(PIVOT_CHUNKS):
+            accumulate(chunk)
+    return partial.sum(axis=0)
+
+
+def normalize_betweenness(betweenness: np.ndarray) -> np.ndarray:
+    """
+    Normalizes the unnormalized betweenness of an undirected graph, which counts each pair of
+    endpoints in both directions, by the number of pairs of the other nodes.
+    """
+    n = len(betweenness)
+    if n <= 2:
+        return np.zeros(n)
+    return betweenness / ((n - 1) * (n - 2))
@@ -1,7 +1,10 @@
 from pathlib import Path
+import asyncio
 import time
 import pickle
-from typing import TypeVar, Generic, Dict, Any
+from typing import Awaitable, Callable, TypeVar, Generic, Dict, Any
+
+from graphrag_kb_server.logger import logger
 
 T = TypeVar("T")
 U = TypeVar("U")
@@ -64,6 +67,46 @@ class GenericSimpleCache(Generic[T, U]):
         }
 
 
+class DelayedProjectWriter:
+    """
+    Writes the changed data of a project `delay` seconds after its first change, so that the
+    changes made in the meantime are written once and requests do not wait for the writes.
+    """
+
+    def __init__(self, delay: float, write: Callable[[Path], Awaitable[None]]):
+        self.delay = delay
+        self.write = write
+        self.pending: dict[str, tuple[Path, asyncio.Task]] = {}
+
+    def schedule(self, project_dir: Path):
+        posix_path = project_dir.as_posix()
+        if posix_path not in self.pending:
+            task = asyncio.create_task(self._write_later(project_dir))
+            self.pending[posix_path] = (project_dir, task)
+
+    async def _write_later(self, project_dir: Path):
+        await asyncio.sleep(self.delay)
+        # Changes from now on are written by the next write
+        self.pending.pop(project_dir.as_posix(), None)
+        try:
+            await self.write(project_dir)
+        except Exception as e:
+            logger.error(f"Could not write the changes of {project_dir}: {e}")
+
+    def cancel(self, project_dir: Path):
+        _, task = self.pending.pop(project_dir.as_posix(), (None, None))
+        if task is not None:
+            task.cancel()
+
+    async def flush(self):
+        """Writes the pending changes now, e.g. when the server stops."""
+        pending = list(self.pending.values())
+        self.pending.clear()
+        for project_dir, task in pending:
+            task.cancel()
+            await self.write(project_dir)
+
+
 class PersistentSimpleCache(Generic[T]):
 
     def __init__(self, key: str):